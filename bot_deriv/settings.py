@@ -74,6 +74,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.monitoreo.consultas.PresupuestoConsultasMiddleware",
 ]
 
 ROOT_URLCONF = 'bot_deriv.urls'
@@ -190,16 +191,56 @@ REST_FRAMEWORK = {
 }
 
 # Channels
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+# "sqlite" comparte los eventos entre procesos (motor, recolector, servidor ASGI)
+# a través de un archivo propio; "memoria" solo entrega dentro del mismo proceso.
+CHANNEL_LAYER = os.getenv("CHANNEL_LAYER", "sqlite").lower()
+
+if CHANNEL_LAYER == "memoria":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.canales.CapaCanalesSQLite",
+            "CONFIG": {
+                "ruta": os.getenv("CHANNEL_LAYER_RUTA") or str(BASE_DIR / "canales.sqlite3"),
+            },
+        }
     }
-}
 
 # Configuración del bot
 DERIV_API_TOKEN = os.getenv("DERIV_API_TOKEN", "WwPVsJ7gJZ7KHW2")
 DERIV_APP_ID = os.getenv("DERIV_APP_ID", "1089")
 DERIV_ACCOUNT_ID = os.getenv("DERIV_ACCOUNT_ID", "")
+# URL del WebSocket (vacío = API real de Deriv); p. ej. ws://127.0.0.1:8765 para replay
+DERIV_WS_URL = os.getenv("DERIV_WS_URL", "")
+# Archivo donde grabar todos los frames del cliente de Deriv (vacío = no grabar)
+DERIV_CAPTURA_FRAMES = os.getenv("DERIV_CAPTURA_FRAMES", "")
+
+# Simulador de horarios: False = guardar solo los agregados por hora
+SIMULACION_PERSISTIR_OPERACIONES = (
+    os.getenv("SIMULACION_PERSISTIR_OPERACIONES", "True").lower() == "true"
+)
+# Operaciones simuladas mínimas en una hora para que su mejor duración
+# reemplace la duración fija del motor profesional (--duracion-simulada)
+SIMULACION_MINIMO_OPERACIONES_DURACION = int(
+    os.getenv("SIMULACION_MINIMO_OPERACIONES_DURACION", "30")
+)
+
+# Presupuesto de consultas SQL por ruta (ver core.monitoreo.consultas).
+# Las claves reemplazan a PRESUPUESTOS_POR_DEFECTO; en modo estricto
+# (tests) excederlo lanza PresupuestoConsultasExcedido en lugar de registrarlo.
+PRESUPUESTOS_CONSULTAS = {}
+PRESUPUESTO_CONSULTAS_ESTRICTO = (
+    os.getenv("PRESUPUESTO_CONSULTAS_ESTRICTO", "False").lower() == "true"
+)
+
+# Días que se conservan los resúmenes de LatenciaEtapa y ConsumoConsultas
+# (se purgan en cada volcado; 0 conserva todo)
+MONITOREO_RETENCION_DIAS = int(os.getenv("MONITOREO_RETENCION_DIAS", "14"))
 
 WHATSAPP_NUMEROS_ALERTA = [
     telefono.strip()
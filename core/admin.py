@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ActivoPermitido, ConfiguracionBot
+from .models import ActivoPermitido, ConfiguracionBot, ConsumoConsultas, LatenciaEtapa
 
 
 @admin.register(ConfiguracionBot)
@@ -27,3 +27,27 @@ class ActivoPermitidoAdmin(admin.ModelAdmin):
     list_display = ("nombre", "habilitado", "actualizado")
     list_filter = ("habilitado",)
     search_fields = ("nombre",)
+
+
+@admin.register(LatenciaEtapa)
+class LatenciaEtapaAdmin(admin.ModelAdmin):
+    list_display = ("etapa", "muestras", "p50_ms", "p95_ms", "p99_ms", "max_ms", "registrado_en")
+    list_filter = ("etapa",)
+    ordering = ("-registrado_en",)
+
+
+@admin.register(ConsumoConsultas)
+class ConsumoConsultasAdmin(admin.ModelAdmin):
+    list_display = (
+        "ruta",
+        "ejecuciones",
+        "consultas_p50",
+        "consultas_p95",
+        "consultas_max",
+        "presupuesto",
+        "excesos",
+        "ejecuciones_n_mas_uno",
+        "registrado_en",
+    )
+    list_filter = ("ruta",)
+    ordering = ("-registrado_en",)
@@ -0,0 +1,466 @@
+"""
+Capa de canales entre procesos respaldada por SQLite.
+
+``InMemoryChannelLayer`` solo entrega dentro del proceso que hace el
+``group_send``: los eventos del motor (``ejecutar_bot``), del simulador y de
+``enviar_actualizaciones_dashboard`` nunca llegaban a los websockets del
+servidor ASGI. ``CapaCanalesSQLite`` comparte un archivo SQLite (en modo WAL,
+separado de la base de datos de Django) entre todos los procesos, sin
+servicios externos:
+
+- Cada proceso tiene un identificador y sus canales se llaman
+  ``<prefijo><proceso>!<sufijo>``; los envíos a canales propios y a los
+  miembros locales de un grupo se entregan en memoria, sin tocar SQLite.
+- Un ``group_send`` escribe una fila por *proceso* con miembros en el grupo
+  (no una por canal); el proceso receptor la reparte a sus canales locales.
+- Las escrituras se encolan y un hilo escritor las confirma por lotes en una
+  sola transacción, así que ``group_send`` no bloquea al motor.
+- Un sondeo por proceso receptor lee ``PRAGMA data_version`` cada
+  ``intervalo_sondeo`` segundos y solo consulta la tabla cuando otra
+  conexión escribió algo.
+- Los procesos publican un latido; los mensajes no se enrutan a procesos sin
+  latido reciente y sus membresías se purgan.
+
+Se usa SQLite en lugar de un socket Unix porque también debe funcionar en
+Windows y no requiere un proceso broker.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import queue
+import random
+import sqlite3
+import string
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_LATIDO = 5.0
+PROCESO_VIVO = 30.0  # segundos sin latido para dejar de enrutarle mensajes
+PROCESO_MUERTO = 300.0  # segundos sin latido para purgar sus membresías
+INTERVALO_PURGA = 30.0
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proceso TEXT NOT NULL,
+    canal TEXT NOT NULL DEFAULT '',
+    grupo TEXT NOT NULL DEFAULT '',
+    expira REAL NOT NULL,
+    cuerpo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mensajes_proceso ON mensajes (proceso, id);
+CREATE TABLE IF NOT EXISTS miembros (
+    grupo TEXT NOT NULL,
+    canal TEXT NOT NULL,
+    proceso TEXT NOT NULL,
+    alta REAL NOT NULL,
+    PRIMARY KEY (grupo, canal)
+);
+CREATE INDEX IF NOT EXISTS miembros_grupo ON miembros (grupo, proceso);
+CREATE TABLE IF NOT EXISTS procesos (
+    proceso TEXT PRIMARY KEY,
+    visto REAL NOT NULL
+);
+"""
+
+
+def _conectar(ruta: str) -> sqlite3.Connection:
+    conexion = sqlite3.connect(ruta, timeout=10, isolation_level=None, check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    return conexion
+
+
+class CapaCanalesSQLite(BaseChannelLayer):
+    """
+    Channel layer de Django Channels compartida entre procesos vía SQLite.
+
+    Configuración::
+
+        CHANNEL_LAYERS = {
+            "default": {
+                "BACKEND": "core.canales.CapaCanalesSQLite",
+                "CONFIG": {"ruta": BASE_DIR / "canales.sqlite3"},
+            }
+        }
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        ruta: str = "canales.sqlite3",
+        expiry: int = 60,
+        group_expiry: int = 86400,
+        capacity: int = 100,
+        channel_capacity=None,
+        intervalo_sondeo: float = 0.005,
+        lote_maximo: int = 500,
+        **kwargs,
+    ) -> None:
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.ruta = str(ruta)
+        self.group_expiry = group_expiry
+        self.intervalo_sondeo = intervalo_sondeo
+        self.lote_maximo = lote_maximo
+        self.proceso = uuid.uuid4().hex[:12]
+
+        # Estado local del proceso (solo se toca desde el bucle del sondeo)
+        self._colas: Dict[str, asyncio.Queue] = {}
+        self._grupos: Dict[str, Dict[str, float]] = {}
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._sondeo: Optional[asyncio.Task] = None
+        self._lectura: Optional[sqlite3.Connection] = None
+        self._ultimo_id = 0
+        self._version_datos: Optional[int] = None
+
+        # Escrituras por lotes en un hilo propio
+        self._pendientes: "queue.Queue[Tuple]" = queue.Queue()
+        self._escritor: Optional[threading.Thread] = None
+        self._lock_escritor = threading.Lock()
+        self._esquema_creado = False
+        self.lotes_escritos = 0
+
+    # --- API de channel layer -------------------------------------------------
+
+    async def send(self, channel: str, message: dict) -> None:
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        expira = time.time() + self.expiry
+        cuerpo = self._serializar(message)
+        if self._es_local(channel):
+            if not self._entregar(channel, expira, cuerpo):
+                raise ChannelFull(channel)
+            return
+        self._escribir(("mensaje", self._proceso_de(channel), channel, "", expira, cuerpo))
+
+    async def receive(self, channel: str) -> dict:
+        assert self.valid_channel_name(channel)
+        if not self._es_local(channel):
+            raise ValueError(
+                f"CapaCanalesSQLite solo recibe en canales creados por este proceso ({channel})."
+            )
+        self._asegurar_sondeo()
+        cola = self._colas.setdefault(channel, asyncio.Queue())
+        try:
+            while True:
+                expira, cuerpo = await cola.get()
+                if expira >= time.time():
+                    return json.loads(cuerpo)
+        finally:
+            if cola.empty() and self._colas.get(channel) is cola:
+                del self._colas[channel]
+
+    async def new_channel(self, prefix: str = "specific.") -> str:
+        sufijo = "".join(random.choice(string.ascii_letters) for _ in range(12))
+        return f"{prefix}{self.proceso}!{sufijo}"
+
+    async def flush(self) -> None:
+        self._colas = {}
+        self._grupos = {}
+        self._escribir(("vaciar",))
+        self.esperar_escrituras()
+
+    async def close(self) -> None:
+        if self._sondeo is not None:
+            self._sondeo.cancel()
+            self._sondeo = None
+        self.esperar_escrituras()
+
+    async def group_add(self, group: str, channel: str) -> None:
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        ahora = time.time()
+        if self._es_local(channel):
+            self._grupos.setdefault(group, {})[channel] = ahora
+        self._escribir(("alta", group, channel, self._proceso_de(channel), ahora))
+
+    async def group_discard(self, group: str, channel: str) -> None:
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        miembros = self._grupos.get(group)
+        if miembros is not None:
+            miembros.pop(channel, None)
+            if not miembros:
+                del self._grupos[group]
+        self._escribir(("baja", group, channel))
+
+    async def group_send(self, group: str, message: dict) -> None:
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        expira = time.time() + self.expiry
+        cuerpo = self._serializar(message)
+        self._repartir_grupo(group, expira, cuerpo)
+        self._escribir(("grupo", group, expira, cuerpo))
+
+    def contar_miembros(self, grupos: Iterable[str]) -> Dict[str, int]:
+        """
+        Canales suscritos a cada grupo en todos los procesos vivos.
+
+        Los miembros de este proceso se cuentan en memoria (pueden no estar
+        confirmados todavía); los de los demás, en la tabla ``miembros``.
+
+        Args:
+            grupos: Grupos a consultar.
+
+        Returns:
+            Cantidad de canales por grupo (0 si no tiene miembros).
+        """
+        grupos = list(grupos)
+        conteos = {grupo: len(self._grupos.get(grupo, ())) for grupo in grupos}
+        if not grupos:
+            return conteos
+        ahora = time.time()
+        self._crear_esquema()
+        conexion = _conectar(self.ruta)
+        try:
+            filas = conexion.execute(
+                "SELECT m.grupo, COUNT(*) FROM miembros m "
+                "JOIN procesos p ON p.proceso = m.proceso "
+                f"WHERE m.grupo IN ({', '.join('?' * len(grupos))}) "
+                "AND m.proceso != ? AND p.visto >= ? AND m.alta >= ? GROUP BY m.grupo",
+                (*grupos, self.proceso, ahora - PROCESO_VIVO, ahora - self.group_expiry),
+            ).fetchall()
+        finally:
+            conexion.close()
+        for grupo, cantidad in filas:
+            conteos[grupo] += cantidad
+        return conteos
+
+    # --- Entrega local --------------------------------------------------------
+
+    def _es_local(self, canal: str) -> bool:
+        return self._proceso_de(canal) == self.proceso
+
+    @staticmethod
+    def _proceso_de(canal: str) -> str:
+        # "<prefijo><proceso>!<sufijo>": el proceso son los 12 caracteres antes del '!'
+        if "!" not in canal:
+            return ""
+        return canal[: canal.index("!")][-12:]
+
+    @staticmethod
+    def _serializar(mensaje: dict) -> str:
+        return json.dumps(mensaje, cls=DjangoJSONEncoder, separators=(",", ":"))
+
+    def _entregar(self, canal: str, expira: float, cuerpo: str) -> bool:
+        """Encola el mensaje en un canal local; False si el canal está lleno."""
+        try:
+            actual = asyncio.get_running_loop()
+        except RuntimeError:
+            actual = None
+        bucle = self._bucle
+        if bucle is None or bucle.is_closed():
+            if actual is None:
+                return True  # Nadie puede recibir en este proceso todavía
+            self._bucle = bucle = actual
+        if actual is not bucle:
+            # Llamado desde otro hilo (p. ej. async_to_sync en una vista síncrona)
+            bucle.call_soon_threadsafe(self._entregar, canal, expira, cuerpo)
+            return True
+        cola = self._colas.setdefault(canal, asyncio.Queue())
+        if cola.qsize() >= self.get_capacity(canal):
+            return False
+        cola.put_nowait((expira, cuerpo))
+        return True
+
+    def _repartir_grupo(self, grupo: str, expira: float, cuerpo: str) -> None:
+        miembros = self._grupos.get(grupo)
+        if not miembros:
+            return
+        limite = time.time() - self.group_expiry
+        for canal, alta in list(miembros.items()):
+            if alta < limite:
+                del miembros[canal]
+                continue
+            if not self._entregar(canal, expira, cuerpo):
+                logger.debug("Canal %s lleno, mensaje del grupo %s descartado", canal, grupo)
+
+    # --- Sondeo de mensajes de otros procesos ---------------------------------
+
+    def _asegurar_sondeo(self) -> None:
+        bucle = asyncio.get_running_loop()
+        if self._sondeo is not None and not self._sondeo.done() and self._bucle is bucle:
+            return
+        if self._bucle is not None and self._bucle is not bucle:
+            # Las colas de asyncio quedan ligadas al bucle en que se usaron
+            self._colas = {}
+        self._bucle = bucle
+        self._sondeo = bucle.create_task(self._sondear())
+
+    async def _sondear(self) -> None:
+        proximo_latido = 0.0
+        proxima_purga = time.monotonic() + INTERVALO_PURGA
+        while True:
+            ahora = time.monotonic()
+            if ahora >= proximo_latido:
+                proximo_latido = ahora + INTERVALO_LATIDO
+                self._escribir(("latido", self.proceso))
+            if ahora >= proxima_purga:
+                proxima_purga = ahora + INTERVALO_PURGA
+                self._escribir(("purga",))
+            try:
+                leidos = self._leer_mensajes()
+            except sqlite3.Error as exc:
+                logger.warning("Error leyendo la capa de canales %s: %s", self.ruta, exc)
+                leidos = 0
+            # Con un lote completo puede haber más filas esperando
+            await asyncio.sleep(0 if leidos >= self.lote_maximo else self.intervalo_sondeo)
+
+    def _leer_mensajes(self) -> int:
+        if self._lectura is None:
+            self._crear_esquema()
+            self._lectura = _conectar(self.ruta)
+        version = self._lectura.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version_datos:
+            return 0
+        filas = self._lectura.execute(
+            "SELECT id, canal, grupo, expira, cuerpo FROM mensajes "
+            "WHERE proceso = ? AND id > ? ORDER BY id LIMIT ?",
+            (self.proceso, self._ultimo_id, self.lote_maximo),
+        ).fetchall()
+        if len(filas) < self.lote_maximo:
+            self._version_datos = version
+        if not filas:
+            return 0
+        ahora = time.time()
+        for _, canal, grupo, expira, cuerpo in filas:
+            if expira < ahora:
+                continue
+            if grupo:
+                self._repartir_grupo(grupo, expira, cuerpo)
+            elif not self._entregar(canal, expira, cuerpo):
+                logger.debug("Canal %s lleno, mensaje descartado", canal)
+        self._ultimo_id = filas[-1][0]
+        self._escribir(("borrar", self.proceso, self._ultimo_id))
+        return len(filas)
+
+    # --- Escritor por lotes ---------------------------------------------------
+
+    def _crear_esquema(self) -> None:
+        if self._esquema_creado:
+            return
+        conexion = _conectar(self.ruta)
+        try:
+            conexion.executescript(_ESQUEMA)
+        finally:
+            conexion.close()
+        self._esquema_creado = True
+
+    def _escribir(self, operacion: Tuple) -> None:
+        if self._escritor is None or not self._escritor.is_alive():
+            with self._lock_escritor:
+                if self._escritor is None or not self._escritor.is_alive():
+                    self._crear_esquema()
+                    self._escritor = threading.Thread(
+                        target=self._ejecutar_escritor, name="capa-canales-escritor", daemon=True
+                    )
+                    self._escritor.start()
+                    atexit.register(self.esperar_escrituras)
+        self._pendientes.put(operacion)
+
+    def esperar_escrituras(self, timeout: float = 5.0) -> bool:
+        """
+        Espera a que el escritor confirme las operaciones encoladas.
+
+        Args:
+            timeout: Segundos máximos de espera.
+
+        Returns:
+            True si no quedaron operaciones pendientes.
+        """
+        limite = time.monotonic() + timeout
+        while self._pendientes.unfinished_tasks and time.monotonic() < limite:
+            if self._escritor is None or not self._escritor.is_alive():
+                return False
+            time.sleep(0.001)
+        return not self._pendientes.unfinished_tasks
+
+    def _ejecutar_escritor(self) -> None:
+        conexion = _conectar(self.ruta)
+        while True:
+            lote: List[Tuple] = [self._pendientes.get()]
+            while len(lote) < self.lote_maximo:
+                try:
+                    lote.append(self._pendientes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conexion.execute("BEGIN IMMEDIATE")
+                for operacion in lote:
+                    self._aplicar(conexion, operacion)
+                conexion.execute("COMMIT")
+                self.lotes_escritos += 1
+            except sqlite3.Error as exc:
+                logger.warning(
+                    "No se pudieron escribir %s operaciones en la capa de canales: %s", len(lote), exc
+                )
+                try:
+                    conexion.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            finally:
+                for _ in lote:
+                    self._pendientes.task_done()
+
+    def _aplicar(self, conexion: sqlite3.Connection, operacion: Tuple) -> None:
+        tipo, *datos = operacion
+        ahora = time.time()
+        if tipo == "grupo":
+            grupo, expira, cuerpo = datos
+            conexion.execute(
+                "INSERT INTO mensajes (proceso, grupo, expira, cuerpo) "
+                "SELECT DISTINCT m.proceso, ?, ?, ? FROM miembros m "
+                "JOIN procesos p ON p.proceso = m.proceso "
+                "WHERE m.grupo = ? AND m.proceso != ? AND p.visto >= ? AND m.alta >= ?",
+                (
+                    grupo,
+                    expira,
+                    cuerpo,
+                    grupo,
+                    self.proceso,
+                    ahora - PROCESO_VIVO,
+                    ahora - self.group_expiry,
+                ),
+            )
+        elif tipo == "mensaje":
+            conexion.execute(
+                "INSERT INTO mensajes (proceso, canal, grupo, expira, cuerpo) VALUES (?, ?, ?, ?, ?)",
+                datos,
+            )
+        elif tipo == "borrar":
+            conexion.execute("DELETE FROM mensajes WHERE proceso = ? AND id <= ?", datos)
+        elif tipo == "alta":
+            conexion.execute(
+                "INSERT OR REPLACE INTO miembros (grupo, canal, proceso, alta) VALUES (?, ?, ?, ?)",
+                datos,
+            )
+        elif tipo == "baja":
+            conexion.execute("DELETE FROM miembros WHERE grupo = ? AND canal = ?", datos)
+        elif tipo == "latido":
+            conexion.execute(
+                "INSERT OR REPLACE INTO procesos (proceso, visto) VALUES (?, ?)", (datos[0], ahora)
+            )
+        elif tipo == "purga":
+            muerto = ahora - PROCESO_MUERTO
+            conexion.execute("DELETE FROM mensajes WHERE expira < ?", (ahora,))
+            conexion.execute(
+                "DELETE FROM miembros WHERE alta < ? OR proceso IN "
+                "(SELECT proceso FROM procesos WHERE visto < ?)",
+                (ahora - self.group_expiry, muerto),
+            )
+            conexion.execute("DELETE FROM procesos WHERE visto < ?", (muerto,))
+        elif tipo == "vaciar":
+            conexion.execute("DELETE FROM mensajes")
+            conexion.execute("DELETE FROM miembros")
@@ -0,0 +1,264 @@
+"""
+Benchmark de la capa de canales: ``InMemoryChannelLayer`` frente a
+``CapaCanalesSQLite``, dentro del mismo proceso y entre procesos.
+"""
+import asyncio
+import json
+import multiprocessing
+import platform
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.canales import CapaCanalesSQLite
+from core.monitoreo.regresiones import (
+    aplanar_metricas,
+    cargar_metricas,
+    detectar_regresiones,
+    version_codigo,
+)
+
+GRUPO = "benchmark_canales"
+CAPAS = ("memoria", "sqlite")
+ESCENARIOS = ("mismo_proceso", "entre_procesos")
+
+
+def _crear_capa(nombre: str, ruta: str, capacidad: int):
+    if nombre == "memoria":
+        return InMemoryChannelLayer(capacity=capacidad)
+    return CapaCanalesSQLite(ruta=ruta, capacity=capacidad)
+
+
+async def _emitir(capa, mensajes: int, ritmo: float, tamano: int) -> None:
+    """Envía ``mensajes`` al grupo (``ritmo`` 0 = ráfaga), con la hora de envío."""
+    relleno = "x" * tamano
+    pausa = 1.0 / ritmo if ritmo > 0 else 0.0
+    for indice in range(mensajes):
+        await capa.group_send(
+            GRUPO, {"type": "benchmark", "i": indice, "t": time.time(), "relleno": relleno}
+        )
+        # Sin pausa igual se cede el bucle, como un consumer que publica eventos
+        await asyncio.sleep(pausa)
+    if isinstance(capa, CapaCanalesSQLite):
+        await asyncio.to_thread(capa.esperar_escrituras, 30)
+
+
+def _emisor_remoto(nombre_capa: str, ruta: str, capacidad: int, mensajes: int, ritmo: float, tamano: int):
+    """Proceso emisor: su propia instancia de la capa, como el motor frente al ASGI."""
+    asyncio.run(_emitir(_crear_capa(nombre_capa, ruta, capacidad), mensajes, ritmo, tamano))
+
+
+@dataclass
+class ResultadoCanales:
+    capa: str
+    escenario: str
+    modo: str
+    receptores: int
+    esperados: int
+    entregados: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    mensajes_por_segundo: float
+
+    @property
+    def etiqueta(self) -> str:
+        return f"{self.capa}.{self.escenario}.{self.modo}.r{self.receptores}"
+
+
+def _percentil(ordenadas: List[float], percentil: float) -> float:
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(percentil / 100 * len(ordenadas)))]
+
+
+async def _medir(
+    nombre_capa: str,
+    escenario: str,
+    receptores: int,
+    mensajes: int,
+    ritmo: float,
+    tamano: int,
+    espera: float,
+) -> ResultadoCanales:
+    directorio = tempfile.mkdtemp(prefix="benchmark_canales_")
+    ruta = str(Path(directorio) / "canales.sqlite3")
+    capacidad = mensajes + 10
+    capa = _crear_capa(nombre_capa, ruta, capacidad)
+    canales = [await capa.new_channel() for _ in range(receptores)]
+    for canal in canales:
+        await capa.group_add(GRUPO, canal)
+
+    latencias: List[float] = []
+    recepciones: List[float] = []
+
+    async def recibir(canal: str) -> None:
+        for _ in range(mensajes):
+            mensaje = await capa.receive(canal)
+            ahora = time.time()
+            latencias.append(ahora - mensaje["t"])
+            recepciones.append(ahora)
+
+    tareas = [asyncio.ensure_future(recibir(canal)) for canal in canales]
+    if isinstance(capa, CapaCanalesSQLite):
+        # Deja que el sondeo publique el latido y las membresías antes de emitir
+        await asyncio.sleep(0.2)
+        await asyncio.to_thread(capa.esperar_escrituras)
+
+    inicio = time.time()
+    if escenario == "mismo_proceso":
+        emisor = _emitir(capa, mensajes, ritmo, tamano)
+    else:
+        contexto = multiprocessing.get_context("spawn")
+        proceso = contexto.Process(
+            target=_emisor_remoto, args=(nombre_capa, ruta, capacidad, mensajes, ritmo, tamano)
+        )
+        proceso.start()
+        emisor = asyncio.to_thread(proceso.join)
+    await emisor
+    try:
+        await asyncio.wait_for(asyncio.gather(*tareas), timeout=espera)
+    except asyncio.TimeoutError:
+        pass
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    await capa.close()
+    shutil.rmtree(directorio, ignore_errors=True)
+
+    ordenadas = sorted(latencia * 1000 for latencia in latencias)
+    duracion = (max(recepciones) - inicio) if recepciones else 0.0
+    return ResultadoCanales(
+        capa=nombre_capa,
+        escenario=escenario,
+        modo="rafaga" if ritmo <= 0 else "ritmo",
+        receptores=receptores,
+        esperados=mensajes * receptores,
+        entregados=len(latencias),
+        p50_ms=round(_percentil(ordenadas, 50), 3),
+        p95_ms=round(_percentil(ordenadas, 95), 3),
+        p99_ms=round(_percentil(ordenadas, 99), 3),
+        max_ms=round(ordenadas[-1], 3) if ordenadas else 0.0,
+        mensajes_por_segundo=round(len(latencias) / duracion, 1) if duracion > 0 else 0.0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia de fan-out y throughput de group_send con la capa en memoria y con "
+        "CapaCanalesSQLite, con el emisor en el mismo proceso que los receptores y en otro "
+        "proceso (como el motor frente al servidor ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--capas", nargs="+", choices=CAPAS, default=list(CAPAS))
+        parser.add_argument("--escenarios", nargs="+", choices=ESCENARIOS, default=list(ESCENARIOS))
+        parser.add_argument(
+            "--receptores",
+            nargs="+",
+            type=int,
+            default=[1, 10, 100],
+            help="Canales suscritos al grupo (p. ej. clientes del dashboard).",
+        )
+        parser.add_argument("--mensajes", type=int, default=200, help="Mensajes por medición.")
+        parser.add_argument(
+            "--ritmo",
+            type=float,
+            default=200,
+            help="Mensajes por segundo en la medición de latencia (default: 200).",
+        )
+        parser.add_argument(
+            "--tamano", type=int, default=512, help="Bytes de relleno por mensaje (default: 512)."
+        )
+        parser.add_argument(
+            "--espera",
+            type=float,
+            default=5.0,
+            help="Segundos máximos de espera de los mensajes pendientes tras el último envío.",
+        )
+        parser.add_argument("--salida", type=str, default="benchmark_canales.json")
+        parser.add_argument("--referencia", type=str, default="")
+        parser.add_argument("--tolerancia", type=float, default=0.5)
+        parser.add_argument("--estricto", action="store_true", help="Terminar con error si hay regresiones")
+
+    def handle(self, *args, **options):
+        if options["mensajes"] < 1 or any(valor < 1 for valor in options["receptores"]):
+            raise CommandError("--mensajes y --receptores deben ser mayores que 0.")
+        referencia = cargar_metricas(options["referencia"]) if options["referencia"] else None
+
+        self.stdout.write(
+            f"{'capa':<8} {'escenario':<15} {'modo':<7} {'recept.':>7} {'entregados':>12} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'msg/s':>10}"
+        )
+        resultados: List[ResultadoCanales] = []
+        for nombre_capa in options["capas"]:
+            for escenario in options["escenarios"]:
+                for receptores in options["receptores"]:
+                    for ritmo in (options["ritmo"], 0):
+                        resultado = async_to_sync(_medir)(
+                            nombre_capa,
+                            escenario,
+                            receptores,
+                            options["mensajes"],
+                            ritmo,
+                            options["tamano"],
+                            options["espera"],
+                        )
+                        resultados.append(resultado)
+                        self._imprimir(resultado)
+
+        metricas: Dict[str, Dict[str, float]] = {
+            resultado.etiqueta: {
+                "p95_ms": resultado.p95_ms,
+                "mensajes_por_segundo": resultado.mensajes_por_segundo,
+            }
+            for resultado in resultados
+            if resultado.entregados
+        }
+        regresiones = detectar_regresiones(
+            aplanar_metricas(metricas),
+            referencia=referencia,
+            tolerancia=options["tolerancia"],
+            margen_absoluto=1.0,
+        )
+        salida = {
+            "benchmark": "canales",
+            "fecha": timezone.now().isoformat(),
+            "version": version_codigo(),
+            "entorno": {"python": platform.python_version(), "maquina": platform.machine()},
+            "parametros": {
+                "mensajes": options["mensajes"],
+                "ritmo": options["ritmo"],
+                "tamano": options["tamano"],
+            },
+            "resultados": [asdict(resultado) for resultado in resultados],
+            "metricas": metricas,
+            "regresiones": [asdict(regresion) for regresion in regresiones],
+        }
+        with open(options["salida"], "w", encoding="utf-8") as archivo:
+            json.dump(salida, archivo, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        for regresion in regresiones:
+            self.stdout.write(self.style.WARNING(f"REGRESIÓN {regresion.describir()}"))
+        if regresiones and options["estricto"]:
+            raise CommandError(f"{len(regresiones)} regresiones detectadas.")
+
+    def _imprimir(self, resultado: ResultadoCanales) -> None:
+        entregados = f"{resultado.entregados}/{resultado.esperados}"
+        if resultado.entregados < resultado.esperados:
+            entregados = self.style.WARNING(entregados)
+        self.stdout.write(
+            f"{resultado.capa:<8} {resultado.escenario:<15} {resultado.modo:<7} "
+            f"{resultado.receptores:>7} {entregados:>12} {resultado.p50_ms:>8.2f} "
+            f"{resultado.p95_ms:>8.2f} {resultado.p99_ms:>8.2f} {resultado.mensajes_por_segundo:>10.1f}"
+        )
@@ -0,0 +1,110 @@
+"""
+Compara las instantáneas de ``tracemalloc`` escritas con ``--memoria`` por
+``ejecutar_bot`` y ``recolectar_ticks``.
+"""
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.monitoreo.memoria import (
+    DIRECTORIO_POR_DEFECTO,
+    EXTENSION_INSTANTANEA,
+    cargar_informes,
+    sitios_por_crecimiento,
+    sitios_por_tamano,
+)
+from core.monitoreo.perfilado import archivos_perfil
+
+
+def _mb(valor: float) -> str:
+    return f"{valor / 1024 / 1024:.2f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra la evolución de la memoria trazada y los sitios de asignación que más "
+        "crecieron entre dos instantáneas de tracemalloc (por defecto, la primera y la última)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directorio",
+            nargs="?",
+            default=DIRECTORIO_POR_DEFECTO,
+            help=f"Directorio de instantáneas (default: {DIRECTORIO_POR_DEFECTO}).",
+        )
+        parser.add_argument("--base", default="", help="Instantánea .snap de partida.")
+        parser.add_argument("--actual", default="", help="Instantánea .snap a comparar.")
+        parser.add_argument("--top", type=int, default=15, help="Sitios a mostrar (default: 15).")
+        parser.add_argument(
+            "--agrupar",
+            choices=["lineno", "filename", "traceback"],
+            default="lineno",
+            help="Agrupación de los sitios (traceback requiere --frames-memoria > 1).",
+        )
+
+    def handle(self, *args, **options):
+        directorio = options["directorio"]
+        informes = cargar_informes(directorio)
+        if informes:
+            self._evolucion(informes)
+
+        instantaneas = archivos_perfil(directorio, EXTENSION_INSTANTANEA)
+        base = Path(options["base"]) if options["base"] else (instantaneas[0] if instantaneas else None)
+        actual = Path(options["actual"]) if options["actual"] else (instantaneas[-1] if instantaneas else None)
+        if base is None and not informes:
+            raise CommandError(f"No hay instantáneas de memoria en {directorio}.")
+        if base is None:
+            return
+        try:
+            snapshot_base = tracemalloc.Snapshot.load(str(base))
+            snapshot_actual = tracemalloc.Snapshot.load(str(actual))
+        except (OSError, EOFError, ValueError) as exc:
+            raise CommandError(f"No se pudo leer la instantánea: {exc}")
+
+        top, agrupar = options["top"], options["agrupar"]
+        segundos = actual.stat().st_mtime - base.stat().st_mtime
+        self.stdout.write(
+            self.style.SUCCESS(f"\nSitios con más memoria en {actual.name}")
+        )
+        for sitio in sitios_por_tamano(snapshot_actual, top, agrupar):
+            self.stdout.write(f"{_mb(sitio.bytes):>12} {sitio.bloques:>9} bloques  {sitio.sitio}")
+            for linea in sitio.traza:
+                self.stdout.write(f"{'':>24}{linea}")
+
+        if base == actual:
+            self.stdout.write("Solo hay una instantánea: no se puede calcular crecimiento por sitio.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSitios que más crecieron de {base.name} a {actual.name} ({segundos / 60:.1f} min)"
+            )
+        )
+        for sitio in sitios_por_crecimiento(snapshot_actual, snapshot_base, top, agrupar):
+            ritmo = f"{sitio.crecimiento_bytes / segundos:,.0f} B/s" if segundos > 0 else "-"
+            self.stdout.write(
+                f"{'+' + _mb(sitio.crecimiento_bytes):>13} {ritmo:>12} "
+                f"{sitio.crecimiento_bloques:>+9} bloques  {sitio.sitio}"
+            )
+            for linea in sitio.traza:
+                self.stdout.write(f"{'':>36}{linea}")
+
+    def _evolucion(self, informes) -> None:
+        self.stdout.write(self.style.SUCCESS("Evolución de la memoria trazada"))
+        self.stdout.write(f"{'fecha':<20} {'trazada':>12} {'pico':>12} {'crec. B/s':>12}")
+        for informe in informes:
+            fecha = datetime.fromtimestamp(informe["epoch"]).strftime("%Y-%m-%d %H:%M:%S")
+            self.stdout.write(
+                f"{fecha:<20} {_mb(informe['trazada_bytes']):>12} {_mb(informe['pico_bytes']):>12} "
+                f"{informe['crecimiento_bytes_por_segundo']:>12,.0f}"
+            )
+        primero, ultimo = informes[0], informes[-1]
+        segundos = ultimo["epoch"] - primero["epoch"]
+        if segundos > 0:
+            ritmo = (ultimo["trazada_bytes"] - primero["trazada_bytes"]) / segundos
+            self.stdout.write(
+                f"Crecimiento medio: {ritmo:,.0f} B/s ({ritmo * 3600 / 1024 / 1024:.2f} MB/h) "
+                f"en {segundos / 3600:.2f} h"
+            )
@@ -1,11 +1,40 @@
+import argparse
 import time
+from typing import List
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
+from core.monitoreo import PerfiladorCiclo, registro_consultas
+from core.monitoreo.memoria import DIRECTORIO_POR_DEFECTO as DIRECTORIO_MEMORIA, MonitorMemoria
+from core.monitoreo.metricas import iniciar_servidor_metricas, observar_ciclo
+from core.monitoreo.perfilado import (
+    DIRECTORIO_POR_DEFECTO,
+    DirectorioRotativo,
+    MuestreadorPilas,
+    PerfiladorCProfile,
+)
 from core.services import GestorBotCore
 from trading.services import MotorTrading
 from trading.services_profesional import MotorTradingProfesional
+from trading.variantes import EvaluadorSombra, cargar_variantes
+
+
+def _parsear_duraciones(valor: str) -> List[int]:
+    """Convierte '1-10' o '3,5,7' en una lista de duraciones en ticks."""
+    duraciones = set()
+    try:
+        for parte in valor.split(","):
+            if "-" in parte:
+                desde, hasta = (int(extremo) for extremo in parte.split("-", 1))
+                duraciones.update(range(desde, hasta + 1))
+            elif parte.strip():
+                duraciones.add(int(parte))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Duraciones inválidas: {valor!r}")
+    if not duraciones or min(duraciones) < 1:
+        raise argparse.ArgumentTypeError(f"Duraciones inválidas: {valor!r}")
+    return sorted(duraciones)
 
 
 class Command(BaseCommand):
@@ -24,39 +53,261 @@ class Command(BaseCommand):
             default=3600,
             help="Segundos mínimos entre simulaciones mientras el bot está en pausa.",
         )
+        parser.add_argument(
+            "--workers-simulacion",
+            type=int,
+            default=0,
+            help="Procesos para simular los símbolos en paralelo durante la pausa (0 = secuencial).",
+        )
+        parser.add_argument(
+            "--duraciones-simulacion",
+            type=_parsear_duraciones,
+            default=None,
+            help="Duraciones de contrato (ticks) a simular en la misma pasada, p. ej. '1-10' o '3,5,7' (default: 5).",
+        )
+        parser.add_argument(
+            "--duracion-simulada",
+            action="store_true",
+            help=(
+                "Con el motor profesional, operar con la duración de mejor winrate simulado para la "
+                "hora actual en lugar de la fija (requiere SIMULACION_MINIMO_OPERACIONES_DURACION "
+                "operaciones simuladas)."
+            ),
+        )
         parser.add_argument(
             "--profesional",
             action="store_true",
             help="Usar motor de trading profesional (análisis multi-activo avanzado)",
         )
+        parser.add_argument(
+            "--workers-evaluacion",
+            type=int,
+            default=0,
+            help="Workers para evaluar activos en paralelo con el motor profesional (0 = secuencial).",
+        )
+        parser.add_argument(
+            "--pool-evaluacion",
+            choices=["hilos", "procesos"],
+            default="hilos",
+            help="Tipo de pool para la evaluación paralela (default: hilos).",
+        )
+        parser.add_argument(
+            "--variantes-sombra",
+            type=str,
+            default="",
+            help=(
+                "Variantes de estrategia a evaluar en modo sombra con el motor profesional: "
+                "archivo JSON o 'predefinidas'."
+            ),
+        )
+        parser.add_argument(
+            "--intervalo-flush-latencias",
+            type=int,
+            default=300,
+            help=(
+                "Segundos entre cada volcado de latencias por etapa y consultas SQL "
+                "por ruta a la base de datos (default: 300)."
+            ),
+        )
+        parser.add_argument(
+            "--puerto-metricas",
+            type=int,
+            default=0,
+            help="Puerto del endpoint /metrics en formato Prometheus (0 = desactivado).",
+        )
+        parser.add_argument(
+            "--host-metricas",
+            default="127.0.0.1",
+            help="Interfaz del endpoint de métricas (default: 127.0.0.1).",
+        )
+        parser.add_argument(
+            "--profile",
+            choices=["muestreo", "cprofile"],
+            nargs="?",
+            const="muestreo",
+            default=None,
+            help=(
+                "Perfilar el proceso: 'muestreo' toma la pila de todos los hilos cada "
+                "--intervalo-muestreo ms; 'cprofile' perfila uno de cada --perfilar-cada ciclos. "
+                "Resumen con 'manage.py resumen_perfil'."
+            ),
+        )
+        parser.add_argument(
+            "--directorio-perfiles",
+            default=DIRECTORIO_POR_DEFECTO,
+            help=f"Directorio donde rotan los perfiles (default: {DIRECTORIO_POR_DEFECTO}).",
+        )
+        parser.add_argument(
+            "--max-archivos-perfil",
+            type=int,
+            default=50,
+            help="Perfiles a conservar en el directorio (default: 50).",
+        )
+        parser.add_argument(
+            "--intervalo-muestreo",
+            type=float,
+            default=10,
+            help="Milisegundos entre muestras de pila con --profile muestreo (default: 10).",
+        )
+        parser.add_argument(
+            "--perfilar-cada",
+            type=int,
+            default=10,
+            help="Con --profile cprofile, perfilar uno de cada N ciclos (default: 10).",
+        )
+        parser.add_argument(
+            "--memoria",
+            action="store_true",
+            help=(
+                "Activar tracemalloc y tomar una instantánea cada --intervalo-memoria segundos "
+                "(top de sitios y crecimiento en /metrics; comparación con 'manage.py diagnostico_memoria')."
+            ),
+        )
+        parser.add_argument(
+            "--intervalo-memoria",
+            type=float,
+            default=300,
+            help="Segundos entre instantáneas de memoria (default: 300).",
+        )
+        parser.add_argument(
+            "--directorio-memoria",
+            default=DIRECTORIO_MEMORIA,
+            help=f"Directorio donde rotan las instantáneas (default: {DIRECTORIO_MEMORIA}).",
+        )
+        parser.add_argument(
+            "--max-instantaneas",
+            type=int,
+            default=24,
+            help="Instantáneas de memoria a conservar (default: 24).",
+        )
+        parser.add_argument(
+            "--frames-memoria",
+            type=int,
+            default=1,
+            help="Marcos de pila por asignación; más de 1 permite agrupar por traza pero cuesta más (default: 1).",
+        )
 
     def handle(self, *args, **options):
         intervalo = options["intervalo"]
         intervalo_simulacion = options["intervalo_simulacion"]
 
         gestor = GestorBotCore()
+        perfilador = PerfiladorCiclo(
+            intervalo_flush=options["intervalo_flush_latencias"],
+            observadores=[observar_ciclo],
+        )
+        registro_consultas.intervalo_flush = options["intervalo_flush_latencias"]
+
+        if options["variantes_sombra"] and not options["profesional"]:
+            raise CommandError("--variantes-sombra requiere --profesional.")
         
         # Seleccionar motor según opción
         if options["profesional"]:
-            motor = MotorTradingProfesional()
+            evaluador_sombra = None
+            if options["variantes_sombra"]:
+                try:
+                    variantes = cargar_variantes(options["variantes_sombra"])
+                except (OSError, ValueError, KeyError) as exc:
+                    raise CommandError(f"No se pudieron cargar las variantes: {exc}")
+                evaluador_sombra = EvaluadorSombra(variantes)
+            motor = MotorTradingProfesional(
+                workers_evaluacion=options["workers_evaluacion"],
+                tipo_pool_evaluacion=options["pool_evaluacion"],
+                perfilador=perfilador,
+                evaluador_sombra=evaluador_sombra,
+                usar_duracion_simulada=options["duracion_simulada"],
+            )
             self.stdout.write(
                 self.style.SUCCESS("Motor de trading PROFESIONAL activado")
             )
+            if options["workers_evaluacion"]:
+                self.stdout.write(
+                    f"Evaluación paralela: {options['workers_evaluacion']} workers "
+                    f"({options['pool_evaluacion']})"
+                )
+            if options["duracion_simulada"]:
+                self.stdout.write("Duración de contrato según la simulación de horarios")
+            if evaluador_sombra is not None:
+                self.stdout.write(
+                    "Variantes en modo sombra: "
+                    + ", ".join(variante.nombre for variante in evaluador_sombra.variantes)
+                )
         else:
             motor = MotorTrading()
             self.stdout.write(
                 self.style.WARNING("Motor de trading SIMPLE activado (usa --profesional para activar el motor avanzado)")
             )
 
+        if options["puerto_metricas"]:
+            servidor_metricas = iniciar_servidor_metricas(
+                options["puerto_metricas"], host=options["host_metricas"]
+            )
+            host, puerto = servidor_metricas.server_address[:2]
+            self.stdout.write(f"Métricas en http://{host}:{puerto}/metrics")
+
+        muestreador = None
+        perfilador_cprofile = None
+        if options["profile"]:
+            directorio = DirectorioRotativo(
+                options["directorio_perfiles"], max_archivos=options["max_archivos_perfil"]
+            )
+            if options["profile"] == "muestreo":
+                muestreador = MuestreadorPilas(
+                    directorio,
+                    intervalo=options["intervalo_muestreo"] / 1000,
+                    prefijo="bot",
+                ).iniciar()
+                detalle = f"muestreo cada {options['intervalo_muestreo']:g} ms"
+            else:
+                perfilador_cprofile = PerfiladorCProfile(
+                    directorio, cada_n=options["perfilar_cada"], prefijo="bot"
+                )
+                detalle = f"cProfile uno de cada {perfilador_cprofile.cada_n} ciclos"
+            self.stdout.write(f"Perfilado activo ({detalle}) en {directorio.ruta}/")
+
+        monitor_memoria = None
+        if options["memoria"]:
+            monitor_memoria = MonitorMemoria(
+                DirectorioRotativo(
+                    options["directorio_memoria"], max_archivos=options["max_instantaneas"]
+                ),
+                intervalo=options["intervalo_memoria"],
+                frames=options["frames_memoria"],
+                prefijo="bot",
+            ).iniciar()
+            self.stdout.write(
+                f"Diagnóstico de memoria activo (cada {monitor_memoria.intervalo:g}s) "
+                f"en {monitor_memoria.directorio.ruta}/"
+            )
+
         self.stdout.write(self.style.SUCCESS("Loop principal del bot iniciado."))
         self.stdout.write(f"Intervalo de ciclo: {intervalo}s")
 
+        try:
+            self._loop(
+                gestor, motor, perfilador, intervalo, intervalo_simulacion, options, perfilador_cprofile
+            )
+        finally:
+            if muestreador is not None:
+                muestreador.detener()
+            if monitor_memoria is not None:
+                monitor_memoria.detener()
+            if hasattr(motor, "cerrar"):
+                motor.cerrar()
+
+    def _loop(
+        self, gestor, motor, perfilador, intervalo, intervalo_simulacion, options, perfilador_cprofile
+    ):
         while True:
+            perfilador.iniciar_ciclo()
+            if perfilador_cprofile is not None:
+                perfilador_cprofile.iniciar_ciclo()
             try:
-                gestor.configuracion.refresh_from_db()
-                # Sincronizar balance con la API antes de evaluar el estado actual.
-                gestor.sincronizar_balance_desde_api()
-                gestor.configuracion.refresh_from_db()
+                with perfilador.medir("sincronizacion_balance"):
+                    gestor.configuracion.refresh_from_db()
+                    # Sincronizar balance con la API antes de evaluar el estado actual.
+                    gestor.sincronizar_balance_desde_api()
+                    gestor.configuracion.refresh_from_db()
 
                 if gestor.debe_reanudar():
                     gestor.reanudar_operativa()
@@ -82,7 +333,16 @@ class Command(BaseCommand):
                         f"[{timezone.now():%Y-%m-%d %H:%M:%S}] Bot en pausa. "
                         "Esperando reanudación automática."
                     )
-                    resultado = gestor.ejecutar_simulacion_pausa(intervalo_simulacion)
+                    # La simulación de la pausa dura minutos y no es un ciclo
+                    # de trading: no se registra en ciclo_total ni por etapa
+                    perfilador.descartar_ciclo()
+                    if perfilador_cprofile is not None:
+                        perfilador_cprofile.descartar_ciclo()
+                    resultado = gestor.ejecutar_simulacion_pausa(
+                        intervalo_simulacion,
+                        workers_simulacion=options["workers_simulacion"],
+                        duraciones_simulacion=options["duraciones_simulacion"],
+                    )
                     if resultado:
                         self.stdout.write(
                             self.style.SUCCESS(
@@ -111,5 +371,16 @@ class Command(BaseCommand):
                         )
                     )
 
+            perfilador.finalizar_ciclo()
+            if perfilador_cprofile is not None:
+                perfilador_cprofile.finalizar_ciclo()
+            try:
+                perfilador.flush_si_corresponde()
+                registro_consultas.flush_si_corresponde()
+            except Exception as exc:
+                self.stderr.write(
+                    self.style.ERROR(f"No se pudieron guardar las latencias: {exc}")
+                )
+
             time.sleep(intervalo)
 
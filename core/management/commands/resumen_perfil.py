@@ -0,0 +1,112 @@
+"""
+Resumen de los perfiles escritos con ``--profile`` por ``ejecutar_bot`` y
+``recolectar_ticks``.
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.monitoreo.perfilado import (
+    DIRECTORIO_POR_DEFECTO,
+    EXTENSION_PILAS,
+    EXTENSION_PSTATS,
+    archivos_perfil,
+    cargar_pilas,
+    fusionar_pstats,
+    resumir_funciones,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fusiona las pilas muestreadas y los perfiles cProfile de un directorio: "
+        "muestra las funciones más costosas y escribe un archivo de pilas colapsadas "
+        "para generar un flamegraph (flamegraph.pl, inferno o speedscope)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directorio",
+            nargs="?",
+            default=DIRECTORIO_POR_DEFECTO,
+            help=f"Directorio de perfiles (default: {DIRECTORIO_POR_DEFECTO}).",
+        )
+        parser.add_argument(
+            "--ultimos-minutos",
+            type=float,
+            default=0,
+            help="Solo archivos escritos en los últimos N minutos (0 = todos).",
+        )
+        parser.add_argument(
+            "--hilo",
+            default="",
+            help="Solo pilas de los hilos cuyo nombre contenga este texto (p. ej. MainThread).",
+        )
+        parser.add_argument("--top", type=int, default=25, help="Funciones a mostrar (default: 25).")
+        parser.add_argument(
+            "--salida",
+            default="",
+            help="Archivo .folded fusionado para el flamegraph (default: <directorio>/resumen.folded).",
+        )
+        parser.add_argument(
+            "--salida-pstats",
+            default="",
+            help="Archivo .pstats fusionado (para snakeviz o pstats), si hay perfiles cProfile.",
+        )
+
+    def handle(self, *args, **options):
+        directorio = options["directorio"]
+        desde = time.time() - options["ultimos_minutos"] * 60 if options["ultimos_minutos"] else None
+        salida = options["salida"] or f"{directorio.rstrip('/')}/resumen{EXTENSION_PILAS}"
+
+        archivos_pilas = [
+            archivo
+            for archivo in archivos_perfil(directorio, EXTENSION_PILAS, desde)
+            if not archivo.name.startswith("resumen")
+        ]
+        archivos_pstats = archivos_perfil(directorio, EXTENSION_PSTATS, desde)
+        if not archivos_pilas and not archivos_pstats:
+            raise CommandError(f"No hay perfiles en {directorio}.")
+
+        if archivos_pilas:
+            self._resumir_pilas(archivos_pilas, options["hilo"], options["top"], salida)
+        if archivos_pstats:
+            self._resumir_pstats(archivos_pstats, options["top"], options["salida_pstats"])
+
+    def _resumir_pilas(self, archivos, hilo: str, top: int, salida: str) -> None:
+        pilas = cargar_pilas(archivos, hilo=hilo)
+        total = sum(pilas.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Pilas muestreadas: {total} muestras en {len(archivos)} archivos"
+                + (f" (hilo '{hilo}')" if hilo else "")
+            )
+        )
+        if not total:
+            return
+        self.stdout.write(f"{'propias':>8} {'%':>6} {'inclus.':>8} {'%':>6}  función")
+        for resumen in resumir_funciones(pilas)[:top]:
+            self.stdout.write(
+                f"{resumen.propias:>8} {resumen.porcentaje(total):>5.1f}% "
+                f"{resumen.inclusivas:>8} {resumen.porcentaje(total, inclusivo=True):>5.1f}%  "
+                f"{resumen.funcion}"
+            )
+        with open(salida, "w", encoding="utf-8") as archivo:
+            for pila, conteo in pilas.most_common():
+                archivo.write(f"{pila} {conteo}\n")
+        self.stdout.write(
+            f"Pilas colapsadas en {salida} (flamegraph.pl {salida} > flamegraph.svg)"
+        )
+
+    def _resumir_pstats(self, archivos, top: int, salida_pstats: str) -> None:
+        flujo = io.StringIO()
+        estadisticas = fusionar_pstats(archivos, flujo=flujo)
+        self.stdout.write(
+            self.style.SUCCESS(f"Perfiles cProfile: {len(archivos)} ciclos perfilados")
+        )
+        estadisticas.strip_dirs().sort_stats("cumulative").print_stats(top)
+        self.stdout.write(flujo.getvalue())
+        if salida_pstats:
+            estadisticas.dump_stats(salida_pstats)
+            self.stdout.write(f"Perfil fusionado en {salida_pstats}")
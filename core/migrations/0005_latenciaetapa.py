@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-19 04:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_activopermitido_hora_mejor_simulacion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatenciaEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etapa', models.CharField(max_length=40)),
+                ('muestras', models.PositiveIntegerField(default=0)),
+                ('p50_ms', models.FloatField(default=0)),
+                ('p95_ms', models.FloatField(default=0)),
+                ('p99_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('registrado_en', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Latencia de etapa',
+                'verbose_name_plural': 'Latencias de etapas',
+                'ordering': ('-registrado_en', 'etapa'),
+            },
+        ),
+    ]
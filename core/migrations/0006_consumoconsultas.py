@@ -0,0 +1,36 @@
+# Generated by Django 5.0.4 on 2026-10-19 05:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_latenciaetapa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoConsultas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=80)),
+                ('ejecuciones', models.PositiveIntegerField(default=0)),
+                ('consultas_p50', models.PositiveIntegerField(default=0)),
+                ('consultas_p95', models.PositiveIntegerField(default=0)),
+                ('consultas_max', models.PositiveIntegerField(default=0)),
+                ('tiempo_p95_ms', models.FloatField(default=0)),
+                ('presupuesto', models.PositiveIntegerField(blank=True, null=True)),
+                ('excesos', models.PositiveIntegerField(default=0)),
+                ('ejecuciones_n_mas_uno', models.PositiveIntegerField(default=0)),
+                ('forma_n_mas_uno', models.TextField(blank=True)),
+                ('registrado_en', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Consumo de consultas',
+                'verbose_name_plural': 'Consumo de consultas',
+                'ordering': ('-registrado_en', 'ruta'),
+            },
+        ),
+    ]
@@ -233,3 +233,52 @@ class ActivoPermitido(models.Model):
 
     def __str__(self) -> str:
         return self.nombre
+
+
+class LatenciaEtapa(models.Model):
+    """
+    Resumen periódico de la latencia de una etapa del ciclo de trading.
+    Cada flush del perfilador guarda una fila por etapa con sus percentiles.
+    """
+    etapa = models.CharField(max_length=40)
+    muestras = models.PositiveIntegerField(default=0)
+    p50_ms = models.FloatField(default=0)
+    p95_ms = models.FloatField(default=0)
+    p99_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    registrado_en = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Latencia de etapa"
+        verbose_name_plural = "Latencias de etapas"
+        ordering = ("-registrado_en", "etapa")
+
+    def __str__(self) -> str:
+        return f"{self.etapa} p95={self.p95_ms:.1f}ms @ {self.registrado_en:%Y-%m-%d %H:%M:%S}"
+
+
+class ConsumoConsultas(models.Model):
+    """
+    Resumen periódico de las consultas SQL por ejecución de una ruta de código
+    (ciclo de trading, simulador, vistas REST...). Los contadores son
+    acumulados del proceso; los percentiles, de las últimas ejecuciones.
+    """
+    ruta = models.CharField(max_length=80)
+    ejecuciones = models.PositiveIntegerField(default=0)
+    consultas_p50 = models.PositiveIntegerField(default=0)
+    consultas_p95 = models.PositiveIntegerField(default=0)
+    consultas_max = models.PositiveIntegerField(default=0)
+    tiempo_p95_ms = models.FloatField(default=0)
+    presupuesto = models.PositiveIntegerField(null=True, blank=True)
+    excesos = models.PositiveIntegerField(default=0)
+    ejecuciones_n_mas_uno = models.PositiveIntegerField(default=0)
+    forma_n_mas_uno = models.TextField(blank=True)
+    registrado_en = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Consumo de consultas"
+        verbose_name_plural = "Consumo de consultas"
+        ordering = ("-registrado_en", "ruta")
+
+    def __str__(self) -> str:
+        return f"{self.ruta} p95={self.consultas_p95} consultas @ {self.registrado_en:%Y-%m-%d %H:%M:%S}"
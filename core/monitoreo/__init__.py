@@ -0,0 +1,24 @@
+"""
+Instrumentación de los procesos del bot (latencias por etapa del ciclo y
+consultas SQL por ruta).
+"""
+
+from .consultas import (
+    PresupuestoConsultasExcedido,
+    en_mediciones_activas,
+    mediciones_activas,
+    medir_consultas,
+    registro_consultas,
+)
+from .latencias import ETAPAS_CICLO, HistogramaMovil, PerfiladorCiclo
+
+__all__ = [
+    "ETAPAS_CICLO",
+    "HistogramaMovil",
+    "PerfiladorCiclo",
+    "PresupuestoConsultasExcedido",
+    "en_mediciones_activas",
+    "mediciones_activas",
+    "medir_consultas",
+    "registro_consultas",
+]
@@ -0,0 +1,404 @@
+"""
+Presupuesto de consultas SQL por ruta de código.
+
+``medir_consultas(ruta)`` instala un ``connection.execute_wrapper`` mientras
+dura el bloque (o la función decorada) y registra cuántas consultas se
+ejecutaron, el tiempo total en base de datos y cuántas veces se repitió cada
+forma de consulta (el SQL con los literales y las listas ``IN`` colapsados).
+Una misma forma de ``SELECT`` repetida muchas veces en una sola ejecución
+es el patrón N+1 (una consulta por fila en lugar de una para todas).
+
+Cada ruta tiene un presupuesto de consultas (``PRESUPUESTOS_POR_DEFECTO``,
+reemplazable con ``settings.PRESUPUESTOS_CONSULTAS``). Excederlo se registra
+en el log; con ``settings.PRESUPUESTO_CONSULTAS_ESTRICTO`` (pensado para los
+tests) lanza ``PresupuestoConsultasExcedido``. Las estadísticas vivas se
+acumulan en ``registro_consultas`` y se persisten periódicamente en
+``ConsumoConsultas``, igual que las latencias del ciclo.
+
+``execute_wrapper`` solo ve la conexión del hilo que abre el bloque. Las
+tareas que la ruta reparte en un pool de hilos (``--workers-evaluacion`` con
+``--pool-evaluacion hilos``) deben ejecutarse con ``en_mediciones_activas``
+para sumarse a la medición; las de un pool de procesos (evaluación con
+``procesos`` y ``--workers-simulacion``) no se cuentan.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .latencias import HistogramaMovil, purgar_resumenes_antiguos
+from .metricas import (
+    CONSULTAS_POR_EJECUCION,
+    CONSULTAS_SQL,
+    EXCESOS_PRESUPUESTO,
+    N_MAS_UNO,
+    TIEMPO_SQL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Máximo de consultas por ejecución de cada ruta. Las vistas REST se
+# registran como "vista:<nombre de la URL>"; "vista:*" aplica a las demás.
+PRESUPUESTOS_POR_DEFECTO: Dict[str, int] = {
+    "ejecutar_ciclo": 150,
+    "ejecutar_ciclo_simple": 60,
+    "enviar_actualizacion_dashboard": 20,
+    "simulacion_horarios": 200,
+    # Vistas que ejecutan un ciclo o una simulación completos
+    "vista:trading-ejecutar": 80,
+    "vista:simulacion-ejecutar": 220,
+    "vista:*": 15,
+}
+# Repeticiones de una misma forma de SELECT que se consideran N+1
+UMBRAL_N_MAS_UNO = 10
+FORMAS_REPORTADAS = 5
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una ruta ejecutó más consultas que su presupuesto (modo estricto)."""
+
+
+def forma_consulta(sql: str) -> str:
+    """
+    SQL normalizado para agrupar consultas equivalentes: literales y
+    parámetros como ``?`` y listas ``IN (?, ?, ...)`` como ``(...)``.
+    """
+    forma = _LITERALES.sub("?", sql)
+    forma = _LISTAS.sub("(...)", forma)
+    return _ESPACIOS.sub(" ", forma).strip()
+
+
+def presupuesto_de(ruta: str) -> Optional[int]:
+    presupuestos = {
+        **PRESUPUESTOS_POR_DEFECTO,
+        **getattr(settings, "PRESUPUESTOS_CONSULTAS", {}),
+    }
+    if ruta in presupuestos:
+        return presupuestos[ruta]
+    if ruta.startswith("vista:"):
+        return presupuestos.get("vista:*")
+    return None
+
+
+@dataclass
+class MedicionConsultas:
+    """Consultas de una ejecución de una ruta."""
+    ruta: str
+    consultas: int = 0
+    tiempo_ms: float = 0.0
+    formas: Counter = field(default_factory=Counter)
+    tiempo_por_forma: Dict[str, float] = field(default_factory=dict)
+    presupuesto: Optional[int] = None
+    # Los workers de un pool de hilos cuentan sobre la misma medición
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Firma de connection.execute_wrapper
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            forma = forma_consulta(sql)
+            with self._lock:
+                self.consultas += 1
+                self.tiempo_ms += transcurrido
+                self.formas[forma] += 1
+                self.tiempo_por_forma[forma] = (
+                    self.tiempo_por_forma.get(forma, 0.0) + transcurrido
+                )
+
+    @property
+    def excede_presupuesto(self) -> bool:
+        return self.presupuesto is not None and self.consultas > self.presupuesto
+
+    def repetidas(self, minimo: int = 2) -> List[Tuple[str, int]]:
+        """Formas ejecutadas al menos ``minimo`` veces, de la más repetida a la menos."""
+        return [(forma, veces) for forma, veces in self.formas.most_common() if veces >= minimo]
+
+    def n_mas_uno(self, umbral: int = UMBRAL_N_MAS_UNO) -> List[Tuple[str, int]]:
+        """Formas de SELECT repetidas ``umbral`` veces o más (patrón N+1)."""
+        return [
+            (forma, veces)
+            for forma, veces in self.repetidas(umbral)
+            if forma.upper().startswith("SELECT")
+        ]
+
+    def resumen(self) -> Dict:
+        return {
+            "ruta": self.ruta,
+            "consultas": self.consultas,
+            "tiempo_ms": round(self.tiempo_ms, 3),
+            "presupuesto": self.presupuesto,
+            "excede_presupuesto": self.excede_presupuesto,
+            "formas_distintas": len(self.formas),
+            "repetidas": [
+                {
+                    "forma": forma,
+                    "veces": veces,
+                    "tiempo_ms": round(self.tiempo_por_forma[forma], 3),
+                }
+                for forma, veces in self.repetidas()[:FORMAS_REPORTADAS]
+            ],
+            "n_mas_uno": [forma for forma, _ in self.n_mas_uno()],
+        }
+
+
+def _resumen_conteos(histograma: HistogramaMovil) -> Dict[str, float]:
+    """Resumen de un histograma de conteos (sin el sufijo ``_ms``)."""
+    return {clave.replace("_ms", ""): valor for clave, valor in histograma.resumen().items()}
+
+
+class EstadisticasRuta:
+    """Acumulado de las ejecuciones de una ruta en este proceso."""
+
+    def __init__(self, capacidad: int = 1000) -> None:
+        self.ejecuciones = 0
+        self.consultas_totales = 0
+        self.tiempo_total_ms = 0.0
+        self.excesos = 0
+        self.ejecuciones_n_mas_uno = 0
+        self.consultas = HistogramaMovil(capacidad)
+        self.tiempo = HistogramaMovil(capacidad)
+        self.ultima: Optional[MedicionConsultas] = None
+        self.ultima_n_mas_uno: Optional[MedicionConsultas] = None
+
+    def registrar(self, medicion: MedicionConsultas) -> None:
+        self.ejecuciones += 1
+        self.consultas_totales += medicion.consultas
+        self.tiempo_total_ms += medicion.tiempo_ms
+        self.consultas.registrar(medicion.consultas)
+        self.tiempo.registrar(medicion.tiempo_ms)
+        self.excesos += medicion.excede_presupuesto
+        if medicion.n_mas_uno():
+            self.ejecuciones_n_mas_uno += 1
+            self.ultima_n_mas_uno = medicion
+        self.ultima = medicion
+
+
+class RegistroConsultas:
+    """
+    Estadísticas vivas por ruta, compartidas por todos los hilos del proceso.
+    Se vuelcan a ``ConsumoConsultas`` cada ``intervalo_flush`` segundos.
+    """
+
+    def __init__(self, intervalo_flush: int = 300) -> None:
+        self.intervalo_flush = intervalo_flush
+        self.rutas: Dict[str, EstadisticasRuta] = {}
+        self._lock = threading.Lock()
+        self._ultimo_flush = time.monotonic()
+        self._n_mas_uno_avisados: set = set()
+
+    def registrar(self, medicion: MedicionConsultas) -> None:
+        with self._lock:
+            estadisticas = self.rutas.get(medicion.ruta)
+            if estadisticas is None:
+                estadisticas = self.rutas[medicion.ruta] = EstadisticasRuta()
+            estadisticas.registrar(medicion)
+            nuevos = [
+                (forma, veces)
+                for forma, veces in medicion.n_mas_uno()
+                if (medicion.ruta, forma) not in self._n_mas_uno_avisados
+            ]
+            self._n_mas_uno_avisados.update((medicion.ruta, forma) for forma, _ in nuevos)
+        ruta = medicion.ruta
+        CONSULTAS_SQL.inc(medicion.consultas, ruta=ruta)
+        TIEMPO_SQL.inc(medicion.tiempo_ms / 1000, ruta=ruta)
+        CONSULTAS_POR_EJECUCION.observar(medicion.consultas, ruta=ruta)
+        if medicion.excede_presupuesto:
+            EXCESOS_PRESUPUESTO.inc(ruta=ruta)
+        if medicion.n_mas_uno():
+            N_MAS_UNO.inc(ruta=ruta)
+        # Cada patrón se avisa una vez por proceso; después solo se cuenta
+        for forma, veces in nuevos:
+            logger.warning("Posible N+1 en %s: %d veces %s", medicion.ruta, veces, forma[:300])
+
+    def resumen(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                ruta: {
+                    "ejecuciones": estadisticas.ejecuciones,
+                    "consultas_totales": estadisticas.consultas_totales,
+                    "tiempo_total_ms": round(estadisticas.tiempo_total_ms, 3),
+                    "consultas": _resumen_conteos(estadisticas.consultas),
+                    "tiempo": estadisticas.tiempo.resumen(),
+                    "presupuesto": presupuesto_de(ruta),
+                    "excesos": estadisticas.excesos,
+                    "ejecuciones_n_mas_uno": estadisticas.ejecuciones_n_mas_uno,
+                    "ultima": estadisticas.ultima.resumen() if estadisticas.ultima else None,
+                }
+                for ruta, estadisticas in self.rutas.items()
+            }
+
+    def flush_si_corresponde(self) -> bool:
+        if time.monotonic() - self._ultimo_flush < self.intervalo_flush:
+            return False
+        self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Persiste una fila por ruta con lo acumulado hasta ahora."""
+        from core.models import ConsumoConsultas
+
+        self._ultimo_flush = time.monotonic()
+        with self._lock:
+            filas = []
+            ahora = timezone.now()
+            for ruta, estadisticas in self.rutas.items():
+                resumen = _resumen_conteos(estadisticas.consultas)
+                if not resumen["muestras"]:
+                    continue
+                sospechosa = estadisticas.ultima_n_mas_uno
+                filas.append(
+                    ConsumoConsultas(
+                        ruta=ruta[:80],
+                        ejecuciones=estadisticas.ejecuciones,
+                        consultas_p50=int(resumen["p50"]),
+                        consultas_p95=int(resumen["p95"]),
+                        consultas_max=int(resumen["max"]),
+                        tiempo_p95_ms=estadisticas.tiempo.resumen()["p95_ms"],
+                        presupuesto=presupuesto_de(ruta),
+                        excesos=estadisticas.excesos,
+                        ejecuciones_n_mas_uno=estadisticas.ejecuciones_n_mas_uno,
+                        forma_n_mas_uno=sospechosa.n_mas_uno()[0][0] if sospechosa else "",
+                        registrado_en=ahora,
+                    )
+                )
+        if filas:
+            ConsumoConsultas.objects.bulk_create(filas)
+        purgar_resumenes_antiguos(ConsumoConsultas, ahora)
+
+
+registro_consultas = RegistroConsultas()
+
+
+# Mediciones abiertas en cada hilo, de la más externa a la más interna
+_activas = threading.local()
+
+
+def _pila_activas() -> List[MedicionConsultas]:
+    if not hasattr(_activas, "pila"):
+        _activas.pila = []
+    return _activas.pila
+
+
+def mediciones_activas() -> Tuple[MedicionConsultas, ...]:
+    """Mediciones abiertas en el hilo actual (para pasarlas a un worker)."""
+    return tuple(_pila_activas())
+
+
+def en_mediciones_activas(
+    mediciones: Tuple[MedicionConsultas, ...], funcion: Callable, *args, **kwargs
+):
+    """
+    Ejecuta ``funcion`` contando sus consultas en ``mediciones``.
+
+    Pensado para las tareas de un pool de hilos: cada hilo tiene su propia
+    conexión, que el ``execute_wrapper`` del hilo principal no ve::
+
+        activas = mediciones_activas()
+        pool.submit(en_mediciones_activas, activas, funcion, *args)
+    """
+    if not mediciones:
+        return funcion(*args, **kwargs)
+    with ExitStack() as pila:
+        for medicion in mediciones:
+            pila.enter_context(connection.execute_wrapper(medicion))
+        return funcion(*args, **kwargs)
+
+
+@contextmanager
+def medir_consultas(
+    ruta: str,
+    presupuesto: Optional[int] = None,
+    registro: Optional[RegistroConsultas] = None,
+) -> Iterator[MedicionConsultas]:
+    """
+    Cuenta las consultas del bloque en la conexión del hilo actual (y en las
+    de los hilos que usen ``en_mediciones_activas``).
+
+    Sirve como context manager o como decorador::
+
+        @medir_consultas("ejecutar_ciclo")
+        def ejecutar_ciclo(self): ...
+
+    La ejecución se registra aunque el bloque lance una excepción; en ese
+    caso el exceso de presupuesto solo se informa en el log para no tapar
+    la excepción original.
+
+    Args:
+        ruta: Nombre de la ruta de código (clave del presupuesto)
+        presupuesto: Máximo de consultas; por defecto ``presupuesto_de(ruta)``
+        registro: Registro donde acumular (por defecto ``registro_consultas``)
+    """
+    medicion = MedicionConsultas(
+        ruta=ruta,
+        presupuesto=presupuesto if presupuesto is not None else presupuesto_de(ruta),
+    )
+    pila = _pila_activas()
+    completado = False
+    pila.append(medicion)
+    try:
+        with connection.execute_wrapper(medicion):
+            yield medicion
+        completado = True
+    finally:
+        pila.remove(medicion)
+        (registro or registro_consultas).registrar(medicion)
+        _verificar(medicion, estricto=completado)
+
+
+def _verificar(medicion: MedicionConsultas, estricto: bool = True) -> None:
+    if not medicion.excede_presupuesto:
+        return
+    mensaje = (
+        f"{medicion.ruta} ejecutó {medicion.consultas} consultas "
+        f"(presupuesto {medicion.presupuesto}, {medicion.tiempo_ms:.1f} ms en BD)"
+    )
+    repetidas = medicion.repetidas()
+    if repetidas:
+        mensaje += f"; la más repetida ({repetidas[0][1]} veces): {repetidas[0][0][:300]}"
+    if estricto and getattr(settings, "PRESUPUESTO_CONSULTAS_ESTRICTO", False):
+        raise PresupuestoConsultasExcedido(mensaje)
+    logger.warning(mensaje)
+
+
+class PresupuestoConsultasMiddleware:
+    """
+    Mide cada petición a la API REST (``/api/``) y la registra como
+    ``vista:<nombre de la URL>``.
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith("/api/"):
+            return self.get_response(request)
+
+        medicion = MedicionConsultas(ruta="")
+        with connection.execute_wrapper(medicion):
+            response = self.get_response(request)
+        coincidencia = getattr(request, "resolver_match", None)
+        if coincidencia is not None:
+            medicion.ruta = f"vista:{coincidencia.view_name or coincidencia.route}"
+            medicion.presupuesto = presupuesto_de(medicion.ruta)
+            registro_consultas.registrar(medicion)
+            _verificar(medicion)
+        try:
+            registro_consultas.flush_si_corresponde()
+        except Exception as exc:
+            logger.error("No se pudo guardar el consumo de consultas: %s", exc)
+        return response
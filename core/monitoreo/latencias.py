@@ -0,0 +1,199 @@
+"""
+Perfilador de latencia por etapa del ciclo de trading.
+
+Acumula el tiempo de cada etapa durante un ciclo con temporizadores
+monotónicos, lo vuelca al cerrar el ciclo en histogramas móviles en memoria
+(p50/p95/p99) y los persiste periódicamente en ``LatenciaEtapa``, borrando
+los resúmenes más viejos que ``settings.MONITOREO_RETENCION_DIAS``.
+"""
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ETAPAS_CICLO = (
+    "sincronizacion_balance",
+    "filtros",
+    "carga_ticks",
+    "indicadores",
+    "scoring",
+    "persistencia",
+    "envio_orden",
+    "liquidacion",
+    "publicacion_eventos",
+)
+ETAPA_TOTAL = "ciclo_total"
+
+
+def purgar_resumenes_antiguos(modelo, ahora=None) -> int:
+    """
+    Borra las filas de ``modelo`` con ``registrado_en`` anterior a
+    ``settings.MONITOREO_RETENCION_DIAS`` días (0 conserva todo).
+
+    Returns:
+        Filas borradas.
+    """
+    dias = getattr(settings, "MONITOREO_RETENCION_DIAS", 14)
+    if not dias:
+        return 0
+    limite = (ahora or timezone.now()) - timedelta(days=dias)
+    return modelo.objects.filter(registrado_en__lt=limite).delete()[0]
+
+
+class HistogramaMovil:
+    """Ventana móvil de las últimas N muestras (en milisegundos)."""
+
+    def __init__(self, capacidad: int = 1000) -> None:
+        self._muestras: deque = deque(maxlen=capacidad)
+
+    def registrar(self, valor_ms: float) -> None:
+        self._muestras.append(valor_ms)
+
+    def __len__(self) -> int:
+        return len(self._muestras)
+
+    @staticmethod
+    def _percentil(ordenadas: List[float], percentil: float) -> float:
+        # Método nearest-rank
+        indice = max(0, math.ceil(percentil / 100 * len(ordenadas)) - 1)
+        return ordenadas[indice]
+
+    def resumen(self) -> Dict[str, float]:
+        if not self._muestras:
+            return {"muestras": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordenadas = sorted(self._muestras)
+        return {
+            "muestras": len(ordenadas),
+            "p50_ms": self._percentil(ordenadas, 50),
+            "p95_ms": self._percentil(ordenadas, 95),
+            "p99_ms": self._percentil(ordenadas, 99),
+            "max_ms": ordenadas[-1],
+        }
+
+
+class PerfiladorCiclo:
+    """
+    Mide el tiempo por etapa de cada ciclo.
+
+    Uso::
+
+        perfilador.iniciar_ciclo()
+        with perfilador.medir("scoring"):
+            ...
+        perfilador.finalizar_ciclo()
+        perfilador.flush_si_corresponde()
+
+    Una etapa medida varias veces en el mismo ciclo (por ejemplo, una vez por
+    activo) se suma y cuenta como una sola muestra del ciclo. Las etapas no
+    se solapan: el tiempo de una etapa medida dentro de otra (por ejemplo,
+    ``publicacion_eventos`` dentro de ``persistencia``) se descuenta de la
+    que la contiene, así que la suma de etapas no supera ``ciclo_total``. Los
+    ``observadores`` reciben al cerrar cada ciclo las duraciones por etapa en
+    segundos (por ejemplo, ``metricas.observar_ciclo``).
+    """
+
+    def __init__(
+        self,
+        capacidad: int = 1000,
+        intervalo_flush: int = 300,
+        observadores: Optional[Iterable[Callable[[Dict[str, float]], None]]] = None,
+    ) -> None:
+        self.capacidad = capacidad
+        self.intervalo_flush = intervalo_flush
+        self.observadores = list(observadores or [])
+        self.histogramas: Dict[str, HistogramaMovil] = {}
+        self._ciclo_actual: Dict[str, float] = defaultdict(float)
+        # None fuera de un ciclo o con el ciclo descartado
+        self._inicio_ciclo: Optional[float] = None
+        # Tiempo de las etapas anidadas dentro de cada etapa abierta
+        self._anidadas: List[float] = []
+        self._ultimo_flush = time.monotonic()
+
+    def _histograma(self, etapa: str) -> HistogramaMovil:
+        histograma = self.histogramas.get(etapa)
+        if histograma is None:
+            histograma = self.histogramas[etapa] = HistogramaMovil(self.capacidad)
+        return histograma
+
+    def iniciar_ciclo(self) -> None:
+        self._ciclo_actual.clear()
+        self._inicio_ciclo = time.perf_counter()
+
+    @contextmanager
+    def medir(self, etapa: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        self._anidadas.append(0.0)
+        try:
+            yield
+        finally:
+            transcurrido = time.perf_counter() - inicio
+            self._ciclo_actual[etapa] += transcurrido - self._anidadas.pop()
+            if self._anidadas:
+                self._anidadas[-1] += transcurrido
+
+    def descartar_ciclo(self) -> None:
+        """Abandona el ciclo en curso: ``finalizar_ciclo`` no lo registrará."""
+        self._ciclo_actual.clear()
+        self._inicio_ciclo = None
+
+    def finalizar_ciclo(self) -> None:
+        if self._inicio_ciclo is None:
+            return
+        duraciones = dict(self._ciclo_actual)
+        duraciones[ETAPA_TOTAL] = time.perf_counter() - self._inicio_ciclo
+        self._inicio_ciclo = None
+        for etapa, segundos in duraciones.items():
+            self._histograma(etapa).registrar(segundos * 1000)
+        self._ciclo_actual.clear()
+        for observador in self.observadores:
+            try:
+                observador(duraciones)
+            except Exception as exc:
+                logger.error("Error en observador del perfilador: %s", exc)
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        return {
+            etapa: histograma.resumen()
+            for etapa, histograma in self.histogramas.items()
+            if len(histograma)
+        }
+
+    def flush_si_corresponde(self) -> bool:
+        if time.monotonic() - self._ultimo_flush < self.intervalo_flush:
+            return False
+        self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Persiste el resumen actual (una fila por etapa) y lo escribe en el log."""
+        from core.models import LatenciaEtapa
+
+        self._ultimo_flush = time.monotonic()
+        resumen = self.resumen()
+        if not resumen:
+            return
+
+        ahora = timezone.now()
+        LatenciaEtapa.objects.bulk_create(
+            [
+                LatenciaEtapa(etapa=etapa, registrado_en=ahora, **datos)
+                for etapa, datos in resumen.items()
+            ]
+        )
+        purgar_resumenes_antiguos(LatenciaEtapa, ahora)
+        logger.info(
+            "Latencias del ciclo: %s",
+            ", ".join(
+                f"{etapa} p50={datos['p50_ms']:.1f}ms p95={datos['p95_ms']:.1f}ms "
+                f"p99={datos['p99_ms']:.1f}ms"
+                for etapa, datos in resumen.items()
+            ),
+        )
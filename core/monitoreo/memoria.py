@@ -0,0 +1,264 @@
+"""
+Diagnóstico de memoria con ``tracemalloc`` para los procesos de larga duración.
+
+``MonitorMemoria`` activa ``tracemalloc`` (opt-in: encarece cada asignación
+mientras está activo) y cada ``intervalo`` segundos toma una instantánea
+desde un hilo daemon, la compara con la anterior y con la primera, y
+publica la memoria trazada, el crecimiento por segundo y los sitios de
+asignación con más memoria y más crecimiento en ``/metrics``. Las
+instantáneas (``.snap``) y un informe JSON por instantánea se guardan en un
+``DirectorioRotativo``; el comando ``diagnostico_memoria`` los compara.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from .metricas import registro_metricas
+from .perfilado import DirectorioRotativo
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_POR_DEFECTO = "memoria"
+EXTENSION_INSTANTANEA = ".snap"
+EXTENSION_INFORME = ".json"
+TOP_SITIOS_METRICAS = 10
+
+# Ruido del propio diagnóstico y del sistema de imports
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def filtrar(instantanea: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return instantanea.filter_traces(_FILTROS)
+
+
+@dataclass
+class SitioMemoria:
+    sitio: str
+    bytes: int
+    bloques: int
+    crecimiento_bytes: int = 0
+    crecimiento_bloques: int = 0
+    traza: List[str] = field(default_factory=list)
+
+
+def _sitio_texto(traza: tracemalloc.Traceback) -> str:
+    marco = traza[0]
+    directorio, archivo = os.path.split(marco.filename)
+    return f"{os.path.basename(directorio)}/{archivo}:{marco.lineno}"
+
+
+def sitios_por_tamano(
+    instantanea: tracemalloc.Snapshot, top: int = 15, agrupar: str = "lineno"
+) -> List[SitioMemoria]:
+    """Sitios de asignación con más memoria viva en la instantánea."""
+    return [
+        SitioMemoria(
+            sitio=_sitio_texto(estadistica.traceback),
+            bytes=estadistica.size,
+            bloques=estadistica.count,
+            traza=estadistica.traceback.format() if agrupar == "traceback" else [],
+        )
+        for estadistica in instantanea.statistics(agrupar)[:top]
+    ]
+
+
+def sitios_por_crecimiento(
+    actual: tracemalloc.Snapshot,
+    anterior: tracemalloc.Snapshot,
+    top: int = 15,
+    agrupar: str = "lineno",
+) -> List[SitioMemoria]:
+    """Sitios cuya memoria viva más creció entre dos instantáneas."""
+    diferencias = [
+        diferencia for diferencia in actual.compare_to(anterior, agrupar) if diferencia.size_diff > 0
+    ]
+    diferencias.sort(key=lambda diferencia: diferencia.size_diff, reverse=True)
+    return [
+        SitioMemoria(
+            sitio=_sitio_texto(diferencia.traceback),
+            bytes=diferencia.size,
+            bloques=diferencia.count,
+            crecimiento_bytes=diferencia.size_diff,
+            crecimiento_bloques=diferencia.count_diff,
+            traza=diferencia.traceback.format() if agrupar == "traceback" else [],
+        )
+        for diferencia in diferencias[:top]
+    ]
+
+
+@dataclass
+class InformeMemoria:
+    """Resultado de una instantánea frente a la anterior y a la primera."""
+
+    epoch: float
+    trazada_bytes: int
+    pico_bytes: int
+    crecimiento_bytes_por_segundo: float
+    crecimiento_total_bytes_por_segundo: float
+    segundos_desde_inicio: float
+    top_tamano: List[SitioMemoria]
+    top_crecimiento: List[SitioMemoria]
+    instantanea: str = ""
+
+    def guardar(self, ruta: Path) -> None:
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(asdict(self), archivo, indent=2)
+
+
+class MonitorMemoria:
+    """
+    Instantáneas periódicas de ``tracemalloc`` en un hilo daemon.
+
+    Uso::
+
+        monitor = MonitorMemoria(DirectorioRotativo("memoria"), intervalo=300).iniciar()
+        ...
+        monitor.detener()
+    """
+
+    def __init__(
+        self,
+        directorio: DirectorioRotativo,
+        intervalo: float = 300.0,
+        frames: int = 1,
+        top: int = 15,
+        prefijo: str = "memoria",
+        guardar_instantaneas: bool = True,
+    ) -> None:
+        self.directorio = directorio
+        self.intervalo = max(1.0, intervalo)
+        self.frames = max(1, frames)
+        self.top = top
+        self.prefijo = prefijo
+        self.guardar_instantaneas = guardar_instantaneas
+        self.ultimo_informe: Optional[InformeMemoria] = None
+        self._anterior: Optional[tracemalloc.Snapshot] = None
+        self._epoch_inicial = 0.0
+        self._epoch_anterior = 0.0
+        self._trazada_inicial = 0
+        self._trazada_anterior = 0
+        # Se registran solo en los procesos con el diagnóstico activo
+        self._metrica_trazada = registro_metricas.medidor(
+            "memoria_trazada_bytes", "Memoria asignada por Python según tracemalloc"
+        )
+        self._metrica_pico = registro_metricas.medidor(
+            "memoria_pico_bytes", "Pico de memoria asignada desde que se activó tracemalloc"
+        )
+        self._metrica_crecimiento = registro_metricas.medidor(
+            "memoria_crecimiento_bytes_por_segundo",
+            "Crecimiento de la memoria trazada entre las dos últimas instantáneas",
+        )
+        self._metrica_sitio = registro_metricas.medidor(
+            "memoria_sitio_bytes", "Memoria de los sitios de asignación más grandes", ("sitio",)
+        )
+        self._metrica_crecimiento_sitio = registro_metricas.medidor(
+            "memoria_sitio_crecimiento_bytes",
+            "Crecimiento desde la instantánea anterior de los sitios que más crecen",
+            ("sitio",),
+        )
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> "MonitorMemoria":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.tomar_instantanea()
+        self._hilo = threading.Thread(target=self._ejecutar, name="monitor-memoria", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> Optional[InformeMemoria]:
+        """Toma una última instantánea y desactiva ``tracemalloc``."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+        informe = self.tomar_instantanea() if tracemalloc.is_tracing() else None
+        tracemalloc.stop()
+        return informe
+
+    def tomar_instantanea(self) -> InformeMemoria:
+        """Toma una instantánea, actualiza las métricas y guarda el informe."""
+        instantanea = filtrar(tracemalloc.take_snapshot())
+        trazada, pico = tracemalloc.get_traced_memory()
+        ahora = time.time()
+        if self._anterior is None:
+            self._epoch_inicial, self._trazada_inicial = ahora, trazada
+            self._anterior, self._epoch_anterior, self._trazada_anterior = instantanea, ahora, trazada
+
+        transcurrido = ahora - self._epoch_anterior
+        desde_inicio = ahora - self._epoch_inicial
+        informe = InformeMemoria(
+            epoch=ahora,
+            trazada_bytes=trazada,
+            pico_bytes=pico,
+            crecimiento_bytes_por_segundo=(
+                (trazada - self._trazada_anterior) / transcurrido if transcurrido > 0 else 0.0
+            ),
+            crecimiento_total_bytes_por_segundo=(
+                (trazada - self._trazada_inicial) / desde_inicio if desde_inicio > 0 else 0.0
+            ),
+            segundos_desde_inicio=desde_inicio,
+            top_tamano=sitios_por_tamano(instantanea, self.top),
+            top_crecimiento=sitios_por_crecimiento(instantanea, self._anterior, self.top),
+        )
+        self._anterior, self._epoch_anterior, self._trazada_anterior = instantanea, ahora, trazada
+        self._publicar(informe)
+
+        try:
+            if self.guardar_instantaneas:
+                ruta = self.directorio.nuevo_archivo(self.prefijo, EXTENSION_INSTANTANEA)
+                instantanea.dump(str(ruta))
+                informe.instantanea = ruta.name
+            informe.guardar(self.directorio.nuevo_archivo(self.prefijo, EXTENSION_INFORME))
+        except OSError as exc:
+            logger.warning("No se pudo guardar la instantánea de memoria: %s", exc)
+        self.ultimo_informe = informe
+        return informe
+
+    def _publicar(self, informe: InformeMemoria) -> None:
+        self._metrica_trazada.set(informe.trazada_bytes)
+        self._metrica_pico.set(informe.pico_bytes)
+        self._metrica_crecimiento.set(informe.crecimiento_bytes_por_segundo)
+        self._metrica_sitio.reemplazar(
+            {(sitio.sitio,): sitio.bytes for sitio in informe.top_tamano[:TOP_SITIOS_METRICAS]}
+        )
+        self._metrica_crecimiento_sitio.reemplazar(
+            {
+                (sitio.sitio,): sitio.crecimiento_bytes
+                for sitio in informe.top_crecimiento[:TOP_SITIOS_METRICAS]
+            }
+        )
+
+    def _ejecutar(self) -> None:
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.tomar_instantanea()
+            except Exception as exc:
+                logger.warning("Error en el monitor de memoria: %s", exc)
+
+
+def cargar_informes(directorio: str) -> List[dict]:
+    """Informes JSON del directorio, del más antiguo al más nuevo."""
+    ruta = Path(directorio)
+    if not ruta.is_dir():
+        return []
+    informes = []
+    for archivo in ruta.glob(f"*{EXTENSION_INFORME}"):
+        try:
+            with open(archivo, encoding="utf-8") as contenido:
+                informes.append(json.load(contenido))
+        except (OSError, ValueError) as exc:
+            logger.debug("Informe de memoria ilegible %s: %s", archivo, exc)
+    informes.sort(key=lambda informe: informe.get("epoch", 0))
+    return informes
@@ -0,0 +1,330 @@
+"""
+Métricas de los procesos del bot en formato de exposición de Prometheus.
+
+Contadores, medidores e histogramas en memoria, sin dependencias externas.
+Registrar una muestra cuesta una búsqueda en un diccionario y una suma
+bajo un lock, por lo que se puede llamar desde el camino caliente (cada
+tick, cada consulta). ``registro_metricas.exponer()`` genera el texto que
+sirven la vista ``/metrics`` del servidor ASGI y el listener HTTP embebido
+de ``ejecutar_bot`` y ``recolectar_ticks`` (``iniciar_servidor_metricas``).
+"""
+import bisect
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+PREFIJO = "binabot_"
+
+# Límites en segundos: de 1 ms a 2 min (la liquidación de un contrato
+# cae en el extremo alto, las etapas del ciclo en el bajo)
+LIMITES_SEGUNDOS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if valor == int(valor) and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _etiquetas_texto(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> None:
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(etiquetas.get(nombre, "")) for nombre in self.etiquetas)
+
+    def _cabecera(self) -> List[str]:
+        return [f"# HELP {self.nombre} {_escapar(self.ayuda)}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def exponer(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    """Valor que solo crece (total de ticks, órdenes, reconexiones...)."""
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        # Sin etiquetas la serie existe desde el inicio (se expone en 0)
+        self._valores: Dict[Tuple[str, ...], float] = {} if self.etiquetas else {(): 0.0}
+
+    def inc(self, valor: float = 1.0, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + valor
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        lineas = self._cabecera()
+        for clave, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {_formatear(valor)}")
+        return lineas
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantáneo (profundidad de cola, balance...). Con ``funcion`` el
+    valor se calcula al exponer en lugar de actualizarse en el camino caliente.
+    """
+    tipo = "gauge"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        funcion: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {} if self.etiquetas else {(): 0.0}
+        self.funcion = funcion
+
+    def set(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def reemplazar(self, valores: Dict[Tuple[str, ...], float]) -> None:
+        """Reemplaza todas las series (etiquetas que rotan, como un top N)."""
+        with self._lock:
+            self._valores = dict(valores)
+
+    def exponer(self) -> List[str]:
+        if self.funcion is not None:
+            try:
+                self.set(self.funcion())
+            except Exception as exc:
+                logger.debug("No se pudo calcular %s: %s", self.nombre, exc)
+        with self._lock:
+            valores = list(self._valores.items())
+        lineas = self._cabecera()
+        for clave, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {_formatear(valor)}")
+        return lineas
+
+
+class Histograma(_Metrica):
+    """Distribución por cubetas acumulativas (``le``), con suma y conteo."""
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        limites: Sequence[float] = LIMITES_SEGUNDOS,
+    ) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(limites))
+        # Por clave: [conteo por cubeta (+Inf al final), suma, conteo]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        if not self.etiquetas:
+            self._series[()] = [[0] * (len(self.limites) + 1), 0.0, 0]
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        cubeta = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][cubeta] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def conteo(self, **etiquetas) -> int:
+        serie = self._series.get(self._clave(etiquetas))
+        return serie[2] if serie else 0
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            series = [(clave, list(serie[0]), serie[1], serie[2]) for clave, serie in self._series.items()]
+        lineas = self._cabecera()
+        for clave, cubetas, suma, conteo in series:
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + (math.inf,), cubetas):
+                acumulado += cantidad
+                etiquetas = _etiquetas_texto(self.etiquetas, clave, f'le="{_formatear(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _etiquetas_texto(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear(suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {conteo}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Métricas del proceso, creadas bajo demanda y expuestas en orden de alta."""
+
+    def __init__(self, prefijo: str = PREFIJO) -> None:
+        self.prefijo = prefijo
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _obtener(self, clase, nombre: str, ayuda: str, etiquetas: Sequence[str], **opciones):
+        nombre = self.prefijo + nombre
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **opciones)
+            elif not isinstance(metrica, clase):
+                raise ValueError(f"La métrica {nombre} ya existe como {metrica.tipo}.")
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        funcion: Optional[Callable[[], float]] = None,
+    ) -> Medidor:
+        return self._obtener(Medidor, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        limites: Sequence[float] = LIMITES_SEGUNDOS,
+    ) -> Histograma:
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, limites=limites)
+
+    def exponer(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas: List[str] = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+# --- Métricas del bot ---------------------------------------------------------
+
+TICKS_INGERIDOS = registro_metricas.contador(
+    "ticks_ingeridos_total", "Ticks guardados por el recolector", ("simbolo",)
+)
+RETRASO_TICK = registro_metricas.histograma(
+    "retraso_tick_segundos", "Tiempo entre el epoch del tick y su guardado"
+)
+COLA_RECEPCION = registro_metricas.medidor(
+    "cola_recepcion_mensajes", "Mensajes del websocket de Deriv pendientes de procesar"
+)
+RECONEXIONES_WS = registro_metricas.contador(
+    "reconexiones_websocket_total", "Conexiones al websocket de Deriv reabiertas tras un cierre"
+)
+DURACION_ETAPA = registro_metricas.histograma(
+    "etapa_ciclo_segundos", "Duración de cada etapa del ciclo de trading", ("etapa",)
+)
+ORDENES = registro_metricas.contador(
+    "ordenes_total", "Órdenes de compra enviadas a Deriv", ("tipo", "estado")
+)
+CONTRATOS_LIQUIDADOS = registro_metricas.contador(
+    "contratos_liquidados_total", "Contratos liquidados por resultado", ("resultado",)
+)
+TIEMPO_LIQUIDACION = registro_metricas.histograma(
+    "liquidacion_contrato_segundos", "Tiempo entre la compra y el resultado del contrato"
+)
+CONSULTAS_SQL = registro_metricas.contador(
+    "consultas_sql_total", "Consultas SQL ejecutadas por ruta de código", ("ruta",)
+)
+TIEMPO_SQL = registro_metricas.contador(
+    "consultas_sql_segundos_total", "Tiempo en base de datos por ruta de código", ("ruta",)
+)
+CONSULTAS_POR_EJECUCION = registro_metricas.histograma(
+    "consultas_sql_por_ejecucion",
+    "Consultas SQL por ejecución de cada ruta",
+    ("ruta",),
+    limites=LIMITES_CONSULTAS,
+)
+EXCESOS_PRESUPUESTO = registro_metricas.contador(
+    "consultas_sql_excesos_total", "Ejecuciones sobre el presupuesto de consultas", ("ruta",)
+)
+N_MAS_UNO = registro_metricas.contador(
+    "consultas_sql_n_mas_uno_total", "Ejecuciones con un patrón N+1", ("ruta",)
+)
+
+
+def observar_ciclo(duraciones: Dict[str, float]) -> None:
+    """Observador de ``PerfiladorCiclo``: duraciones por etapa en segundos."""
+    for etapa, segundos in duraciones.items():
+        DURACION_ETAPA.observar(segundos, etapa=etapa)
+
+
+# --- Listener HTTP embebido ---------------------------------------------------
+
+def iniciar_servidor_metricas(
+    puerto: int, host: str = "127.0.0.1", registro: Optional[RegistroMetricas] = None
+) -> ThreadingHTTPServer:
+    """
+    Sirve ``/metrics`` en un hilo demonio del proceso actual.
+
+    Args:
+        puerto: Puerto TCP (0 = uno libre, ver ``server_address``)
+        host: Interfaz donde escuchar
+        registro: Registro a exponer (por defecto ``registro_metricas``)
+
+    Returns:
+        El servidor; ``shutdown()`` lo detiene
+    """
+    registro = registro or registro_metricas
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            cuerpo = registro.exponer().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", TIPO_CONTENIDO)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            logger.debug("metricas %s - %s", self.address_string(), formato % args)
+
+    servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(
+        target=servidor.serve_forever, name="servidor-metricas", daemon=True
+    ).start()
+    return servidor
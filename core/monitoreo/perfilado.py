@@ -0,0 +1,300 @@
+"""
+Perfilado de los procesos de larga duración sin reiniciarlos bajo un depurador.
+
+Dos modos:
+
+- ``MuestreadorPilas``: un hilo daemon toma cada ``intervalo`` segundos la
+  pila de todos los hilos del proceso (``sys._current_frames``) y acumula
+  las pilas colapsadas (``raiz;...;hoja conteo``), que se vuelcan
+  periódicamente a archivos ``.folded``. El costo es proporcional a la
+  frecuencia de muestreo, no a la cantidad de llamadas del proceso.
+- ``PerfiladorCProfile``: ejecuta ``cProfile`` solo en uno de cada N ciclos
+  y guarda el resultado como ``.pstats``.
+
+Ambos escriben en un ``DirectorioRotativo`` que conserva los últimos
+archivos. El comando ``resumen_perfil`` fusiona esos archivos en un resumen
+por función y en un ``.folded`` listo para flamegraph.pl, inferno o
+speedscope.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_POR_DEFECTO = "perfiles"
+EXTENSION_PILAS = ".folded"
+EXTENSION_PSTATS = ".pstats"
+
+
+def _marco_texto(codigo) -> str:
+    # ';' separa marcos en el formato colapsado; el conteo va tras el último espacio
+    archivo = os.path.basename(codigo.co_filename)
+    return f"{codigo.co_name} ({archivo}:{codigo.co_firstlineno})".replace(";", ":")
+
+
+def pila_colapsada(frame, raiz: str = "") -> str:
+    """
+    Convierte un frame en una pila colapsada, de la raíz a la hoja.
+
+    Args:
+        frame: Frame más interno (el que se está ejecutando).
+        raiz: Marco inicial opcional (p. ej., el nombre del hilo).
+
+    Returns:
+        Marcos separados por ';'.
+    """
+    marcos: List[str] = []
+    while frame is not None:
+        marcos.append(_marco_texto(frame.f_code))
+        frame = frame.f_back
+    if raiz:
+        marcos.append(raiz)
+    return ";".join(reversed(marcos))
+
+
+class DirectorioRotativo:
+    """Directorio de perfiles que conserva solo los ``max_archivos`` más recientes."""
+
+    def __init__(self, ruta: str = DIRECTORIO_POR_DEFECTO, max_archivos: int = 50) -> None:
+        self.ruta = Path(ruta)
+        self.max_archivos = max(1, max_archivos)
+        self._secuencia = 0
+
+    def nuevo_archivo(self, prefijo: str, extension: str) -> Path:
+        """Ruta para un archivo nuevo; rota los más antiguos del mismo tipo."""
+        self.ruta.mkdir(parents=True, exist_ok=True)
+        self._secuencia += 1
+        nombre = (
+            f"{prefijo}-{timezone.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self._secuencia:04d}{extension}"
+        )
+        self._rotar(extension)
+        return self.ruta / nombre
+
+    def _rotar(self, extension: str) -> None:
+        archivos = sorted(self.ruta.glob(f"*{extension}"), key=lambda archivo: archivo.stat().st_mtime)
+        # Se deja lugar para el archivo que se va a escribir
+        for archivo in archivos[: max(0, len(archivos) - self.max_archivos + 1)]:
+            try:
+                archivo.unlink()
+            except OSError as exc:
+                logger.debug("No se pudo rotar %s: %s", archivo, exc)
+
+
+class MuestreadorPilas:
+    """
+    Muestreador de pilas de bajo costo que corre en un hilo propio.
+
+    Las muestras son de tiempo de reloj: un hilo esperando I/O o durmiendo
+    entre ciclos aparece con la pila de esa espera. Cada pila empieza con
+    ``hilo:<nombre>`` para poder separar los hilos en el flamegraph.
+    """
+
+    def __init__(
+        self,
+        directorio: DirectorioRotativo,
+        intervalo: float = 0.01,
+        intervalo_volcado: float = 60.0,
+        prefijo: str = "muestras",
+    ) -> None:
+        self.directorio = directorio
+        self.intervalo = max(0.001, intervalo)
+        self.intervalo_volcado = max(1.0, intervalo_volcado)
+        self.prefijo = prefijo
+        self.muestras = 0
+        self._pilas: Counter = Counter()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> "MuestreadorPilas":
+        self._hilo = threading.Thread(target=self._ejecutar, name="muestreador-pilas", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> Optional[Path]:
+        """Detiene el muestreo y vuelca las pilas pendientes."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+        return self.volcar()
+
+    def muestrear(self) -> None:
+        """Toma una muestra de la pila de cada hilo (salvo el propio)."""
+        propio = threading.get_ident()
+        nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+        pilas = [
+            pila_colapsada(frame, raiz=f"hilo:{nombres.get(ident, ident)}")
+            for ident, frame in sys._current_frames().items()
+            if ident != propio
+        ]
+        with self._lock:
+            self._pilas.update(pilas)
+            self.muestras += 1
+
+    def volcar(self) -> Optional[Path]:
+        """Escribe las pilas acumuladas en un archivo nuevo y las reinicia."""
+        with self._lock:
+            pilas, self._pilas = self._pilas, Counter()
+        if not pilas:
+            return None
+        ruta = self.directorio.nuevo_archivo(self.prefijo, EXTENSION_PILAS)
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            for pila, conteo in pilas.most_common():
+                archivo.write(f"{pila} {conteo}\n")
+        return ruta
+
+    def _ejecutar(self) -> None:
+        proximo_volcado = time.monotonic() + self.intervalo_volcado
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.muestrear()
+                if time.monotonic() >= proximo_volcado:
+                    proximo_volcado = time.monotonic() + self.intervalo_volcado
+                    self.volcar()
+            except Exception as exc:
+                logger.warning("Error en el muestreador de pilas: %s", exc)
+
+
+class PerfiladorCProfile:
+    """
+    Perfila con ``cProfile`` uno de cada ``cada_n`` ciclos.
+
+    Uso (igual que ``PerfiladorCiclo``)::
+
+        perfilador_cprofile.iniciar_ciclo()
+        motor.ejecutar_ciclo()
+        perfilador_cprofile.finalizar_ciclo()
+
+    o ``with perfilador_cprofile.ciclo(): ...``. Los ciclos que no se
+    perfilan no pagan ningún costo.
+    """
+
+    def __init__(self, directorio: DirectorioRotativo, cada_n: int = 10, prefijo: str = "ciclo") -> None:
+        self.directorio = directorio
+        self.cada_n = max(1, cada_n)
+        self.prefijo = prefijo
+        self.ciclos = 0
+        self._perfil: Optional[cProfile.Profile] = None
+
+    def iniciar_ciclo(self) -> None:
+        self.ciclos += 1
+        if self.ciclos % self.cada_n:
+            return
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+    def descartar_ciclo(self) -> None:
+        """Detiene el perfil del ciclo actual, si lo hay, sin guardarlo."""
+        perfil, self._perfil = self._perfil, None
+        if perfil is not None:
+            perfil.disable()
+
+    def finalizar_ciclo(self) -> Optional[Path]:
+        """Detiene el perfil del ciclo actual, si lo hay, y lo guarda."""
+        perfil, self._perfil = self._perfil, None
+        if perfil is None:
+            return None
+        perfil.disable()
+        ruta = self.directorio.nuevo_archivo(self.prefijo, EXTENSION_PSTATS)
+        try:
+            perfil.dump_stats(ruta)
+        except OSError as exc:
+            logger.warning("No se pudo guardar el perfil del ciclo %s: %s", self.ciclos, exc)
+            return None
+        return ruta
+
+    @contextmanager
+    def ciclo(self) -> Iterator[None]:
+        self.iniciar_ciclo()
+        try:
+            yield
+        finally:
+            self.finalizar_ciclo()
+
+
+@dataclass
+class ResumenFuncion:
+    funcion: str
+    propias: int
+    inclusivas: int
+
+    def porcentaje(self, total: int, inclusivo: bool = False) -> float:
+        if not total:
+            return 0.0
+        return 100.0 * (self.inclusivas if inclusivo else self.propias) / total
+
+
+def cargar_pilas(rutas: Iterable[Path], hilo: str = "") -> Counter:
+    """
+    Fusiona archivos ``.folded``.
+
+    Args:
+        rutas: Archivos de pilas colapsadas.
+        hilo: Si se indica, solo las pilas de hilos cuyo nombre lo contenga.
+
+    Returns:
+        Conteo de muestras por pila.
+    """
+    pilas: Counter = Counter()
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                pila, _, conteo = linea.rstrip("\n").rpartition(" ")
+                if not pila or not conteo.isdigit():
+                    continue
+                if hilo and hilo not in pila.split(";", 1)[0]:
+                    continue
+                pilas[pila] += int(conteo)
+    return pilas
+
+
+def resumir_funciones(pilas: Counter) -> List[ResumenFuncion]:
+    """
+    Muestras propias (la función es la hoja) e inclusivas (aparece en la
+    pila) por función, ordenadas por muestras propias.
+    """
+    propias: Dict[str, int] = Counter()
+    inclusivas: Dict[str, int] = Counter()
+    for pila, conteo in pilas.items():
+        marcos = pila.split(";")
+        propias[marcos[-1]] += conteo
+        # Una función recursiva cuenta una sola vez por muestra
+        for marco in set(marcos):
+            inclusivas[marco] += conteo
+    resumen = [
+        ResumenFuncion(funcion=marco, propias=propias.get(marco, 0), inclusivas=total)
+        for marco, total in inclusivas.items()
+        if not marco.startswith("hilo:")
+    ]
+    resumen.sort(key=lambda item: (item.propias, item.inclusivas), reverse=True)
+    return resumen
+
+
+def archivos_perfil(directorio: str, extension: str, desde: Optional[float] = None) -> List[Path]:
+    """Archivos de ``directorio`` con la extensión dada, del más antiguo al más nuevo."""
+    ruta = Path(directorio)
+    if not ruta.is_dir():
+        return []
+    archivos = sorted(ruta.glob(f"*{extension}"), key=lambda archivo: archivo.stat().st_mtime)
+    if desde is not None:
+        archivos = [archivo for archivo in archivos if archivo.stat().st_mtime >= desde]
+    return archivos
+
+
+def fusionar_pstats(rutas: List[Path], flujo=None) -> Optional[pstats.Stats]:
+    """Une varios ``.pstats`` en un solo ``pstats.Stats`` (None si no hay archivos)."""
+    if not rutas:
+        return None
+    return pstats.Stats(*[str(ruta) for ruta in rutas], stream=flujo or sys.stdout)
@@ -0,0 +1,117 @@
+"""
+Comparación de resultados de benchmarks contra umbrales y contra una
+ejecución de referencia.
+
+Las métricas se comparan por ruta aplanada (``"ciclo.p95_ms"``). Las que
+terminan en ``_por_segundo`` o ``speedup`` son "más es mejor"; el resto
+(latencias, tiempos, consultas) son "menos es mejor".
+"""
+import json
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional
+
+from django.conf import settings
+
+SUFIJOS_MAYOR_ES_MEJOR = ("_por_segundo", "speedup")
+
+
+@dataclass
+class Regresion:
+    metrica: str
+    valor: float
+    limite: float
+    motivo: str  # "umbral" o "referencia"
+    referencia: Optional[float] = None
+
+    def describir(self) -> str:
+        if self.motivo == "referencia":
+            return (
+                f"{self.metrica}: {self.valor:.3f} vs {self.referencia:.3f} de referencia "
+                f"(límite {self.limite:.3f})"
+            )
+        if mayor_es_mejor(self.metrica):
+            return f"{self.metrica}: {self.valor:.3f} por debajo del mínimo {self.limite:.3f}"
+        return f"{self.metrica}: {self.valor:.3f} supera el umbral {self.limite:.3f}"
+
+
+def mayor_es_mejor(metrica: str) -> bool:
+    return metrica.endswith(SUFIJOS_MAYOR_ES_MEJOR)
+
+
+def aplanar_metricas(datos: Mapping, prefijo: str = "") -> Dict[str, float]:
+    """``{"ciclo": {"p95_ms": 3}}`` → ``{"ciclo.p95_ms": 3.0}`` (solo valores numéricos)."""
+    planas: Dict[str, float] = {}
+    for clave, valor in datos.items():
+        ruta = f"{prefijo}{clave}"
+        if isinstance(valor, Mapping):
+            planas.update(aplanar_metricas(valor, f"{ruta}."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planas[ruta] = float(valor)
+    return planas
+
+
+def version_codigo() -> str:
+    """Commit corto del árbol medido (vacío si no hay git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def cargar_metricas(ruta: str, seccion: str = "metricas") -> Dict[str, float]:
+    """Métricas aplanadas de un JSON de resultados guardado previamente."""
+    with open(ruta, encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+    return aplanar_metricas(datos.get(seccion, datos))
+
+
+def detectar_regresiones(
+    metricas: Mapping[str, float],
+    umbrales: Optional[Mapping[str, float]] = None,
+    referencia: Optional[Mapping[str, float]] = None,
+    tolerancia: float = 0.20,
+    margen_absoluto: float = 0.0,
+) -> List[Regresion]:
+    """
+    Marca las métricas que empeoran.
+
+    Args:
+        metricas: Métricas aplanadas de la ejecución actual
+        umbrales: Límite absoluto por métrica (máximo, o mínimo si más es mejor)
+        referencia: Métricas aplanadas de una ejecución anterior
+        tolerancia: Empeoramiento relativo permitido frente a la referencia
+        margen_absoluto: Diferencias menores a este valor no cuentan como
+            regresión (evita ruido en métricas muy pequeñas)
+
+    Returns:
+        Lista de regresiones (vacía si todo está dentro de los límites)
+    """
+    regresiones = []
+    for metrica, limite in (umbrales or {}).items():
+        valor = metricas.get(metrica)
+        if valor is None:
+            continue
+        excede = valor < limite if mayor_es_mejor(metrica) else valor > limite
+        if excede:
+            regresiones.append(Regresion(metrica, valor, float(limite), "umbral"))
+
+    for metrica, anterior in (referencia or {}).items():
+        valor = metricas.get(metrica)
+        if valor is None:
+            continue
+        if mayor_es_mejor(metrica):
+            limite = anterior * (1 - tolerancia)
+            empeora = valor < limite and anterior - valor > margen_absoluto
+        else:
+            limite = anterior * (1 + tolerancia)
+            empeora = valor > limite and valor - anterior > margen_absoluto
+        if empeora:
+            regresiones.append(Regresion(metrica, valor, limite, "referencia", anterior))
+    return regresiones
@@ -282,7 +282,12 @@ class GestorBotCore:
             ]
         )
 
-    def ejecutar_simulacion_pausa(self, intervalo_segundos: int = 3600):
+    def ejecutar_simulacion_pausa(
+        self,
+        intervalo_segundos: int = 3600,
+        workers_simulacion: int = 0,
+        duraciones_simulacion=None,
+    ):
         if self.configuracion.estado != ConfiguracionBot.Estado.PAUSADO:
             return None
 
@@ -294,7 +299,11 @@ class GestorBotCore:
         try:
             from simulacion.services import SimuladorHorariosService
 
-            simulador = SimuladorHorariosService()
+            simulador = SimuladorHorariosService(
+                workers=workers_simulacion,
+                incremental=True,
+                duraciones=duraciones_simulacion,
+            )
             resultado = simulador.ejecutar()
         except Exception:
             return None
@@ -1,3 +1,217 @@
-from django.test import TestCase
+import asyncio
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from core.canales import PROCESO_VIVO, CapaCanalesSQLite
+from core.models import ActivoPermitido
+from core.monitoreo import (
+    PresupuestoConsultasExcedido,
+    en_mediciones_activas,
+    mediciones_activas,
+    medir_consultas,
+)
+from core.monitoreo.consultas import RegistroConsultas
+from core.monitoreo.latencias import ETAPA_TOTAL, PerfiladorCiclo
+
+
+def contar_activos() -> int:
+    try:
+        return ActivoPermitido.objects.count()
+    finally:
+        connection.close()
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True)
+class MedirConsultasTests(TestCase):
+    def setUp(self):
+        self.registro = RegistroConsultas()
+
+    def test_estricto_falla_al_exceder_el_presupuesto(self):
+        with self.assertRaises(PresupuestoConsultasExcedido):
+            with medir_consultas("prueba", presupuesto=1, registro=self.registro):
+                ActivoPermitido.objects.count()
+                ActivoPermitido.objects.count()
+
+        self.assertEqual(self.registro.rutas["prueba"].excesos, 1)
+
+    def test_registra_la_ejecucion_aunque_el_bloque_falle(self):
+        with self.assertRaises(ValueError):
+            with medir_consultas("prueba", presupuesto=0, registro=self.registro):
+                ActivoPermitido.objects.count()
+                raise ValueError("falla de la ruta")
+
+        estadisticas = self.registro.rutas["prueba"]
+        self.assertEqual(estadisticas.ejecuciones, 1)
+        self.assertEqual(estadisticas.ultima.consultas, 1)
+        self.assertEqual(estadisticas.excesos, 1)
+
+    def test_decorador_registra_cada_llamada(self):
+        @medir_consultas("prueba", registro=self.registro)
+        def ruta():
+            return ActivoPermitido.objects.count()
+
+        ruta()
+        ruta()
+
+        self.assertEqual(self.registro.rutas["prueba"].ejecuciones, 2)
+        self.assertEqual(mediciones_activas(), ())
+
+
+class MedirConsultasHilosTests(TransactionTestCase):
+    def test_cuenta_las_consultas_de_un_pool_de_hilos(self):
+        registro = RegistroConsultas()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with medir_consultas("prueba", registro=registro) as medicion:
+                activas = mediciones_activas()
+                futuros = [
+                    pool.submit(en_mediciones_activas, activas, contar_activos)
+                    for _ in range(3)
+                ]
+                for futuro in futuros:
+                    futuro.result()
+                # Sin propagar la medición, el hilo no se cuenta
+                pool.submit(contar_activos).result()
+
+        self.assertEqual(medicion.consultas, 3)
+        self.assertEqual(registro.rutas["prueba"].ultima.consultas, 3)
+
+
+class PerfiladorCicloTests(SimpleTestCase):
+    def test_ciclo_descartado_no_se_registra(self):
+        observados = []
+        perfilador = PerfiladorCiclo(observadores=[observados.append])
+
+        perfilador.iniciar_ciclo()
+        with perfilador.medir("sincronizacion_balance"):
+            pass
+        perfilador.finalizar_ciclo()
+
+        perfilador.iniciar_ciclo()
+        with perfilador.medir("sincronizacion_balance"):
+            pass
+        perfilador.descartar_ciclo()
+        perfilador.finalizar_ciclo()
+
+        self.assertEqual(len(observados), 1)
+        self.assertEqual(perfilador.histogramas[ETAPA_TOTAL].resumen()["muestras"], 1)
+        self.assertEqual(perfilador.histogramas["sincronizacion_balance"].resumen()["muestras"], 1)
+
+
+class CapaCanalesSQLiteTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / "canales.sqlite3"
+
+    def crear_capa(self, **kwargs) -> CapaCanalesSQLite:
+        capa = CapaCanalesSQLite(ruta=self.ruta, **kwargs)
+        self.addCleanup(capa.esperar_escrituras)
+        return capa
+
+    async def sin_mensajes(self, capa: CapaCanalesSQLite, canal: str) -> bool:
+        try:
+            await asyncio.wait_for(capa.receive(canal), 0.1)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    def test_envio_local(self):
+        capa = self.crear_capa()
+
+        async def probar():
+            canal = await capa.new_channel()
+            await capa.send(canal, {"type": "prueba", "valor": 1})
+            mensaje = await asyncio.wait_for(capa.receive(canal), 1)
+            await capa.close()
+            return mensaje
+
+        self.assertEqual(asyncio.run(probar()), {"type": "prueba", "valor": 1})
+
+    def test_grupo_reparte_a_sus_miembros(self):
+        capa = self.crear_capa()
+
+        async def probar():
+            primero, segundo, tercero = [await capa.new_channel() for _ in range(3)]
+            for canal in (primero, segundo, tercero):
+                await capa.group_add("dashboard", canal)
+            await capa.group_discard("dashboard", tercero)
+            await capa.group_send("dashboard", {"type": "aviso"})
+            recibidos = [
+                await asyncio.wait_for(capa.receive(canal), 1) for canal in (primero, segundo)
+            ]
+            descartado_vacio = await self.sin_mensajes(capa, tercero)
+            await capa.close()
+            return recibidos, descartado_vacio
+
+        recibidos, descartado_vacio = asyncio.run(probar())
+        self.assertEqual(recibidos, [{"type": "aviso"}] * 2)
+        self.assertTrue(descartado_vacio)
+
+    def test_mensaje_expirado_no_se_entrega(self):
+        capa = self.crear_capa(expiry=0.05)
+
+        async def probar():
+            canal = await capa.new_channel()
+            await capa.send(canal, {"type": "viejo"})
+            await asyncio.sleep(0.1)
+            await capa.send(canal, {"type": "nuevo"})
+            mensaje = await asyncio.wait_for(capa.receive(canal), 1)
+            await capa.close()
+            return mensaje
+
+        self.assertEqual(asyncio.run(probar()), {"type": "nuevo"})
+
+    def test_contar_miembros_ignora_procesos_sin_latido(self):
+        local = self.crear_capa()
+        remota = self.crear_capa()
+
+        async def suscribir():
+            await local.group_add("estado", await local.new_channel())
+            await remota.group_add("estado", await remota.new_channel())
+            await remota.group_add("estado", await remota.new_channel())
+
+        asyncio.run(suscribir())
+        remota._escribir(("latido", remota.proceso))
+        self.assertTrue(remota.esperar_escrituras())
+
+        self.assertEqual(local.contar_miembros(["estado", "winrate"]), {"estado": 3, "winrate": 0})
+
+        conexion = sqlite3.connect(self.ruta)
+        with conexion:
+            conexion.execute(
+                "UPDATE procesos SET visto = ? WHERE proceso = ?",
+                (time.time() - PROCESO_VIVO - 1, remota.proceso),
+            )
+        conexion.close()
+
+        self.assertEqual(local.contar_miembros(["estado"]), {"estado": 1})
+
+    def test_entrega_entre_procesos(self):
+        receptora = self.crear_capa()
+        emisora = self.crear_capa()
+        self.assertNotEqual(receptora.proceso, emisora.proceso)
+
+        async def probar():
+            canal = await receptora.new_channel()
+            await receptora.group_add("operaciones", canal)
+            recepcion = asyncio.ensure_future(receptora.receive(canal))
+            # El sondeo de la receptora publica su latido al arrancar
+            await asyncio.sleep(0.05)
+            receptora.esperar_escrituras()
+
+            await emisora.group_send("operaciones", {"type": "grupo"})
+            await emisora.send(canal, {"type": "directo"})
+            emisora.esperar_escrituras()
+
+            recibidos = [await asyncio.wait_for(recepcion, 2)]
+            recibidos.append(await asyncio.wait_for(receptora.receive(canal), 2))
+            await receptora.close()
+            return recibidos
+
+        self.assertEqual(asyncio.run(probar()), [{"type": "grupo"}, {"type": "directo"}])
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import PanelPrincipalView
+from .views import PanelPrincipalView, metricas_prometheus
 
 urlpatterns = [
     path("", PanelPrincipalView.as_view(), name="panel-principal"),
+    path("metrics", metricas_prometheus, name="metricas-prometheus"),
 ]
 
@@ -1,5 +1,13 @@
+from django.http import HttpResponse
 from django.views.generic import TemplateView
 
+from core.monitoreo.metricas import TIPO_CONTENIDO, registro_metricas
+
 
 class PanelPrincipalView(TemplateView):
     template_name = "core/panel.html"
+
+
+def metricas_prometheus(request):
+    """Métricas de este proceso (servidor ASGI) en formato de Prometheus."""
+    return HttpResponse(registro_metricas.exponer(), content_type=TIPO_CONTENIDO)
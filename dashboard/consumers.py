@@ -2,39 +2,114 @@
 Consumer WebSocket para actualizaciones en tiempo real del dashboard.
 """
 import json
-from asgiref.sync import async_to_sync
+from typing import FrozenSet, Iterable, Optional
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .services import (
+    GRUPO_DASHBOARD,
+    SECCIONES,
+    construir_snapshot_dashboard,
+    filtrar_mensaje,
+    grupo_tema,
+    mensaje_completo,
+)
+
+
+def _temas_validos(temas: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(tema for tema in temas if tema in SECCIONES)
 
 
 class DashboardConsumer(AsyncWebsocketConsumer):
-    """Consumer para actualizaciones del dashboard en tiempo real."""
-    
+    """
+    Consumer para actualizaciones del dashboard en tiempo real.
+
+    El cliente elige los temas (secciones) con ``?temas=estado,winrate`` o
+    enviando ``{"tipo": "suscribir", "temas": [...]}``; por defecto, todos.
+    """
+
+    # Última secuencia del difusor vista por este proceso (todos los consumers
+    # del proceso reciben los mismos mensajes del grupo)
+    ultima_secuencia: Optional[int] = None
+
     async def connect(self):
-        """Conectar al grupo del dashboard."""
-        self.group_name = "dashboard_updates"
-        
+        """Conectar al grupo del dashboard y a los de sus temas."""
+        self.group_name = GRUPO_DASHBOARD
+        self.temas: FrozenSet[str] = frozenset()
+
         # Unirse al grupo
         await self.channel_layer.group_add(
             self.group_name,
             self.channel_name
         )
-        
+        consulta = parse_qs(self.scope.get("query_string", b"").decode())
+        pedidos = ",".join(consulta.get("temas", [])).split(",")
+        await self.suscribir(_temas_validos(pedidos) if consulta.get("temas") else SECCIONES)
+
         await self.accept()
-        
+
         # Enviar mensaje de conexión exitosa
         await self.send(text_data=json.dumps({
             "tipo": "conexion",
-            "mensaje": "Conectado al dashboard en tiempo real"
+            "mensaje": "Conectado al dashboard en tiempo real",
+            "temas": sorted(self.temas),
         }))
-    
+        await self.enviar_resync()
+
     async def disconnect(self, close_code):
         """Desconectar del grupo."""
+        await self.suscribir(())
         await self.channel_layer.group_discard(
             self.group_name,
             self.channel_name
         )
-    
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """
+        ``resync`` cuando el cliente detecta un salto en la secuencia;
+        ``suscribir`` reemplaza sus temas y responde con la instantánea.
+        """
+        try:
+            mensaje = json.loads(text_data or "{}")
+        except ValueError:
+            return
+        if mensaje.get("tipo") == "resync":
+            await self.enviar_resync()
+        elif mensaje.get("tipo") == "suscribir":
+            await self.suscribir(_temas_validos(mensaje.get("temas") or ()))
+            await self.enviar_resync()
+
+    async def suscribir(self, temas: Iterable[str]) -> None:
+        """Actualiza los grupos por tema que cuenta el difusor."""
+        temas = frozenset(temas)
+        for tema in self.temas - temas:
+            await self.channel_layer.group_discard(grupo_tema(tema), self.channel_name)
+        for tema in temas - self.temas:
+            await self.channel_layer.group_add(grupo_tema(tema), self.channel_name)
+        self.temas = temas
+
+    async def enviar_resync(self):
+        """Envía la instantánea completa de sus temas con la última secuencia conocida."""
+        # Se toma antes de armar la instantánea: los deltas anteriores a ella
+        # que todavía estén en cola los descarta el cliente
+        secuencia = DashboardConsumer.ultima_secuencia
+        snapshot = await database_sync_to_async(construir_snapshot_dashboard)(None, self.temas)
+        await self.send(
+            text_data=json.dumps(mensaje_completo(snapshot, secuencia), cls=DjangoJSONEncoder)
+        )
+
     async def recibir_actualizacion(self, event):
         """Recibir actualización del grupo y enviarla al WebSocket."""
-        await self.send(text_data=json.dumps(event["data"]))
-
+        if event.get("secuencia") is not None:
+            DashboardConsumer.ultima_secuencia = event["secuencia"]
+        if "texto" not in event:
+            await self.send(text_data=json.dumps(event["data"]))
+        elif self.temas.issuperset(event.get("secciones", SECCIONES)):
+            await self.send(text_data=event["texto"])
+        else:
+            # Se reenvía aunque quede vacío para no cortar la secuencia del cliente
+            mensaje = filtrar_mensaje(json.loads(event["texto"]), self.temas)
+            await self.send(text_data=json.dumps(mensaje))
@@ -1,38 +1,69 @@
 """
-Comando para enviar actualizaciones del dashboard cada 10 segundos.
+Comando para enviar actualizaciones del dashboard cuando cambian los datos.
 Este comando debe ejecutarse como un servicio systemd separado.
+
+Espera los avisos de ``dashboard.signals`` (operaciones reales y
+configuración del bot) en el grupo ``dashboard_cambios`` y recalcula solo las
+secciones afectadas que tienen clientes suscritos. Sin avisos solo revisa el
+dashboard cada ``--intervalo`` segundos, por si algo cambió sin pasar por
+el ORM.
 """
-import time
+import asyncio
 
-from django.core.management.base import BaseCommand
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
 
-from dashboard.services import enviar_actualizacion_dashboard
+from dashboard.services import (
+    GRUPO_CAMBIOS,
+    SECCIONES,
+    difusor_dashboard,
+    enviar_actualizacion_dashboard,
+)
 
 
 class Command(BaseCommand):
-    help = "Envía actualizaciones del dashboard cada 10 segundos a través de WebSocket."
+    help = (
+        "Envía actualizaciones del dashboard a través de WebSocket cuando cambian "
+        "operaciones o el estado del bot, solo si hay clientes conectados."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--intervalo",
             type=int,
-            default=10,
-            help="Intervalo en segundos entre actualizaciones (default: 10)",
+            default=60,
+            help="Segundos sin avisos de cambios antes de revisar igual el dashboard; 0 desactiva (default: 60)",
+        )
+        parser.add_argument(
+            "--agrupar",
+            type=int,
+            default=250,
+            help="Milisegundos para juntar los avisos de una misma ráfaga antes de publicar (default: 250)",
+        )
+        parser.add_argument(
+            "--completa-cada",
+            type=int,
+            default=30,
+            help="Enviar la instantánea completa cada N mensajes; el resto son deltas (default: 30)",
         )
 
     def handle(self, *args, **options):
-        intervalo = options["intervalo"]
-        
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            raise CommandError("No hay una capa de canales configurada (CHANNEL_LAYERS).")
+        difusor_dashboard.completa_cada = max(1, options["completa_cada"])
+
         self.stdout.write(
-            self.style.SUCCESS(
-                f"Iniciando envío de actualizaciones del dashboard cada {intervalo} segundos..."
-            )
+            self.style.SUCCESS("Esperando cambios para actualizar el dashboard...")
         )
-        
+
         try:
-            while True:
-                enviar_actualizacion_dashboard()
-                time.sleep(intervalo)
+            asyncio.run(
+                self._escuchar(
+                    channel_layer, options["intervalo"] or None, options["agrupar"] / 1000
+                )
+            )
         except KeyboardInterrupt:
             self.stdout.write(self.style.WARNING("Deteniendo envío de actualizaciones..."))
         except Exception as e:
@@ -41,3 +72,25 @@ class Command(BaseCommand):
             )
             raise
 
+    async def _escuchar(self, channel_layer, intervalo, agrupar: float) -> None:
+        canal = await channel_layer.new_channel()
+        bucle = asyncio.get_running_loop()
+        # Estado inicial para los clientes que ya estén conectados
+        await database_sync_to_async(enviar_actualizacion_dashboard)()
+        while True:
+            # Se renueva en cada vuelta para que la membresía no expire
+            await channel_layer.group_add(GRUPO_CAMBIOS, canal)
+            try:
+                evento = await asyncio.wait_for(channel_layer.receive(canal), timeout=intervalo)
+            except asyncio.TimeoutError:
+                secciones = set(SECCIONES)
+            else:
+                secciones = set(evento.get("secciones") or SECCIONES)
+                limite = bucle.time() + agrupar
+                while (restante := limite - bucle.time()) > 0:
+                    try:
+                        evento = await asyncio.wait_for(channel_layer.receive(canal), timeout=restante)
+                    except asyncio.TimeoutError:
+                        break
+                    secciones.update(evento.get("secciones") or SECCIONES)
+            await database_sync_to_async(enviar_actualizacion_dashboard)(secciones)
@@ -1,64 +1,142 @@
 """
 Servicio para enviar actualizaciones del dashboard en tiempo real.
+
+``DifusorDashboard`` conserva la última instantánea enviada y, en cada
+ciclo, publica solo los campos que cambiaron y las operaciones nuevas o
+modificadas, con un número de secuencia. Los clientes reciben una
+instantánea completa al conectarse (ver ``DashboardConsumer``) o cuando
+detectan un salto en la secuencia y piden ``resync``.
+
+Cada consumer se une además a un grupo por tema (sección) al que está
+suscrito; ``enviar_actualizacion_dashboard`` solo calcula las secciones con
+suscriptores y no consulta nada si no hay ninguno. Los cambios en
+operaciones reales y en la configuración del bot se avisan al grupo
+``dashboard_cambios`` (ver ``dashboard.signals``).
 """
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 
+from core.monitoreo import medir_consultas
 from core.services import GestorBotCore
 from historial.models import Operacion
 
+logger = logging.getLogger(__name__)
+
+GRUPO_DASHBOARD = "dashboard_updates"
+GRUPO_CAMBIOS = "dashboard_cambios"
+SECCIONES = ("estado", "winrate", "estadisticas", "operaciones", "temporizador")
+SECCIONES_CAMPOS = ("estado", "winrate", "estadisticas", "temporizador")
+LIMITE_OPERACIONES = 20
+
+
+def grupo_tema(tema: str) -> str:
+    """Grupo de la capa de canales con los consumers suscritos a ``tema``."""
+    return f"{GRUPO_DASHBOARD}.{tema}"
 
-def enviar_actualizacion_dashboard():
+
+def construir_snapshot_dashboard(
+    cache_operaciones: Optional[Dict[int, Tuple[object, Dict]]] = None,
+    secciones: Optional[Iterable[str]] = None,
+) -> Dict:
     """
-    Envía una actualización completa del dashboard a través de WebSocket.
-    Se ejecuta cada 10 segundos o cuando hay eventos importantes.
+    Arma la instantánea del dashboard.
+
+    Args:
+        cache_operaciones: Operaciones ya serializadas por id, con su campo
+            ``actualizado``; solo se vuelven a serializar las que cambiaron.
+            Se actualiza en el lugar.
+        secciones: Secciones a calcular (default: todas).
+
+    Returns:
+        Las secciones pedidas entre ``estado``, ``winrate``,
+        ``estadisticas``, ``operaciones`` y ``temporizador``.
     """
-    channel_layer = get_channel_layer()
-    if not channel_layer:
-        return
-    
-    try:
+    from historial.serializers import OperacionSerializer
+
+    secciones = set(SECCIONES if secciones is None else secciones)
+    snapshot: Dict = {}
+    operaciones = Operacion.objetos.reales()
+
+    if secciones & {"estado", "temporizador"}:
         gestor = GestorBotCore()
         estado = gestor.obtener_estado()
-        
-        # Obtener estadísticas
-        operaciones = Operacion.objetos.reales()
-        total_operaciones = operaciones.count()
-        ganadas = operaciones.ganadas().count()
+
+    if secciones & {"winrate", "estadisticas"}:
+        # Un solo recorrido de la tabla para todos los conteos
+        ganada = Q(resultado=Operacion.Resultado.GANADA)
+        perdida = Q(resultado=Operacion.Resultado.PERDIDA)
+        call = Q(direccion=Operacion.Direccion.CALL)
+        put = Q(direccion=Operacion.Direccion.PUT)
+        conteos = operaciones.aggregate(
+            total_operaciones=Count("pk"),
+            ganadas=Count("pk", filter=ganada),
+            ganadas_call=Count("pk", filter=call & ganada),
+            ganadas_put=Count("pk", filter=put & ganada),
+            perdidas_call=Count("pk", filter=call & perdida),
+            perdidas_put=Count("pk", filter=put & perdida),
+        )
+        total_operaciones = conteos["total_operaciones"]
+        ganadas = conteos["ganadas"]
         winrate = (ganadas / total_operaciones * 100) if total_operaciones else 0
-        
-        # Estadísticas CALL/PUT
-        ganadas_call = operaciones.filter(
-            direccion=Operacion.Direccion.CALL, 
-            resultado=Operacion.Resultado.GANADA
-        ).count()
-        ganadas_put = operaciones.filter(
-            direccion=Operacion.Direccion.PUT, 
-            resultado=Operacion.Resultado.GANADA
-        ).count()
-        perdidas_call = operaciones.filter(
-            direccion=Operacion.Direccion.CALL, 
-            resultado=Operacion.Resultado.PERDIDA
-        ).count()
-        perdidas_put = operaciones.filter(
-            direccion=Operacion.Direccion.PUT, 
-            resultado=Operacion.Resultado.PERDIDA
-        ).count()
-        
-        # Últimas operaciones
-        ultimas_operaciones = list(operaciones[:20])
-        from historial.serializers import OperacionSerializer
-        operaciones_data = OperacionSerializer(ultimas_operaciones, many=True).data
-        
-        # Temporizador
+
+    if "estado" in secciones:
+        snapshot["estado"] = {
+            "estado": estado.estado,
+            "balance_actual": str(estado.balance_actual),
+            "meta_actual": str(estado.meta_actual),
+            "stop_loss_actual": str(estado.stop_loss_actual),
+            "perdida_acumulada": str(estado.perdida_acumulada),
+            "ganancia_acumulada": str(estado.ganancia_acumulada),
+            "activo_seleccionado": estado.activo_seleccionado,
+            "en_operacion": estado.en_operacion,
+        }
+
+    if "winrate" in secciones:
+        snapshot["winrate"] = {
+            "total_operaciones": total_operaciones,
+            "ganadas": ganadas,
+            "winrate": round(winrate, 2),
+        }
+
+    if "estadisticas" in secciones:
+        snapshot["estadisticas"] = {
+            "ganadas_call": conteos["ganadas_call"],
+            "ganadas_put": conteos["ganadas_put"],
+            "perdidas_call": conteos["perdidas_call"],
+            "perdidas_put": conteos["perdidas_put"],
+        }
+
+    if "operaciones" in secciones:
+        # Últimas operaciones (se reutiliza la serialización de las que no cambiaron)
+        cache = cache_operaciones if cache_operaciones is not None else {}
+        operaciones_data = []
+        for operacion in operaciones[:LIMITE_OPERACIONES]:
+            guardada = cache.get(operacion.pk)
+            if guardada is None or guardada[0] != operacion.actualizado:
+                guardada = (operacion.actualizado, _a_json(OperacionSerializer(operacion).data))
+                cache[operacion.pk] = guardada
+            operaciones_data.append(guardada[1])
+        vigentes = {operacion["id"] for operacion in operaciones_data}
+        for pk in [pk for pk in cache if pk not in vigentes]:
+            del cache[pk]
+        snapshot["operaciones"] = operaciones_data
+
+    if "temporizador" in secciones:
         temporizador_data = {
             "pausado": False,
             "tiempo_detencion": None,
             "reactivacion": None,
             "tiempo_restante": None,
         }
-        
+
         if estado.estado == gestor.configuracion.Estado.PAUSADO and estado.pausado_desde:
             ahora = timezone.now()
             tiempo_detencion = ahora - estado.pausado_desde
@@ -67,7 +145,7 @@ def enviar_actualizacion_dashboard():
                 restante = estado.pausa_finaliza - ahora
                 if restante.total_seconds() < 0:
                     restante = None
-            
+
             temporizador_data = {
                 "pausado": True,
                 "tiempo_detencion": tiempo_detencion.total_seconds(),
@@ -75,47 +153,232 @@ def enviar_actualizacion_dashboard():
                 "tiempo_restante": restante.total_seconds() if restante else None,
                 "mejor_horario": estado.mejor_horario.isoformat() if estado.mejor_horario else None,
             }
-        
-        # Preparar datos de actualización
-        datos = {
-            "tipo": "actualizacion_completa",
+        snapshot["temporizador"] = temporizador_data
+
+    return snapshot
+
+
+def _a_json(datos) -> Dict:
+    # Decimal y fechas a texto, igual que los verá el cliente
+    return json.loads(json.dumps(datos, cls=DjangoJSONEncoder))
+
+
+def calcular_delta_dashboard(anterior: Dict, actual: Dict) -> Dict:
+    """
+    Cambios entre dos instantáneas, en las secciones presentes en ``actual``.
+
+    Returns:
+        Por sección, solo los campos con valor distinto; en ``operaciones``,
+        las nuevas o modificadas, y en ``operaciones_ids`` el orden vigente si
+        cambió. Vacío si no hubo cambios.
+    """
+    cambios: Dict = {}
+    for seccion in SECCIONES_CAMPOS:
+        if seccion not in actual:
+            continue
+        previos = anterior.get(seccion, {})
+        distintos = {
+            campo: valor
+            for campo, valor in actual[seccion].items()
+            if campo not in previos or previos[campo] != valor
+        }
+        distintos.update({campo: None for campo in previos if campo not in actual[seccion]})
+        if distintos:
+            cambios[seccion] = distintos
+
+    if "operaciones" in actual:
+        previas = {operacion["id"]: operacion for operacion in anterior.get("operaciones", [])}
+        modificadas = [
+            operacion
+            for operacion in actual["operaciones"]
+            if previas.get(operacion["id"]) != operacion
+        ]
+        if modificadas:
+            cambios["operaciones"] = modificadas
+        ids = [operacion["id"] for operacion in actual["operaciones"]]
+        if ids != list(previas):
+            cambios["operaciones_ids"] = ids
+    return cambios
+
+
+def mensaje_completo(snapshot: Dict, secuencia: Optional[int]) -> Dict:
+    return {
+        "tipo": "actualizacion_completa",
+        "secuencia": secuencia,
+        "timestamp": timezone.now().isoformat(),
+        **snapshot,
+    }
+
+
+def secciones_mensaje(mensaje: Dict) -> List[str]:
+    """Secciones que trae un mensaje completo o delta."""
+    datos = mensaje.get("cambios", mensaje)
+    return [seccion for seccion in SECCIONES if seccion in datos]
+
+
+def filtrar_mensaje(mensaje: Dict, temas: Iterable[str]) -> Dict:
+    """Copia de ``mensaje`` con solo las secciones de ``temas``."""
+    temas = set(temas)
+    excluidas = {seccion for seccion in SECCIONES if seccion not in temas}
+    if "operaciones" in excluidas:
+        excluidas.add("operaciones_ids")
+    if "cambios" in mensaje:
+        cambios = {clave: valor for clave, valor in mensaje["cambios"].items() if clave not in excluidas}
+        return {**mensaje, "cambios": cambios}
+    return {clave: valor for clave, valor in mensaje.items() if clave not in excluidas}
+
+
+class DifusorDashboard:
+    """
+    Publica en ``dashboard_updates`` deltas numerados frente a la última
+    instantánea enviada.
+
+    Cada ``completa_cada`` publicaciones se envía la instantánea completa
+    (de las secciones suscritas) para acotar cualquier divergencia de los
+    clientes.
+    """
+
+    def __init__(self, completa_cada: int = 30) -> None:
+        self.completa_cada = max(1, completa_cada)
+        self.secuencia = 0
+        self._ultimo: Optional[Dict] = None
+        self._cache_operaciones: Dict[int, Tuple[object, Dict]] = {}
+        self._desde_completa = 0
+
+    def preparar(
+        self,
+        secciones: Optional[Iterable[str]] = None,
+        suscritas: Optional[Iterable[str]] = None,
+    ) -> Optional[Dict]:
+        """
+        Calcula el siguiente mensaje a publicar.
+
+        Args:
+            secciones: Secciones que pudieron cambiar (default: todas).
+            suscritas: Secciones con algún cliente (default: todas). Solo se
+                calculan las suscritas; las instantáneas completas las
+                incluyen todas.
+
+        Returns:
+            ``actualizacion_completa`` o ``actualizacion_delta`` con su
+            secuencia, o None si nada cambió o no hay nada que calcular.
+        """
+        suscritas = set(SECCIONES if suscritas is None else suscritas)
+        if not suscritas:
+            return None
+        if self._ultimo is None or self._desde_completa + 1 >= self.completa_cada:
+            snapshot = construir_snapshot_dashboard(self._cache_operaciones, suscritas)
+            self.secuencia += 1
+            self._desde_completa = 0
+            self._ultimo = snapshot
+            return mensaje_completo(snapshot, self.secuencia)
+
+        a_calcular = suscritas if secciones is None else suscritas & set(secciones)
+        if not a_calcular:
+            return None
+        snapshot = construir_snapshot_dashboard(self._cache_operaciones, a_calcular)
+        cambios = calcular_delta_dashboard(self._ultimo, snapshot)
+        # Las secciones sin suscriptores conservan su último valor enviado
+        self._ultimo.update(snapshot)
+        if not cambios:
+            return None
+        self.secuencia += 1
+        self._desde_completa += 1
+        return {
+            "tipo": "actualizacion_delta",
+            "secuencia": self.secuencia,
             "timestamp": timezone.now().isoformat(),
-            "estado": {
-                "estado": estado.estado,
-                "balance_actual": str(estado.balance_actual),
-                "meta_actual": str(estado.meta_actual),
-                "stop_loss_actual": str(estado.stop_loss_actual),
-                "perdida_acumulada": str(estado.perdida_acumulada),
-                "ganancia_acumulada": str(estado.ganancia_acumulada),
-                "activo_seleccionado": estado.activo_seleccionado,
-                "en_operacion": estado.en_operacion,
-            },
-            "winrate": {
-                "total_operaciones": total_operaciones,
-                "ganadas": ganadas,
-                "winrate": round(winrate, 2),
-            },
-            "estadisticas": {
-                "ganadas_call": ganadas_call,
-                "ganadas_put": ganadas_put,
-                "perdidas_call": perdidas_call,
-                "perdidas_put": perdidas_put,
-            },
-            "operaciones": operaciones_data,
-            "temporizador": temporizador_data,
+            "cambios": cambios,
         }
-        
-        # Enviar al grupo del dashboard
+
+    def publicar(
+        self,
+        secciones: Optional[Iterable[str]] = None,
+        suscritas: Optional[Iterable[str]] = None,
+    ) -> Optional[Dict]:
+        """Publica el siguiente mensaje, si lo hay, y lo devuelve."""
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return None
+        mensaje = self.preparar(secciones, suscritas)
+        if mensaje is None:
+            return None
+        # Se serializa una vez aquí y no en cada consumer
         async_to_sync(channel_layer.group_send)(
-            "dashboard_updates",
+            GRUPO_DASHBOARD,
             {
                 "type": "recibir_actualizacion",
-                "data": datos,
-            }
+                "secuencia": mensaje["secuencia"],
+                "secciones": secciones_mensaje(mensaje),
+                "texto": json.dumps(mensaje, cls=DjangoJSONEncoder),
+            },
         )
-        
+        return mensaje
+
+
+difusor_dashboard = DifusorDashboard()
+
+
+def suscriptores_dashboard(channel_layer=None) -> Optional[Dict[str, int]]:
+    """
+    Consumers suscritos a cada sección, en todos los procesos.
+
+    Returns:
+        Cantidad por sección, o None si la capa de canales no permite
+        contarlos (en ese caso se asume que todas tienen suscriptores).
+    """
+    channel_layer = channel_layer or get_channel_layer()
+    if channel_layer is None:
+        return {seccion: 0 for seccion in SECCIONES}
+    grupos = {seccion: grupo_tema(seccion) for seccion in SECCIONES}
+    if hasattr(channel_layer, "contar_miembros"):
+        conteos = channel_layer.contar_miembros(grupos.values())
+        return {seccion: conteos.get(grupo, 0) for seccion, grupo in grupos.items()}
+    if isinstance(getattr(channel_layer, "groups", None), dict):
+        # InMemoryChannelLayer: solo ve los consumers de este proceso
+        return {
+            seccion: len(channel_layer.groups.get(grupo, {})) for seccion, grupo in grupos.items()
+        }
+    return None
+
+
+def notificar_cambio_dashboard(secciones: Iterable[str]) -> None:
+    """
+    Avisa a ``enviar_actualizaciones_dashboard`` que ``secciones`` pudieron
+    cambiar. Se envía al confirmar la transacción en curso.
+    """
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    evento = {"type": "cambio_dashboard", "secciones": list(secciones)}
+
+    def enviar():
+        try:
+            async_to_sync(channel_layer.group_send)(GRUPO_CAMBIOS, evento)
+        except Exception as e:
+            logger.warning(f"No se pudo avisar el cambio del dashboard: {e}")
+
+    transaction.on_commit(enviar)
+
+
+@medir_consultas("enviar_actualizacion_dashboard")
+def enviar_actualizacion_dashboard(secciones: Optional[Iterable[str]] = None):
+    """
+    Envía los cambios del dashboard a través de WebSocket.
+    Solo calcula las secciones con clientes suscritos.
+
+    Args:
+        secciones: Secciones que pudieron cambiar (default: todas).
+
+    Returns:
+        El mensaje publicado, o None si no hubo cambios o suscriptores.
+    """
+    try:
+        conteos = suscriptores_dashboard()
+        suscritas = None if conteos is None else [s for s, cantidad in conteos.items() if cantidad]
+        if suscritas == []:
+            return None
+        return difusor_dashboard.publicar(secciones, suscritas)
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Error al enviar actualización del dashboard: {e}", exc_info=True)
-
+        return None
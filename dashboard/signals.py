@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import ConfiguracionBot
+from historial.models import Operacion
+
+from .services import notificar_cambio_dashboard
+
+SECCIONES_OPERACION = ("winrate", "estadisticas", "operaciones")
+SECCIONES_CONFIGURACION = ("estado", "temporizador")
+
+
+@receiver(post_save, sender=Operacion)
+@receiver(post_delete, sender=Operacion)
+def operacion_cambiada(sender, instance, raw=False, **kwargs):
+    # El dashboard solo muestra operaciones reales
+    if raw or instance.es_simulada:
+        return
+    notificar_cambio_dashboard(SECCIONES_OPERACION)
+
+
+@receiver(post_save, sender=ConfiguracionBot)
+def configuracion_cambiada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    notificar_cambio_dashboard(SECCIONES_CONFIGURACION)
@@ -1,3 +1,251 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.monitoreo import registro_consultas
+from core.monitoreo.consultas import PRESUPUESTOS_POR_DEFECTO, presupuesto_de
+from core.services import GestorBotCore
+from dashboard.services import (
+    SECCIONES,
+    DifusorDashboard,
+    calcular_delta_dashboard,
+    enviar_actualizacion_dashboard,
+    filtrar_mensaje,
+    grupo_tema,
+    suscriptores_dashboard,
+)
+from dashboard.signals import SECCIONES_OPERACION
+from historial.models import Operacion, Tick
+
+CAPA_MEMORIA = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+# Vistas de lectura de la API y los parámetros con que las usa el panel
+VISTAS_API = {
+    "dashboard-winrate": {},
+    "dashboard-estado": {},
+    "dashboard-historicos": {},
+    "dashboard-balance": {},
+    "dashboard-estadisticas-call-put": {},
+    "dashboard-temporizador": {},
+    "dashboard-ticks": {"activo": "R_10"},
+    "dashboard-latencias": {},
+    "dashboard-consultas": {},
+    "trading-estado": {},
+    "simulacion-resultados": {},
+    "historial-operaciones": {},
+    "historial-exportar": {},
+}
+
+
+def crear_historial(operaciones: int = 60, ticks: int = 200) -> None:
+    """Operaciones cerradas y ticks de varios activos, para que las vistas tengan filas."""
+    ahora = timezone.now()
+    GestorBotCore().inicializar_balance(Decimal("1000.00"))
+    Operacion.objects.bulk_create(
+        Operacion(
+            activo=f"R_{10 * (1 + indice % 4)}",
+            direccion=Operacion.Direccion.CALL if indice % 2 else Operacion.Direccion.PUT,
+            precio_entrada=Decimal("100.00000"),
+            precio_cierre=Decimal("100.10000"),
+            monto_invertido=Decimal("1.00"),
+            resultado=Operacion.Resultado.GANADA if indice % 3 else Operacion.Resultado.PERDIDA,
+            numero_contrato=str(1000 + indice),
+            hora_inicio=ahora - timedelta(minutes=indice),
+            hora_fin=ahora - timedelta(minutes=indice) + timedelta(seconds=10),
+            beneficio=Decimal("0.95") if indice % 3 else Decimal("-1.00"),
+        )
+        for indice in range(operaciones)
+    )
+    Tick.objects.bulk_create(
+        Tick(
+            activo=f"R_{10 * (1 + indice % 4)}",
+            epoch=ahora - timedelta(seconds=2 * indice),
+            precio=Decimal("100.00000") + Decimal(indice % 7) / 100,
+            pip_size=5,
+        )
+        for indice in range(ticks)
+    )
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, CHANNEL_LAYERS=CAPA_MEMORIA)
+class PresupuestoActualizacionDashboardTests(TestCase):
+    def setUp(self):
+        crear_historial()
+        capa = get_channel_layer()
+        for seccion in SECCIONES:
+            async_to_sync(capa.group_add)(grupo_tema(seccion), "cliente.prueba")
+
+    def test_actualizacion_completa_dentro_del_presupuesto(self):
+        mensaje = enviar_actualizacion_dashboard()
+
+        self.assertIsNotNone(mensaje)
+        medicion = registro_consultas.rutas["enviar_actualizacion_dashboard"].ultima
+        self.assertLessEqual(
+            medicion.consultas, PRESUPUESTOS_POR_DEFECTO["enviar_actualizacion_dashboard"]
+        )
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, CHANNEL_LAYERS=CAPA_MEMORIA)
+class PresupuestoVistasApiTests(TestCase):
+    def setUp(self):
+        crear_historial()
+
+    def test_vistas_dentro_del_presupuesto(self):
+        for nombre, parametros in VISTAS_API.items():
+            with self.subTest(vista=nombre):
+                respuesta = self.client.get(reverse(nombre), parametros)
+
+                self.assertEqual(respuesta.status_code, 200)
+                medicion = registro_consultas.rutas[f"vista:{nombre}"].ultima
+                self.assertLessEqual(medicion.consultas, presupuesto_de(f"vista:{nombre}"))
+
+
+def crear_operacion(numero: int, **kwargs) -> Operacion:
+    datos = {
+        "activo": "R_10",
+        "direccion": Operacion.Direccion.CALL,
+        "precio_entrada": Decimal("100.00000"),
+        "monto_invertido": Decimal("1.00"),
+        "resultado": Operacion.Resultado.GANADA,
+        "numero_contrato": str(numero),
+        "hora_inicio": timezone.now() + timedelta(seconds=numero),
+        "beneficio": Decimal("0.95"),
+        **kwargs,
+    }
+    return Operacion.objects.create(**datos)
+
+
+class DeltaDashboardTests(SimpleTestCase):
+    anterior = {
+        "winrate": {"total_operaciones": 2, "ganadas": 1, "winrate": 50.0},
+        "operaciones": [{"id": 2, "resultado": "win"}, {"id": 1, "resultado": "loss"}],
+    }
+
+    def test_sin_cambios(self):
+        self.assertEqual(calcular_delta_dashboard(self.anterior, dict(self.anterior)), {})
+
+    def test_solo_los_campos_que_cambiaron(self):
+        actual = {
+            **self.anterior,
+            "winrate": {"total_operaciones": 3, "ganadas": 1, "winrate": 33.33},
+        }
+
+        self.assertEqual(
+            calcular_delta_dashboard(self.anterior, actual),
+            {"winrate": {"total_operaciones": 3, "winrate": 33.33}},
+        )
+
+    def test_operacion_nueva_envia_el_orden(self):
+        actual = {
+            "operaciones": [{"id": 3, "resultado": "pending"}, *self.anterior["operaciones"]],
+        }
+
+        self.assertEqual(
+            calcular_delta_dashboard(self.anterior, actual),
+            {"operaciones": [{"id": 3, "resultado": "pending"}], "operaciones_ids": [3, 2, 1]},
+        )
+
+    def test_operaciones_reordenadas(self):
+        actual = {"operaciones": list(reversed(self.anterior["operaciones"]))}
+
+        self.assertEqual(
+            calcular_delta_dashboard(self.anterior, actual), {"operaciones_ids": [1, 2]}
+        )
+
+    def test_filtrar_quita_las_secciones_no_suscritas(self):
+        mensaje = {
+            "tipo": "actualizacion_delta",
+            "secuencia": 4,
+            "cambios": {
+                "winrate": {"winrate": 50.0},
+                "operaciones": [{"id": 3}],
+                "operaciones_ids": [3],
+            },
+        }
+
+        self.assertEqual(
+            filtrar_mensaje(mensaje, ["winrate"]),
+            {"tipo": "actualizacion_delta", "secuencia": 4, "cambios": {"winrate": {"winrate": 50.0}}},
+        )
+
+
+class DifusorDashboardTests(TestCase):
+    def setUp(self):
+        GestorBotCore().inicializar_balance(Decimal("1000.00"))
+        crear_operacion(1)
+
+    def test_secuencia_solo_avanza_al_publicar(self):
+        difusor = DifusorDashboard()
+
+        completo = difusor.preparar()
+        self.assertEqual((completo["tipo"], completo["secuencia"]), ("actualizacion_completa", 1))
+
+        self.assertIsNone(difusor.preparar())
+        self.assertEqual(difusor.secuencia, 1)
+
+        operacion = crear_operacion(2, resultado=Operacion.Resultado.PENDIENTE)
+        delta = difusor.preparar()
+        self.assertEqual((delta["tipo"], delta["secuencia"]), ("actualizacion_delta", 2))
+        self.assertEqual([op["id"] for op in delta["cambios"]["operaciones"]], [operacion.pk])
+        self.assertEqual(delta["cambios"]["operaciones_ids"][0], operacion.pk)
+        self.assertNotIn("estado", delta["cambios"])
+
+    def test_completa_cada_n_mensajes(self):
+        difusor = DifusorDashboard(completa_cada=3)
+        tipos = []
+        for numero in range(2, 8):
+            tipos.append(difusor.preparar()["tipo"])
+            crear_operacion(numero)
+
+        self.assertEqual(
+            tipos,
+            ["actualizacion_completa", "actualizacion_delta", "actualizacion_delta"] * 2,
+        )
+        self.assertEqual(difusor.secuencia, 6)
+
+
+@override_settings(CHANNEL_LAYERS=CAPA_MEMORIA)
+class SuscriptoresDashboardTests(TestCase):
+    def setUp(self):
+        # La capa en memoria se comparte entre tests
+        async_to_sync(get_channel_layer().flush)()
+
+    def test_sin_suscriptores_no_consulta_la_base(self):
+        crear_historial(operaciones=5, ticks=0)
+
+        self.assertEqual(suscriptores_dashboard(), {seccion: 0 for seccion in SECCIONES})
+        with self.assertNumQueries(0):
+            self.assertIsNone(enviar_actualizacion_dashboard())
+
+    def test_cuenta_por_tema(self):
+        capa = get_channel_layer()
+        async_to_sync(capa.group_add)(grupo_tema("winrate"), "cliente.uno")
+        async_to_sync(capa.group_add)(grupo_tema("winrate"), "cliente.dos")
+        async_to_sync(capa.group_add)(grupo_tema("estado"), "cliente.dos")
+
+        conteos = suscriptores_dashboard()
+
+        self.assertEqual(conteos["winrate"], 2)
+        self.assertEqual(conteos["estado"], 1)
+        self.assertEqual(conteos["operaciones"], 0)
+
+
+@mock.patch("dashboard.signals.notificar_cambio_dashboard")
+class SenalesDashboardTests(TestCase):
+    def test_operacion_real_avisa_el_cambio(self, notificar):
+        operacion = crear_operacion(1)
+        operacion.delete()
+
+        self.assertEqual(notificar.call_args_list, [mock.call(SECCIONES_OPERACION)] * 2)
+
+    def test_operacion_simulada_no_avisa(self, notificar):
+        operacion = crear_operacion(1, es_simulada=True)
+        operacion.delete()
+
+        notificar.assert_not_called()
@@ -2,9 +2,11 @@ from django.urls import path
 
 from .views import (
     BalanceView,
+    ConsumoConsultasView,
     EstadoBotView,
     EstadisticasCallPutView,
     HistoricosView,
+    LatenciasCicloView,
     TemporizadorView,
     TickAnaliticaView,
     WinrateView,
@@ -22,5 +24,7 @@ urlpatterns = [
     ),
     path("temporizador/", TemporizadorView.as_view(), name="dashboard-temporizador"),
     path("ticks/", TickAnaliticaView.as_view(), name="dashboard-ticks"),
+    path("latencias/", LatenciasCicloView.as_view(), name="dashboard-latencias"),
+    path("consultas/", ConsumoConsultasView.as_view(), name="dashboard-consultas"),
 ]
 
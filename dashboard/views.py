@@ -1,9 +1,12 @@
 from datetime import timedelta
 
+from django.db.models import Max, OuterRef, Subquery
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.models import ConsumoConsultas, LatenciaEtapa
+from core.monitoreo import registro_consultas
 from core.services import GestorBotCore
 from historial.models import Operacion, Tick
 from historial.serializers import OperacionSerializer
@@ -166,3 +169,61 @@ class TickAnaliticaView(APIView):
                 },
             }
         )
+
+
+class LatenciasCicloView(APIView):
+    def get(self, request):
+        registrado_en = LatenciaEtapa.objects.aggregate(
+            reciente=Max("registrado_en")
+        ).get("reciente")
+        if not registrado_en:
+            return Response({"registrado_en": None, "etapas": []})
+
+        etapas = (
+            LatenciaEtapa.objects.filter(registrado_en=registrado_en)
+            .order_by("etapa")
+            .values("etapa", "muestras", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+        )
+        return Response(
+            {
+                "registrado_en": registrado_en,
+                "etapas": list(etapas),
+            }
+        )
+
+
+class ConsumoConsultasView(APIView):
+    """
+    Consultas SQL por ruta: último volcado de cada ruta (todos los procesos)
+    y las estadísticas en vivo de este proceso (vistas REST).
+    """
+
+    def get(self, request):
+        reciente = (
+            ConsumoConsultas.objects.filter(ruta=OuterRef("ruta"))
+            .order_by("-registrado_en")
+            .values("registrado_en")[:1]
+        )
+        rutas = (
+            ConsumoConsultas.objects.filter(registrado_en=Subquery(reciente))
+            .order_by("ruta")
+            .values(
+                "ruta",
+                "ejecuciones",
+                "consultas_p50",
+                "consultas_p95",
+                "consultas_max",
+                "tiempo_p95_ms",
+                "presupuesto",
+                "excesos",
+                "ejecuciones_n_mas_uno",
+                "forma_n_mas_uno",
+                "registrado_en",
+            )
+        )
+        return Response(
+            {
+                "rutas": list(rutas),
+                "en_vivo": registro_consultas.resumen(),
+            }
+        )
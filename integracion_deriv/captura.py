@@ -0,0 +1,137 @@
+"""
+Captura de frames crudos del WebSocket de Deriv en un archivo binario
+append-only, para reproducirlos después con ``integracion_deriv.replay``.
+
+Formato: cabecera ``MAGICO`` y, por cada frame, un registro
+``<epoch float64><sentido uint8><largo uint32>`` seguido del texto del
+frame en UTF-8 tal como viajó por el socket. Cada registro se escribe con
+una sola llamada ``write`` sobre un descriptor abierto en modo append, de
+modo que varios clientes (o procesos) pueden grabar en el mismo archivo.
+"""
+import json
+import os
+import struct
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+MAGICO = b"DRVCAP1\n"
+CABECERA = struct.Struct("<dBI")
+
+ENVIADO = 0
+RECIBIDO = 1
+
+_GRABADORES: Dict[str, "GrabadorFrames"] = {}
+_LOCK_GRABADORES = threading.Lock()
+
+
+@dataclass
+class FrameCapturado:
+    instante: float  # Epoch en segundos
+    sentido: int  # ENVIADO o RECIBIDO
+    texto: str
+
+    @property
+    def mensaje(self) -> Dict[str, Any]:
+        return json.loads(self.texto)
+
+
+@dataclass
+class ResumenCaptura:
+    frames: int = 0
+    enviados: int = 0
+    recibidos: int = 0
+    bytes: int = 0
+    inicio: Optional[float] = None
+    fin: Optional[float] = None
+    por_tipo: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def duracion(self) -> float:
+        if self.inicio is None or self.fin is None:
+            return 0.0
+        return self.fin - self.inicio
+
+
+class GrabadorFrames:
+    """
+    Agrega frames a un archivo de captura.
+
+    Usar ``obtener_grabador`` para compartir un único grabador por archivo
+    entre todos los clientes del proceso.
+    """
+
+    def __init__(self, ruta: str) -> None:
+        self.ruta = ruta
+        self._fd = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._lock = threading.Lock()
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, MAGICO)
+
+    def registrar(self, sentido: int, texto: str, instante: Optional[float] = None) -> None:
+        datos = texto.encode("utf-8")
+        registro = CABECERA.pack(time.time() if instante is None else instante, sentido, len(datos))
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, registro + datos)
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def obtener_grabador(ruta: str) -> GrabadorFrames:
+    """Grabador compartido del proceso para ``ruta``."""
+    ruta = os.path.abspath(ruta)
+    with _LOCK_GRABADORES:
+        grabador = _GRABADORES.get(ruta)
+        if grabador is None or grabador._fd is None:
+            grabador = GrabadorFrames(ruta)
+            _GRABADORES[ruta] = grabador
+        return grabador
+
+
+def leer_captura(ruta: str) -> Iterator[FrameCapturado]:
+    """
+    Recorre los frames de una captura en orden de escritura.
+
+    Un registro incompleto al final (proceso interrumpido mientras grababa)
+    se ignora.
+    """
+    with open(ruta, "rb") as archivo:
+        if archivo.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"{ruta} no es una captura de frames de Deriv.")
+        while True:
+            cabecera = archivo.read(CABECERA.size)
+            if len(cabecera) < CABECERA.size:
+                return
+            instante, sentido, largo = CABECERA.unpack(cabecera)
+            datos = archivo.read(largo)
+            if len(datos) < largo:
+                return
+            yield FrameCapturado(instante=instante, sentido=sentido, texto=datos.decode("utf-8"))
+
+
+def resumir_captura(ruta: str) -> ResumenCaptura:
+    """Conteo de frames por sentido y por ``msg_type`` (o tipo de solicitud)."""
+    resumen = ResumenCaptura()
+    tipos: Counter = Counter()
+    for frame in leer_captura(ruta):
+        resumen.frames += 1
+        resumen.bytes += len(frame.texto)
+        if resumen.inicio is None:
+            resumen.inicio = frame.instante
+        resumen.fin = frame.instante
+        mensaje = frame.mensaje
+        if frame.sentido == ENVIADO:
+            resumen.enviados += 1
+            tipos[f"> {next(iter(mensaje), '?')}"] += 1
+        else:
+            resumen.recibidos += 1
+            tipos[f"< {mensaje.get('msg_type', '?')}"] += 1
+    resumen.por_tipo = dict(sorted(tipos.items()))
+    return resumen
@@ -1,15 +1,34 @@
 import asyncio
+import itertools
 import json
-from typing import Any, Dict, Optional
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional
 
 import websockets
 from django.conf import settings
 
+from core.monitoreo.metricas import (
+    CONTRATOS_LIQUIDADOS,
+    ORDENES,
+    RECONEXIONES_WS,
+    TIEMPO_LIQUIDACION,
+)
+
+from .captura import ENVIADO, RECIBIDO, GrabadorFrames, obtener_grabador
+
+URL_DERIV = "wss://ws.derivws.com/websockets/v3?app_id={app_id}"
+
 
 class DerivWebsocketClient:
     """
     Cliente WebSocket básico para interactuar con la API de Deriv.
     Gestiona reconexión automática y autorización.
+
+    ``url`` (o ``settings.DERIV_WS_URL``) permite apuntar a un servidor
+    local, por ejemplo el de replay. Con ``grabador`` (o
+    ``settings.DERIV_CAPTURA_FRAMES``) cada frame enviado y recibido se
+    agrega a un archivo de captura.
     """
 
     def __init__(
@@ -17,13 +36,19 @@ class DerivWebsocketClient:
         api_token: Optional[str] = None,
         app_id: Optional[str] = None,
         account_id: Optional[str] = None,
+        url: Optional[str] = None,
+        grabador: Optional[GrabadorFrames] = None,
     ) -> None:
         self.api_token = api_token or settings.DERIV_API_TOKEN
         self.app_id = app_id or settings.DERIV_APP_ID
         self.account_id = account_id or settings.DERIV_ACCOUNT_ID
         self._ws: Optional[websockets.WebSocketClientProtocol] = None
-        self._url = f"wss://ws.derivws.com/websockets/v3?app_id={self.app_id}"
+        self._url = url or settings.DERIV_WS_URL or URL_DERIV.format(app_id=self.app_id)
+        if grabador is None and settings.DERIV_CAPTURA_FRAMES:
+            grabador = obtener_grabador(settings.DERIV_CAPTURA_FRAMES)
+        self._grabador = grabador
         self._lock = asyncio.Lock()
+        self._req_ids = itertools.count(1)
 
     async def _ensure_connection(self) -> None:
         if self._ws and not self._ws.closed:
@@ -31,6 +56,9 @@ class DerivWebsocketClient:
         async with self._lock:
             if self._ws and not self._ws.closed:
                 return
+            if self._ws is not None:
+                # La conexión anterior se cerró sin pasar por cerrar()
+                RECONEXIONES_WS.inc()
             self._ws = await websockets.connect(self._url)
             await self._authorize()
 
@@ -44,13 +72,22 @@ class DerivWebsocketClient:
     async def _send(self, payload: Dict[str, Any]) -> None:
         await self._ensure_connection()
         assert self._ws is not None
-        await self._ws.send(json.dumps(payload))
+        texto = json.dumps(payload)
+        await self._ws.send(texto)
+        if self._grabador is not None:
+            self._grabador.registrar(ENVIADO, texto)
 
     async def _receive(self) -> Dict[str, Any]:
         assert self._ws is not None
         respuesta = await self._ws.recv()
+        if self._grabador is not None:
+            self._grabador.registrar(RECIBIDO, respuesta)
         return json.loads(respuesta)
 
+    def mensajes_pendientes(self) -> int:
+        """Mensajes recibidos que aún esperan en la cola de la conexión."""
+        return len(self._ws.messages) if self._ws is not None else 0
+
     async def ping(self) -> Dict[str, Any]:
         await self._send({"ping": 1})
         return await self._receive()
@@ -64,7 +101,16 @@ class DerivWebsocketClient:
 
     async def cerrar(self) -> None:
         if self._ws:
-            await self._ws.close()
+            # Con una suscripción activa la cola de recepción puede estar llena y
+            # el frame de cierre del servidor quedaría detrás: se descartan los
+            # mensajes pendientes mientras se completa el cierre.
+            cierre = asyncio.create_task(self._ws.close())
+            try:
+                while True:
+                    await self._ws.recv()
+            except websockets.ConnectionClosed:
+                pass
+            await cierre
             self._ws = None
 
     async def comprar_contrato(
@@ -123,6 +169,86 @@ class DerivWebsocketClient:
         await self._send(payload)
         return await self._receive()
 
+    async def solicitar_concurrente(
+        self, payloads: Iterable[Dict[str, Any]], max_concurrencia: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Envía varias solicitudes por la misma conexión autorizada sin esperar
+        a que responda cada una. Las respuestas se emparejan por ``req_id``.
+
+        Args:
+            payloads: Solicitudes a enviar (no deben incluir ``req_id``)
+            max_concurrencia: Máximo de solicitudes en vuelo simultáneamente
+
+        Returns:
+            Respuestas en el mismo orden que ``payloads``
+        """
+        await self._ensure_connection()
+        loop = asyncio.get_running_loop()
+        pendientes: Dict[int, asyncio.Future] = {}
+        semaforo = asyncio.Semaphore(max(1, max_concurrencia))
+        # Error del lector: las solicitudes que aún no salieron fallan con él
+        # en lugar de esperar una respuesta que nadie va a leer
+        errores: List[BaseException] = []
+
+        async def lector() -> None:
+            try:
+                while True:
+                    mensaje = await self._receive()
+                    futuro = pendientes.pop(mensaje.get("req_id"), None)
+                    if futuro and not futuro.done():
+                        futuro.set_result(mensaje)
+            except Exception as exc:
+                errores.append(exc)
+                for futuro in pendientes.values():
+                    if not futuro.done():
+                        futuro.set_exception(exc)
+                pendientes.clear()
+
+        async def solicitar(payload: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaforo:
+                if errores:
+                    raise errores[0]
+                req_id = next(self._req_ids)
+                futuro = loop.create_future()
+                pendientes[req_id] = futuro
+                await self._send({**payload, "req_id": req_id})
+                return await futuro
+
+        tarea_lector = asyncio.create_task(lector())
+        tareas = [asyncio.create_task(solicitar(payload)) for payload in payloads]
+        try:
+            return await asyncio.gather(*tareas)
+        finally:
+            # Si una solicitud falló, las demás no quedan corriendo sueltas
+            for tarea in (tarea_lector, *tareas):
+                tarea.cancel()
+            await asyncio.gather(tarea_lector, *tareas, return_exceptions=True)
+
+    async def obtener_ticks_history_lote(
+        self, symbols: Iterable[str], count: int = 10, max_concurrencia: int = 10
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene el historial de ticks de varios símbolos en paralelo.
+
+        Returns:
+            Diccionario {símbolo: respuesta de ticks_history}
+        """
+        symbols = list(symbols)
+        respuestas = await self.solicitar_concurrente(
+            (
+                {
+                    "ticks_history": symbol,
+                    "end": "latest",
+                    "count": count,
+                    "style": "ticks",
+                }
+                for symbol in symbols
+            ),
+            max_concurrencia=max_concurrencia,
+        )
+        return dict(zip(symbols, respuestas))
+
     async def obtener_balance(self) -> Dict[str, Any]:
         await self._send({"balance": 1})
         return await self._receive()
@@ -146,20 +272,39 @@ class DerivWebsocketClient:
         return await self._receive()
 
 
-def operar_contrato_sync(**kwargs) -> Dict[str, Any]:
+def operar_contrato_sync(
+    medir_etapa: Optional[Callable[[str], ContextManager]] = None, **kwargs
+) -> Dict[str, Any]:
     """
     Helper sincrónico para ejecutar la compra y esperar resultado
     desde un contexto síncrono (por ejemplo, dentro de una tarea Celery).
+
+    ``medir_etapa`` permite cronometrar por separado el envío de la orden
+    ("envio_orden") y la espera de liquidación ("liquidacion").
     """
+    medir = medir_etapa or (lambda etapa: nullcontext())
 
     async def _run():
         client = DerivWebsocketClient()
         try:
-            compra = await client.comprar_contrato(**kwargs)
+            with medir("envio_orden"):
+                compra = await client.comprar_contrato(**kwargs)
             contract_id = compra.get("buy", {}).get("contract_id")
+            tipo = kwargs.get("contract_type", "")
             if not contract_id:
+                ORDENES.inc(tipo=tipo, estado="rechazada")
                 return compra
-            return await client.esperar_resultado(str(contract_id))
+            ORDENES.inc(tipo=tipo, estado="aceptada")
+            inicio = time.perf_counter()
+            resultado = "timeout"
+            try:
+                with medir("liquidacion"):
+                    detalle = await client.esperar_resultado(str(contract_id))
+                resultado = detalle.get("proposal_open_contract", {}).get("status", "")
+                return detalle
+            finally:
+                TIEMPO_LIQUIDACION.observar(time.perf_counter() - inicio)
+                CONTRATOS_LIQUIDADOS.inc(resultado=resultado)
         finally:
             await client.cerrar()
 
@@ -178,6 +323,26 @@ def obtener_ticks_history_sync(symbol: str, count: int = 10) -> Dict[str, Any]:
     return asyncio.run(_run())
 
 
+def obtener_ticks_history_lote_sync(
+    symbols: Iterable[str], count: int = 10, max_concurrencia: int = 10
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Helper sincrónico que obtiene el historial de varios símbolos con una
+    única conexión autorizada.
+    """
+
+    async def _run():
+        client = DerivWebsocketClient()
+        try:
+            return await client.obtener_ticks_history_lote(
+                symbols, count=count, max_concurrencia=max_concurrencia
+            )
+        finally:
+            await client.cerrar()
+
+    return asyncio.run(_run())
+
+
 def obtener_balance_sync() -> Dict[str, Any]:
     async def _run():
         client = DerivWebsocketClient()
@@ -3,6 +3,10 @@ import asyncio
 from django.core.management.base import BaseCommand, CommandError
 
 from core.models import ActivoPermitido
+from core.monitoreo.memoria import DIRECTORIO_POR_DEFECTO as DIRECTORIO_MEMORIA, MonitorMemoria
+from core.monitoreo.metricas import iniciar_servidor_metricas
+from core.monitoreo.perfilado import DIRECTORIO_POR_DEFECTO, DirectorioRotativo, MuestreadorPilas
+from integracion_deriv.captura import obtener_grabador
 from integracion_deriv.services import TickStreamRecorder
 
 
@@ -35,6 +39,83 @@ class Command(BaseCommand):
             action="store_true",
             help="Si se indica, reinicia automáticamente la recolección al terminar (ideal para ejecución continua).",
         )
+        parser.add_argument(
+            "--url",
+            default="",
+            help="URL del WebSocket (p. ej. ws://127.0.0.1:8765 para un servidor de replay). Por defecto DERIV_WS_URL o la API de Deriv.",
+        )
+        parser.add_argument(
+            "--grabar",
+            default="",
+            help="Archivo de captura donde agregar los frames crudos recibidos y enviados.",
+        )
+        parser.add_argument(
+            "--puerto-metricas",
+            type=int,
+            default=0,
+            help="Puerto del endpoint /metrics en formato Prometheus (0 = desactivado).",
+        )
+        parser.add_argument(
+            "--host-metricas",
+            default="127.0.0.1",
+            help="Interfaz del endpoint de métricas (default: 127.0.0.1).",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help=(
+                "Muestrear la pila de todos los hilos cada --intervalo-muestreo ms y guardar "
+                "las pilas colapsadas en --directorio-perfiles (resumen con 'manage.py resumen_perfil')."
+            ),
+        )
+        parser.add_argument(
+            "--directorio-perfiles",
+            default=DIRECTORIO_POR_DEFECTO,
+            help=f"Directorio donde rotan los perfiles (default: {DIRECTORIO_POR_DEFECTO}).",
+        )
+        parser.add_argument(
+            "--max-archivos-perfil",
+            type=int,
+            default=50,
+            help="Perfiles a conservar en el directorio (default: 50).",
+        )
+        parser.add_argument(
+            "--intervalo-muestreo",
+            type=float,
+            default=10,
+            help="Milisegundos entre muestras de pila (default: 10).",
+        )
+        parser.add_argument(
+            "--memoria",
+            action="store_true",
+            help=(
+                "Activar tracemalloc y tomar una instantánea cada --intervalo-memoria segundos "
+                "(top de sitios y crecimiento en /metrics; comparación con 'manage.py diagnostico_memoria')."
+            ),
+        )
+        parser.add_argument(
+            "--intervalo-memoria",
+            type=float,
+            default=300,
+            help="Segundos entre instantáneas de memoria (default: 300).",
+        )
+        parser.add_argument(
+            "--directorio-memoria",
+            default=DIRECTORIO_MEMORIA,
+            help=f"Directorio donde rotan las instantáneas (default: {DIRECTORIO_MEMORIA}).",
+        )
+        parser.add_argument(
+            "--max-instantaneas",
+            type=int,
+            default=24,
+            help="Instantáneas de memoria a conservar (default: 24).",
+        )
+        parser.add_argument(
+            "--frames-memoria",
+            type=int,
+            default=1,
+            help="Marcos de pila por asignación; más de 1 permite agrupar por traza pero cuesta más (default: 1).",
+        )
 
     def handle(self, *args, **options):
         activos = options.get("activos") or list(
@@ -48,7 +129,50 @@ class Command(BaseCommand):
         duracion = options["duracion"] or None
         max_ticks = options["max_ticks"] or None
         loop = options["loop"]
+        grabador = obtener_grabador(options["grabar"]) if options["grabar"] else None
+        if options["puerto_metricas"]:
+            servidor_metricas = iniciar_servidor_metricas(
+                options["puerto_metricas"], host=options["host_metricas"]
+            )
+            host, puerto = servidor_metricas.server_address[:2]
+            self.stdout.write(f"Métricas en http://{host}:{puerto}/metrics")
+
+        muestreador = None
+        if options["profile"]:
+            # El recolector es un loop asyncio sin ciclos discretos: solo muestreo de pilas
+            directorio = DirectorioRotativo(
+                options["directorio_perfiles"], max_archivos=options["max_archivos_perfil"]
+            )
+            muestreador = MuestreadorPilas(
+                directorio, intervalo=options["intervalo_muestreo"] / 1000, prefijo="recolector"
+            ).iniciar()
+            self.stdout.write(
+                f"Perfilado activo (muestreo cada {options['intervalo_muestreo']:g} ms) en {directorio.ruta}/"
+            )
+        monitor_memoria = None
+        if options["memoria"]:
+            monitor_memoria = MonitorMemoria(
+                DirectorioRotativo(
+                    options["directorio_memoria"], max_archivos=options["max_instantaneas"]
+                ),
+                intervalo=options["intervalo_memoria"],
+                frames=options["frames_memoria"],
+                prefijo="recolector",
+            ).iniciar()
+            self.stdout.write(
+                f"Diagnóstico de memoria activo (cada {monitor_memoria.intervalo:g}s) "
+                f"en {monitor_memoria.directorio.ruta}/"
+            )
+
+        try:
+            self._recolectar(activos, duracion, max_ticks, loop, grabador, options)
+        finally:
+            if muestreador is not None:
+                muestreador.detener()
+            if monitor_memoria is not None:
+                monitor_memoria.detener()
 
+    def _recolectar(self, activos, duracion, max_ticks, loop, grabador, options):
         ciclo = 1
         while True:
             self.stdout.write(
@@ -59,7 +183,11 @@ class Command(BaseCommand):
                 )
             )
             recorder = TickStreamRecorder(
-                activos=activos, duracion=duracion, max_ticks=max_ticks
+                activos=activos,
+                duracion=duracion,
+                max_ticks=max_ticks,
+                url=options["url"] or None,
+                grabador=grabador,
             )
             try:
                 resultado = asyncio.run(recorder.ejecutar())
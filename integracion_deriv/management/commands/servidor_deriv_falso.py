@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ActivoPermitido
+from integracion_deriv.mercado_sintetico import MercadoSintetico, simbolos_sinteticos
+from integracion_deriv.servidor_falso import ServidorDerivFalso
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un servidor WebSocket local que imita la API de Deriv con precios "
+        "sintéticos (GBM con saltos) para pruebas de carga sin red."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--puerto", type=int, default=8765)
+        parser.add_argument(
+            "--activos",
+            nargs="*",
+            help="Símbolos a incluir (default: activos habilitados en el administrador).",
+        )
+        parser.add_argument(
+            "--sinteticos",
+            type=int,
+            default=100,
+            help="Símbolos adicionales SINT_000, SINT_001, ... (default: 100).",
+        )
+        parser.add_argument(
+            "--ticks-por-segundo",
+            type=float,
+            default=1.0,
+            help="Ticks por segundo de cada símbolo (default: 1, como los índices R_).",
+        )
+        parser.add_argument("--semilla", type=int, default=0)
+        parser.add_argument("--historial", type=int, default=5000, help="Ticks disponibles en ticks_history.")
+        parser.add_argument("--balance", type=float, default=10000.0)
+        parser.add_argument("--pago", type=float, default=0.95, help="Pago por unidad en contratos ganados.")
+        parser.add_argument("--probabilidad-salto", type=float, default=0.001)
+        parser.add_argument("--tamano-salto", type=float, default=0.01)
+        parser.add_argument(
+            "--latencia-ms",
+            type=float,
+            default=0.0,
+            help="Retardo artificial antes de responder cada solicitud.",
+        )
+
+    def handle(self, *args, **options):
+        if options["ticks_por_segundo"] <= 0:
+            raise CommandError("--ticks-por-segundo debe ser mayor que 0.")
+        activos = options["activos"]
+        if activos is None:
+            activos = list(
+                ActivoPermitido.objects.filter(habilitado=True)
+                .order_by("id")
+                .values_list("nombre", flat=True)
+            )
+        simbolos = list(activos) + simbolos_sinteticos(max(0, options["sinteticos"]))
+        if not simbolos:
+            raise CommandError("No hay símbolos: indique --activos o --sinteticos.")
+
+        intervalo = 1.0 / options["ticks_por_segundo"]
+        mercado = MercadoSintetico(
+            simbolos,
+            semilla=options["semilla"],
+            intervalo_tick=intervalo,
+            epoch_inicial=float(int(time.time())),
+            historial=options["historial"] + 1,
+            probabilidad_salto=options["probabilidad_salto"],
+            tamano_salto=options["tamano_salto"],
+        )
+        servidor = ServidorDerivFalso(
+            mercado,
+            host=options["host"],
+            puerto=options["puerto"],
+            balance_inicial=options["balance"],
+            pago=options["pago"],
+            latencia=options["latencia_ms"] / 1000,
+            historial_inicial=options["historial"],
+        )
+
+        async def _servir():
+            async with servidor:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"API de Deriv simulada en {servidor.url}: {len(mercado.simbolos)} símbolos, "
+                        f"{options['ticks_por_segundo']:g} ticks/s por símbolo, semilla {options['semilla']}"
+                    )
+                )
+                self.stdout.write(
+                    f"Use DERIV_WS_URL={servidor.url} o recolectar_ticks --url {servidor.url}"
+                )
+                await asyncio.Future()
+
+        try:
+            asyncio.run(_servir())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Servidor detenido."))
@@ -0,0 +1,68 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integracion_deriv.captura import resumir_captura
+from integracion_deriv.replay import IndiceCaptura, ServidorReplay
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un servidor WebSocket local que reproduce una captura de frames "
+        "de Deriv (ver recolectar_ticks --grabar y DERIV_CAPTURA_FRAMES)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("captura", help="Archivo de captura a reproducir.")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--puerto", type=int, default=8765)
+        parser.add_argument(
+            "--velocidad",
+            type=float,
+            default=1.0,
+            help="Factor de velocidad de los flujos de ticks (1 = tiempo real, 0 = lo más rápido posible).",
+        )
+        parser.add_argument(
+            "--resumen",
+            action="store_true",
+            help="Solo mostrar el contenido de la captura y salir.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            resumen = resumir_captura(options["captura"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"No se pudo leer la captura: {exc}") from exc
+
+        self.stdout.write(
+            f"Captura: {resumen.frames} frames ({resumen.enviados} enviados, "
+            f"{resumen.recibidos} recibidos), {resumen.bytes / 1024:.1f} KiB, "
+            f"{resumen.duracion:.1f}s"
+        )
+        for tipo, cantidad in resumen.por_tipo.items():
+            self.stdout.write(f"  {tipo:<28} {cantidad}")
+        if options["resumen"]:
+            return
+
+        indice = IndiceCaptura.desde_archivo(options["captura"])
+        servidor = ServidorReplay(
+            indice,
+            host=options["host"],
+            puerto=options["puerto"],
+            velocidad=max(0.0, options["velocidad"]),
+        )
+
+        async def _servir():
+            async with servidor:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Replay en {servidor.url} ({indice.total_ticks} ticks, "
+                        f"velocidad {'máxima' if servidor.velocidad == 0 else f'{servidor.velocidad:g}x'})"
+                    )
+                )
+                await asyncio.Future()
+
+        try:
+            asyncio.run(_servir())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Servidor de replay detenido."))
@@ -0,0 +1,136 @@
+"""
+Generador de mercado sintético para pruebas de carga.
+
+Cada símbolo sigue un movimiento browniano geométrico con saltos (Merton):
+en cada paso el logaritmo del precio avanza
+``(mu - sigma²/2)·dt + sigma·√dt·Z`` más, con probabilidad
+``probabilidad_salto``, un salto normal de desviación ``tamano_salto``.
+Todos los símbolos avanzan juntos con una sola operación vectorizada y la
+secuencia depende solo de la semilla y del universo de símbolos, no del
+reloj, de modo que dos ejecuciones con la misma semilla producen los mismos
+precios.
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SEGUNDOS_ANIO = 365 * 24 * 3600
+
+_PATRON_VOLATILIDAD = re.compile(r"^(?:1HZ)?(\d+)V?$|^R_(\d+)$")
+
+
+def volatilidad_por_nombre(simbolo: str) -> Optional[float]:
+    """Volatilidad anual implícita en el nombre (R_100 → 1.0, 1HZ10V → 0.10)."""
+    coincidencia = _PATRON_VOLATILIDAD.match(simbolo)
+    if not coincidencia:
+        return None
+    return int(coincidencia.group(1) or coincidencia.group(2)) / 100
+
+
+def simbolos_sinteticos(cantidad: int, prefijo: str = "SINT_") -> List[str]:
+    ancho = max(3, len(str(max(cantidad - 1, 0))))
+    return [f"{prefijo}{indice:0{ancho}d}" for indice in range(cantidad)]
+
+
+class MercadoSintetico:
+    """
+    Precios sintéticos para un universo fijo de símbolos.
+
+    Args:
+        simbolos: Universo de símbolos (el orden forma parte de la semilla)
+        semilla: Semilla del generador
+        intervalo_tick: Segundos entre ticks de cada símbolo
+        epoch_inicial: Epoch del paso 0
+        historial: Pasos que se conservan para ``ticks_history`` y liquidación
+        volatilidades: Volatilidad anual por símbolo; por defecto la del
+            nombre (R_50 → 0.5) o una aleatoria entre 0.1 y 1.0
+        deriva: Deriva anual ``mu``
+        probabilidad_salto: Probabilidad de salto por tick
+        tamano_salto: Desviación del salto en log-precio
+        decimales: Decimales de las cotizaciones (``pip_size``)
+    """
+
+    def __init__(
+        self,
+        simbolos: Sequence[str],
+        semilla: int = 0,
+        intervalo_tick: float = 1.0,
+        epoch_inicial: float = 0.0,
+        historial: int = 5000,
+        volatilidades: Optional[Dict[str, float]] = None,
+        deriva: float = 0.0,
+        probabilidad_salto: float = 0.001,
+        tamano_salto: float = 0.01,
+        decimales: int = 3,
+    ) -> None:
+        if not simbolos:
+            raise ValueError("Se requiere al menos un símbolo.")
+        self.simbolos = list(dict.fromkeys(simbolos))
+        self.posiciones = {simbolo: posicion for posicion, simbolo in enumerate(self.simbolos)}
+        self.intervalo_tick = intervalo_tick
+        self.epoch_inicial = epoch_inicial
+        self.decimales = decimales
+        self.probabilidad_salto = probabilidad_salto
+        self.tamano_salto = tamano_salto
+
+        huella = zlib.crc32("\n".join(self.simbolos).encode("utf-8"))
+        self._rng = np.random.default_rng([semilla, huella])
+        n = len(self.simbolos)
+        volatilidades = volatilidades or {}
+        sigma = self._rng.uniform(0.1, 1.0, n)
+        for posicion, simbolo in enumerate(self.simbolos):
+            valor = volatilidades.get(simbolo, volatilidad_por_nombre(simbolo))
+            if valor is not None:
+                sigma[posicion] = valor
+        dt = intervalo_tick / SEGUNDOS_ANIO
+        self._deriva_paso = (deriva - 0.5 * sigma ** 2) * dt
+        self._difusion_paso = sigma * np.sqrt(dt)
+
+        self.capacidad = max(2, historial)
+        self._log_precios = np.empty((self.capacidad, n))
+        self._log_precios[0] = np.log(self._rng.uniform(100.0, 10000.0, n))
+        self.paso = 0
+
+    @property
+    def epoch(self) -> float:
+        return self.epoch_inicial + self.paso * self.intervalo_tick
+
+    def epoch_de(self, paso: int) -> float:
+        return self.epoch_inicial + paso * self.intervalo_tick
+
+    def avanzar(self, pasos: int = 1) -> np.ndarray:
+        """Genera ``pasos`` ticks para todos los símbolos y devuelve los últimos precios."""
+        n = len(self.simbolos)
+        for _ in range(pasos):
+            choque = self._deriva_paso + self._difusion_paso * self._rng.standard_normal(n)
+            saltos = self._rng.random(n) < self.probabilidad_salto
+            if saltos.any():
+                choque[saltos] += self._rng.normal(0.0, self.tamano_salto, saltos.sum())
+            anterior = self._log_precios[self.paso % self.capacidad]
+            self.paso += 1
+            self._log_precios[self.paso % self.capacidad] = anterior + choque
+        return self.precios()
+
+    def _fila(self, paso: Optional[int]) -> int:
+        paso = self.paso if paso is None else paso
+        if not self.paso - self.capacidad < paso <= self.paso:
+            raise IndexError(f"El paso {paso} no está en el historial.")
+        return paso % self.capacidad
+
+    def precios(self, paso: Optional[int] = None) -> np.ndarray:
+        """Precios de todos los símbolos en ``paso`` (por defecto el actual)."""
+        return np.round(np.exp(self._log_precios[self._fila(paso)]), self.decimales)
+
+    def precio(self, simbolo: str, paso: Optional[int] = None) -> float:
+        valor = np.exp(self._log_precios[self._fila(paso), self.posiciones[simbolo]])
+        return round(float(valor), self.decimales)
+
+    def historial(self, simbolo: str, cantidad: int) -> Tuple[List[float], List[float]]:
+        """Últimos ``cantidad`` ticks de ``simbolo``: (epochs, precios), del más antiguo al más reciente."""
+        cantidad = max(1, min(cantidad, self.capacidad - 1, self.paso + 1))
+        pasos = np.arange(self.paso - cantidad + 1, self.paso + 1)
+        columna = self._log_precios[pasos % self.capacidad, self.posiciones[simbolo]]
+        precios = np.round(np.exp(columna), self.decimales)
+        return [self.epoch_de(int(paso)) for paso in pasos], precios.tolist()
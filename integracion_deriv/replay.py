@@ -0,0 +1,214 @@
+"""
+Servidor WebSocket local que reproduce una captura de frames de Deriv.
+
+Las solicitudes se emparejan con las respuestas grabadas por su tipo y un
+discriminador (símbolo o ``contract_id``), tomando el ``echo_req`` que
+Deriv incluye en cada respuesta. Cada conexión recorre la captura desde el
+principio, de modo que dos ejecuciones contra la misma captura reciben
+exactamente los mismos datos. Los flujos de ticks se emiten con su
+espaciado original dividido por ``velocidad`` (0 = lo más rápido posible).
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+from .captura import RECIBIDO, leer_captura
+
+TIPOS_SOLICITUD = (
+    "authorize",
+    "ticks",
+    "ticks_history",
+    "buy",
+    "proposal_open_contract",
+    "balance",
+    "active_symbols",
+    "forget_all",
+    "forget",
+    "ping",
+)
+
+Clave = Tuple[str, Optional[str]]
+
+
+def tipo_solicitud(payload: Dict[str, Any]) -> str:
+    for tipo in TIPOS_SOLICITUD:
+        if tipo in payload:
+            return tipo
+    return next(iter(payload), "")
+
+
+def clave_solicitud(payload: Dict[str, Any]) -> Clave:
+    """Tipo de solicitud y discriminador usados para emparejar respuestas."""
+    tipo = tipo_solicitud(payload)
+    if tipo in ("ticks", "ticks_history"):
+        return tipo, str(payload[tipo])
+    if tipo == "buy":
+        return tipo, (payload.get("parameters") or {}).get("symbol")
+    if tipo == "proposal_open_contract":
+        return tipo, str(payload.get("contract_id", ""))
+    return tipo, None
+
+
+@dataclass
+class IndiceCaptura:
+    """Respuestas y flujos de ticks de una captura, listos para reproducir."""
+    respuestas: Dict[Clave, List[Dict[str, Any]]] = field(default_factory=dict)
+    flujos: Dict[str, List[Tuple[float, str]]] = field(default_factory=dict)
+    inicio_flujos: float = 0.0
+
+    @classmethod
+    def desde_archivo(cls, ruta: str) -> "IndiceCaptura":
+        indice = cls()
+        inicio = None
+        for frame in leer_captura(ruta):
+            if frame.sentido != RECIBIDO:
+                continue
+            mensaje = frame.mensaje
+            echo = mensaje.get("echo_req") or {}
+            if mensaje.get("msg_type") == "tick":
+                simbolo = (mensaje.get("tick") or {}).get("symbol") or echo.get("ticks")
+                if simbolo:
+                    indice.flujos.setdefault(simbolo, []).append((frame.instante, frame.texto))
+                    inicio = frame.instante if inicio is None else min(inicio, frame.instante)
+                continue
+            clave = clave_solicitud(echo) if echo else (mensaje.get("msg_type", ""), None)
+            indice.respuestas.setdefault(clave, []).append(mensaje)
+        indice.inicio_flujos = inicio or 0.0
+        return indice
+
+    @property
+    def total_ticks(self) -> int:
+        return sum(len(flujo) for flujo in self.flujos.values())
+
+
+class _ConexionReplay:
+    """Estado de una conexión: posición en cada lista de respuestas y flujos activos."""
+
+    def __init__(self, servidor: "ServidorReplay", websocket) -> None:
+        self.servidor = servidor
+        self.websocket = websocket
+        self.cursores: Dict[Clave, int] = {}
+        self.flujos: Dict[str, asyncio.Task] = {}
+        self.reloj: Optional[float] = None
+
+    def _siguiente_respuesta(self, clave: Clave) -> Optional[Dict[str, Any]]:
+        respuestas = self.servidor.indice.respuestas
+        if clave not in respuestas:
+            # Sin coincidencia exacta: cualquier respuesta del mismo tipo
+            clave = next((otra for otra in respuestas if otra[0] == clave[0]), None)
+            if clave is None:
+                return None
+        lista = respuestas[clave]
+        posicion = self.cursores.get(clave, 0)
+        # Al agotarse se repite la última (p. ej. el estado final de un contrato)
+        self.cursores[clave] = min(posicion + 1, len(lista) - 1)
+        return lista[posicion]
+
+    async def _emitir_flujo(self, simbolo: str) -> None:
+        loop = asyncio.get_running_loop()
+        velocidad = self.servidor.velocidad
+        inicio_flujos = self.servidor.indice.inicio_flujos
+        for posicion, (instante, texto) in enumerate(self.servidor.indice.flujos[simbolo]):
+            if velocidad > 0:
+                espera = self.reloj + (instante - inicio_flujos) / velocidad - loop.time()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            elif posicion % 100 == 0:
+                await asyncio.sleep(0)  # Ceder a los demás flujos
+            await self.websocket.send(texto)
+
+    async def atender(self) -> None:
+        try:
+            async for texto in self.websocket:
+                await self._responder(json.loads(texto))
+        finally:
+            for tarea in self.flujos.values():
+                tarea.cancel()
+
+    async def _responder(self, payload: Dict[str, Any]) -> None:
+        clave = clave_solicitud(payload)
+        tipo = clave[0]
+        if tipo == "ticks" and clave[1] in self.servidor.indice.flujos:
+            if clave[1] not in self.flujos:
+                if self.reloj is None:
+                    self.reloj = asyncio.get_running_loop().time()
+                self.flujos[clave[1]] = asyncio.create_task(self._emitir_flujo(clave[1]))
+            return
+        if tipo in ("forget_all", "forget"):
+            for tarea in self.flujos.values():
+                tarea.cancel()
+            respuesta = {tipo: 1 if tipo == "forget" else list(self.flujos), "msg_type": tipo}
+            self.flujos.clear()
+        else:
+            grabada = self._siguiente_respuesta(clave)
+            if grabada is None:
+                respuesta = {
+                    "error": {
+                        "code": "ReplaySinDatos",
+                        "message": f"La captura no tiene respuestas para {tipo}.",
+                    },
+                    "msg_type": tipo,
+                }
+            else:
+                respuesta = dict(grabada)
+        respuesta["echo_req"] = payload
+        if "req_id" in payload:
+            respuesta["req_id"] = payload["req_id"]
+        else:
+            respuesta.pop("req_id", None)
+        await self.websocket.send(json.dumps(respuesta))
+
+
+class ServidorReplay:
+    """
+    Servidor de replay sobre ``websockets``.
+
+    Uso::
+
+        async with ServidorReplay(IndiceCaptura.desde_archivo(ruta), velocidad=0) as servidor:
+            cliente = DerivWebsocketClient(url=servidor.url)
+    """
+
+    def __init__(
+        self,
+        indice: IndiceCaptura,
+        host: str = "127.0.0.1",
+        puerto: int = 8765,
+        velocidad: float = 1.0,
+    ) -> None:
+        self.indice = indice
+        self.host = host
+        self.puerto = puerto
+        self.velocidad = velocidad
+        self._servidor = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.puerto}"
+
+    async def _atender(self, websocket) -> None:
+        try:
+            await _ConexionReplay(self, websocket).atender()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def iniciar(self) -> None:
+        self._servidor = await websockets.serve(self._atender, self.host, self.puerto)
+        if not self.puerto:
+            self.puerto = next(iter(self._servidor.sockets)).getsockname()[1]
+
+    async def cerrar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def __aenter__(self) -> "ServidorReplay":
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
@@ -1,4 +1,5 @@
 import asyncio
+import time
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional
 
@@ -6,8 +7,10 @@ from asgiref.sync import sync_to_async
 from django.db import close_old_connections
 from django.db.utils import OperationalError
 
+from core.monitoreo.metricas import COLA_RECEPCION, RETRASO_TICK, TICKS_INGERIDOS
 from historial.models import Tick
 
+from .captura import GrabadorFrames
 from .client import DerivWebsocketClient
 
 
@@ -29,11 +32,13 @@ class TickStreamRecorder:
         activos: Iterable[str],
         duracion: Optional[int] = None,
         max_ticks: Optional[int] = None,
+        url: Optional[str] = None,
+        grabador: Optional[GrabadorFrames] = None,
     ):
         self.activos: List[str] = list(dict.fromkeys(activos))
         self.duracion = duracion
         self.max_ticks = max_ticks
-        self._client = DerivWebsocketClient()
+        self._client = DerivWebsocketClient(url=url, grabador=grabador)
         self._contador_total = 0
         self._contadores_por_activo: Dict[str, int] = {activo: 0 for activo in self.activos}
 
@@ -44,6 +49,8 @@ class TickStreamRecorder:
                 instancia = await sync_to_async(
                     _registrar_tick_threadsafe, thread_sensitive=True
                 )(tick)
+                TICKS_INGERIDOS.inc(simbolo=instancia.activo)
+                RETRASO_TICK.observar(time.time() - instancia.epoch.timestamp())
                 print(
                     f"[{instancia.epoch:%Y-%m-%d %H:%M:%S}] "
                     f"Activo {instancia.activo} | Precio {instancia.precio}"
@@ -68,6 +75,7 @@ class TickStreamRecorder:
         try:
             while True:
                 mensaje = await self._client._receive()
+                COLA_RECEPCION.set(self._client.mensajes_pendientes())
                 if mensaje.get("msg_type") == "tick":
                     tick = mensaje.get("tick", {})
                     simbolo = tick.get("symbol")
@@ -0,0 +1,443 @@
+"""
+Servidor WebSocket local que implementa el subconjunto de la API de Deriv
+usado por el proyecto, con precios de ``MercadoSintetico``.
+
+Mensajes soportados: ``authorize``, ``ticks`` (suscripción),
+``ticks_history``, ``buy``, ``proposal_open_contract``, ``balance``,
+``active_symbols``, ``forget_all``/``forget`` y ``ping``. Los contratos son
+de duración en ticks (``t``; ``s`` y ``m`` se convierten a ticks): la
+entrada es el primer tick posterior a la compra y la salida el tick
+``duration`` después, como en Deriv. Todas las conexiones comparten la
+misma cuenta virtual.
+"""
+import asyncio
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+import websockets
+
+from .mercado_sintetico import MercadoSintetico
+from .replay import tipo_solicitud
+
+LOGIN_ID = "VRTC0000001"
+
+
+@dataclass
+class ContratoFalso:
+    contract_id: int
+    simbolo: str
+    tipo: str  # CALL o PUT
+    monto: float
+    pago: float
+    paso_compra: int
+    paso_entrada: int
+    paso_salida: int
+    hora_compra: int
+    estado: str = "open"  # open, won, lost
+    precio_entrada: Optional[float] = None
+    precio_salida: Optional[float] = None
+
+    @property
+    def beneficio(self) -> float:
+        if self.estado == "won":
+            return round(self.pago - self.monto, 2)
+        if self.estado == "lost":
+            return -self.monto
+        return 0.0
+
+
+def _error(codigo: str, mensaje: str) -> Dict[str, Any]:
+    return {"error": {"code": codigo, "message": mensaje}}
+
+
+def _epoch(valor: float):
+    """Epoch entero como en Deriv, salvo que el intervalo sea subsegundo."""
+    return int(valor) if float(valor).is_integer() else round(valor, 3)
+
+
+class _ConexionFalsa:
+    def __init__(self, servidor: "ServidorDerivFalso", websocket) -> None:
+        self.servidor = servidor
+        self.websocket = websocket
+        self.autorizada = False
+        self.simbolos: Set[str] = set()
+
+    async def atender(self) -> None:
+        try:
+            async for texto in self.websocket:
+                try:
+                    payload = json.loads(texto)
+                except ValueError:
+                    await self.websocket.send(
+                        json.dumps({**_error("InputValidationFailed", "JSON inválido."), "msg_type": "error"})
+                    )
+                    continue
+                if self.servidor.latencia > 0:
+                    await asyncio.sleep(self.servidor.latencia)
+                respuesta = self._responder(payload)
+                if respuesta is not None:
+                    await self.websocket.send(json.dumps(respuesta))
+        finally:
+            self.servidor._desuscribir(self, self.simbolos)
+
+    def _responder(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tipo = tipo_solicitud(payload)
+        manejador = getattr(self, f"_msg_{tipo}", None)
+        if manejador is None:
+            respuesta = _error("UnrecognisedRequest", f"Solicitud no soportada: {tipo}")
+        elif tipo in ("buy", "balance", "proposal_open_contract") and not self.autorizada:
+            respuesta = _error("AuthorizationRequired", "Please log in.")
+        else:
+            respuesta = manejador(payload)
+        respuesta.setdefault("msg_type", "history" if tipo == "ticks_history" else tipo)
+        respuesta["echo_req"] = payload
+        if "req_id" in payload:
+            respuesta["req_id"] = payload["req_id"]
+        return respuesta
+
+    def _msg_authorize(self, payload):
+        if not payload.get("authorize"):
+            return _error("InvalidToken", "The token is invalid.")
+        self.autorizada = True
+        return {
+            "authorize": {
+                "loginid": LOGIN_ID,
+                "balance": round(self.servidor.balance, 2),
+                "currency": "USD",
+                "is_virtual": 1,
+                "email": "simulado@localhost",
+                "fullname": "Cuenta simulada",
+            }
+        }
+
+    def _msg_ping(self, payload):
+        return {"ping": "pong"}
+
+    def _msg_balance(self, payload):
+        return {
+            "balance": {
+                "balance": round(self.servidor.balance, 2),
+                "currency": "USD",
+                "loginid": LOGIN_ID,
+            }
+        }
+
+    def _msg_active_symbols(self, payload):
+        mercado = self.servidor.mercado
+        pip = 10 ** -mercado.decimales
+        return {
+            "active_symbols": [
+                {
+                    "symbol": simbolo,
+                    "display_name": f"Índice sintético {simbolo}",
+                    "market": "synthetic_index",
+                    "market_display_name": "Derived",
+                    "submarket": "random_index",
+                    "submarket_display_name": "Continuous Indices",
+                    "exchange_is_open": 1,
+                    "is_trading_suspended": 0,
+                    "pip": pip,
+                    "symbol_type": "stockindex",
+                }
+                for simbolo in mercado.simbolos
+            ]
+        }
+
+    def _msg_ticks(self, payload):
+        simbolo = str(payload["ticks"])
+        mercado = self.servidor.mercado
+        if simbolo not in mercado.posiciones:
+            return _error("InvalidSymbol", f"Symbol {simbolo} invalid.")
+        respuesta = {"msg_type": "tick", "tick": self.servidor.tick_actual(simbolo)}
+        if payload.get("subscribe"):
+            self.simbolos.add(simbolo)
+            self.servidor._suscribir(self, simbolo)
+            # La respuesta a la suscripción ya lleva el primer tick
+            self.servidor.ticks_emitidos += 1
+            respuesta["subscription"] = {"id": self.servidor.id_suscripcion(simbolo)}
+        return respuesta
+
+    def _msg_ticks_history(self, payload):
+        simbolo = str(payload["ticks_history"])
+        mercado = self.servidor.mercado
+        if simbolo not in mercado.posiciones:
+            return _error("InvalidSymbol", f"Symbol {simbolo} invalid.")
+        epochs, precios = mercado.historial(simbolo, int(payload.get("count", 5000)))
+        return {
+            "history": {"prices": precios, "times": [_epoch(epoch) for epoch in epochs]},
+            "pip_size": mercado.decimales,
+        }
+
+    def _msg_forget_all(self, payload):
+        ids = [self.servidor.id_suscripcion(simbolo) for simbolo in sorted(self.simbolos)]
+        self.servidor._desuscribir(self, self.simbolos)
+        self.simbolos = set()
+        return {"forget_all": ids}
+
+    def _msg_forget(self, payload):
+        simbolos = {
+            simbolo
+            for simbolo in self.simbolos
+            if self.servidor.id_suscripcion(simbolo) == payload["forget"]
+        }
+        self.servidor._desuscribir(self, simbolos)
+        self.simbolos -= simbolos
+        return {"forget": 1 if simbolos else 0}
+
+    def _msg_buy(self, payload):
+        return self.servidor.comprar(payload.get("parameters") or {})
+
+    def _msg_proposal_open_contract(self, payload):
+        try:
+            contrato = self.servidor.contratos.get(int(payload.get("contract_id") or 0))
+        except (TypeError, ValueError):
+            contrato = None
+        if contrato is None:
+            return _error("ContractNotFound", "Contract not found.")
+        return {"proposal_open_contract": self.servidor.detalle_contrato(contrato)}
+
+
+class ServidorDerivFalso:
+    """
+    API de Deriv simulada sobre ``websockets``.
+
+    Un bucle de reloj avanza el mercado cada ``intervalo_tick`` segundos,
+    emite un tick por símbolo suscrito (un mismo frame se comparte entre
+    todas las conexiones suscritas) y liquida los contratos vencidos.
+
+    Uso::
+
+        mercado = MercadoSintetico(simbolos, semilla=7)
+        async with ServidorDerivFalso(mercado, puerto=0) as servidor:
+            cliente = DerivWebsocketClient(url=servidor.url)
+    """
+
+    def __init__(
+        self,
+        mercado: MercadoSintetico,
+        host: str = "127.0.0.1",
+        puerto: int = 8765,
+        balance_inicial: float = 10000.0,
+        pago: float = 0.95,
+        latencia: float = 0.0,
+        historial_inicial: int = 1000,
+    ) -> None:
+        self.mercado = mercado
+        self.host = host
+        self.puerto = puerto
+        self.balance = float(balance_inicial)
+        self.pago = pago
+        self.latencia = latencia
+        self.contratos: Dict[int, ContratoFalso] = {}
+        self._vencimientos: Dict[int, List[ContratoFalso]] = {}
+        self._suscriptores: Dict[str, Set] = {}
+        self._ids_contrato = itertools.count(100000001)
+        self._servidor = None
+        self._reloj: Optional[asyncio.Task] = None
+        self.ticks_emitidos = 0
+        if historial_inicial and mercado.paso == 0:
+            # Historial previo para ticks_history; el paso actual queda en epoch_inicial
+            pasos = min(historial_inicial, mercado.capacidad - 1)
+            mercado.epoch_inicial -= pasos * mercado.intervalo_tick
+            mercado.avanzar(pasos)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.puerto}"
+
+    def id_suscripcion(self, simbolo: str) -> str:
+        return f"{self.mercado.posiciones[simbolo]:032x}"
+
+    def tick_actual(self, simbolo: str) -> Dict[str, Any]:
+        mercado = self.mercado
+        precio = mercado.precio(simbolo)
+        return {
+            "ask": precio,
+            "bid": precio,
+            "epoch": _epoch(mercado.epoch),
+            "id": self.id_suscripcion(simbolo),
+            "pip_size": mercado.decimales,
+            "quote": precio,
+            "symbol": simbolo,
+        }
+
+    def _suscribir(self, conexion: _ConexionFalsa, simbolo: str) -> None:
+        self._suscriptores.setdefault(simbolo, set()).add(conexion.websocket)
+
+    def _desuscribir(self, conexion: _ConexionFalsa, simbolos) -> None:
+        for simbolo in simbolos:
+            suscriptores = self._suscriptores.get(simbolo)
+            if suscriptores is not None:
+                suscriptores.discard(conexion.websocket)
+                if not suscriptores:
+                    del self._suscriptores[simbolo]
+
+    def comprar(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        simbolo = parametros.get("symbol")
+        tipo = parametros.get("contract_type")
+        if simbolo not in self.mercado.posiciones:
+            return _error("InvalidSymbol", f"Symbol {simbolo} invalid.")
+        if tipo not in ("CALL", "PUT"):
+            return _error("InvalidContractType", f"Contract type {tipo} not supported.")
+        try:
+            monto = round(float(parametros.get("amount", 0)), 2)
+            duracion = int(parametros.get("duration", 0))
+        except (TypeError, ValueError):
+            return _error("InputValidationFailed", "Invalid amount or duration.")
+        unidad = parametros.get("duration_unit", "t")
+        if unidad in ("s", "m"):
+            segundos = duracion * (60 if unidad == "m" else 1)
+            duracion = math.ceil(segundos / self.mercado.intervalo_tick)
+        elif unidad != "t":
+            return _error("InvalidDurationUnit", f"Duration unit {unidad} not supported.")
+        if monto < 0.35 or duracion < 1:
+            return _error("ContractBuyValidationError", "Invalid stake or duration.")
+        if duracion >= self.mercado.capacidad:
+            return _error("ContractBuyValidationError", "Duration too long.")
+        if monto > self.balance:
+            return _error("InsufficientBalance", "Your account balance is insufficient.")
+
+        self.balance -= monto
+        paso = self.mercado.paso
+        contrato = ContratoFalso(
+            contract_id=next(self._ids_contrato),
+            simbolo=simbolo,
+            tipo=tipo,
+            monto=monto,
+            pago=round(monto * (1 + self.pago), 2),
+            paso_compra=paso,
+            paso_entrada=paso + 1,
+            paso_salida=paso + 1 + duracion,
+            hora_compra=int(time.time()),
+        )
+        self.contratos[contrato.contract_id] = contrato
+        self._vencimientos.setdefault(contrato.paso_salida, []).append(contrato)
+        return {
+            "buy": {
+                "balance_after": round(self.balance, 2),
+                "buy_price": monto,
+                "contract_id": contrato.contract_id,
+                "longcode": f"{tipo} {simbolo} {duracion} ticks",
+                "payout": contrato.pago,
+                "purchase_time": contrato.hora_compra,
+                "shortcode": f"{tipo}_{simbolo}_{contrato.pago}_{contrato.hora_compra}_{duracion}T_S0P_0",
+                "start_time": contrato.hora_compra,
+                "transaction_id": contrato.contract_id * 2,
+            }
+        }
+
+    def detalle_contrato(self, contrato: ContratoFalso) -> Dict[str, Any]:
+        mercado = self.mercado
+        vendido = contrato.estado != "open"
+        detalle = {
+            "contract_id": contrato.contract_id,
+            "contract_type": contrato.tipo,
+            "underlying": contrato.simbolo,
+            "buy_price": contrato.monto,
+            "payout": contrato.pago,
+            "purchase_time": contrato.hora_compra,
+            "status": contrato.estado,
+            "is_sold": 1 if vendido else 0,
+            "profit": contrato.beneficio,
+            "current_spot": mercado.precio(contrato.simbolo),
+            "current_spot_time": _epoch(mercado.epoch),
+        }
+        if contrato.precio_entrada is not None:
+            detalle["entry_spot"] = contrato.precio_entrada
+            detalle["entry_tick_time"] = _epoch(mercado.epoch_de(contrato.paso_entrada))
+        if vendido:
+            detalle["exit_tick"] = contrato.precio_salida
+            detalle["exit_tick_time"] = _epoch(mercado.epoch_de(contrato.paso_salida))
+            detalle["sell_price"] = contrato.pago if contrato.estado == "won" else 0
+        return detalle
+
+    def _liquidar(self) -> None:
+        paso = self.mercado.paso
+        for contrato in self._vencimientos.pop(paso, ()):
+            entrada = self.mercado.precio(contrato.simbolo, contrato.paso_entrada)
+            salida = self.mercado.precio(contrato.simbolo, paso)
+            ganada = salida > entrada if contrato.tipo == "CALL" else salida < entrada
+            contrato.precio_entrada = entrada
+            contrato.precio_salida = salida
+            contrato.estado = "won" if ganada else "lost"
+            if ganada:
+                self.balance += contrato.pago
+
+    def _emitir_ticks(self) -> None:
+        mercado = self.mercado
+        if not self._suscriptores:
+            return
+        precios = mercado.precios()
+        epoch = _epoch(mercado.epoch)
+        for simbolo, suscriptores in self._suscriptores.items():
+            precio = float(precios[mercado.posiciones[simbolo]])
+            identificador = self.id_suscripcion(simbolo)
+            texto = json.dumps(
+                {
+                    "echo_req": {"ticks": simbolo, "subscribe": 1},
+                    "msg_type": "tick",
+                    "subscription": {"id": identificador},
+                    "tick": {
+                        "ask": precio,
+                        "bid": precio,
+                        "epoch": epoch,
+                        "id": identificador,
+                        "pip_size": mercado.decimales,
+                        "quote": precio,
+                        "symbol": simbolo,
+                    },
+                }
+            )
+            websockets.broadcast(suscriptores, texto)
+            self.ticks_emitidos += len(suscriptores)
+
+    async def _bucle_reloj(self) -> None:
+        loop = asyncio.get_running_loop()
+        intervalo = self.mercado.intervalo_tick
+        siguiente = loop.time()
+        while True:
+            siguiente += intervalo
+            espera = siguiente - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            else:
+                await asyncio.sleep(0)  # Atrasado: ceder sin acumular más retraso
+            self.mercado.avanzar()
+            self._liquidar()
+            self._emitir_ticks()
+
+    async def _atender(self, websocket) -> None:
+        try:
+            await _ConexionFalsa(self, websocket).atender()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def iniciar(self) -> None:
+        self._servidor = await websockets.serve(self._atender, self.host, self.puerto)
+        if not self.puerto:
+            self.puerto = next(iter(self._servidor.sockets)).getsockname()[1]
+        self._reloj = asyncio.create_task(self._bucle_reloj())
+
+    async def cerrar(self) -> None:
+        if self._reloj is not None:
+            self._reloj.cancel()
+            try:
+                await self._reloj
+            except asyncio.CancelledError:
+                pass
+            self._reloj = None
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def __aenter__(self) -> "ServidorDerivFalso":
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
@@ -1,3 +1,95 @@
-from django.test import TestCase
+import asyncio
 
-# Create your tests here.
+import websockets
+from django.test import SimpleTestCase
+
+from integracion_deriv.client import DerivWebsocketClient
+from integracion_deriv.mercado_sintetico import MercadoSintetico, simbolos_sinteticos
+from integracion_deriv.servidor_falso import ServidorDerivFalso
+
+
+class ClienteMedido(DerivWebsocketClient):
+    """Cliente que registra cuántas solicitudes con ``req_id`` hay en vuelo."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    async def _send(self, payload):
+        if "req_id" in payload:
+            self.en_vuelo += 1
+            self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        await super()._send(payload)
+
+    async def _receive(self):
+        mensaje = await super()._receive()
+        if "req_id" in mensaje:
+            self.en_vuelo -= 1
+        return mensaje
+
+
+class SolicitudesConcurrentesTests(SimpleTestCase):
+    simbolos = simbolos_sinteticos(12)
+
+    def servidor(self, **kwargs) -> ServidorDerivFalso:
+        return ServidorDerivFalso(
+            MercadoSintetico(self.simbolos, semilla=7), puerto=0, historial_inicial=50, **kwargs
+        )
+
+    def test_respuestas_en_el_orden_de_los_payloads(self):
+        async def probar():
+            async with self.servidor() as servidor:
+                cliente = ClienteMedido(api_token="falso", url=servidor.url)
+                try:
+                    historial = await cliente.obtener_ticks_history_lote(
+                        reversed(self.simbolos), count=5, max_concurrencia=3
+                    )
+                finally:
+                    await cliente.cerrar()
+            return historial, cliente.max_en_vuelo
+
+        historial, max_en_vuelo = asyncio.run(probar())
+
+        self.assertEqual(list(historial), list(reversed(self.simbolos)))
+        for simbolo, respuesta in historial.items():
+            self.assertEqual(respuesta["echo_req"]["ticks_history"], simbolo)
+            self.assertEqual(len(respuesta["history"]["prices"]), 5)
+        self.assertEqual(max_en_vuelo, 3)
+
+    def test_conexion_cerrada_falla_todas_las_solicitudes(self):
+        async def probar():
+            servidor = self.servidor(latencia=0.2)
+            await servidor.iniciar()
+            cliente = DerivWebsocketClient(api_token="falso", url=servidor.url)
+            await cliente._ensure_connection()
+            lote = asyncio.create_task(
+                cliente.obtener_ticks_history_lote(self.simbolos, count=5, max_concurrencia=4)
+            )
+            await asyncio.sleep(0.1)
+            # El servidor sigue aceptando conexiones: sin cortar el lote, las
+            # solicitudes en cola se enviarían por una conexión nueva sin lector
+            for conexion in list(servidor._servidor.websockets):
+                await conexion.close()
+            # Un cuelgue termina en TimeoutError y hace fallar el test
+            error = None
+            try:
+                await asyncio.wait_for(asyncio.shield(lote), 5)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as exc:
+                error = exc
+            sueltas = [
+                tarea.get_coro().__qualname__
+                for tarea in asyncio.all_tasks()
+                if not tarea.done()
+                and tarea.get_coro().__qualname__.startswith("DerivWebsocketClient.")
+            ]
+            await cliente.cerrar()
+            await servidor.cerrar()
+            return error, sueltas
+
+        error, sueltas = asyncio.run(probar())
+
+        self.assertIsInstance(error, websockets.ConnectionClosed)
+        self.assertEqual(sueltas, [])
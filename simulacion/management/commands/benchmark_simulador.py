@@ -0,0 +1,180 @@
+"""
+Benchmark del simulador de horarios con muchos símbolos y 24 h de ticks:
+secuencial frente al pool de procesos, sobre una base de datos de prueba
+desechable.
+"""
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from core.models import ActivoPermitido
+from historial.models import Tick
+from simulacion.paralelo import cerrar_pool_simulacion, obtener_pool_simulacion, simular_ventana
+from simulacion.services import SimuladorHorariosService
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de una corrida del simulador de horarios con N símbolos y 24 h de "
+        "ticks, en secuencial y con 1..M workers de proceso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--activos", type=int, default=88, help="Símbolos simulados (default: 88)")
+        parser.add_argument(
+            "--segundos-por-tick",
+            type=float,
+            default=2.0,
+            help="Separación entre ticks en las 24 h generadas (default: 2)",
+        )
+        parser.add_argument(
+            "--workers",
+            nargs="+",
+            type=int,
+            default=[0, 1, 2, 4],
+            help="Configuraciones a medir; 0 = secuencial (default: 0 1 2 4)",
+        )
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--duraciones", nargs="+", type=int, default=[5])
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Medir la primera corrida incremental (todas las horas cerradas) en lugar de la ventana completa",
+        )
+        parser.add_argument("--semilla", type=int, default=7)
+        parser.add_argument("--salida", type=str, default="benchmark_simulador.json")
+
+    def handle(self, *args, **options):
+        if options["activos"] < 1 or options["segundos_por_tick"] <= 0:
+            raise CommandError("Se requieren --activos >= 1 y --segundos-por-tick > 0.")
+
+        # Base de prueba en archivo: los workers abren su propia conexión a ella
+        directorio = tempfile.TemporaryDirectory(prefix="benchmark_simulador_")
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = str(
+                Path(directorio.name) / "benchmark.sqlite3"
+            )
+        self.stdout.write("Creando base de datos de prueba...")
+        configuracion_anterior = setup_databases(
+            verbosity=0, interactive=False, serialized_aliases=set()
+        )
+        try:
+            resultado = self._ejecutar(options)
+        finally:
+            cerrar_pool_simulacion()
+            connection.close()
+            teardown_databases(configuracion_anterior, verbosity=0)
+            directorio.cleanup()
+
+        with open(options["salida"], "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+    def _generar_ticks(self, simbolos: List[str], segundos_por_tick: float, semilla: int) -> int:
+        generador = np.random.default_rng(semilla)
+        fin = timezone.now()
+        cantidad = int(24 * 3600 / segundos_por_tick)
+        segundos = np.arange(cantidad) * segundos_por_tick
+        inicio = fin - timedelta(seconds=float(segundos[-1]) + 1)
+        epochs = [inicio + timedelta(seconds=float(segundo)) for segundo in segundos]
+        for simbolo in simbolos:
+            log_precios = np.log(1000.0) + np.cumsum(generador.normal(0, 2e-4, cantidad))
+            precios = np.round(np.exp(log_precios), 5).tolist()
+            Tick.objects.bulk_create(
+                [
+                    Tick(activo=simbolo, epoch=epoch, precio=Decimal(str(precio)), pip_size=5)
+                    for epoch, precio in zip(epochs, precios)
+                ],
+                batch_size=5000,
+            )
+        return cantidad
+
+    def _medir(self, servicio: SimuladorHorariosService) -> float:
+        # Cada corrida se revierte para que las siguientes partan del mismo estado
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            servicio.ejecutar()
+            transcurrido = time.perf_counter() - inicio
+            transaction.set_rollback(True)
+        return transcurrido
+
+    def _ejecutar(self, options) -> Dict:
+        simbolos = [f"SIM_{indice:03d}" for indice in range(options["activos"])]
+        ActivoPermitido.objects.bulk_create(
+            [ActivoPermitido(nombre=simbolo, habilitado=True) for simbolo in simbolos]
+        )
+        self.stdout.write(f"Generando 24 h de ticks para {len(simbolos)} símbolos...")
+        ticks_por_simbolo = self._generar_ticks(
+            simbolos, options["segundos_por_tick"], options["semilla"]
+        )
+
+        # Trabajo que hace cada worker (lectura de ticks, arrays y simulación),
+        # medido en secuencial: el resto de la corrida queda en el proceso principal
+        fin = timezone.now()
+        tz = timezone.get_current_timezone()
+        duraciones = sorted(set(options["duraciones"]) | {5})
+        inicio_trabajo = time.perf_counter()
+        for simbolo in simbolos:
+            simular_ventana(simbolo, fin - timedelta(hours=24), fin, tz, duraciones, 5, 5)
+        trabajo_por_simbolo = time.perf_counter() - inicio_trabajo
+
+        self.stdout.write(
+            f"{len(simbolos)} símbolos x {ticks_por_simbolo} ticks, {os.cpu_count()} CPU"
+        )
+        self.stdout.write(f"{'workers':>8} {'media (s)':>10} {'min (s)':>10} {'speedup':>8}")
+        mediciones = []
+        base = None
+        for workers in options["workers"]:
+            servicio = SimuladorHorariosService(
+                workers=workers, incremental=options["incremental"], duraciones=duraciones
+            )
+            if workers:
+                # El arranque del pool se paga una vez por proceso, no por corrida
+                obtener_pool_simulacion(workers)
+            tiempos = [self._medir(servicio) for _ in range(max(1, options["repeticiones"]))]
+            media = statistics.mean(tiempos)
+            base = base or media
+            mediciones.append(
+                {"workers": workers, "media_s": round(media, 3), "min_s": round(min(tiempos), 3)}
+            )
+            etiqueta = workers if workers else "sec."
+            self.stdout.write(
+                f"{etiqueta:>8} {media:>10.3f} {min(tiempos):>10.3f} {base / media:>7.2f}x"
+            )
+
+        secuencial = next((m["media_s"] for m in mediciones if m["workers"] == 0), None)
+        resultado = {
+            "benchmark": "simulador",
+            "fecha": timezone.now().isoformat(),
+            "cpus": os.cpu_count(),
+            "parametros": {
+                "activos": len(simbolos),
+                "ticks_por_simbolo": ticks_por_simbolo,
+                "duraciones": duraciones,
+                "incremental": options["incremental"],
+            },
+            "trabajo_por_simbolo_s": round(trabajo_por_simbolo, 3),
+            "mediciones": mediciones,
+        }
+        if secuencial:
+            # Ley de Amdahl con la parte que sigue en el proceso principal
+            fraccion = min(1.0, trabajo_por_simbolo / secuencial)
+            resultado["fraccion_paralelizable"] = round(fraccion, 3)
+            self.stdout.write(
+                f"Trabajo repartible entre workers: {trabajo_por_simbolo:.3f} s de "
+                f"{secuencial:.3f} s ({fraccion:.0%}); speedup máximo con 8 workers: "
+                f"{1 / ((1 - fraccion) + fraccion / 8):.1f}x"
+            )
+        return resultado
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-19 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacion', '0003_resultadohorariosimulacion_activo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgregadoHorarioSimulacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activo', models.CharField(max_length=80)),
+                ('inicio_bucket', models.DateTimeField()),
+                ('hora_inicio', models.TimeField()),
+                ('operaciones_ganadas', models.PositiveIntegerField(default=0)),
+                ('operaciones_perdidas', models.PositiveIntegerField(default=0)),
+                ('procesado_hasta', models.DateTimeField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Agregado horario de simulación',
+                'verbose_name_plural': 'Agregados horarios de simulación',
+                'ordering': ('activo', '-inicio_bucket'),
+                'unique_together': {('activo', 'inicio_bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-19 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacion', '0004_agregadohorariosimulacion'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='agregadohorariosimulacion',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resultadohorariosimulacion',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='agregadohorariosimulacion',
+            name='duracion_ticks',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name='resultadohorariosimulacion',
+            name='duracion_ticks',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+        migrations.AlterUniqueTogether(
+            name='agregadohorariosimulacion',
+            unique_together={('activo', 'inicio_bucket', 'duracion_ticks')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='resultadohorariosimulacion',
+            unique_together={('activo', 'hora_inicio', 'duracion_ticks', 'fecha_calculo')},
+        ),
+    ]
@@ -1,9 +1,34 @@
+import math
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
 
+from django.conf import settings
 from django.db import models
+from django.db.models import Max
 from django.utils import timezone
 
 
+def limite_inferior_wilson(ganadas: int, total: int, z: float = 1.96) -> float:
+    """
+    Límite inferior del intervalo de Wilson para la proporción ganadas/total.
+
+    Args:
+        ganadas: Operaciones ganadas
+        total: Operaciones totales
+        z: Cuantil de la normal (1.96 = 95 %)
+
+    Returns:
+        Límite inferior entre 0 y 1 (0 si no hay operaciones)
+    """
+    if total <= 0:
+        return 0.0
+    proporcion = ganadas / total
+    z2 = z * z
+    centro = proporcion + z2 / (2 * total)
+    margen = z * math.sqrt(proporcion * (1 - proporcion) / total + z2 / (4 * total * total))
+    return (centro - margen) / (1 + z2 / total)
+
+
 class ResultadoHorarioSimulacionQuerySet(models.QuerySet):
     def recientes(self):
         return self.order_by("-fecha_calculo")
@@ -11,10 +36,47 @@ class ResultadoHorarioSimulacionQuerySet(models.QuerySet):
     def mejor(self):
         return self.order_by("-winrate").first()
 
+    def mejor_duracion(
+        self, activo: str, hora_inicio, minimo_operaciones: Optional[int] = None
+    ):
+        """
+        Duración (en ticks) con mejor winrate para el activo y la hora dados,
+        según la simulación más reciente del activo.
+
+        Solo cuentan las duraciones con al menos ``minimo_operaciones``
+        operaciones simuladas (default: SIMULACION_MINIMO_OPERACIONES_DURACION),
+        y se ordenan por el límite inferior de Wilson del winrate para que una
+        duración con pocas operaciones y winrate alto no gane por azar.
+
+        Returns:
+            Duración en ticks, o None si ninguna tiene datos suficientes
+        """
+        if minimo_operaciones is None:
+            minimo_operaciones = getattr(settings, "SIMULACION_MINIMO_OPERACIONES_DURACION", 30)
+        ultima = self.filter(activo=activo).aggregate(ultima=Max("fecha_calculo"))[
+            "ultima"
+        ]
+        if ultima is None:
+            return None
+        candidatas = self.filter(
+            activo=activo,
+            hora_inicio=hora_inicio,
+            fecha_calculo=ultima,
+            total_operaciones__gte=max(1, minimo_operaciones),
+        ).values_list("duracion_ticks", "operaciones_ganadas", "total_operaciones")
+        if not candidatas:
+            return None
+        duracion, _, _ = max(
+            candidatas,
+            key=lambda fila: (limite_inferior_wilson(fila[1], fila[2]), fila[2], -fila[0]),
+        )
+        return duracion
+
 
 class ResultadoHorarioSimulacion(models.Model):
     activo = models.CharField(max_length=80, default="")
     hora_inicio = models.TimeField()
+    duracion_ticks = models.PositiveSmallIntegerField(default=5)
     total_operaciones = models.PositiveIntegerField(default=0)
     operaciones_ganadas = models.PositiveIntegerField(default=0)
     operaciones_perdidas = models.PositiveIntegerField(default=0)
@@ -28,11 +90,43 @@ class ResultadoHorarioSimulacion(models.Model):
         verbose_name = "Resultado de simulación por horario"
         verbose_name_plural = "Resultados de simulación por horario"
         ordering = ("-fecha_calculo", "-winrate")
-        unique_together = ("activo", "hora_inicio", "fecha_calculo")
+        unique_together = ("activo", "hora_inicio", "duracion_ticks", "fecha_calculo")
 
     def __str__(self) -> str:
         return f"Horario {self.hora_inicio} - Winrate {self.winrate}%"
 
+    @staticmethod
+    def calcular_winrate(ganadas: int, perdidas: int) -> Decimal:
+        total = ganadas + perdidas
+        if total == 0:
+            return Decimal("0.00")
+        return (Decimal(ganadas) / Decimal(total) * Decimal("100")).quantize(
+            Decimal("0.01"), rounding=ROUND_HALF_UP
+        )
+
+    @classmethod
+    def construir(
+        cls,
+        *,
+        activo: str,
+        hora_inicio,
+        ganadas: int,
+        perdidas: int,
+        fecha_calculo=None,
+        duracion_ticks: int = 5,
+    ):
+        """Instancia sin guardar, lista para ``guardar_lote``."""
+        return cls(
+            activo=activo,
+            hora_inicio=hora_inicio,
+            duracion_ticks=duracion_ticks,
+            total_operaciones=ganadas + perdidas,
+            operaciones_ganadas=ganadas,
+            operaciones_perdidas=perdidas,
+            winrate=cls.calcular_winrate(ganadas, perdidas),
+            fecha_calculo=fecha_calculo or timezone.now(),
+        )
+
     @classmethod
     def crear_o_actualizar(
         cls,
@@ -42,25 +136,62 @@ class ResultadoHorarioSimulacion(models.Model):
         ganadas: int,
         perdidas: int,
         fecha_calculo=None,
+        duracion_ticks: int = 5,
     ):
         fecha_calculo = fecha_calculo or timezone.now()
-        total = ganadas + perdidas
-        if total == 0:
-            winrate = Decimal("0.00")
-        else:
-            winrate = (Decimal(ganadas) / Decimal(total) * Decimal("100")).quantize(
-                Decimal("0.01"), rounding=ROUND_HALF_UP
-            )
-
         objeto, _ = cls.objects.update_or_create(
             activo=activo,
             hora_inicio=hora_inicio,
+            duracion_ticks=duracion_ticks,
             fecha_calculo=fecha_calculo,
             defaults={
-                "total_operaciones": total,
+                "total_operaciones": ganadas + perdidas,
                 "operaciones_ganadas": ganadas,
                 "operaciones_perdidas": perdidas,
-                "winrate": winrate,
+                "winrate": cls.calcular_winrate(ganadas, perdidas),
             },
         )
         return objeto
+
+    @classmethod
+    def guardar_lote(cls, resultados):
+        """Upsert de todos los resultados de una corrida en una sola sentencia."""
+        return cls.objects.bulk_create(
+            resultados,
+            update_conflicts=True,
+            unique_fields=["activo", "hora_inicio", "duracion_ticks", "fecha_calculo"],
+            update_fields=[
+                "total_operaciones",
+                "operaciones_ganadas",
+                "operaciones_perdidas",
+                "winrate",
+            ],
+        )
+
+
+class AgregadoHorarioSimulacion(models.Model):
+    """
+    Ganadas/perdidas simuladas de un símbolo en una hora de reloj concreta.
+
+    La simulación incremental mantiene estos buckets para la ventana de las
+    últimas 24 horas: cada corrida solo simula los ticks posteriores a
+    ``procesado_hasta`` y elimina los buckets que salen de la ventana.
+    """
+
+    activo = models.CharField(max_length=80)
+    inicio_bucket = models.DateTimeField()
+    hora_inicio = models.TimeField()
+    duracion_ticks = models.PositiveSmallIntegerField(default=5)
+    operaciones_ganadas = models.PositiveIntegerField(default=0)
+    operaciones_perdidas = models.PositiveIntegerField(default=0)
+    procesado_hasta = models.DateTimeField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Agregado horario de simulación"
+        verbose_name_plural = "Agregados horarios de simulación"
+        ordering = ("activo", "-inicio_bucket")
+        unique_together = ("activo", "inicio_bucket", "duracion_ticks")
+
+    def __str__(self) -> str:
+        return f"{self.activo} {self.inicio_bucket:%Y-%m-%d %H:%M}"
@@ -0,0 +1,318 @@
+"""
+Simulación de un símbolo completo, en el proceso actual o en un worker del
+pool de la simulación paralela.
+
+En un worker, cada llamada lee los ticks del símbolo con su propia conexión
+a la base de datos; en el proceso actual los recibe ya leídos por
+``iterar_ticks_por_simbolo``, una sola consulta para todos los símbolos. Con
+los ticks arma los arrays de NumPy y simula todas las duraciones; devuelve solo
+los agregados y las operaciones de la duración principal (unas pocas por
+hora), así que el proceso principal se limita a escribir los resultados.
+
+Este módulo no importa modelos a nivel de módulo: los workers arrancan con
+contexto ``spawn`` y deben poder importarlo antes de que
+``inicializar_worker`` configure Django.
+"""
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from decimal import Decimal
+from functools import reduce
+from itertools import groupby
+from operator import itemgetter, or_
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vectorizado import (
+    SimulacionVectorizada,
+    calcular_horas_locales,
+    calcular_indices_hora_local,
+    epochs_a_segundos,
+    inicio_hora_local,
+    simular_duraciones,
+)
+
+# Ganadas/perdidas por hora del día (0-23)
+ResultadosPorHora = Dict[int, Dict[str, int]]
+# (epoch inicio, epoch salida, precio inicio, precio salida, es CALL, ganada)
+OperacionSimulada = Tuple[datetime, datetime, Decimal, Decimal, bool, bool]
+# (epochs, precios) de un símbolo, en orden cronológico
+TicksSimbolo = Tuple[List[datetime], List[Decimal]]
+
+
+@dataclass
+class BucketSimulado:
+    """Ganadas/perdidas de una hora de reloj para una duración."""
+    inicio_bucket: datetime
+    hora_inicio: time
+    duracion_ticks: int
+    ganadas: int
+    perdidas: int
+
+
+@dataclass
+class SimulacionSimbolo:
+    simbolo: str
+    # Ventana completa: ganadas/perdidas por duración y hora del día
+    resultados: Dict[int, ResultadosPorHora] = field(default_factory=dict)
+    # Modo incremental: un bucket por hora de reloj y duración
+    buckets: List[BucketSimulado] = field(default_factory=list)
+    # Operaciones de la duración principal, para persistirlas
+    operaciones: List[OperacionSimulada] = field(default_factory=list)
+
+
+def cargar_ticks(
+    simbolo: str, inicio: datetime, fin: datetime, incluir_fin: bool = True
+) -> Tuple[List[datetime], List[Decimal]]:
+    from historial.models import Tick
+
+    filtro_fin = {"epoch__lte": fin} if incluir_fin else {"epoch__lt": fin}
+    filas = Tick.objects.filter(
+        activo=simbolo,
+        epoch__gte=inicio,
+        **filtro_fin,
+    ).order_by("epoch").values_list("epoch", "precio")
+    if not filas:
+        return [], []
+    epochs, precios = zip(*filas)
+    return list(epochs), list(precios)
+
+
+def iterar_ticks_por_simbolo(
+    rangos: Sequence[Tuple[str, datetime, datetime]], incluir_fin: bool = True
+) -> Iterator[Tuple[str, List[datetime], List[Decimal]]]:
+    """
+    Lee con una sola consulta los ticks de varios símbolos, cada uno en su
+    rango [inicio, fin], y los entrega símbolo por símbolo.
+
+    La consulta se recorre con ``iterator``, así que en memoria solo están
+    los ticks del símbolo en curso, como con ``cargar_ticks``. Si un símbolo
+    aparece en varios rangos se entrega una vez, con la unión de todos.
+
+    Args:
+        rangos: (símbolo, inicio, fin) de cada lectura
+        incluir_fin: False para leer [inicio, fin)
+
+    Yields:
+        (símbolo, epochs, precios) de los símbolos que tienen ticks
+    """
+    from django.db.models import Q
+
+    from historial.models import Tick
+
+    if not rangos:
+        return
+    simbolos_por_rango: Dict[Tuple[datetime, datetime], List[str]] = {}
+    for simbolo, inicio, fin in rangos:
+        simbolos_por_rango.setdefault((inicio, fin), []).append(simbolo)
+    campo_fin = "epoch__lte" if incluir_fin else "epoch__lt"
+    filtro = reduce(
+        or_,
+        (
+            Q(activo__in=simbolos, epoch__gte=inicio, **{campo_fin: fin})
+            for (inicio, fin), simbolos in simbolos_por_rango.items()
+        ),
+    )
+    filas = (
+        Tick.objects.filter(filtro)
+        .order_by("activo", "epoch")
+        .values_list("activo", "epoch", "precio")
+        .iterator(chunk_size=5000)
+    )
+    for simbolo, filas_simbolo in groupby(filas, key=itemgetter(0)):
+        _, epochs, precios = zip(*filas_simbolo)
+        yield simbolo, list(epochs), list(precios)
+
+
+def _operaciones(
+    epochs: List[datetime], precios: List[Decimal], simulacion: SimulacionVectorizada
+) -> List[OperacionSimulada]:
+    return [
+        (
+            epochs[posicion_inicio],
+            epochs[posicion_salida],
+            precios[posicion_inicio],
+            precios[posicion_salida],
+            es_call,
+            ganada,
+        )
+        for posicion_inicio, posicion_salida, es_call, ganada in zip(
+            simulacion.inicio.tolist(),
+            simulacion.salida.tolist(),
+            simulacion.es_call.tolist(),
+            simulacion.ganada.tolist(),
+        )
+    ]
+
+
+def simular_ventana(
+    simbolo: str,
+    inicio: datetime,
+    fin: datetime,
+    tz,
+    duraciones: Sequence[int],
+    operaciones_por_horario: int,
+    duracion_principal: int,
+    ticks: Optional[TicksSimbolo] = None,
+) -> Optional[SimulacionSimbolo]:
+    """
+    Simula todas las horas y duraciones del símbolo en [inicio, fin].
+
+    Args:
+        ticks: Ticks del rango ya leídos (default: se leen aquí)
+
+    Returns:
+        Agregados por duración y hora, o None si no hay ticks suficientes
+    """
+    if ticks is None:
+        ticks = cargar_ticks(simbolo, inicio, fin)
+    epochs, precios = ticks
+    if len(epochs) <= min(duraciones):
+        return None
+
+    horas = calcular_horas_locales(epochs, epochs_a_segundos(epochs), tz).astype(np.uint8)
+    simulaciones = simular_duraciones(
+        horas, np.array(precios, dtype=np.float64), duraciones, operaciones_por_horario
+    )
+    return SimulacionSimbolo(
+        simbolo=simbolo,
+        resultados={
+            duracion: {
+                hora: {
+                    "ganadas": int(simulacion.ganadas_por_hora[hora]),
+                    "perdidas": int(simulacion.perdidas_por_hora[hora]),
+                }
+                for hora in range(24)
+            }
+            for duracion, simulacion in simulaciones.items()
+        },
+        operaciones=_operaciones(epochs, precios, simulaciones[duracion_principal]),
+    )
+
+
+def simular_buckets(
+    simbolo: str,
+    desde: datetime,
+    hasta: datetime,
+    tz,
+    duraciones: Sequence[int],
+    operaciones_por_horario: int,
+    duracion_principal: int,
+    ticks: Optional[TicksSimbolo] = None,
+) -> Optional[SimulacionSimbolo]:
+    """
+    Simula los ticks de [desde, hasta) agrupados por hora de reloj local.
+
+    Args:
+        ticks: Ticks del rango ya leídos (default: se leen aquí)
+
+    Returns:
+        Un bucket por hora de reloj y duración, o None si no hay ticks
+    """
+    if ticks is None:
+        ticks = cargar_ticks(simbolo, desde, hasta, incluir_fin=False)
+    epochs, precios = ticks
+    if not epochs:
+        return None
+
+    indices = calcular_indices_hora_local(epochs, epochs_a_segundos(epochs), tz)
+    base = int(indices[0])
+    relativos = indices - base
+    horas_validas = np.unique(relativos).tolist()
+    simulaciones = simular_duraciones(
+        relativos,
+        np.array(precios, dtype=np.float64),
+        duraciones,
+        operaciones_por_horario,
+        horas_validas=horas_validas,
+    )
+
+    buckets = []
+    for relativo in horas_validas:
+        inicio_bucket = inicio_hora_local(base + relativo, tz)
+        for duracion, simulacion in simulaciones.items():
+            buckets.append(
+                BucketSimulado(
+                    inicio_bucket=inicio_bucket,
+                    hora_inicio=time(inicio_bucket.hour, 0),
+                    duracion_ticks=duracion,
+                    ganadas=int(simulacion.ganadas_por_hora[relativo]),
+                    perdidas=int(simulacion.perdidas_por_hora[relativo]),
+                )
+            )
+    operaciones = []
+    if duracion_principal in simulaciones:
+        operaciones = _operaciones(epochs, precios, simulaciones[duracion_principal])
+    return SimulacionSimbolo(simbolo=simbolo, buckets=buckets, operaciones=operaciones)
+
+
+# --- Pool de procesos ---------------------------------------------------------
+
+def inicializar_worker(nombre_bd: Optional[str] = None) -> None:
+    """
+    Prepara Django en un worker de proceso.
+
+    Args:
+        nombre_bd: Base de datos del proceso principal, si no es la de
+            settings (por ejemplo, la base de prueba de un benchmark)
+    """
+    import django
+
+    django.setup()
+    if nombre_bd:
+        from django.db import connection
+
+        connection.settings_dict["NAME"] = nombre_bd
+
+
+def ejecutar_en_worker(funcion: Callable, *args):
+    """Ejecuta ``funcion`` en el worker con una conexión a la base de datos propia."""
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        return funcion(*args)
+    finally:
+        close_old_connections()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_clave_pool: Optional[Tuple[int, str]] = None
+
+
+def obtener_pool_simulacion(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos compartido por las corridas del simulador en este
+    proceso; se crea una vez (o al cambiar ``workers`` o la base de datos)
+    para no pagar el arranque de los workers en cada pausa del bot.
+    """
+    from django.db import connection
+
+    global _pool, _clave_pool
+    clave = (workers, str(connection.settings_dict["NAME"]))
+    if _pool is not None and _clave_pool != clave:
+        cerrar_pool_simulacion()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=inicializar_worker,
+            initargs=(clave[1],),
+        )
+        _clave_pool = clave
+    return _pool
+
+
+def cerrar_pool_simulacion() -> None:
+    """Libera el pool de la simulación paralela."""
+    global _pool, _clave_pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+        _clave_pool = None
+
+
+atexit.register(cerrar_pool_simulacion)
@@ -1,19 +1,32 @@
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import time, timedelta
+from datetime import datetime, time, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 
 from core.models import ActivoPermitido
+from core.monitoreo import medir_consultas
 from core.services import GestorBotCore
 from historial.models import Operacion, Tick
 
-from .models import ResultadoHorarioSimulacion
+from .models import AgregadoHorarioSimulacion, ResultadoHorarioSimulacion
+from .paralelo import (
+    ResultadosPorHora,
+    SimulacionSimbolo,
+    ejecutar_en_worker,
+    iterar_ticks_por_simbolo,
+    obtener_pool_simulacion,
+    simular_buckets,
+    simular_ventana,
+)
 
 
 @dataclass
@@ -37,10 +50,36 @@ class SimuladorHorariosService:
         operaciones_por_horario: int = 5,
         activo: Optional[str] = None,
         duracion_ticks: int = 5,
+        vectorizado: bool = True,
+        persistir_operaciones: Optional[bool] = None,
+        workers: int = 0,
+        incremental: bool = False,
+        duraciones: Optional[Sequence[int]] = None,
     ) -> None:
         self.operaciones_por_horario = operaciones_por_horario
         self.activo = activo
         self.duracion_ticks = max(1, duracion_ticks)
+        # Duraciones evaluadas en la misma pasada. El mejor horario y las
+        # operaciones simuladas se basan en ``duracion_ticks``; el resto solo
+        # deja winrate por hora para elegir la duración del contrato.
+        self.duraciones = sorted(
+            {max(1, duracion) for duracion in duraciones or []} | {self.duracion_ticks}
+        )
+        # False = recorrer instancias de Tick con la implementación original
+        self.vectorizado = vectorizado
+        # False = guardar solo los agregados por hora, sin cada Operacion simulada
+        if persistir_operaciones is None:
+            persistir_operaciones = getattr(
+                settings, "SIMULACION_PERSISTIR_OPERACIONES", True
+            )
+        self.persistir_operaciones = persistir_operaciones
+        self._operaciones_pendientes: Dict[str, Operacion] = {}
+        # 0 = simular los símbolos uno tras otro en el proceso actual
+        self.workers = max(0, workers)
+        # True = simular solo las horas cerradas desde la última corrida
+        self.incremental = incremental
+        self._agregados_pendientes: List[AgregadoHorarioSimulacion] = []
+        self._inicio_ventana: Optional[datetime] = None
         self.channel_layer = get_channel_layer()
 
     def _obtener_activo(self) -> Optional[str]:
@@ -68,25 +107,100 @@ class SimuladorHorariosService:
             agrupados[hora_local].append(tick)
         return agrupados
 
+    def _registrar_operacion_simulada(
+        self,
+        activo: str,
+        epoch_inicio: datetime,
+        epoch_fin: datetime,
+        precio_inicio: Decimal,
+        precio_fin: Decimal,
+        direccion: str,
+        resultado: str,
+    ) -> None:
+        """Acumula la operación simulada para el upsert masivo del final de la corrida."""
+        if not self.persistir_operaciones:
+            return
+
+        diferencia = (precio_fin - precio_inicio).quantize(Decimal("0.00001"))
+
+        confianza = (
+            (abs(diferencia) / precio_inicio * Decimal("100"))
+            .quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        )
+        # Generar numero_contrato truncado a 40 caracteres máximo
+        timestamp_inicio = int(epoch_inicio.timestamp())
+        timestamp_fin = int(epoch_fin.timestamp())
+        numero_contrato = f"SIM-{timestamp_inicio}-{timestamp_fin}"
+        # Truncar si excede 40 caracteres
+        numero_contrato = numero_contrato[:40]
+
+        beneficio = (
+            abs(diferencia)
+            if resultado == Operacion.Resultado.GANADA
+            else -abs(diferencia)
+        ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+        # Mismo contrato dentro de la corrida: gana el último, como con update_or_create
+        self._operaciones_pendientes[numero_contrato] = Operacion(
+            numero_contrato=numero_contrato,
+            activo=activo,
+            direccion=direccion,
+            precio_entrada=precio_inicio,
+            precio_cierre=precio_fin,
+            monto_invertido=Decimal("0.00"),
+            confianza=confianza,
+            resultado=resultado,
+            hora_inicio=epoch_inicio,
+            hora_fin=epoch_fin,
+            beneficio=beneficio,
+            es_simulada=True,
+        )
+
+    def _persistir_operaciones(self) -> None:
+        operaciones = list(self._operaciones_pendientes.values())
+        self._operaciones_pendientes = {}
+        if not operaciones:
+            return
+        Operacion.objetos.bulk_create(
+            operaciones,
+            update_conflicts=True,
+            unique_fields=["numero_contrato"],
+            update_fields=[
+                "activo",
+                "direccion",
+                "precio_entrada",
+                "precio_cierre",
+                "monto_invertido",
+                "confianza",
+                "resultado",
+                "hora_inicio",
+                "hora_fin",
+                "beneficio",
+                "es_simulada",
+                "actualizado",
+            ],
+        )
+
     def _simular_operaciones_con_ticks(
-        self, ticks: List[Tick]
+        self, ticks: List[Tick], duracion_ticks: Optional[int] = None
     ) -> Dict[str, int]:
+        duracion = duracion_ticks or self.duracion_ticks
         ganadas = 0
         perdidas = 0
-        if len(ticks) <= self.duracion_ticks:
+        if len(ticks) <= duracion:
             return {"ganadas": ganadas, "perdidas": perdidas}
 
-        universo = max(1, len(ticks) - self.duracion_ticks)
+        universo = max(1, len(ticks) - duracion)
         paso = max(1, universo // max(1, self.operaciones_por_horario))
         operaciones_generadas = 0
 
-        for indice in range(1, len(ticks) - self.duracion_ticks, paso):
+        for indice in range(1, len(ticks) - duracion, paso):
             if operaciones_generadas >= self.operaciones_por_horario:
                 break
 
             tick_inicio = ticks[indice]
             tick_prev = ticks[indice - 1]
-            tick_salida = ticks[indice + self.duracion_ticks]
+            tick_salida = ticks[indice + duracion]
 
             precio_inicio = tick_inicio.precio
             precio_prev = tick_prev.precio
@@ -114,41 +228,16 @@ class SimuladorHorariosService:
             else:
                 resultado = Operacion.Resultado.PERDIDA
 
-            diferencia = (precio_fin - precio_inicio).quantize(Decimal("0.00001"))
-
-            confianza = (
-                (abs(diferencia) / precio_inicio * Decimal("100"))
-                .quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            )
-            # Generar numero_contrato truncado a 40 caracteres máximo
-            timestamp_inicio = int(tick_inicio.epoch.timestamp())
-            timestamp_fin = int(tick_salida.epoch.timestamp())
-            numero_contrato = f"SIM-{timestamp_inicio}-{timestamp_fin}"
-            # Truncar si excede 40 caracteres
-            numero_contrato = numero_contrato[:40]
-
-            beneficio = (
-                abs(diferencia)
-                if resultado == Operacion.Resultado.GANADA
-                else -abs(diferencia)
-            ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-            Operacion.objetos.update_or_create(
-                numero_contrato=numero_contrato,
-                defaults={
-                    "activo": tick_inicio.activo,
-                    "direccion": direccion,
-                    "precio_entrada": precio_inicio,
-                    "precio_cierre": precio_fin,
-                    "monto_invertido": Decimal("0.00"),
-                    "confianza": confianza,
-                    "resultado": resultado,
-                    "hora_inicio": tick_inicio.epoch,
-                    "hora_fin": tick_salida.epoch,
-                    "beneficio": beneficio,
-                    "es_simulada": True,
-                },
-            )
+            if duracion == self.duracion_ticks:
+                self._registrar_operacion_simulada(
+                    activo=tick_inicio.activo,
+                    epoch_inicio=tick_inicio.epoch,
+                    epoch_fin=tick_salida.epoch,
+                    precio_inicio=precio_inicio,
+                    precio_fin=precio_fin,
+                    direccion=direccion,
+                    resultado=resultado,
+                )
 
             if resultado == Operacion.Resultado.GANADA:
                 ganadas += 1
@@ -158,7 +247,282 @@ class SimuladorHorariosService:
 
         return {"ganadas": ganadas, "perdidas": perdidas}
 
-    @transaction.atomic
+    def _simular_simbolo_con_ticks(
+        self, simbolo: str, inicio: datetime, fin: datetime, tz
+    ) -> Dict[int, ResultadosPorHora]:
+        """Implementación original: instancias de Tick agrupadas por hora."""
+        ticks = list(
+            Tick.objects.filter(
+                activo=simbolo,
+                epoch__range=(inicio, fin),
+            ).order_by("epoch")
+        )
+        if len(ticks) <= self.duraciones[0]:
+            return {}
+
+        ticks_por_hora = self._agrupar_ticks_por_hora(ticks, tz)
+        return {
+            duracion: {
+                hora: self._simular_operaciones_con_ticks(
+                    ticks_por_hora.get(hora, []), duracion
+                )
+                for hora in range(24)
+            }
+            for duracion in self.duraciones
+        }
+
+    def _ejecutar_por_simbolo(
+        self, funcion: Callable, tareas: List[Tuple], incluir_fin: bool = True
+    ) -> List[Optional[SimulacionSimbolo]]:
+        """
+        Ejecuta ``funcion`` (ver ``simulacion.paralelo``) con cada tupla de
+        argumentos ``(símbolo, inicio, fin, ...)``, en este proceso o
+        repartida en el pool de workers.
+
+        Con workers, cada uno lee los ticks de su símbolo con su propia
+        conexión y arma los arrays; aquí solo se reciben agregados y
+        operaciones. En este proceso los ticks de todas las tareas se leen
+        con una sola consulta, en vez de una por símbolo. Los resultados
+        vuelven en el mismo orden que ``tareas``.
+        """
+        if self.workers > 0 and len(tareas) > 1:
+            pool = obtener_pool_simulacion(self.workers)
+            futuros = [pool.submit(ejecutar_en_worker, funcion, *args) for args in tareas]
+            return [futuro.result() for futuro in futuros]
+
+        resultados: List[Optional[SimulacionSimbolo]] = [None] * len(tareas)
+        posiciones: Dict[str, List[int]] = defaultdict(list)
+        for posicion, args in enumerate(tareas):
+            posiciones[args[0]].append(posicion)
+        rangos = [args[:3] for args in tareas]
+        for simbolo, epochs, precios in iterar_ticks_por_simbolo(rangos, incluir_fin):
+            for posicion in posiciones[simbolo]:
+                args = tareas[posicion]
+                # Un símbolo con varias tareas se leyó con la unión de sus rangos
+                desde = bisect_left(epochs, args[1])
+                hasta = (bisect_right if incluir_fin else bisect_left)(epochs, args[2])
+                resultados[posicion] = funcion(
+                    *args, ticks=(epochs[desde:hasta], precios[desde:hasta])
+                )
+        return resultados
+
+    def _registrar_simulacion(self, simulacion: SimulacionSimbolo) -> None:
+        """Registra las operaciones simuladas de la duración principal."""
+        for epoch_inicio, epoch_fin, precio_inicio, precio_fin, es_call, ganada in (
+            simulacion.operaciones
+        ):
+            self._registrar_operacion_simulada(
+                activo=simulacion.simbolo,
+                epoch_inicio=epoch_inicio,
+                epoch_fin=epoch_fin,
+                precio_inicio=precio_inicio,
+                precio_fin=precio_fin,
+                direccion=(
+                    Operacion.Direccion.CALL if es_call else Operacion.Direccion.PUT
+                ),
+                resultado=(
+                    Operacion.Resultado.GANADA if ganada else Operacion.Resultado.PERDIDA
+                ),
+            )
+
+    def _simular_simbolos_vectorizado(
+        self, simbolos: List[str], inicio: datetime, fin: datetime, tz
+    ) -> Dict[str, Dict[int, ResultadosPorHora]]:
+        """
+        Simula todas las horas y duraciones de cada símbolo sobre arrays de
+        NumPy. Los Decimal originales solo se usan para persistir las
+        operaciones.
+        """
+        tareas = [
+            (
+                simbolo,
+                inicio,
+                fin,
+                tz,
+                self.duraciones,
+                self.operaciones_por_horario,
+                self.duracion_ticks,
+            )
+            for simbolo in simbolos
+        ]
+        resultados: Dict[str, Dict[int, ResultadosPorHora]] = {}
+        for simulacion in self._ejecutar_por_simbolo(simular_ventana, tareas):
+            if simulacion is None:
+                continue
+            self._registrar_simulacion(simulacion)
+            resultados[simulacion.simbolo] = simulacion.resultados
+        return resultados
+
+    def _simular_incremental(
+        self, simbolos: List[str], ahora: datetime, tz
+    ) -> Dict[str, Dict[int, ResultadosPorHora]]:
+        """
+        Mantiene los agregados por hora de reloj de las últimas 24 horas
+        cerradas. Solo se simulan los ticks posteriores a la marca
+        ``procesado_hasta`` de cada símbolo y duración; la hora en curso se
+        simula cuando se cierra. Una duración recién agregada (sin
+        agregados) se rellena desde el inicio de la ventana aunque las demás
+        ya estén al día.
+
+        Returns:
+            Ganadas/perdidas por duración y hora del día para cada símbolo
+        """
+        hora_actual = timezone.localtime(ahora, tz).replace(
+            minute=0, second=0, microsecond=0
+        )
+        self._inicio_ventana = hora_actual - timedelta(hours=24)
+        marcas = {
+            (activo, duracion): hasta
+            for activo, duracion, hasta in (
+                AgregadoHorarioSimulacion.objects.filter(
+                    activo__in=simbolos, duracion_ticks__in=self.duraciones
+                )
+                .values("activo", "duracion_ticks")
+                .annotate(hasta=Max("procesado_hasta"))
+                .values_list("activo", "duracion_ticks", "hasta")
+            )
+        }
+
+        agregados = {
+            (activo, inicio_bucket, duracion): (hora_inicio, ganadas, perdidas)
+            for activo, inicio_bucket, duracion, hora_inicio, ganadas, perdidas in (
+                AgregadoHorarioSimulacion.objects.filter(
+                    activo__in=simbolos,
+                    inicio_bucket__gte=self._inicio_ventana,
+                    duracion_ticks__in=self.duraciones,
+                ).values_list(
+                    "activo",
+                    "inicio_bucket",
+                    "duracion_ticks",
+                    "hora_inicio",
+                    "operaciones_ganadas",
+                    "operaciones_perdidas",
+                )
+            )
+        }
+
+        # Una tarea por símbolo y marca: las duraciones al día juntas
+        tareas = []
+        for simbolo in simbolos:
+            duraciones_por_desde: Dict[datetime, List[int]] = defaultdict(list)
+            for duracion in self.duraciones:
+                marca = marcas.get((simbolo, duracion)) or self._inicio_ventana
+                desde = max(marca, self._inicio_ventana)
+                if desde < hora_actual:
+                    duraciones_por_desde[desde].append(duracion)
+            for desde, duraciones in sorted(duraciones_por_desde.items()):
+                tareas.append(
+                    (
+                        simbolo,
+                        desde,
+                        hora_actual,
+                        tz,
+                        duraciones,
+                        self.operaciones_por_horario,
+                        self.duracion_ticks,
+                    )
+                )
+
+        self._agregados_pendientes = []
+        for simulacion in self._ejecutar_por_simbolo(
+            simular_buckets, tareas, incluir_fin=False
+        ):
+            if simulacion is None:
+                continue
+            self._registrar_simulacion(simulacion)
+            for bucket in simulacion.buckets:
+                self._agregados_pendientes.append(
+                    AgregadoHorarioSimulacion(
+                        activo=simulacion.simbolo,
+                        inicio_bucket=bucket.inicio_bucket,
+                        hora_inicio=bucket.hora_inicio,
+                        duracion_ticks=bucket.duracion_ticks,
+                        operaciones_ganadas=bucket.ganadas,
+                        operaciones_perdidas=bucket.perdidas,
+                        procesado_hasta=hora_actual,
+                    )
+                )
+                agregados[
+                    (simulacion.simbolo, bucket.inicio_bucket, bucket.duracion_ticks)
+                ] = (bucket.hora_inicio, bucket.ganadas, bucket.perdidas)
+
+        resultados: Dict[str, Dict[int, ResultadosPorHora]] = {}
+        for (simbolo, _, duracion), (hora_inicio, ganadas, perdidas) in agregados.items():
+            por_hora = resultados.setdefault(simbolo, {}).setdefault(
+                duracion, {hora: {"ganadas": 0, "perdidas": 0} for hora in range(24)}
+            )
+            por_hora[hora_inicio.hour]["ganadas"] += ganadas
+            por_hora[hora_inicio.hour]["perdidas"] += perdidas
+        return resultados
+
+    def _simular_simbolos(
+        self, simbolos: List[str], inicio: datetime, fin: datetime, tz
+    ) -> Dict[str, Dict[int, ResultadosPorHora]]:
+        """Ganadas/perdidas por duración y hora del día para cada símbolo de la ventana."""
+        if self.incremental:
+            return self._simular_incremental(simbolos, fin, tz)
+        if self.vectorizado:
+            return self._simular_simbolos_vectorizado(simbolos, inicio, fin, tz)
+        return {
+            simbolo: self._simular_simbolo_con_ticks(simbolo, inicio, fin, tz)
+            for simbolo in simbolos
+        }
+
+    def _persistir_agregados(self) -> None:
+        """Expira los buckets fuera de la ventana y guarda los recién simulados."""
+        if not self.incremental:
+            return
+        AgregadoHorarioSimulacion.objects.filter(
+            inicio_bucket__lt=self._inicio_ventana
+        ).delete()
+        AgregadoHorarioSimulacion.objects.bulk_create(
+            self._agregados_pendientes,
+            update_conflicts=True,
+            unique_fields=["activo", "inicio_bucket", "duracion_ticks"],
+            update_fields=[
+                "hora_inicio",
+                "operaciones_ganadas",
+                "operaciones_perdidas",
+                "procesado_hasta",
+                "actualizado",
+            ],
+        )
+        self._agregados_pendientes = []
+
+    def _persistir_corrida(
+        self,
+        resultados_modelo: List[ResultadoHorarioSimulacion],
+        mejores_por_simbolo: List[ResultadoHorario],
+        ahora: datetime,
+    ) -> None:
+        """Escribe toda la salida de la corrida: un upsert masivo por tabla."""
+        self._persistir_operaciones()
+        ResultadoHorarioSimulacion.guardar_lote(resultados_modelo)
+
+        self._persistir_agregados()
+
+        mejores = {resultado.activo: resultado for resultado in mejores_por_simbolo}
+        activos = list(ActivoPermitido.objects.filter(nombre__in=mejores.keys()))
+        for activo in activos:
+            mejor = mejores[activo.nombre]
+            activo.winrate_simulacion = mejor.winrate
+            activo.hora_mejor_simulacion = mejor.hora
+            activo.ultima_simulacion = ahora
+        ActivoPermitido.objects.bulk_update(
+            activos,
+            ["winrate_simulacion", "hora_mejor_simulacion", "ultima_simulacion"],
+        )
+
+        if not self.activo:
+            ActivoPermitido.objects.filter(habilitado=True).exclude(
+                nombre__in=mejores.keys()
+            ).update(
+                winrate_simulacion=Decimal("0.00"),
+                hora_mejor_simulacion=None,
+                ultima_simulacion=ahora,
+            )
+
+    @medir_consultas("simulacion_horarios")
     def ejecutar(self) -> Optional[ResultadoHorario]:
         fin = timezone.now()
         inicio = fin - timedelta(hours=24)
@@ -185,93 +549,85 @@ class SimuladorHorariosService:
         if not simbolos:
             return None
 
+        self._operaciones_pendientes = {}
+        resultados_modelo: List[ResultadoHorarioSimulacion] = []
         mejores_globales: List[ResultadoHorario] = []
-        procesados: List[str] = []
+
+        resultados_por_simbolo = self._simular_simbolos(simbolos, inicio, fin, tz)
 
         for simbolo in simbolos:
-            ticks = list(
-                Tick.objects.filter(
-                    activo=simbolo,
-                    epoch__range=(inicio, fin),
-                ).order_by("epoch")
-            )
-            if len(ticks) <= self.duracion_ticks:
+            resultados_por_duracion = resultados_por_simbolo.get(simbolo)
+            if not resultados_por_duracion:
                 continue
 
-            ticks_por_hora = self._agrupar_ticks_por_hora(ticks, tz)
             mejores_resultados: List[ResultadoHorario] = []
 
-            for hora in horas:
-                data_hora = ticks_por_hora.get(hora.hour, [])
-                resultados = self._simular_operaciones_con_ticks(data_hora)
-                ganadas = resultados["ganadas"]
-                perdidas = resultados["perdidas"]
-                total = ganadas + perdidas
-                if total == 0:
-                    continue
-
-                resultado_modelo = ResultadoHorarioSimulacion.crear_o_actualizar(
-                    activo=simbolo,
-                    hora_inicio=hora,
-                    ganadas=ganadas,
-                    perdidas=perdidas,
-                    fecha_calculo=ahora,
-                )
-                mejores_resultados.append(
-                    ResultadoHorario(
+            for duracion, resultados_por_hora in resultados_por_duracion.items():
+                for hora in horas:
+                    resultados = resultados_por_hora[hora.hour]
+                    ganadas = resultados["ganadas"]
+                    perdidas = resultados["perdidas"]
+                    total = ganadas + perdidas
+                    if total == 0:
+                        continue
+
+                    resultado_modelo = ResultadoHorarioSimulacion.construir(
                         activo=simbolo,
-                        hora=hora,
-                        winrate=resultado_modelo.winrate,
-                        total_operaciones=resultado_modelo.total_operaciones,
+                        hora_inicio=hora,
                         ganadas=ganadas,
                         perdidas=perdidas,
+                        fecha_calculo=ahora,
+                        duracion_ticks=duracion,
+                    )
+                    resultados_modelo.append(resultado_modelo)
+                    if duracion != self.duracion_ticks:
+                        continue
+                    mejores_resultados.append(
+                        ResultadoHorario(
+                            activo=simbolo,
+                            hora=hora,
+                            winrate=resultado_modelo.winrate,
+                            total_operaciones=resultado_modelo.total_operaciones,
+                            ganadas=ganadas,
+                            perdidas=perdidas,
+                        )
                     )
-                )
 
             if not mejores_resultados:
                 continue
 
-            procesados.append(simbolo)
-            mejor_activo = max(
-                mejores_resultados,
-                key=lambda r: (r.winrate, r.total_operaciones),
-            )
-            mejores_globales.append(mejor_activo)
-
-            ActivoPermitido.objects.filter(nombre=simbolo).update(
-                winrate_simulacion=mejor_activo.winrate,
-                hora_mejor_simulacion=mejor_activo.hora,
-                ultima_simulacion=ahora,
+            mejores_globales.append(
+                max(
+                    mejores_resultados,
+                    key=lambda r: (r.winrate, r.total_operaciones),
+                )
             )
 
         if not mejores_globales:
+            with transaction.atomic():
+                self._persistir_operaciones()
+                self._persistir_agregados()
             return None
 
-        if not self.activo:
-            ActivoPermitido.objects.filter(habilitado=True).exclude(
-                nombre__in=procesados
-            ).update(
-                winrate_simulacion=Decimal("0.00"),
-                hora_mejor_simulacion=None,
-                ultima_simulacion=ahora,
-            )
-
         mejor_global = max(
             mejores_globales,
             key=lambda r: (r.winrate, r.total_operaciones),
         )
 
-        gestor = GestorBotCore()
-        configuracion = gestor.configuracion
-        configuracion.mejor_horario = mejor_global.hora
-        configuracion.activo_seleccionado = mejor_global.activo
-        configuracion.save(
-            update_fields=[
-                "mejor_horario",
-                "activo_seleccionado",
-                "ultima_actualizacion",
-            ]
-        )
+        with transaction.atomic():
+            self._persistir_corrida(resultados_modelo, mejores_globales, ahora)
+
+            gestor = GestorBotCore()
+            configuracion = gestor.configuracion
+            configuracion.mejor_horario = mejor_global.hora
+            configuracion.activo_seleccionado = mejor_global.activo
+            configuracion.save(
+                update_fields=[
+                    "mejor_horario",
+                    "activo_seleccionado",
+                    "ultima_actualizacion",
+                ]
+            )
 
         if self.channel_layer:
             async_to_sync(self.channel_layer.group_send)(
@@ -1,3 +1,145 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import ActivoPermitido
+from core.monitoreo import registro_consultas
+from core.monitoreo.consultas import PRESUPUESTOS_POR_DEFECTO
+from historial.models import Tick
+from simulacion.models import AgregadoHorarioSimulacion, ResultadoHorarioSimulacion
+from simulacion.services import SimuladorHorariosService
+
+CAPA_MEMORIA = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+AHORA = datetime(2026, 3, 10, 15, 20, tzinfo=dt_timezone.utc)
+
+
+def crear_ticks(simbolos, horas: int = 6, segundos_por_tick: int = 20, semilla: int = 5) -> None:
+    """Caminata aleatoria de ``horas`` horas que termina en ``AHORA``."""
+    generador = np.random.default_rng(semilla)
+    cantidad = horas * 3600 // segundos_por_tick
+    ActivoPermitido.objects.bulk_create(
+        [ActivoPermitido(nombre=simbolo, habilitado=True) for simbolo in simbolos]
+    )
+    filas = []
+    for simbolo in simbolos:
+        precios = 100 + np.cumsum(generador.normal(0, 0.05, cantidad))
+        filas.extend(
+            Tick(
+                activo=simbolo,
+                epoch=AHORA - timedelta(seconds=segundos_por_tick * (cantidad - posicion)),
+                precio=Decimal(str(round(precio, 5))),
+                pip_size=5,
+            )
+            for posicion, precio in enumerate(precios)
+        )
+    Tick.objects.bulk_create(filas)
+
+
+def agregados(duracion: int):
+    return sorted(
+        AgregadoHorarioSimulacion.objects.filter(duracion_ticks=duracion).values_list(
+            "activo", "inicio_bucket", "operaciones_ganadas", "operaciones_perdidas"
+        )
+    )
+
+
+@override_settings(CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("django.utils.timezone.now", return_value=AHORA)
+class SimulacionIncrementalTests(TestCase):
+    def setUp(self):
+        crear_ticks(["R_10", "R_25"])
+
+    def test_duracion_nueva_se_rellena_aunque_otra_este_al_dia(self, _):
+        SimuladorHorariosService(incremental=True, duraciones=[5]).ejecutar()
+        self.assertTrue(agregados(5))
+        self.assertFalse(agregados(7))
+
+        SimuladorHorariosService(incremental=True, duraciones=[5, 7]).ejecutar()
+        rellenados = agregados(7)
+
+        AgregadoHorarioSimulacion.objects.all().delete()
+        SimuladorHorariosService(incremental=True, duraciones=[5, 7]).ejecutar()
+        self.assertTrue(rellenados)
+        self.assertEqual(rellenados, agregados(7))
+
+    def test_marca_por_duracion(self, _):
+        SimuladorHorariosService(incremental=True, duraciones=[5, 7]).ejecutar()
+        marcas = set(
+            AgregadoHorarioSimulacion.objects.values_list("duracion_ticks", "procesado_hasta")
+        )
+        self.assertEqual(
+            marcas,
+            {(5, AHORA.replace(minute=0)), (7, AHORA.replace(minute=0))},
+        )
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("django.utils.timezone.now", return_value=AHORA)
+class PresupuestoSimulacionTests(TestCase):
+    """``SimuladorHorariosService.ejecutar`` con 88 activos dentro de su presupuesto."""
+
+    def setUp(self):
+        crear_ticks([f"SINT_{indice:03d}" for indice in range(88)], horas=2, segundos_por_tick=30)
+
+    def verificar_consultas(self) -> None:
+        medicion = registro_consultas.rutas["simulacion_horarios"].ultima
+        self.assertLessEqual(medicion.consultas, PRESUPUESTOS_POR_DEFECTO["simulacion_horarios"])
+        self.assertEqual(medicion.n_mas_uno(), [])
+
+    def test_simulacion_completa_dentro_del_presupuesto(self, _):
+        SimuladorHorariosService(duraciones=[5, 7]).ejecutar()
+
+        self.assertTrue(ResultadoHorarioSimulacion.objects.exists())
+        self.verificar_consultas()
+
+    def test_simulacion_incremental_dentro_del_presupuesto(self, _):
+        SimuladorHorariosService(incremental=True, duraciones=[5, 7]).ejecutar()
+        self.verificar_consultas()
+
+        SimuladorHorariosService(incremental=True, duraciones=[5, 7]).ejecutar()
+        self.verificar_consultas()
+
+
+class MejorDuracionTests(TestCase):
+    def crear(self, duracion: int, ganadas: int, perdidas: int) -> None:
+        ResultadoHorarioSimulacion.construir(
+            activo="R_10",
+            hora_inicio=time(9, 0),
+            ganadas=ganadas,
+            perdidas=perdidas,
+            fecha_calculo=AHORA,
+            duracion_ticks=duracion,
+        ).save()
+
+    def test_ignora_duraciones_con_pocas_operaciones(self):
+        self.crear(3, ganadas=4, perdidas=0)
+        self.crear(5, ganadas=120, perdidas=80)
+
+        with override_settings(SIMULACION_MINIMO_OPERACIONES_DURACION=30):
+            duracion = ResultadoHorarioSimulacion.objetos.mejor_duracion("R_10", time(9, 0))
+
+        self.assertEqual(duracion, 5)
+
+    def test_ordena_por_limite_inferior_de_wilson(self):
+        # 100 % de 4 operaciones tiene menos respaldo que 60 % de 200
+        self.crear(3, ganadas=4, perdidas=0)
+        self.crear(5, ganadas=120, perdidas=80)
+
+        duracion = ResultadoHorarioSimulacion.objetos.mejor_duracion(
+            "R_10", time(9, 0), minimo_operaciones=1
+        )
+
+        self.assertEqual(duracion, 5)
+
+    def test_sin_datos_suficientes(self):
+        self.crear(5, ganadas=10, perdidas=5)
+
+        self.assertIsNone(
+            ResultadoHorarioSimulacion.objetos.mejor_duracion(
+                "R_10", time(9, 0), minimo_operaciones=30
+            )
+        )
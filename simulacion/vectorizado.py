@@ -0,0 +1,199 @@
+"""
+Núcleo vectorizado del simulador de horarios.
+
+Trabaja sobre arrays de NumPy (epoch en segundos y precio) en lugar de
+instancias de ``Tick``: agrupa por hora local con aritmética de offsets y
+resuelve dirección y resultado de todas las operaciones simuladas con
+desplazamientos de arrays. Reproduce exactamente la lógica de
+``SimuladorHorariosService._simular_operaciones_con_ticks``.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.utils import timezone
+
+
+@dataclass
+class SimulacionVectorizada:
+    """Operaciones simuladas (posiciones en los arrays de ticks) y agregados por hora."""
+    hora: np.ndarray
+    inicio: np.ndarray
+    salida: np.ndarray
+    es_call: np.ndarray
+    ganada: np.ndarray
+    ganadas_por_hora: np.ndarray
+    perdidas_por_hora: np.ndarray
+
+
+def epochs_a_segundos(epochs: Sequence[datetime]) -> np.ndarray:
+    """Convierte una secuencia de datetimes aware a segundos desde 1970."""
+    return np.fromiter(
+        (epoch.timestamp() for epoch in epochs), dtype=np.float64, count=len(epochs)
+    )
+
+
+def calcular_indices_hora_local(
+    epochs: Sequence[datetime], segundos: np.ndarray, tz
+) -> np.ndarray:
+    """
+    Índice de la hora de reloj local de cada tick (horas desde 1970 en hora
+    local). Dos ticks comparten índice si caen en la misma hora de reloj.
+
+    Si la zona horaria tiene el mismo offset al inicio y al final del rango
+    se usa aritmética vectorizada; si hay un cambio de horario en medio se
+    recurre a ``timezone.localtime`` tick por tick.
+    """
+    if not len(epochs):
+        return np.empty(0, dtype=np.int64)
+    offset_inicio = timezone.localtime(epochs[0], tz).utcoffset()
+    offset_fin = timezone.localtime(epochs[-1], tz).utcoffset()
+    if offset_inicio == offset_fin:
+        locales = segundos + offset_inicio.total_seconds()
+        return np.floor_divide(locales, 3600).astype(np.int64)
+    return np.fromiter(
+        (
+            int(timezone.localtime(epoch, tz).replace(tzinfo=dt_timezone.utc).timestamp())
+            // 3600
+            for epoch in epochs
+        ),
+        dtype=np.int64,
+        count=len(epochs),
+    )
+
+
+def inicio_hora_local(indice: int, tz) -> datetime:
+    """Datetime aware del inicio de la hora local con el índice dado."""
+    naive = datetime.fromtimestamp(indice * 3600, dt_timezone.utc).replace(tzinfo=None)
+    return timezone.make_aware(naive, tz)
+
+
+def calcular_horas_locales(
+    epochs: Sequence[datetime], segundos: np.ndarray, tz
+) -> np.ndarray:
+    """Hora local (0-23) de cada tick."""
+    return calcular_indices_hora_local(epochs, segundos, tz) % 24
+
+
+def indices_operaciones(
+    cantidad_ticks: int, duracion_ticks: int, operaciones_por_horario: int
+) -> np.ndarray:
+    """
+    Posiciones (dentro de una hora) donde se abre cada operación simulada.
+    Mismo muestreo que el simulador original: paso uniforme desde el índice 1.
+    """
+    if cantidad_ticks <= duracion_ticks:
+        return np.empty(0, dtype=np.int64)
+    universo = max(1, cantidad_ticks - duracion_ticks)
+    paso = max(1, universo // max(1, operaciones_por_horario))
+    return np.arange(1, cantidad_ticks - duracion_ticks, paso, dtype=np.int64)[
+        :operaciones_por_horario
+    ]
+
+
+def simular_por_hora(
+    horas: np.ndarray,
+    precios: np.ndarray,
+    duracion_ticks: int,
+    operaciones_por_horario: int,
+    horas_validas: Optional[List[int]] = None,
+) -> SimulacionVectorizada:
+    """
+    Simula las operaciones de todas las horas de un símbolo a la vez.
+
+    Args:
+        horas: Hora local de cada tick (ordenados por epoch) o cualquier
+            etiqueta entera no negativa que agrupe los ticks
+        precios: Precio de cada tick (float)
+        duracion_ticks: Duración del contrato en ticks
+        operaciones_por_horario: Máximo de operaciones por hora
+        horas_validas: Horas a simular (por defecto 0-23)
+
+    Returns:
+        SimulacionVectorizada con posiciones globales de entrada/salida
+    """
+    return simular_duraciones(
+        horas, precios, [duracion_ticks], operaciones_por_horario, horas_validas
+    )[duracion_ticks]
+
+
+def simular_duraciones(
+    horas: np.ndarray,
+    precios: np.ndarray,
+    duraciones: Sequence[int],
+    operaciones_por_horario: int,
+    horas_validas: Optional[List[int]] = None,
+) -> Dict[int, SimulacionVectorizada]:
+    """
+    Simula varias duraciones de contrato en una sola pasada.
+
+    La agrupación por hora, los precios de cada hora y la dirección de cada
+    tick (sube/baja respecto al anterior) se calculan una vez y se reutilizan
+    para todas las duraciones.
+
+    Args:
+        horas: Hora local de cada tick (ver ``simular_por_hora``)
+        precios: Precio de cada tick (float)
+        duraciones: Duraciones de contrato en ticks
+        operaciones_por_horario: Máximo de operaciones por hora
+        horas_validas: Horas a simular (por defecto 0-23)
+
+    Returns:
+        SimulacionVectorizada por duración
+    """
+    partes: Dict[int, Dict[str, List[np.ndarray]]] = {
+        duracion: {"hora": [], "inicio": [], "salida": [], "es_call": [], "ganada": []}
+        for duracion in duraciones
+    }
+    for hora in horas_validas if horas_validas is not None else range(24):
+        posiciones = np.flatnonzero(horas == hora)
+        if posiciones.size < 2:
+            continue
+        precios_hora = precios[posiciones]
+        # Sin movimiento previo se asume CALL (igual que el simulador original)
+        sube = precios_hora[1:] >= precios_hora[:-1]
+        for duracion in duraciones:
+            locales = indices_operaciones(
+                len(posiciones), duracion, operaciones_por_horario
+            )
+            if not locales.size:
+                continue
+            precio_inicio = precios_hora[locales]
+            precio_fin = precios_hora[locales + duracion]
+            es_call = sube[locales - 1]
+            acumulado = partes[duracion]
+            acumulado["hora"].append(np.full(locales.size, hora, dtype=np.int64))
+            acumulado["inicio"].append(posiciones[locales])
+            acumulado["salida"].append(posiciones[locales + duracion])
+            acumulado["es_call"].append(es_call)
+            acumulado["ganada"].append(
+                np.where(es_call, precio_fin > precio_inicio, precio_fin < precio_inicio)
+            )
+
+    minimo = max(24, int(horas.max()) + 1) if horas.size else 24
+    resultados: Dict[int, SimulacionVectorizada] = {}
+    for duracion, acumulado in partes.items():
+        if acumulado["hora"]:
+            hora_op, inicio, salida, es_call, ganada = (
+                np.concatenate(acumulado[clave])
+                for clave in ("hora", "inicio", "salida", "es_call", "ganada")
+            )
+        else:
+            hora_op = inicio = salida = np.empty(0, dtype=np.int64)
+            es_call = ganada = np.empty(0, dtype=bool)
+        ganadas_por_hora = np.bincount(
+            hora_op, weights=ganada, minlength=minimo
+        ).astype(np.int64)
+        totales_por_hora = np.bincount(hora_op, minlength=minimo).astype(np.int64)
+        resultados[duracion] = SimulacionVectorizada(
+            hora=hora_op,
+            inicio=inicio,
+            salida=salida,
+            es_call=es_call,
+            ganada=ganada,
+            ganadas_por_hora=ganadas_por_hora,
+            perdidas_por_hora=totales_por_hora - ganadas_por_hora,
+        )
+    return resultados
@@ -29,6 +29,7 @@ class ResultadosSimulacionView(APIView):
                 .values(
                     "activo",
                     "hora_inicio",
+                    "duracion_ticks",
                     "total_operaciones",
                     "operaciones_ganadas",
                     "operaciones_perdidas",
@@ -39,6 +40,7 @@ class ResultadosSimulacionView(APIView):
                 {
                     "activo": fila["activo"],
                     "hora_inicio": fila["hora_inicio"].strftime("%H:%M"),
+                    "duracion_ticks": fila["duracion_ticks"],
                     "total_operaciones": fila["total_operaciones"],
                     "operaciones_ganadas": fila["operaciones_ganadas"],
                     "operaciones_perdidas": fila["operaciones_perdidas"],
@@ -33,6 +33,8 @@ const formatoFechaCorta = new Intl.DateTimeFormat("es-CO", {
 
 let socketConexion = null;
 let socketDashboard = null;  // Nueva conexión para el dashboard
+let secuenciaDashboard = null;  // Última secuencia aplicada del difusor
+let snapshotDashboard = null;  // Estado del dashboard sobre el que se aplican los deltas
 let refrescoEnCurso = false;
 let refrescoPendiente = false;
 let temporizadorIntervalo = null;
@@ -422,36 +424,82 @@ function manejarMensajeTiempoReal(data) {
 }
 
 function manejarActualizacionDashboard(data) {
-  if (!data || data.tipo !== "actualizacion_completa") return;
-  
-  console.log("[Dashboard] Actualización recibida:", data.timestamp);
-  
-  // Actualizar estado del bot
-  if (data.estado) {
-    actualizarEstadoBot(data.estado);
+  if (!data) return;
+  if (data.tipo === "actualizacion_completa") {
+    aplicarSnapshotDashboard(data);
+  } else if (data.tipo === "actualizacion_delta") {
+    aplicarDeltaDashboard(data);
   }
-  
-  // Actualizar winrate
-  if (data.winrate) {
-    actualizarWinrate(data.winrate);
+}
+
+function aplicarSnapshotDashboard(data) {
+  console.log("[Dashboard] Actualización completa:", data.timestamp);
+
+  // Secuencia null: el servidor aún no vio ningún delta, se acepta el próximo
+  secuenciaDashboard = data.secuencia ?? null;
+  snapshotDashboard = {
+    estado: { ...(data.estado || {}) },
+    winrate: { ...(data.winrate || {}) },
+    estadisticas: { ...(data.estadisticas || {}) },
+    temporizador: { ...(data.temporizador || {}) },
+    operaciones: [...(data.operaciones || [])],
+  };
+
+  // Solo llegan las secciones a las que está suscrito el socket
+  if (data.estado) actualizarEstadoBot(snapshotDashboard.estado);
+  if (data.winrate) actualizarWinrate(snapshotDashboard.winrate);
+  if (data.estadisticas) actualizarEstadisticas(snapshotDashboard.estadisticas);
+  if (data.operaciones) actualizarOperaciones(snapshotDashboard.operaciones);
+  if (data.temporizador) actualizarTemporizador(snapshotDashboard.temporizador);
+  actualizarSelloTemporal();
+}
+
+function pedirResyncDashboard() {
+  secuenciaDashboard = null;
+  snapshotDashboard = null;
+  if (socketDashboard && socketDashboard.readyState === WebSocket.OPEN) {
+    socketDashboard.send(JSON.stringify({ tipo: "resync" }));
   }
-  
-  // Actualizar estadísticas
-  if (data.estadisticas) {
-    actualizarEstadisticas(data.estadisticas);
+}
+
+function aplicarDeltaDashboard(data) {
+  if (!snapshotDashboard) return;  // Esperando la instantánea completa
+  // Deltas ya incluidos en la instantánea recibida
+  if (secuenciaDashboard !== null && data.secuencia <= secuenciaDashboard) return;
+  if (secuenciaDashboard !== null && data.secuencia !== secuenciaDashboard + 1) {
+    console.warn(
+      `[Dashboard] Salto de secuencia (${secuenciaDashboard} -> ${data.secuencia}), resincronizando.`
+    );
+    pedirResyncDashboard();
+    return;
+  }
+  secuenciaDashboard = data.secuencia;
+  const cambios = data.cambios || {};
+
+  if (cambios.estado) {
+    Object.assign(snapshotDashboard.estado, cambios.estado);
+    actualizarEstadoBot(snapshotDashboard.estado);
+  }
+  if (cambios.winrate) {
+    Object.assign(snapshotDashboard.winrate, cambios.winrate);
+    actualizarWinrate(snapshotDashboard.winrate);
   }
-  
-  // Actualizar operaciones
-  if (data.operaciones) {
-    actualizarOperaciones(data.operaciones);
+  if (cambios.estadisticas) {
+    Object.assign(snapshotDashboard.estadisticas, cambios.estadisticas);
+    actualizarEstadisticas(snapshotDashboard.estadisticas);
   }
-  
-  // Actualizar temporizador
-  if (data.temporizador) {
-    actualizarTemporizador(data.temporizador);
+  if (cambios.operaciones || cambios.operaciones_ids) {
+    const porId = new Map(snapshotDashboard.operaciones.map((op) => [op.id, op]));
+    (cambios.operaciones || []).forEach((op) => porId.set(op.id, op));
+    const ids = cambios.operaciones_ids || snapshotDashboard.operaciones.map((op) => op.id);
+    snapshotDashboard.operaciones = ids.map((id) => porId.get(id)).filter(Boolean);
+    actualizarOperaciones(snapshotDashboard.operaciones);
   }
-  
-  // Actualizar sello temporal
+  if (cambios.temporizador) {
+    Object.assign(snapshotDashboard.temporizador, cambios.temporizador);
+    actualizarTemporizador(snapshotDashboard.temporizador);
+  }
+
   actualizarSelloTemporal();
 }
 
@@ -493,6 +541,9 @@ function iniciarSocketDashboard() {
 
   socketDashboard.onopen = () => {
     console.info("[Dashboard] Conectado al canal de actualizaciones en tiempo real.");
+    // El servidor envía la instantánea completa al conectar
+    secuenciaDashboard = null;
+    snapshotDashboard = null;
   };
 
   socketDashboard.onmessage = (event) => {
@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from .models import CooldownActivo, IndicadoresActivo, RendimientoActivo, TickCache
+from .models import (
+    CooldownActivo,
+    IndicadoresActivo,
+    OperacionVirtual,
+    RendimientoActivo,
+    TickCache,
+)
 
 
 @admin.register(TickCache)
@@ -162,3 +168,19 @@ class CooldownActivoAdmin(admin.ModelAdmin):
         if obj.motivo and len(obj.motivo) > 40:
             obj.motivo = obj.motivo[:40]
         super().save_model(request, obj, form, change)
+
+
+@admin.register(OperacionVirtual)
+class OperacionVirtualAdmin(admin.ModelAdmin):
+    list_display = (
+        "variante",
+        "activo",
+        "direccion",
+        "score",
+        "resultado",
+        "hora_decision",
+        "hora_cierre",
+    )
+    list_filter = ("variante", "resultado", "direccion")
+    search_fields = ("variante", "activo")
+    ordering = ("-hora_decision",)
@@ -0,0 +1,33 @@
+"""
+Backtesting del motor profesional sobre el historial de ticks.
+"""
+
+from .barrido import ejecutar_barrido, generar_grilla, generar_ventanas
+from .datos import HistoricoTicks, cargar_historico, precalcular_indicadores
+from .motor import (
+    BrokerSimulado,
+    ConfiguracionBacktest,
+    CuentaSimulada,
+    MotorBacktest,
+    OperacionBacktest,
+    ParametrosEstrategia,
+    ResultadoBacktest,
+    ResumenBacktest,
+)
+
+__all__ = [
+    "BrokerSimulado",
+    "ConfiguracionBacktest",
+    "CuentaSimulada",
+    "HistoricoTicks",
+    "MotorBacktest",
+    "OperacionBacktest",
+    "ParametrosEstrategia",
+    "ResultadoBacktest",
+    "ResumenBacktest",
+    "cargar_historico",
+    "ejecutar_barrido",
+    "generar_grilla",
+    "generar_ventanas",
+    "precalcular_indicadores",
+]
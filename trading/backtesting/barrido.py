@@ -0,0 +1,307 @@
+"""
+Barrido walk-forward de parámetros de estrategia sobre el backtest.
+
+Cada configuración de la grilla se evalúa en ventanas móviles de
+entrenamiento/prueba. Los ticks y los indicadores precalculados (uno por
+``periodo_analisis``) se publican una sola vez en memoria compartida y los
+workers de proceso los leen sin copiarlos ni recalcularlos.
+"""
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from trading.evaluacion_paralela import inicializar_worker_proceso
+from trading.ranking.scorer import PesosScoring
+from trading.ranking.vectorizado import vector_pesos
+
+from .datos import HistoricoTicks, precalcular_indicadores
+from .motor import ConfiguracionBacktest, MotorBacktest, ParametrosEstrategia, ResumenBacktest
+
+# Datos compartidos ya adjuntados en cada worker: {nombre: (memoria, histórico, indicadores)}
+_DATOS_ADJUNTOS: Dict[str, Tuple[SharedMemory, HistoricoTicks, Dict[int, List[np.ndarray]]]] = {}
+
+
+@dataclass
+class VentanaWalkForward:
+    indice: int
+    inicio_entrenamiento: float
+    inicio_prueba: float
+    fin_prueba: float
+
+
+@dataclass
+class DescriptorDatos:
+    """Ubicación de los arrays de un HistoricoTicks e indicadores en memoria compartida."""
+    nombre: str
+    simbolos: List[str]
+    periodos: List[int]
+    arrays: List[Tuple[int, Tuple[int, ...], str]]  # (desplazamiento, forma, dtype)
+
+
+@dataclass
+class ResultadoConfiguracion:
+    parametros: ParametrosEstrategia
+    entrenamiento: List[ResumenBacktest] = field(default_factory=list)
+    prueba: List[ResumenBacktest] = field(default_factory=list)
+
+    @staticmethod
+    def _total(resumenes: List[ResumenBacktest], atributo: str):
+        return sum((getattr(resumen, atributo) for resumen in resumenes), Decimal("0.00"))
+
+    @property
+    def beneficio_entrenamiento(self) -> Decimal:
+        return self._total(self.entrenamiento, "beneficio_neto")
+
+    @property
+    def beneficio_prueba(self) -> Decimal:
+        return self._total(self.prueba, "beneficio_neto")
+
+    @property
+    def operaciones_prueba(self) -> int:
+        return sum(resumen.operaciones for resumen in self.prueba)
+
+    @property
+    def winrate_prueba(self) -> Decimal:
+        operaciones = self.operaciones_prueba
+        if not operaciones:
+            return Decimal("0.00")
+        ganadas = sum(resumen.ganadas for resumen in self.prueba)
+        return (Decimal(ganadas) / Decimal(operaciones) * Decimal("100")).quantize(Decimal("0.01"))
+
+    @property
+    def drawdown_prueba(self) -> Decimal:
+        return max((resumen.drawdown_maximo for resumen in self.prueba), default=Decimal("0.00"))
+
+    @property
+    def ventanas_positivas(self) -> int:
+        return sum(1 for resumen in self.prueba if resumen.beneficio_neto > 0)
+
+
+def generar_ventanas(
+    inicio: float,
+    fin: float,
+    segundos_entrenamiento: float,
+    segundos_prueba: float,
+    segundos_paso: Optional[float] = None,
+) -> List[VentanaWalkForward]:
+    """
+    Ventanas móviles: entrenamiento seguido inmediatamente de prueba.
+
+    Args:
+        inicio: Epoch inicial del historial
+        fin: Epoch final del historial
+        segundos_entrenamiento: Largo del tramo de entrenamiento
+        segundos_prueba: Largo del tramo de prueba (fuera de muestra)
+        segundos_paso: Desplazamiento entre ventanas (por defecto el tramo de prueba)
+    """
+    paso = segundos_paso or segundos_prueba
+    ventanas = []
+    inicio_entrenamiento = inicio
+    while inicio_entrenamiento + segundos_entrenamiento + segundos_prueba <= fin:
+        inicio_prueba = inicio_entrenamiento + segundos_entrenamiento
+        ventanas.append(
+            VentanaWalkForward(
+                indice=len(ventanas),
+                inicio_entrenamiento=inicio_entrenamiento,
+                inicio_prueba=inicio_prueba,
+                fin_prueba=inicio_prueba + segundos_prueba,
+            )
+        )
+        inicio_entrenamiento += paso
+    return ventanas
+
+
+def generar_grilla(
+    periodos: Sequence[int] = (20,),
+    umbrales_score: Sequence[Decimal] = (Decimal("40.00"),),
+    umbrales_consistencia: Sequence[Decimal] = (Decimal("30.00"),),
+    umbrales_volatilidad: Sequence[Decimal] = (Decimal("0.001"),),
+    umbrales_confianza: Sequence[Decimal] = (Decimal("45.00"),),
+    pesos: Sequence = (PesosScoring,),
+) -> List[ParametrosEstrategia]:
+    """Producto cartesiano de los valores de cada parámetro."""
+    return [
+        ParametrosEstrategia(
+            periodo_analisis=periodo,
+            umbral_score_minimo=score,
+            umbral_consistencia=consistencia,
+            umbral_volatilidad_minima=volatilidad,
+            umbral_confianza_horaria=confianza,
+            pesos=vector_pesos(vector),
+        )
+        for periodo, score, consistencia, volatilidad, confianza, vector in itertools.product(
+            periodos,
+            umbrales_score,
+            umbrales_consistencia,
+            umbrales_volatilidad,
+            umbrales_confianza,
+            pesos,
+        )
+    ]
+
+
+def publicar_datos(
+    historico: HistoricoTicks, indicadores: Dict[int, List[np.ndarray]]
+) -> Tuple[SharedMemory, DescriptorDatos]:
+    """
+    Copia ticks e indicadores a un único bloque de memoria compartida.
+
+    El llamador es dueño del bloque y debe cerrarlo y liberarlo (``unlink``).
+    """
+    periodos = sorted(indicadores)
+    arrays = list(historico.epochs) + list(historico.unidades)
+    for periodo in periodos:
+        arrays.extend(indicadores[periodo])
+
+    ubicaciones = []
+    desplazamiento = 0
+    for array in arrays:
+        ubicaciones.append((desplazamiento, array.shape, array.dtype.str))
+        desplazamiento += -(-array.nbytes // 8) * 8  # Alineado a 8 bytes
+    memoria = SharedMemory(create=True, size=max(8, desplazamiento))
+    for array, (inicio, forma, tipo) in zip(arrays, ubicaciones):
+        np.ndarray(forma, dtype=tipo, buffer=memoria.buf, offset=inicio)[...] = array
+
+    descriptor = DescriptorDatos(
+        nombre=memoria.name,
+        simbolos=list(historico.simbolos),
+        periodos=periodos,
+        arrays=ubicaciones,
+    )
+    return memoria, descriptor
+
+
+def adjuntar_datos(
+    descriptor: DescriptorDatos,
+) -> Tuple[HistoricoTicks, Dict[int, List[np.ndarray]]]:
+    """Vistas de solo lectura sobre los datos publicados (una vez por proceso)."""
+    if descriptor.nombre not in _DATOS_ADJUNTOS:
+        memoria = SharedMemory(name=descriptor.nombre)
+        vistas = []
+        for inicio, forma, tipo in descriptor.arrays:
+            vista = np.ndarray(forma, dtype=tipo, buffer=memoria.buf, offset=inicio)
+            vista.flags.writeable = False
+            vistas.append(vista)
+
+        n = len(descriptor.simbolos)
+        historico = HistoricoTicks(
+            simbolos=descriptor.simbolos,
+            epochs=vistas[:n],
+            unidades=vistas[n:2 * n],
+        )
+        indicadores = {
+            periodo: vistas[(2 + posicion) * n:(3 + posicion) * n]
+            for posicion, periodo in enumerate(descriptor.periodos)
+        }
+        _DATOS_ADJUNTOS[descriptor.nombre] = (memoria, historico, indicadores)
+    _, historico, indicadores = _DATOS_ADJUNTOS[descriptor.nombre]
+    return historico, indicadores
+
+
+def evaluar_configuracion(
+    historico: HistoricoTicks,
+    indicadores: Dict[int, List[np.ndarray]],
+    parametros: ParametrosEstrategia,
+    configuracion: ConfiguracionBacktest,
+    ventanas: Sequence[VentanaWalkForward],
+) -> ResultadoConfiguracion:
+    """Ejecuta una configuración en los tramos de entrenamiento y prueba de cada ventana."""
+    motor = MotorBacktest(
+        historico,
+        parametros,
+        configuracion,
+        indicadores=indicadores[parametros.periodo_analisis],
+    )
+    resultado = ResultadoConfiguracion(parametros=parametros)
+    for ventana in ventanas:
+        resultado.entrenamiento.append(
+            motor.ejecutar(ventana.inicio_entrenamiento, ventana.inicio_prueba).resumen
+        )
+        resultado.prueba.append(
+            motor.ejecutar(ventana.inicio_prueba, ventana.fin_prueba).resumen
+        )
+    return resultado
+
+
+def _evaluar_configuracion_compartida(
+    descriptor: DescriptorDatos,
+    parametros: ParametrosEstrategia,
+    configuracion: ConfiguracionBacktest,
+    ventanas: Sequence[VentanaWalkForward],
+) -> ResultadoConfiguracion:
+    """Tarea de worker: adjunta los datos compartidos y evalúa la configuración."""
+    historico, indicadores = adjuntar_datos(descriptor)
+    return evaluar_configuracion(historico, indicadores, parametros, configuracion, ventanas)
+
+
+def ordenar_resultados(resultados: List[ResultadoConfiguracion]) -> List[ResultadoConfiguracion]:
+    """Ranking por beneficio fuera de muestra, luego winrate y menor drawdown."""
+    return sorted(
+        resultados,
+        key=lambda r: (r.beneficio_prueba, r.winrate_prueba, -r.drawdown_prueba),
+        reverse=True,
+    )
+
+
+def ejecutar_barrido(
+    historico: HistoricoTicks,
+    grilla: Sequence[ParametrosEstrategia],
+    ventanas: Sequence[VentanaWalkForward],
+    configuracion: Optional[ConfiguracionBacktest] = None,
+    workers: int = 0,
+) -> List[ResultadoConfiguracion]:
+    """
+    Evalúa la grilla completa y devuelve los resultados ordenados.
+
+    Args:
+        historico: Ticks cargados con ``cargar_historico``
+        grilla: Configuraciones a evaluar (ver ``generar_grilla``)
+        ventanas: Ventanas walk-forward (ver ``generar_ventanas``)
+        configuracion: Condiciones de la cuenta y del broker simulado
+        workers: Procesos en paralelo (0 = secuencial en este proceso)
+
+    Returns:
+        Resultados por configuración, mejor primero
+    """
+    configuracion = configuracion or ConfiguracionBacktest()
+    # Los indicadores dependen solo del periodo: una vez por periodo distinto
+    indicadores = {
+        periodo: precalcular_indicadores(historico, periodo)
+        for periodo in sorted({parametros.periodo_analisis for parametros in grilla})
+    }
+
+    if workers <= 0:
+        resultados = [
+            evaluar_configuracion(historico, indicadores, parametros, configuracion, ventanas)
+            for parametros in grilla
+        ]
+        return ordenar_resultados(resultados)
+
+    memoria, descriptor = publicar_datos(historico, indicadores)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=inicializar_worker_proceso,
+        ) as pool:
+            futuros = [
+                pool.submit(
+                    _evaluar_configuracion_compartida,
+                    descriptor,
+                    parametros,
+                    configuracion,
+                    ventanas,
+                )
+                for parametros in grilla
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+    finally:
+        memoria.close()
+        memoria.unlink()
+    return ordenar_resultados(resultados)
@@ -0,0 +1,87 @@
+"""
+Carga del historial de ticks en arrays compactos para el backtesting.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from historial.models import Tick
+from trading.signals.vectorizado import calcular_indicadores_serie, precios_a_unidades
+
+
+@dataclass
+class HistoricoTicks:
+    """Ticks por símbolo: epoch en segundos (float64) y precio en unidades enteras."""
+    simbolos: List[str]
+    epochs: List[np.ndarray]
+    unidades: List[np.ndarray]
+
+    @property
+    def inicio(self) -> Optional[float]:
+        primeros = [epochs[0] for epochs in self.epochs if epochs.size]
+        return min(primeros) if primeros else None
+
+    @property
+    def fin(self) -> Optional[float]:
+        ultimos = [epochs[-1] for epochs in self.epochs if epochs.size]
+        return max(ultimos) if ultimos else None
+
+    @property
+    def total_ticks(self) -> int:
+        return sum(epochs.size for epochs in self.epochs)
+
+
+def cargar_historico(
+    simbolos: Sequence[str],
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    tamano_lote: int = 20000,
+) -> HistoricoTicks:
+    """
+    Lee los ticks de los símbolos en streaming (sin instanciar modelos) y
+    los deja en arrays por símbolo.
+
+    Args:
+        simbolos: Símbolos a cargar (el orden se conserva)
+        desde: Epoch mínimo (inclusive)
+        hasta: Epoch máximo (inclusive)
+        tamano_lote: Filas por lote del cursor de la base de datos
+
+    Returns:
+        HistoricoTicks con los ticks ordenados por epoch
+    """
+    filtros = {"activo__in": list(simbolos)}
+    if desde is not None:
+        filtros["epoch__gte"] = desde
+    if hasta is not None:
+        filtros["epoch__lte"] = hasta
+
+    epochs: Dict[str, List[float]] = {simbolo: [] for simbolo in simbolos}
+    precios: Dict[str, List[float]] = {simbolo: [] for simbolo in simbolos}
+    filas = (
+        Tick.objects.filter(**filtros)
+        .order_by("activo", "epoch")
+        .values_list("activo", "epoch", "precio")
+        .iterator(chunk_size=tamano_lote)
+    )
+    for activo, epoch, precio in filas:
+        epochs[activo].append(epoch.timestamp())
+        precios[activo].append(float(precio))
+
+    return HistoricoTicks(
+        simbolos=list(simbolos),
+        epochs=[np.array(epochs[simbolo], dtype=np.float64) for simbolo in simbolos],
+        unidades=[precios_a_unidades(precios[simbolo]) for simbolo in simbolos],
+    )
+
+
+def precalcular_indicadores(historico: HistoricoTicks, periodo: int) -> List[np.ndarray]:
+    """
+    Indicadores de cada tick de cada símbolo para un ``periodo_analisis``.
+
+    El resultado solo depende del historial y del periodo, por lo que puede
+    compartirse entre corridas con distintos umbrales o pesos.
+    """
+    return [calcular_indicadores_serie(unidades, periodo) for unidades in historico.unidades]
@@ -0,0 +1,521 @@
+"""
+Backtest determinista del MotorTradingProfesional sobre el historial de ticks.
+
+Reproduce el ciclo del motor (filtros de cooldown y límites, filtros de
+mercado, scoring con confianza horaria, dirección y monto adaptativo) y la
+gestión de meta/stop-loss de ``ConfiguracionBot`` sin tocar la base de datos.
+Los contratos se liquidan con un broker simulado que usa los ticks
+siguientes a la entrada.
+"""
+import time as reloj
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.utils import timezone
+
+from core.models import ConfiguracionBot
+from historial.models import Operacion
+from trading.ranking.scorer import PesosScoring
+from trading.ranking.vectorizado import (
+    COL_MOMENTUM,
+    COL_VOLATILIDAD,
+    COL_CONSISTENCIA,
+    calcular_cotas_superiores,
+    calcular_scores_vectorizados,
+    seleccionar_top_k,
+)
+from trading.risk.gestor_riesgo import calcular_monto_adaptativo
+from trading.signals.vectorizado import COL_DIRECCION, ESCALA_PRECIO
+
+from .datos import HistoricoTicks, precalcular_indicadores
+
+SEGUNDOS_HORA = 3600
+SEGUNDOS_DIA = 86400
+
+
+@dataclass
+class ParametrosEstrategia:
+    """Parámetros de decisión del motor (mismos valores por defecto)."""
+    periodo_analisis: int = 20
+    umbral_score_minimo: Decimal = Decimal("40.00")
+    umbral_consistencia: Decimal = Decimal("30.00")
+    umbral_volatilidad_minima: Decimal = Decimal("0.001")
+    umbral_confianza_horaria: Decimal = Decimal("45.00")
+    max_trades_por_activo: int = 1
+    pesos: object = PesosScoring
+
+    @classmethod
+    def desde_motor(cls, motor) -> "ParametrosEstrategia":
+        """Copia la configuración de una instancia de MotorTradingProfesional."""
+        return cls(
+            periodo_analisis=motor.periodo_analisis,
+            umbral_score_minimo=motor.umbral_score_minimo,
+            umbral_consistencia=motor.umbral_consistencia,
+            umbral_volatilidad_minima=motor.umbral_volatilidad_minima,
+            umbral_confianza_horaria=motor.umbral_confianza_horaria,
+            max_trades_por_activo=motor.max_trades_por_activo,
+        )
+
+
+@dataclass
+class ConfiguracionBacktest:
+    """Condiciones de la simulación (cuenta, broker y ritmo de ciclos)."""
+    balance_inicial: Decimal = Decimal("1000.00")
+    intervalo_ciclo: int = 60  # Segundos entre ciclos (--intervalo de ejecutar_bot)
+    duracion_contrato_ticks: int = 5
+    pago_ganancia: Decimal = Decimal("0.95")  # Beneficio por unidad invertida
+    horas_pausa: int = 24
+    cooldown_micro_congestion_minutos: int = 5
+
+
+@dataclass
+class OperacionBacktest:
+    numero: int
+    activo: str
+    direccion: str
+    score: Decimal
+    monto: Decimal
+    hora_inicio: datetime
+    hora_fin: datetime
+    precio_entrada: Decimal
+    precio_cierre: Decimal
+    resultado: str
+    beneficio: Decimal
+    balance: Decimal
+
+
+@dataclass
+class ResumenBacktest:
+    ciclos: int = 0
+    operaciones: int = 0
+    ganadas: int = 0
+    perdidas: int = 0
+    winrate: Decimal = Decimal("0.00")
+    beneficio_neto: Decimal = Decimal("0.00")
+    balance_inicial: Decimal = Decimal("0.00")
+    balance_final: Decimal = Decimal("0.00")
+    drawdown_maximo: Decimal = Decimal("0.00")
+    pausas: int = 0
+    segundos_simulados: float = 0.0
+    segundos_ejecucion: float = 0.0
+    estadisticas: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def factor_velocidad(self) -> float:
+        """Segundos de mercado simulados por segundo de ejecución."""
+        if self.segundos_ejecucion <= 0:
+            return 0.0
+        return self.segundos_simulados / self.segundos_ejecucion
+
+
+@dataclass
+class ResultadoBacktest:
+    operaciones: List[OperacionBacktest]
+    resumen: ResumenBacktest
+
+
+@dataclass
+class Liquidacion:
+    epoch_entrada: float
+    epoch_salida: float
+    precio_entrada: int
+    precio_salida: int
+    ganada: bool
+
+
+class CuentaSimulada:
+    """
+    Balance, meta y stop-loss con la misma aritmética de ``ConfiguracionBot``
+    (registrar_ganancia, registrar_perdida, pausar y reanudar), en memoria.
+    """
+
+    def __init__(self, balance_inicial: Decimal, horas_pausa: int = 24) -> None:
+        self.balance = balance_inicial.quantize(Decimal("0.01"))
+        self.horas_pausa = horas_pausa
+        self.pausa_finaliza: Optional[float] = None
+        self._reiniciar_bases()
+
+    @staticmethod
+    def _porcentaje(base: Decimal, porcentaje: Decimal) -> Decimal:
+        return (base * porcentaje).quantize(Decimal("0.01"))
+
+    def _reiniciar_bases(self) -> None:
+        self.perdida_acumulada = Decimal("0.00")
+        self.balance_meta_base = self.balance
+        self.balance_stop_loss_base = self.balance
+        self.meta_actual = self._porcentaje(self.balance, ConfiguracionBot.META_PORCENTAJE)
+        self.stop_loss_actual = self._porcentaje(
+            self.balance, ConfiguracionBot.STOP_LOSS_PORCENTAJE
+        )
+
+    @property
+    def pausada(self) -> bool:
+        return self.pausa_finaliza is not None
+
+    @property
+    def operable(self) -> bool:
+        return self.stop_loss_actual > 0 and self.meta_actual > 0
+
+    def registrar_ganancia(self, monto: Decimal) -> None:
+        self.balance = (self.balance + monto).quantize(Decimal("0.01"))
+        self.perdida_acumulada = Decimal("0.00")
+        if self.balance > self.balance_stop_loss_base:
+            self.balance_stop_loss_base = self.balance
+        meta = self._porcentaje(self.balance_meta_base, ConfiguracionBot.META_PORCENTAJE)
+        if self.balance - self.balance_meta_base >= meta:
+            self.balance_meta_base = self.balance
+            meta = self._porcentaje(self.balance_meta_base, ConfiguracionBot.META_PORCENTAJE)
+        self.meta_actual = meta
+        self.stop_loss_actual = self._porcentaje(
+            self.balance_stop_loss_base, ConfiguracionBot.STOP_LOSS_PORCENTAJE
+        )
+
+    def registrar_perdida(self, monto: Decimal, instante: float) -> bool:
+        """Registra la pérdida y pausa la cuenta si se alcanza el stop-loss."""
+        self.balance = (self.balance - monto).quantize(Decimal("0.01"))
+        perdida = self.balance_stop_loss_base - self.balance
+        self.perdida_acumulada = max(perdida, Decimal("0.00")).quantize(Decimal("0.01"))
+        if self.perdida_acumulada >= self.stop_loss_actual:
+            self.pausa_finaliza = instante + self.horas_pausa * SEGUNDOS_HORA
+            return True
+        return False
+
+    def reanudar(self) -> None:
+        self.pausa_finaliza = None
+        self._reiniciar_bases()
+
+
+class BrokerSimulado:
+    """
+    Liquida contratos de N ticks: la entrada es el primer tick posterior al
+    instante de compra y la salida el tick N posiciones después. Un precio de
+    salida igual al de entrada cuenta como pérdida, igual que en Deriv.
+    """
+
+    def __init__(self, historico: HistoricoTicks, duracion_ticks: int = 5) -> None:
+        self.historico = historico
+        self.duracion_ticks = max(1, duracion_ticks)
+
+    def liquidar(self, indice_activo: int, instante: float, es_call: bool) -> Optional[Liquidacion]:
+        epochs = self.historico.epochs[indice_activo]
+        unidades = self.historico.unidades[indice_activo]
+        entrada = int(np.searchsorted(epochs, instante, side="right"))
+        salida = entrada + self.duracion_ticks
+        if salida >= epochs.size:
+            return None
+        precio_entrada = int(unidades[entrada])
+        precio_salida = int(unidades[salida])
+        ganada = precio_salida > precio_entrada if es_call else precio_salida < precio_entrada
+        return Liquidacion(
+            epoch_entrada=float(epochs[entrada]),
+            epoch_salida=float(epochs[salida]),
+            precio_entrada=precio_entrada,
+            precio_salida=precio_salida,
+            ganada=ganada,
+        )
+
+
+def _a_decimal_precio(unidades: int) -> Decimal:
+    return (Decimal(unidades) / ESCALA_PRECIO).quantize(Decimal("0.00001"))
+
+
+def _winrate(ganadas: int, total: int) -> Decimal:
+    return (Decimal(str(ganadas)) / Decimal(str(total)) * Decimal("100")).quantize(
+        Decimal("0.01")
+    )
+
+
+class MotorBacktest:
+    """
+    Reproduce ciclos del motor profesional sobre un ``HistoricoTicks``.
+
+    El estado que el motor real guarda en la base de datos (cooldowns,
+    operaciones recientes, rendimiento por franja de 30 minutos) se mantiene
+    en memoria y se consulta con las mismas reglas.
+    """
+
+    def __init__(
+        self,
+        historico: HistoricoTicks,
+        parametros: Optional[ParametrosEstrategia] = None,
+        configuracion: Optional[ConfiguracionBacktest] = None,
+        indicadores: Optional[List[np.ndarray]] = None,
+        zona_horaria=None,
+    ) -> None:
+        self.historico = historico
+        self.parametros = parametros or ParametrosEstrategia()
+        self.configuracion = configuracion or ConfiguracionBacktest()
+        # Los indicadores solo dependen del periodo: se pueden compartir entre
+        # corridas con distintos umbrales o pesos
+        self.indicadores = indicadores or precalcular_indicadores(
+            historico, self.parametros.periodo_analisis
+        )
+        self.zona_horaria = zona_horaria or timezone.get_current_timezone()
+        self.broker = BrokerSimulado(historico, self.configuracion.duracion_contrato_ticks)
+
+    def _fecha(self, epoch: float) -> datetime:
+        return datetime.fromtimestamp(epoch, dt_timezone.utc)
+
+    def _minuto_local(self, epoch: float) -> int:
+        local = timezone.localtime(self._fecha(epoch), self.zona_horaria)
+        return local.hour * 60 + local.minute
+
+    def _reiniciar_estado(self) -> None:
+        n = len(self.historico.simbolos)
+        self._cooldown_hasta = np.full(n, -np.inf)
+        # (epoch_inicio, minuto_local, ganada) por activo, en orden de inicio
+        self._operaciones_activo: List[Deque[Tuple[float, int, bool]]] = [deque() for _ in range(n)]
+        # Winrate de las últimas 50 operaciones, guardado por franja de 30 minutos
+        self._rendimiento_franjas: List[Dict[int, Decimal]] = [{} for _ in range(n)]
+        self.estadisticas = defaultdict(int)
+
+    def _operaciones_desde(self, indice: int, desde: float):
+        return [op for op in self._operaciones_activo[indice] if op[0] >= desde]
+
+    def _confianza_horaria(self, indice: int, instante: float) -> Decimal:
+        """Winrate ±30 minutos alrededor de la hora local (últimos 30 días)."""
+        minuto = self._minuto_local(instante)
+        hora_min = (minuto - 30) % (24 * 60)
+        hora_max = (minuto + 30) % (24 * 60)
+        ganadas = total = 0
+        for _, minuto_op, ganada in self._operaciones_desde(indice, instante - 30 * SEGUNDOS_DIA):
+            if hora_min <= hora_max:
+                dentro = hora_min <= minuto_op <= hora_max
+            else:
+                dentro = minuto_op >= hora_min or minuto_op <= hora_max
+            if dentro:
+                total += 1
+                ganadas += ganada
+        if not total:
+            return Decimal("50.00")
+        return _winrate(ganadas, total)
+
+    def _actualizar_rendimiento(self, indice: int, epoch_inicio: float, instante: float) -> None:
+        recientes = self._operaciones_desde(indice, instante - 30 * SEGUNDOS_DIA)[-50:]
+        if not recientes:
+            return
+        franja = self._minuto_local(epoch_inicio) // 30
+        ganadas = sum(1 for op in recientes if op[2])
+        self._rendimiento_franjas[indice][franja] = _winrate(ganadas, len(recientes))
+
+    def _evaluar(self, instante: float) -> Optional[Tuple[int, int, float]]:
+        """
+        Etapas de evaluación del motor en un instante.
+
+        Returns:
+            (índice del activo, posición del tick, score) del mejor candidato
+            o None si ninguno pasa los filtros
+        """
+        parametros = self.parametros
+        estadisticas = self.estadisticas
+        n = len(self.historico.simbolos)
+        estadisticas["candidatos"] += n
+
+        # Etapa 1: cooldown y cupo de trades de la última hora
+        indices = []
+        for indice in range(n):
+            if self._cooldown_hasta[indice] > instante:
+                estadisticas["rechazados_cooldown"] += 1
+                continue
+            recientes = sum(
+                1 for op in self._operaciones_activo[indice] if op[0] >= instante - SEGUNDOS_HORA
+            )
+            if recientes >= parametros.max_trades_por_activo:
+                estadisticas["rechazados_limites"] += 1
+                continue
+            indices.append(indice)
+
+        # Etapa 2: indicadores del último tick conocido y filtros de mercado
+        filas = []
+        candidatos = []
+        posiciones = []
+        for indice in indices:
+            posicion = int(np.searchsorted(self.historico.epochs[indice], instante, side="right")) - 1
+            if posicion < parametros.periodo_analisis - 1:
+                estadisticas["rechazados_sin_datos"] += 1
+                continue
+            fila = self.indicadores[indice][posicion]
+            if fila[COL_VOLATILIDAD] < float(parametros.umbral_volatilidad_minima):
+                estadisticas["rechazados_volatilidad"] += 1
+                continue
+            if fila[COL_CONSISTENCIA] < float(parametros.umbral_consistencia):
+                estadisticas["rechazados_consistencia"] += 1
+                continue
+            if abs(fila[COL_MOMENTUM]) < 0.01 and parametros.periodo_analisis > 10:
+                self._cooldown_hasta[indice] = (
+                    instante + self.configuracion.cooldown_micro_congestion_minutos * 60
+                )
+                estadisticas["rechazados_micro_congestion"] += 1
+                continue
+            filas.append(fila)
+            candidatos.append(indice)
+            posiciones.append(posicion)
+        if not candidatos:
+            return None
+
+        # Etapa 3: score con historial y penalización por confianza horaria
+        matriz = np.array(filas)
+        winrates = np.array(
+            [
+                float(max(self._rendimiento_franjas[indice].values(), default=Decimal("50.00")))
+                for indice in candidatos
+            ]
+        )
+        scores = calcular_scores_vectorizados(
+            matriz[:, :COL_DIRECCION],
+            winrates=winrates,
+            pesos=parametros.pesos,
+            umbral_minimo=parametros.umbral_score_minimo,
+        )
+        for posicion, indice in enumerate(candidatos):
+            if self._confianza_horaria(indice, instante) < parametros.umbral_confianza_horaria:
+                scores[posicion] *= 0.5
+        estadisticas["evaluados"] += len(candidatos)
+
+        # Mismo desempate que el motor: primer máximo en orden de cota superior
+        orden = seleccionar_top_k(
+            calcular_cotas_superiores(matriz[:, :COL_DIRECCION], parametros.pesos),
+            k=len(candidatos),
+        )
+        mejor = max(orden, key=lambda posicion: scores[posicion])
+        return candidatos[mejor], posiciones[mejor], float(scores[mejor])
+
+    def ejecutar(self, desde: Optional[float] = None, hasta: Optional[float] = None) -> ResultadoBacktest:
+        """
+        Ejecuta el backtest entre dos epochs (segundos).
+
+        Args:
+            desde: Instante del primer ciclo (por defecto el primer tick)
+            hasta: Instante máximo de ciclo (por defecto el último tick)
+
+        Returns:
+            ResultadoBacktest con el libro de operaciones y el resumen
+        """
+        inicio_ejecucion = reloj.perf_counter()
+        configuracion = self.configuracion
+        parametros = self.parametros
+        self._reiniciar_estado()
+
+        inicio = self.historico.inicio
+        fin = self.historico.fin
+        if inicio is None:
+            return ResultadoBacktest(
+                operaciones=[],
+                resumen=ResumenBacktest(
+                    balance_inicial=configuracion.balance_inicial,
+                    balance_final=configuracion.balance_inicial,
+                ),
+            )
+        desde = inicio if desde is None else max(desde, inicio)
+        hasta = fin if hasta is None else min(hasta, fin)
+
+        cuenta = CuentaSimulada(configuracion.balance_inicial, configuracion.horas_pausa)
+        resumen = ResumenBacktest(balance_inicial=cuenta.balance)
+        operaciones: List[OperacionBacktest] = []
+        pico = cuenta.balance
+        instante = desde
+
+        while instante <= hasta and cuenta.operable:
+            if cuenta.pausada:
+                if instante < cuenta.pausa_finaliza:
+                    instante = cuenta.pausa_finaliza
+                    continue
+                cuenta.reanudar()
+
+            resumen.ciclos += 1
+            seleccion = self._evaluar(instante)
+            siguiente = instante + configuracion.intervalo_ciclo
+            if seleccion is None:
+                instante = siguiente
+                continue
+
+            indice, posicion, score = seleccion
+            fila = self.indicadores[indice][posicion]
+            if score < float(parametros.umbral_score_minimo):
+                instante = siguiente
+                continue
+
+            direccion = int(fila[COL_DIRECCION])
+            if direccion == 0:
+                direccion = int(np.sign(fila[COL_MOMENTUM]))
+            if direccion == 0:
+                instante = siguiente
+                continue
+
+            monto = calcular_monto_adaptativo(
+                balance=cuenta.balance,
+                volatilidad=Decimal(str(fila[COL_VOLATILIDAD])),
+            )
+            liquidacion = self.broker.liquidar(indice, instante, es_call=direccion > 0)
+            if liquidacion is None:
+                # Al activo no le quedan ticks para cerrar el contrato; los
+                # demás siguen teniendo datos más adelante
+                self.estadisticas["sin_liquidacion"] += 1
+                instante = siguiente
+                continue
+
+            if liquidacion.ganada:
+                beneficio = (monto * configuracion.pago_ganancia).quantize(Decimal("0.01"))
+                cuenta.registrar_ganancia(beneficio)
+            else:
+                beneficio = -monto
+                if cuenta.registrar_perdida(monto, liquidacion.epoch_salida):
+                    resumen.pausas += 1
+
+            minuto = self._minuto_local(instante)
+            self._operaciones_activo[indice].append((instante, minuto, liquidacion.ganada))
+            self._actualizar_rendimiento(indice, instante, liquidacion.epoch_salida)
+
+            pico = max(pico, cuenta.balance)
+            resumen.drawdown_maximo = max(resumen.drawdown_maximo, pico - cuenta.balance)
+            operaciones.append(
+                OperacionBacktest(
+                    numero=len(operaciones) + 1,
+                    activo=self.historico.simbolos[indice],
+                    direccion="CALL" if direccion > 0 else "PUT",
+                    score=Decimal(str(score)).quantize(Decimal("0.01")),
+                    monto=monto,
+                    hora_inicio=self._fecha(instante),
+                    hora_fin=self._fecha(liquidacion.epoch_salida),
+                    precio_entrada=_a_decimal_precio(int(self.historico.unidades[indice][posicion])),
+                    precio_cierre=_a_decimal_precio(liquidacion.precio_salida),
+                    resultado=(
+                        Operacion.Resultado.GANADA
+                        if liquidacion.ganada
+                        else Operacion.Resultado.PERDIDA
+                    ).value,
+                    beneficio=beneficio,
+                    balance=cuenta.balance,
+                )
+            )
+            # El motor espera la liquidación antes de volver a dormir
+            instante = max(siguiente, liquidacion.epoch_salida + configuracion.intervalo_ciclo)
+
+        resumen.operaciones = len(operaciones)
+        resumen.ganadas = sum(
+            1 for op in operaciones if op.resultado == Operacion.Resultado.GANADA
+        )
+        resumen.perdidas = resumen.operaciones - resumen.ganadas
+        if resumen.operaciones:
+            resumen.winrate = _winrate(resumen.ganadas, resumen.operaciones)
+        resumen.balance_final = cuenta.balance
+        resumen.beneficio_neto = cuenta.balance - resumen.balance_inicial
+        resumen.segundos_simulados = max(0.0, min(instante, hasta) - desde)
+        resumen.segundos_ejecucion = reloj.perf_counter() - inicio_ejecucion
+        resumen.estadisticas = dict(self.estadisticas)
+        return ResultadoBacktest(operaciones=operaciones, resumen=resumen)
+
+
+def resumen_a_dict(resumen: ResumenBacktest) -> Dict:
+    """Resumen serializable (Decimal como texto) para la salida JSON."""
+    datos = asdict(resumen)
+    datos["factor_velocidad"] = round(resumen.factor_velocidad, 1)
+    return {
+        clave: str(valor) if isinstance(valor, Decimal) else valor
+        for clave, valor in datos.items()
+    }
@@ -4,13 +4,19 @@ Módulo de interacción optimizada con PostgreSQL.
 
 from .cache_manager import (
     actualizar_tick_cache,
+    actualizar_tick_cache_lote,
     obtener_ticks_cache,
+    obtener_precios_recientes,
+    obtener_precios_recientes_lote,
     limpiar_cache_antiguo,
 )
 
 __all__ = [
     "actualizar_tick_cache",
+    "actualizar_tick_cache_lote",
     "obtener_ticks_cache",
+    "obtener_precios_recientes",
+    "obtener_precios_recientes_lote",
     "limpiar_cache_antiguo",
 ]
 
@@ -1,11 +1,14 @@
 """
 Gestión optimizada del cache de ticks en PostgreSQL.
 """
-from datetime import timedelta
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from functools import reduce
+from operator import or_
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
 from django.utils import timezone
 
 from core.models import ActivoPermitido
@@ -92,6 +95,134 @@ def obtener_ticks_cache(
     return [tick.precio for tick in ticks]
 
 
+def obtener_precios_recientes(
+    activo_nombre: str,
+    cantidad: int = 20,
+) -> List[Decimal]:
+    """
+    Obtiene los últimos N precios directamente del historial, sin escribir en cache.
+    Apto para workers concurrentes (solo lectura).
+    
+    Args:
+        activo_nombre: Nombre del activo a consultar
+        cantidad: Número de ticks a obtener
+    
+    Returns:
+        Lista de precios ordenados (más antiguo primero)
+    """
+    precios = list(
+        Tick.objects.filter(activo=activo_nombre)
+        .order_by("-epoch")
+        .values_list("precio", flat=True)[:cantidad]
+    )
+    precios.reverse()
+    return precios
+
+
+def obtener_ticks_recientes_lote(
+    activos_nombres: Sequence[str],
+    cantidad: int = 20,
+) -> Dict[str, List[Tuple[datetime, Decimal]]]:
+    """
+    Últimos N ticks de varios activos con dos consultas en total.
+
+    La primera busca, en una sola sentencia, el epoch del N-ésimo tick más
+    reciente de cada activo (una búsqueda por índice ``(activo, epoch)`` por
+    activo); la segunda lee los rangos de todos los activos a la vez.
+
+    Args:
+        activos_nombres: Nombres de los activos a consultar
+        cantidad: Número de ticks por activo
+
+    Returns:
+        Pares (epoch, precio) por nombre de activo, más antiguo primero
+    """
+    ticks: Dict[str, List[Tuple[datetime, Decimal]]] = {
+        nombre: [] for nombre in activos_nombres
+    }
+    if not ticks or cantidad <= 0:
+        return ticks
+
+    cortes = ActivoPermitido.objects.filter(nombre__in=ticks).annotate(
+        corte=Subquery(
+            Tick.objects.filter(activo=OuterRef("nombre"))
+            .order_by("-epoch")
+            .values("epoch")[cantidad - 1:cantidad]
+        )
+    ).values_list("nombre", "corte")
+    # Los activos con menos de N ticks (corte None) se leen completos
+    rangos = [
+        Q(activo=nombre, epoch__gte=corte) if corte is not None else Q(activo=nombre)
+        for nombre, corte in cortes
+    ]
+    if not rangos:
+        return ticks
+
+    filas = (
+        Tick.objects.filter(reduce(or_, rangos))
+        .order_by("activo", "epoch")
+        .values_list("activo", "epoch", "precio")
+    )
+    for activo, epoch, precio in filas:
+        ticks[activo].append((epoch, precio))
+    return ticks
+
+
+def obtener_precios_recientes_lote(
+    activos_nombres: Sequence[str],
+    cantidad: int = 20,
+) -> Dict[str, List[Decimal]]:
+    """
+    Versión por lotes de ``obtener_precios_recientes``: solo lectura, apta
+    para workers concurrentes.
+
+    Returns:
+        Precios por nombre de activo, más antiguo primero
+    """
+    return {
+        nombre: [precio for _, precio in ticks]
+        for nombre, ticks in obtener_ticks_recientes_lote(activos_nombres, cantidad).items()
+    }
+
+
+@transaction.atomic
+def actualizar_tick_cache_lote(
+    activos: Sequence[ActivoPermitido],
+    max_ticks: int = 20,
+) -> Dict[int, List[Decimal]]:
+    """
+    Actualiza el cache de ticks de varios activos y devuelve sus precios
+    con una cantidad fija de consultas, en lugar de cinco por activo
+    (``actualizar_tick_cache`` + ``obtener_ticks_cache``).
+
+    Args:
+        activos: Activos a actualizar
+        max_ticks: Número máximo de ticks a mantener por activo
+
+    Returns:
+        Precios por id de activo, más antiguo primero (vacío si no tiene ticks)
+    """
+    ticks = obtener_ticks_recientes_lote([activo.nombre for activo in activos], max_ticks)
+    con_ticks = [activo for activo in activos if ticks.get(activo.nombre)]
+    if con_ticks:
+        TickCache.objects.filter(activo__in=con_ticks).delete()
+        TickCache.objects.bulk_create(
+            [
+                TickCache(
+                    activo=activo,
+                    precio=Decimal(str(precio)),
+                    epoch=int(epoch.timestamp()),
+                )
+                for activo in con_ticks
+                for epoch, precio in ticks[activo.nombre]
+            ]
+        )
+    return {
+        activo.id: [precio for _, precio in ticks.get(activo.nombre, [])]
+        for activo in activos
+    }
+
+
 def limpiar_cache_antiguo(dias_antiguedad: int = 1) -> int:
     """
     Limpia el cache de ticks más antiguos que N días.
@@ -0,0 +1,50 @@
+"""
+Funciones ejecutadas por los workers de la evaluación paralela de activos.
+
+Este módulo no importa modelos a nivel de módulo: los workers de proceso
+arrancan con contexto ``spawn`` y deben poder importarlo antes de que
+``inicializar_worker_proceso`` configure Django.
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+def inicializar_worker_proceso() -> None:
+    """Prepara Django en un worker de proceso."""
+    import django
+
+    django.setup()
+
+
+def calcular_indicadores_lote(
+    lote: List[Tuple[int, str]], periodo_analisis: int
+) -> List[Tuple[int, Optional[Dict]]]:
+    """
+    Calcula indicadores para un lote de activos dentro de un worker.
+
+    Cada hilo/proceso usa su propia conexión a la base de datos y solo lee
+    del historial de ticks (dos consultas por lote), por lo que no compite
+    por escrituras con el ciclo principal.
+
+    Args:
+        lote: Pares (posición, nombre del activo)
+        periodo_analisis: Ticks a analizar por activo
+
+    Returns:
+        Pares (posición, indicadores o None)
+    """
+    from django.db import close_old_connections
+
+    from trading.database import obtener_precios_recientes_lote
+    from trading.services_profesional import calcular_indicadores_precios
+
+    close_old_connections()
+    try:
+        precios = obtener_precios_recientes_lote(
+            [nombre for _, nombre in lote], cantidad=periodo_analisis
+        )
+        return [
+            (indice, calcular_indicadores_precios(precios[nombre]))
+            for indice, nombre in lote
+        ]
+    finally:
+        close_old_connections()
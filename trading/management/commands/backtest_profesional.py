@@ -0,0 +1,168 @@
+"""
+Comando para ejecutar el backtest del motor profesional sobre ticks guardados.
+"""
+import csv
+import json
+import time
+from dataclasses import asdict, fields
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import ActivoPermitido
+from trading.backtesting import (
+    ConfiguracionBacktest,
+    MotorBacktest,
+    OperacionBacktest,
+    ParametrosEstrategia,
+    cargar_historico,
+)
+from trading.backtesting.motor import resumen_a_dict
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduce el motor profesional sobre el historial de ticks con un "
+        "broker simulado y muestra el libro de operaciones y el resumen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde",
+            type=str,
+            default=None,
+            help="Inicio del periodo (ISO 8601). Por defecto: --horas hacia atrás",
+        )
+        parser.add_argument(
+            "--hasta",
+            type=str,
+            default=None,
+            help="Fin del periodo (ISO 8601). Por defecto: ahora",
+        )
+        parser.add_argument(
+            "--horas",
+            type=int,
+            default=24,
+            help="Horas a simular si no se indica --desde (default: 24)",
+        )
+        parser.add_argument(
+            "--activos",
+            type=str,
+            default="",
+            help="Símbolos separados por coma (default: activos habilitados)",
+        )
+        parser.add_argument(
+            "--balance",
+            type=str,
+            default="1000.00",
+            help="Balance inicial de la cuenta simulada (default: 1000.00)",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=int,
+            default=60,
+            help="Segundos entre ciclos del motor (default: 60)",
+        )
+        parser.add_argument(
+            "--duracion-ticks",
+            type=int,
+            default=5,
+            help="Duración de los contratos en ticks (default: 5)",
+        )
+        parser.add_argument(
+            "--pago",
+            type=str,
+            default="0.95",
+            help="Beneficio por unidad invertida en operaciones ganadas (default: 0.95)",
+        )
+        parser.add_argument(
+            "--salida",
+            type=str,
+            default="",
+            help="Archivo donde guardar el libro de operaciones (.csv o .json)",
+        )
+
+    def _parsear_fecha(self, valor: str):
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            raise CommandError(f"Fecha inválida: {valor}")
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
+    def _guardar_libro(self, ruta: str, resultado) -> None:
+        filas = [asdict(operacion) for operacion in resultado.operaciones]
+        if ruta.endswith(".json"):
+            with open(ruta, "w", encoding="utf-8") as archivo:
+                json.dump(
+                    {"resumen": resumen_a_dict(resultado.resumen), "operaciones": filas},
+                    archivo,
+                    indent=2,
+                    default=str,
+                )
+            return
+        with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+            escritor = csv.DictWriter(
+                archivo, fieldnames=[campo.name for campo in fields(OperacionBacktest)]
+            )
+            escritor.writeheader()
+            escritor.writerows(filas)
+
+    def handle(self, *args, **options):
+        hasta = self._parsear_fecha(options["hasta"]) if options["hasta"] else timezone.now()
+        if options["desde"]:
+            desde = self._parsear_fecha(options["desde"])
+        else:
+            desde = hasta - timedelta(hours=max(1, options["horas"]))
+        if desde >= hasta:
+            raise CommandError("--desde debe ser anterior a --hasta.")
+
+        if options["activos"]:
+            simbolos = [s.strip() for s in options["activos"].split(",") if s.strip()]
+        else:
+            simbolos = list(
+                ActivoPermitido.objects.filter(habilitado=True)
+                .order_by("id")
+                .values_list("nombre", flat=True)
+            )
+        if not simbolos:
+            raise CommandError("No hay activos para simular.")
+
+        inicio_carga = time.perf_counter()
+        historico = cargar_historico(simbolos, desde=desde, hasta=hasta)
+        self.stdout.write(
+            f"Ticks cargados: {historico.total_ticks} de {len(simbolos)} activos "
+            f"en {time.perf_counter() - inicio_carga:.2f}s"
+        )
+        if not historico.total_ticks:
+            self.stdout.write(self.style.WARNING("No hay ticks en el periodo indicado."))
+            return
+
+        configuracion = ConfiguracionBacktest(
+            balance_inicial=Decimal(options["balance"]),
+            intervalo_ciclo=max(1, options["intervalo"]),
+            duracion_contrato_ticks=max(1, options["duracion_ticks"]),
+            pago_ganancia=Decimal(options["pago"]),
+        )
+        motor = MotorBacktest(historico, ParametrosEstrategia(), configuracion)
+        resultado = motor.ejecutar(desde.timestamp(), hasta.timestamp())
+
+        for operacion in resultado.operaciones:
+            self.stdout.write(
+                f"{operacion.numero:>5} {timezone.localtime(operacion.hora_inicio):%Y-%m-%d %H:%M:%S} "
+                f"{operacion.activo:<12} {operacion.direccion:<4} score={operacion.score:>6} "
+                f"monto={operacion.monto:>8} {operacion.resultado:<4} "
+                f"beneficio={operacion.beneficio:>8} balance={operacion.balance}"
+            )
+
+        resumen = resultado.resumen
+        self.stdout.write(self.style.SUCCESS("Resumen del backtest"))
+        for clave, valor in resumen_a_dict(resumen).items():
+            self.stdout.write(f"  {clave}: {valor}")
+
+        if options["salida"]:
+            self._guardar_libro(options["salida"], resultado)
+            self.stdout.write(f"Libro de operaciones guardado en {options['salida']}")
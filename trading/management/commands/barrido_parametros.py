@@ -0,0 +1,237 @@
+"""
+Comando para el barrido walk-forward de parámetros del motor profesional.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from typing import List
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import ActivoPermitido
+from trading.backtesting import ConfiguracionBacktest, cargar_historico
+from trading.backtesting.barrido import ejecutar_barrido, generar_grilla, generar_ventanas
+from trading.ranking.scorer import PesosScoring
+
+
+def _lista_enteros(valor: str) -> List[int]:
+    try:
+        return [int(parte) for parte in valor.split(",") if parte.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Lista de enteros inválida: {valor}")
+
+
+def _lista_decimales(valor: str) -> List[Decimal]:
+    try:
+        return [Decimal(parte.strip()) for parte in valor.split(",") if parte.strip()]
+    except InvalidOperation:
+        raise argparse.ArgumentTypeError(f"Lista de decimales inválida: {valor}")
+
+
+def _lista_pesos(valor: str) -> list:
+    """
+    Vectores de pesos separados por ';' en el orden momentum, roc,
+    volatilidad, tendencia EMA, consistencia, historial. "estandar" =
+    PesosScoring.
+    """
+    vectores = []
+    for parte in valor.split(";"):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if parte == "estandar":
+            vectores.append(PesosScoring)
+            continue
+        try:
+            vector = np.array([float(peso) for peso in parte.split(",")], dtype=np.float64)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Pesos inválidos: {parte}")
+        if vector.size != 6:
+            raise argparse.ArgumentTypeError(f"Se requieren 6 pesos: {parte}")
+        vectores.append(vector)
+    return vectores
+
+
+def _etiqueta_pesos(pesos) -> str:
+    return ",".join(f"{peso:g}" for peso in pesos)
+
+
+class Command(BaseCommand):
+    help = (
+        "Evalúa una grilla de umbrales y pesos del motor profesional en "
+        "ventanas walk-forward y ordena las configuraciones por su "
+        "resultado fuera de muestra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=str, default=None, help="Inicio (ISO 8601)")
+        parser.add_argument("--hasta", type=str, default=None, help="Fin (ISO 8601, default: ahora)")
+        parser.add_argument(
+            "--horas",
+            type=float,
+            default=72,
+            help="Horas de historial si no se indica --desde (default: 72)",
+        )
+        parser.add_argument(
+            "--activos",
+            type=str,
+            default="",
+            help="Símbolos separados por coma (default: activos habilitados)",
+        )
+        parser.add_argument(
+            "--entrenamiento-horas",
+            type=float,
+            default=24,
+            help="Largo del tramo de entrenamiento (default: 24)",
+        )
+        parser.add_argument(
+            "--prueba-horas",
+            type=float,
+            default=6,
+            help="Largo del tramo de prueba y paso entre ventanas (default: 6)",
+        )
+        parser.add_argument("--periodos", type=_lista_enteros, default=[20])
+        parser.add_argument("--umbrales-score", type=_lista_decimales, default=[Decimal("40.00")])
+        parser.add_argument(
+            "--umbrales-consistencia", type=_lista_decimales, default=[Decimal("30.00")]
+        )
+        parser.add_argument(
+            "--umbrales-volatilidad", type=_lista_decimales, default=[Decimal("0.001")]
+        )
+        parser.add_argument(
+            "--umbrales-confianza", type=_lista_decimales, default=[Decimal("45.00")]
+        )
+        parser.add_argument(
+            "--pesos",
+            type=_lista_pesos,
+            default=[PesosScoring],
+            help=(
+                "Vectores de pesos separados por ';' (momentum,roc,volatilidad,"
+                "tendencia_ema,consistencia,historial). 'estandar' = PesosScoring"
+            ),
+        )
+        parser.add_argument("--balance", type=str, default="1000.00")
+        parser.add_argument("--intervalo", type=int, default=60, help="Segundos entre ciclos")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Procesos en paralelo (0 = secuencial, default: todos los núcleos)",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Configuraciones a mostrar")
+        parser.add_argument(
+            "--salida", type=str, default="", help="Archivo JSON con el ranking completo"
+        )
+
+    def _parsear_fecha(self, valor: str):
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            raise CommandError(f"Fecha inválida: {valor}")
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
+    def handle(self, *args, **options):
+        hasta = self._parsear_fecha(options["hasta"]) if options["hasta"] else timezone.now()
+        if options["desde"]:
+            desde = self._parsear_fecha(options["desde"])
+        else:
+            desde = hasta - timedelta(hours=options["horas"])
+
+        if options["activos"]:
+            simbolos = [s.strip() for s in options["activos"].split(",") if s.strip()]
+        else:
+            simbolos = list(
+                ActivoPermitido.objects.filter(habilitado=True)
+                .order_by("id")
+                .values_list("nombre", flat=True)
+            )
+        if not simbolos:
+            raise CommandError("No hay activos para simular.")
+
+        historico = cargar_historico(simbolos, desde=desde, hasta=hasta)
+        if not historico.total_ticks:
+            raise CommandError("No hay ticks en el periodo indicado.")
+
+        ventanas = generar_ventanas(
+            historico.inicio,
+            historico.fin,
+            options["entrenamiento_horas"] * 3600,
+            options["prueba_horas"] * 3600,
+        )
+        if not ventanas:
+            raise CommandError(
+                "El historial no alcanza para una ventana de entrenamiento + prueba."
+            )
+
+        grilla = generar_grilla(
+            periodos=options["periodos"],
+            umbrales_score=options["umbrales_score"],
+            umbrales_consistencia=options["umbrales_consistencia"],
+            umbrales_volatilidad=options["umbrales_volatilidad"],
+            umbrales_confianza=options["umbrales_confianza"],
+            pesos=options["pesos"],
+        )
+        configuracion = ConfiguracionBacktest(
+            balance_inicial=Decimal(options["balance"]),
+            intervalo_ciclo=max(1, options["intervalo"]),
+        )
+        workers = max(0, options["workers"])
+        self.stdout.write(
+            f"{len(grilla)} configuraciones x {len(ventanas)} ventanas, "
+            f"{historico.total_ticks} ticks, {workers or 'sin'} workers"
+        )
+
+        inicio = time.perf_counter()
+        resultados = ejecutar_barrido(
+            historico, grilla, ventanas, configuracion=configuracion, workers=workers
+        )
+        self.stdout.write(f"Barrido completado en {time.perf_counter() - inicio:.2f}s")
+
+        self.stdout.write(
+            f"{'#':>3} {'per':>4} {'score':>6} {'cons':>6} {'vol':>7} {'conf':>6} "
+            f"{'oos':>9} {'train':>9} {'ops':>5} {'wr':>6} {'dd':>7} {'+/v':>5}  pesos"
+        )
+        filas = []
+        for posicion, resultado in enumerate(resultados, start=1):
+            parametros = resultado.parametros
+            fila = {
+                "posicion": posicion,
+                "periodo_analisis": parametros.periodo_analisis,
+                "umbral_score_minimo": str(parametros.umbral_score_minimo),
+                "umbral_consistencia": str(parametros.umbral_consistencia),
+                "umbral_volatilidad_minima": str(parametros.umbral_volatilidad_minima),
+                "umbral_confianza_horaria": str(parametros.umbral_confianza_horaria),
+                "pesos": [float(peso) for peso in parametros.pesos],
+                "beneficio_prueba": str(resultado.beneficio_prueba),
+                "beneficio_entrenamiento": str(resultado.beneficio_entrenamiento),
+                "operaciones_prueba": resultado.operaciones_prueba,
+                "winrate_prueba": str(resultado.winrate_prueba),
+                "drawdown_prueba": str(resultado.drawdown_prueba),
+                "ventanas_positivas": resultado.ventanas_positivas,
+                "ventanas": len(ventanas),
+            }
+            filas.append(fila)
+            if posicion <= options["top"]:
+                self.stdout.write(
+                    f"{posicion:>3} {parametros.periodo_analisis:>4} "
+                    f"{parametros.umbral_score_minimo:>6} {parametros.umbral_consistencia:>6} "
+                    f"{parametros.umbral_volatilidad_minima:>7} "
+                    f"{parametros.umbral_confianza_horaria:>6} "
+                    f"{resultado.beneficio_prueba:>9} {resultado.beneficio_entrenamiento:>9} "
+                    f"{resultado.operaciones_prueba:>5} {resultado.winrate_prueba:>6} "
+                    f"{resultado.drawdown_prueba:>7} "
+                    f"{resultado.ventanas_positivas:>2}/{len(ventanas):<2}  "
+                    f"{_etiqueta_pesos(parametros.pesos)}"
+                )
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                json.dump(filas, archivo, indent=2)
+            self.stdout.write(f"Ranking guardado en {options['salida']}")
@@ -0,0 +1,474 @@
+"""
+Benchmark de extremo a extremo: del tick del broker a la orden de compra.
+
+Levanta el servidor de Deriv simulado, recolecta sus ticks con
+``TickStreamRecorder`` y ejecuta ciclos del motor profesional contra él,
+todo sobre una base de datos de prueba desechable.
+"""
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_databases,
+    teardown_databases,
+)
+from django.utils import timezone
+
+from core.models import ActivoPermitido, ConfiguracionBot
+from core.monitoreo import HistogramaMovil, PerfiladorCiclo
+from core.monitoreo.regresiones import (
+    aplanar_metricas,
+    cargar_metricas,
+    detectar_regresiones,
+    version_codigo,
+)
+from historial.models import Tick
+from integracion_deriv.mercado_sintetico import MercadoSintetico, simbolos_sinteticos
+from integracion_deriv.servidor_falso import ServidorDerivFalso
+from integracion_deriv.services import TickStreamRecorder, _registrar_tick_threadsafe
+from trading.services_profesional import MotorTradingProfesional
+
+# Límites absolutos por defecto (se pueden reemplazar con --umbrales)
+UMBRALES_POR_DEFECTO = {
+    "tick_a_decision.p95_ms": 5000.0,
+    "decision_a_compra.p95_ms": 1000.0,
+    "ciclo_sin_orden.p95_ms": 2000.0,
+    "ingesta.latencia.p95_ms": 1000.0,
+    "consultas_por_ciclo.media": 200.0,
+}
+
+
+class _RecolectorMedido(TickStreamRecorder):
+    """Recolector que mide la latencia de ingesta (emisión del tick → fila guardada)."""
+
+    def __init__(self, *args, latencias: HistogramaMovil, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencias = latencias
+        self.guardados = 0
+
+    async def _guardar_tick(self, tick: dict) -> None:
+        intentos = 0
+        while True:
+            try:
+                await sync_to_async(_registrar_tick_threadsafe, thread_sensitive=True)(tick)
+                break
+            except OperationalError as exc:
+                if "database is locked" in str(exc).lower() and intentos < 5:
+                    intentos += 1
+                    await asyncio.sleep(0.2 * intentos)
+                    continue
+                raise
+        self.guardados += 1
+        self.latencias.registrar((time.time() - float(tick["epoch"])) * 1000)
+
+
+class _PilaBroker(threading.Thread):
+    """Servidor simulado y recolector en un event loop propio."""
+
+    def __init__(
+        self,
+        servidor: ServidorDerivFalso,
+        simbolos: Sequence[str],
+        latencias: HistogramaMovil,
+    ) -> None:
+        super().__init__(name="benchmark-broker", daemon=True)
+        self.servidor = servidor
+        self.simbolos = list(simbolos)
+        self.latencias = latencias
+        self.recolector: Optional[_RecolectorMedido] = None
+        self.listo = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._detener: Optional[asyncio.Event] = None
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self._principal())
+        except BaseException as exc:  # Se reporta desde el hilo principal
+            self.error = exc
+            self.listo.set()
+
+    async def _principal(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._detener = asyncio.Event()
+        async with self.servidor:
+            self.recolector = _RecolectorMedido(
+                self.simbolos, url=self.servidor.url, latencias=self.latencias
+            )
+            tarea = asyncio.create_task(self.recolector.ejecutar())
+            self.listo.set()
+            await self._detener.wait()
+            tarea.cancel()
+            resultado = (await asyncio.gather(tarea, return_exceptions=True))[0]
+            if isinstance(resultado, Exception):
+                self.error = resultado
+
+    def detener(self) -> None:
+        if self._loop is not None and self._detener is not None:
+            self._loop.call_soon_threadsafe(self._detener.set)
+        self.join(timeout=30)
+
+
+def _distribucion(histograma: HistogramaMovil) -> Dict[str, float]:
+    resumen = histograma.resumen()
+    resumen.pop("muestras")
+    return resumen
+
+
+@contextmanager
+def _transacciones_inmediatas_sqlite():
+    """
+    Inicia las transacciones de SQLite con ``BEGIN IMMEDIATE`` (lo que hace
+    ``transaction_mode="IMMEDIATE"`` desde Django 5.1). Con el motor y el
+    recolector escribiendo a la vez, una transacción diferida que lee y
+    luego escribe falla con "database is locked" en lugar de esperar.
+    """
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+
+    original = DatabaseWrapper._start_transaction_under_autocommit
+
+    def _inmediata(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
+
+    DatabaseWrapper._start_transaction_under_autocommit = _inmediata
+    try:
+        yield
+    finally:
+        DatabaseWrapper._start_transaction_under_autocommit = original
+
+
+def _alinear_reloj(mercado: MercadoSintetico) -> None:
+    """Hace coincidir el epoch del paso actual con el reloj de pared."""
+    mercado.epoch_inicial += time.time() - mercado.epoch
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia tick→decisión y decisión→compra, el throughput de "
+        "ingesta, el tiempo de ciclo y las consultas por ciclo del motor "
+        "profesional contra el servidor de Deriv simulado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--activos", type=int, default=20, help="Símbolos a recolectar y evaluar")
+        parser.add_argument("--ticks-por-segundo", type=float, default=2.0)
+        parser.add_argument("--duracion", type=float, default=60, help="Segundos medidos")
+        parser.add_argument(
+            "--intervalo", type=float, default=1.0, help="Segundos entre ciclos del motor"
+        )
+        parser.add_argument("--semilla", type=int, default=7)
+        parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latencia del broker simulado")
+        parser.add_argument(
+            "--umbral-score",
+            type=str,
+            default=None,
+            help="Score mínimo del motor (default: el del motor). Bajarlo genera más órdenes.",
+        )
+        parser.add_argument(
+            "--max-trades-por-activo",
+            type=int,
+            default=None,
+            help="Trades por activo y hora (default: el del motor)",
+        )
+        parser.add_argument("--salida", type=str, default="benchmark_e2e.json")
+        parser.add_argument(
+            "--referencia", type=str, default="", help="JSON de una ejecución anterior a comparar"
+        )
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=0.25,
+            help="Empeoramiento relativo permitido frente a --referencia (default: 0.25)",
+        )
+        parser.add_argument(
+            "--umbrales", type=str, default="", help="JSON {métrica: límite} que reemplaza los umbrales por defecto"
+        )
+        parser.add_argument(
+            "--estricto", action="store_true", help="Terminar con error si hay regresiones"
+        )
+
+    def handle(self, *args, **options):
+        if options["ticks_por_segundo"] <= 0 or options["activos"] < 1:
+            raise CommandError("Se requieren --activos >= 1 y --ticks-por-segundo > 0.")
+
+        umbrales = dict(UMBRALES_POR_DEFECTO)
+        if options["umbrales"]:
+            with open(options["umbrales"], encoding="utf-8") as archivo:
+                umbrales = json.load(archivo)
+        referencia = cargar_metricas(options["referencia"]) if options["referencia"] else None
+
+        # Base de datos de prueba: el benchmark escribe ticks, operaciones y balances
+        directorio = tempfile.TemporaryDirectory(prefix="benchmark_e2e_")
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = str(
+                Path(directorio.name) / "benchmark.sqlite3"
+            )
+        self.stdout.write("Creando base de datos de prueba...")
+        configuracion_anterior = setup_databases(
+            verbosity=0, interactive=False, serialized_aliases=set()
+        )
+        try:
+            if connection.vendor == "sqlite":
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                with _transacciones_inmediatas_sqlite():
+                    resultado = self._ejecutar(options)
+            else:
+                resultado = self._ejecutar(options)
+        finally:
+            connection.close()
+            teardown_databases(configuracion_anterior, verbosity=0)
+            directorio.cleanup()
+
+        metricas = aplanar_metricas(resultado["metricas"])
+        regresiones = detectar_regresiones(
+            metricas,
+            umbrales=umbrales,
+            referencia=referencia,
+            tolerancia=options["tolerancia"],
+            margen_absoluto=1.0,
+        )
+        resultado["umbrales"] = umbrales
+        resultado["regresiones"] = [asdict(regresion) for regresion in regresiones]
+        with open(options["salida"], "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2)
+
+        self._imprimir(resultado)
+        self.stdout.write(f"Resultados guardados en {options['salida']}")
+        if options["referencia"]:
+            with open(options["referencia"], encoding="utf-8") as archivo:
+                parametros_referencia = json.load(archivo).get("parametros", {})
+            distintos = sorted(
+                clave
+                for clave, valor in resultado["parametros"].items()
+                if parametros_referencia.get(clave, valor) != valor
+            )
+            if distintos:
+                self.stdout.write(
+                    self.style.WARNING(
+                        "La referencia usó parámetros distintos: " + ", ".join(distintos)
+                    )
+                )
+        if regresiones:
+            for regresion in regresiones:
+                self.stdout.write(self.style.WARNING(f"REGRESIÓN {regresion.describir()}"))
+            if options["estricto"]:
+                raise CommandError(f"{len(regresiones)} regresiones detectadas.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin regresiones."))
+
+    def _ejecutar(self, options) -> Dict:
+        simbolos = simbolos_sinteticos(options["activos"])
+        ActivoPermitido.objects.bulk_create(
+            [ActivoPermitido(nombre=simbolo, habilitado=True) for simbolo in simbolos]
+        )
+
+        intervalo_tick = 1.0 / options["ticks_por_segundo"]
+        mercado = MercadoSintetico(
+            simbolos, semilla=options["semilla"], intervalo_tick=intervalo_tick
+        )
+        servidor = ServidorDerivFalso(mercado, puerto=0, latencia=options["latencia_ms"] / 1000)
+
+        # Historial previo en la base para que el motor tenga ventana completa desde el inicio
+        _alinear_reloj(mercado)
+        ticks_previos = []
+        for simbolo in simbolos:
+            epochs, precios = mercado.historial(simbolo, 200)
+            ticks_previos.extend(
+                Tick(
+                    activo=simbolo,
+                    epoch=datetime.fromtimestamp(epoch, tz=dt_timezone.utc),
+                    precio=Decimal(str(precio)),
+                    pip_size=mercado.decimales,
+                )
+                for epoch, precio in zip(epochs, precios)
+            )
+        Tick.objects.bulk_create(ticks_previos, batch_size=2000)
+
+        latencias_ingesta = HistogramaMovil(capacidad=1_000_000)
+        pila = _PilaBroker(servidor, simbolos, latencias_ingesta)
+        _alinear_reloj(mercado)
+        pila.start()
+        pila.listo.wait()
+        if pila.error is not None:
+            raise CommandError(f"No se pudo iniciar el broker simulado: {pila.error}")
+        recolector = pila.recolector
+
+        perfilador = PerfiladorCiclo(capacidad=100_000)
+        tick_a_decision = HistogramaMovil(capacidad=100_000)
+        ciclo_sin_orden = HistogramaMovil(capacidad=100_000)
+        ciclo_con_orden = HistogramaMovil(capacidad=100_000)
+        consultas_por_ciclo: List[int] = []
+        operaciones = 0
+        reinicios = 0
+
+        with override_settings(DERIV_WS_URL=servidor.url, DERIV_CAPTURA_FRAMES=""):
+            motor = MotorTradingProfesional(perfilador=perfilador)
+            if options["umbral_score"] is not None:
+                motor.umbral_score_minimo = Decimal(options["umbral_score"])
+            if options["max_trades_por_activo"] is not None:
+                motor.max_trades_por_activo = options["max_trades_por_activo"]
+            gestor = motor.gestor_core
+            gestor.inicializar_balance(Decimal(str(servidor.balance)))
+
+            self.stdout.write(
+                f"Broker simulado en {servidor.url}: {len(simbolos)} símbolos a "
+                f"{options['ticks_por_segundo']:g} ticks/s; midiendo {options['duracion']:g}s..."
+            )
+            # La ventana empieza con el primer tick de cada símbolo ya guardado,
+            # para no contar como guardados ticks emitidos antes de medir
+            limite = time.monotonic() + 10
+            while recolector.guardados < len(simbolos) and time.monotonic() < limite:
+                if pila.error is not None:
+                    raise CommandError(f"Falló el broker simulado: {pila.error}")
+                time.sleep(0.05)
+            inicio = time.monotonic()
+            guardados_inicio = recolector.guardados
+            emitidos_inicio = servidor.ticks_emitidos
+            try:
+                while time.monotonic() - inicio < options["duracion"]:
+                    if pila.error is not None:
+                        raise CommandError(f"Falló el broker simulado: {pila.error}")
+                    gestor.configuracion.refresh_from_db()
+                    if gestor.configuracion.estado != ConfiguracionBot.Estado.OPERANDO:
+                        # Meta o stop-loss alcanzados: se reinicia para seguir midiendo
+                        gestor.inicializar_balance(gestor.configuracion.balance_actual)
+                        reinicios += 1
+
+                    perfilador.iniciar_ciclo()
+                    comienzo = time.perf_counter()
+                    with CaptureQueriesContext(connection) as consultas:
+                        operacion = motor.ejecutar_ciclo()
+                    duracion_ms = (time.perf_counter() - comienzo) * 1000
+                    perfilador.finalizar_ciclo()
+                    consultas_por_ciclo.append(len(consultas))
+
+                    if operacion is None:
+                        ciclo_sin_orden.registrar(duracion_ms)
+                    else:
+                        operaciones += 1
+                        ciclo_con_orden.registrar(duracion_ms)
+                        ultimo_tick = (
+                            Tick.objects.filter(
+                                activo=operacion.activo, epoch__lte=operacion.hora_inicio
+                            )
+                            .order_by("-epoch")
+                            .values_list("epoch", flat=True)
+                            .first()
+                        )
+                        if ultimo_tick is not None:
+                            tick_a_decision.registrar(
+                                (operacion.hora_inicio - ultimo_tick).total_seconds() * 1000
+                            )
+                    time.sleep(max(0.0, options["intervalo"]))
+            finally:
+                transcurrido = time.monotonic() - inicio
+                guardados = recolector.guardados - guardados_inicio
+                emitidos = servidor.ticks_emitidos - emitidos_inicio
+                pila.detener()
+                motor.cerrar()
+
+        etapas = perfilador.resumen()
+        for datos in etapas.values():
+            datos.pop("muestras")
+        return {
+            "benchmark": "e2e",
+            "fecha": timezone.now().isoformat(),
+            "version": version_codigo(),
+            "parametros": {
+                "activos": options["activos"],
+                "ticks_por_segundo": options["ticks_por_segundo"],
+                "duracion": options["duracion"],
+                "intervalo": options["intervalo"],
+                "semilla": options["semilla"],
+                "latencia_ms": options["latencia_ms"],
+                "umbral_score": options["umbral_score"],
+                "max_trades_por_activo": options["max_trades_por_activo"],
+                "motor_bd": connection.vendor,
+            },
+            "conteos": {
+                "ciclos": len(consultas_por_ciclo),
+                "operaciones": operaciones,
+                "reinicios_balance": reinicios,
+                "ticks_emitidos": emitidos,
+                "ticks_guardados": guardados,
+            },
+            "metricas": {
+                "tick_a_decision": _distribucion(tick_a_decision),
+                "decision_a_compra": etapas.get("envio_orden", {}),
+                "compra_a_liquidacion": etapas.get("liquidacion", {}),
+                "ciclo": etapas.get("ciclo_total", {}),
+                "ciclo_sin_orden": _distribucion(ciclo_sin_orden),
+                "ciclo_con_orden": _distribucion(ciclo_con_orden),
+                "etapas": {
+                    etapa: datos
+                    for etapa, datos in etapas.items()
+                    if etapa not in ("ciclo_total", "envio_orden", "liquidacion")
+                },
+                "ingesta": {
+                    "ticks_por_segundo": guardados / transcurrido if transcurrido else 0.0,
+                    "latencia": _distribucion(latencias_ingesta),
+                },
+                "consultas_por_ciclo": {
+                    "media": statistics.mean(consultas_por_ciclo) if consultas_por_ciclo else 0.0,
+                    "p95": (
+                        sorted(consultas_por_ciclo)[int(0.95 * (len(consultas_por_ciclo) - 1))]
+                        if consultas_por_ciclo
+                        else 0
+                    ),
+                    "max": max(consultas_por_ciclo, default=0),
+                },
+            },
+        }
+
+    def _imprimir(self, resultado: Dict) -> None:
+        conteos = resultado["conteos"]
+        metricas = resultado["metricas"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{conteos['ciclos']} ciclos, {conteos['operaciones']} operaciones, "
+                f"{conteos['ticks_guardados']}/{conteos['ticks_emitidos']} ticks guardados"
+            )
+        )
+        self.stdout.write(f"{'métrica':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for nombre in (
+            "tick_a_decision",
+            "decision_a_compra",
+            "compra_a_liquidacion",
+            "ciclo_sin_orden",
+            "ciclo_con_orden",
+        ):
+            datos = metricas[nombre]
+            if not datos or not datos.get("max_ms"):
+                self.stdout.write(f"{nombre:<24} {'-':>9}")
+                continue
+            self.stdout.write(
+                f"{nombre:<24} {datos['p50_ms']:>9.1f} {datos['p95_ms']:>9.1f} "
+                f"{datos['p99_ms']:>9.1f} {datos['max_ms']:>9.1f}"
+            )
+        ingesta = metricas["ingesta"]
+        self.stdout.write(
+            f"Ingesta: {ingesta['ticks_por_segundo']:.1f} ticks/s, latencia "
+            f"p50={ingesta['latencia']['p50_ms']:.1f}ms p95={ingesta['latencia']['p95_ms']:.1f}ms"
+        )
+        consultas = metricas["consultas_por_ciclo"]
+        self.stdout.write(
+            f"Consultas por ciclo: media={consultas['media']:.1f} p95={consultas['p95']} "
+            f"max={consultas['max']}"
+        )
@@ -0,0 +1,84 @@
+"""
+Comando para medir cómo escala la evaluación de activos con el número de workers.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from trading.services_profesional import MotorTradingProfesional
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de evaluación de activos del motor profesional "
+        "en modo secuencial y con 1..N workers (hilos o procesos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=4,
+            help="Número máximo de workers a medir (default: 4)",
+        )
+        parser.add_argument(
+            "--pool",
+            choices=["hilos", "procesos"],
+            default="hilos",
+            help="Tipo de pool de workers (default: hilos)",
+        )
+        parser.add_argument(
+            "--repeticiones",
+            type=int,
+            default=3,
+            help="Ejecuciones medidas por configuración (default: 3)",
+        )
+
+    def _medir(self, motor: MotorTradingProfesional) -> float:
+        # Cada medición se revierte para que cooldowns e indicadores
+        # escritos no alteren las siguientes ejecuciones.
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            motor._evaluar_activos()
+            transcurrido = time.perf_counter() - inicio
+            transaction.set_rollback(True)
+        return transcurrido
+
+    def handle(self, *args, **options):
+        max_workers = max(1, options["max_workers"])
+        repeticiones = max(1, options["repeticiones"])
+        pool = options["pool"]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Benchmark de evaluación ({pool}, {repeticiones} repeticiones)"
+            )
+        )
+        self.stdout.write(f"{'workers':>8} {'media (s)':>10} {'min (s)':>10} {'speedup':>8}")
+
+        base = None
+        # 0 = modo secuencial original (con cache de ticks) como referencia
+        for workers in range(0, max_workers + 1):
+            motor = MotorTradingProfesional(
+                workers_evaluacion=workers, tipo_pool_evaluacion=pool
+            )
+            try:
+                # Calentamiento: arranque del pool y caches de conexión
+                self._medir(motor)
+                tiempos = [self._medir(motor) for _ in range(repeticiones)]
+            finally:
+                motor.cerrar()
+
+            media = statistics.mean(tiempos)
+            if base is None:
+                base = media
+            etiqueta = workers if workers else "sec."
+            self.stdout.write(
+                f"{etiqueta:>8} {media:>10.4f} {min(tiempos):>10.4f} {base / media:>7.2f}x"
+            )
+
+        self.stdout.write(
+            f"Candidatos evaluados por ciclo: {motor.estadisticas_evaluacion.candidatos}"
+        )
@@ -0,0 +1,168 @@
+"""
+Microbenchmarks de las funciones calientes: implementación original frente
+al motor optimizado, con verificación de paridad.
+"""
+import json
+import platform
+from dataclasses import asdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.monitoreo.regresiones import (
+    aplanar_metricas,
+    cargar_metricas,
+    detectar_regresiones,
+    version_codigo,
+)
+from trading.microbenchmarks import (
+    CASOS,
+    ResultadoMicrobenchmark,
+    ejecutar_microbenchmarks,
+    metricas_microbenchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide indicadores, scoring, monto adaptativo y simulador de horarios en su "
+        "implementación original y en la optimizada, para varios tamaños de ventana "
+        "y de universo, y verifica que ambas den los mismos resultados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--casos",
+            nargs="+",
+            choices=sorted(CASOS),
+            help="Casos a ejecutar (default: todos)",
+        )
+        parser.add_argument(
+            "--ventanas",
+            nargs="+",
+            type=int,
+            help="Ticks por ventana (ticks por hora en el simulador); reemplaza los del caso",
+        )
+        parser.add_argument(
+            "--activos", nargs="+", type=int, help="Tamaños de universo; reemplaza los del caso"
+        )
+        parser.add_argument("--repeticiones", type=int, default=5, help="Muestras por implementación")
+        parser.add_argument(
+            "--tiempo-minimo",
+            type=float,
+            default=0.02,
+            help="Segundos mínimos por muestra (default: 0.02)",
+        )
+        parser.add_argument("--semilla", type=int, default=7)
+        parser.add_argument("--salida", type=str, default="benchmark_micro.json")
+        parser.add_argument(
+            "--referencia", type=str, default="", help="JSON de una ejecución anterior a comparar"
+        )
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=0.25,
+            help="Empeoramiento relativo permitido frente a --referencia (default: 0.25)",
+        )
+        parser.add_argument(
+            "--umbrales",
+            type=str,
+            default="",
+            help='JSON {métrica: límite}, p. ej. {"indicadores.v20_a100.speedup": 5}',
+        )
+        parser.add_argument(
+            "--estricto",
+            action="store_true",
+            help="Terminar con error si hay regresiones",
+        )
+
+    def handle(self, *args, **options):
+        if any(valor < 1 for valor in (options["ventanas"] or []) + (options["activos"] or [])):
+            raise CommandError("--ventanas y --activos deben ser mayores que 0.")
+        try:
+            umbrales = json.loads(options["umbrales"]) if options["umbrales"] else {}
+        except json.JSONDecodeError as exc:
+            raise CommandError(f"--umbrales no es JSON válido: {exc}")
+        referencia = cargar_metricas(options["referencia"]) if options["referencia"] else None
+
+        self.stdout.write(
+            f"{'caso':<20} {'ventana':>7} {'activos':>7} {'actual ms':>10} "
+            f"{'optim. ms':>10} {'speedup':>8}  paridad"
+        )
+        resultados = ejecutar_microbenchmarks(
+            casos=options["casos"],
+            ventanas=options["ventanas"],
+            activos=options["activos"],
+            repeticiones=max(1, options["repeticiones"]),
+            tiempo_minimo=max(0.0, options["tiempo_minimo"]),
+            semilla=options["semilla"],
+            al_terminar=self._imprimir,
+        )
+
+        metricas = metricas_microbenchmarks(resultados)
+        regresiones = detectar_regresiones(
+            aplanar_metricas(metricas),
+            umbrales=umbrales,
+            referencia=referencia,
+            tolerancia=options["tolerancia"],
+            margen_absoluto=0.05,
+        )
+        sin_paridad = [resultado for resultado in resultados if resultado.diferencias]
+        salida = {
+            "benchmark": "micro",
+            "fecha": timezone.now().isoformat(),
+            "version": version_codigo(),
+            "entorno": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "maquina": platform.machine(),
+            },
+            "parametros": {
+                "repeticiones": options["repeticiones"],
+                "tiempo_minimo": options["tiempo_minimo"],
+                "semilla": options["semilla"],
+            },
+            "casos": {
+                nombre: {"funcion": CASOS[nombre].funcion, "optimizado_por": CASOS[nombre].optimizado_por}
+                for nombre in options["casos"] or CASOS
+            },
+            "resultados": [asdict(resultado) for resultado in resultados],
+            "paridad": not sin_paridad,
+            "metricas": metricas,
+            "umbrales": umbrales,
+            "regresiones": [asdict(regresion) for regresion in regresiones],
+        }
+        with open(options["salida"], "w", encoding="utf-8") as archivo:
+            json.dump(salida, archivo, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        for regresion in regresiones:
+            self.stdout.write(self.style.WARNING(f"REGRESIÓN {regresion.describir()}"))
+        # Una optimización que cambia los números es un error siempre, no una regresión
+        if sin_paridad:
+            for resultado in sin_paridad:
+                for ejemplo in resultado.ejemplos:
+                    self.stdout.write(
+                        self.style.ERROR(f"{resultado.caso} {resultado.etiqueta}: {ejemplo}")
+                    )
+            raise CommandError(
+                f"{len(sin_paridad)} combinaciones con resultados distintos entre implementaciones."
+            )
+        if regresiones and options["estricto"]:
+            raise CommandError(f"{len(regresiones)} regresiones detectadas.")
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS("Paridad verificada, sin regresiones."))
+
+    def _imprimir(self, resultado: ResultadoMicrobenchmark) -> None:
+        paridad = (
+            self.style.SUCCESS("ok")
+            if not resultado.diferencias
+            else self.style.ERROR(f"{resultado.diferencias} diferencias")
+        )
+        ventana = "-" if resultado.ventana is None else resultado.ventana
+        self.stdout.write(
+            f"{resultado.caso:<20} {ventana:>7} {resultado.activos:>7} "
+            f"{resultado.actual['mediana_ms']:>10.3f} {resultado.optimizado['mediana_ms']:>10.3f} "
+            f"{resultado.speedup:>7.1f}x  {paridad}"
+        )
@@ -0,0 +1,47 @@
+"""
+Comando para comparar las variantes en modo sombra con el motor real.
+"""
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from trading.variantes import resumen_variantes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el winrate y el rendimiento por unidad invertida de las "
+        "variantes evaluadas en modo sombra con las operaciones reales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horas",
+            type=float,
+            default=24,
+            help="Horas hacia atrás a comparar (0 = todo el historial, default: 24)",
+        )
+        parser.add_argument("--pago", type=str, default="0.95", help="Pago por operación ganada")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        desde = None
+        if options["horas"] > 0:
+            desde = timezone.now() - timedelta(hours=options["horas"])
+        filas = resumen_variantes(desde=desde, pago=Decimal(options["pago"]))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(filas, indent=2, default=str))
+            return
+
+        self.stdout.write(
+            f"{'variante':<20} {'ops':>6} {'ganadas':>8} {'pend':>5} {'winrate':>8} {'rend/u':>8}"
+        )
+        for fila in filas:
+            self.stdout.write(
+                f"{fila['variante']:<20} {fila['total']:>6} {fila['ganadas']:>8} "
+                f"{fila['pendientes']:>5} {fila['winrate']:>8} {fila['rendimiento_unitario']:>8}"
+            )
@@ -0,0 +1,143 @@
+"""
+Comando para estimar el perfil de riesgo de la política de monto y stop-loss.
+"""
+import json
+from dataclasses import asdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ConfiguracionBot
+from trading.risk.montecarlo import (
+    PerfilActivo,
+    PoliticaRiesgo,
+    perfiles_desde_operaciones,
+    simular_politica,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula miles de trayectorias de balance con el winrate y pago "
+        "empíricos de cada activo y reporta probabilidad de ruina, drawdown, "
+        "pausas por stop-loss y tiempo hasta el objetivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trayectorias", type=int, default=10000)
+        parser.add_argument(
+            "--dias", type=float, default=30, help="Horizonte simulado en días (default: 30)"
+        )
+        parser.add_argument(
+            "--dias-historial",
+            type=int,
+            default=30,
+            help="Días de operaciones usados para los perfiles (default: 30)",
+        )
+        parser.add_argument(
+            "--incluir-simuladas",
+            action="store_true",
+            help="Incluir operaciones de la simulación de pausa en el winrate",
+        )
+        parser.add_argument(
+            "--winrate",
+            type=float,
+            default=None,
+            help="Ignora el historial y usa un único activo con este winrate (0-100)",
+        )
+        parser.add_argument("--pago", type=float, default=0.95, help="Pago por defecto")
+        parser.add_argument("--balance", type=float, default=None, help="Balance inicial")
+        parser.add_argument("--riesgo-base", type=str, default="0.005")
+        parser.add_argument(
+            "--meta", type=str, default=str(ConfiguracionBot.META_PORCENTAJE)
+        )
+        parser.add_argument(
+            "--stop-loss", type=str, default=str(ConfiguracionBot.STOP_LOSS_PORCENTAJE)
+        )
+        parser.add_argument("--horas-pausa", type=float, default=24)
+        parser.add_argument(
+            "--operaciones-hora",
+            type=float,
+            default=30,
+            help="Operaciones por hora mientras el bot opera (default: 30)",
+        )
+        parser.add_argument(
+            "--objetivo",
+            type=float,
+            default=None,
+            help="Ganancia objetivo sobre el balance inicial (default: --meta)",
+        )
+        parser.add_argument("--semilla", type=int, default=None)
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if options["winrate"] is not None:
+            perfiles = [
+                PerfilActivo(
+                    nombre="manual",
+                    winrate=options["winrate"] / 100,
+                    pago=options["pago"],
+                )
+            ]
+        else:
+            perfiles = perfiles_desde_operaciones(
+                dias=options["dias_historial"],
+                incluir_simuladas=options["incluir_simuladas"],
+                pago_por_defecto=options["pago"],
+            )
+        if not perfiles:
+            raise CommandError(
+                "No hay operaciones cerradas en el historial. Use --winrate o --incluir-simuladas."
+            )
+
+        balance = options["balance"]
+        if balance is None:
+            balance = float(ConfiguracionBot.obtener().balance_actual) or 1000.0
+
+        politica = PoliticaRiesgo(
+            riesgo_base=Decimal(options["riesgo_base"]),
+            meta_porcentaje=Decimal(options["meta"]),
+            stop_loss_porcentaje=Decimal(options["stop_loss"]),
+            horas_pausa=options["horas_pausa"],
+            operaciones_por_hora=options["operaciones_hora"],
+        )
+        resultado = simular_politica(
+            perfiles,
+            politica,
+            balance_inicial=balance,
+            horizonte_horas=options["dias"] * 24,
+            trayectorias=max(1, options["trayectorias"]),
+            objetivo_porcentaje=options["objetivo"],
+            semilla=options["semilla"],
+        )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(asdict(resultado), indent=2))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{resultado.trayectorias} trayectorias, {options['dias']:g} días, "
+                f"{len(perfiles)} activos, {resultado.segundos_ejecucion:.2f}s"
+            )
+        )
+        for perfil in perfiles:
+            self.stdout.write(
+                f"  {perfil.nombre:<14} winrate={perfil.winrate * 100:6.2f}% "
+                f"pago={perfil.pago:.3f} vol={perfil.volatilidad:.4f} peso={perfil.peso:g}"
+            )
+        self.stdout.write(f"Probabilidad de ruina: {resultado.probabilidad_ruina:.2%}")
+        self.stdout.write(
+            f"Probabilidad de alcanzar el objetivo: {resultado.probabilidad_objetivo:.2%}"
+        )
+        self.stdout.write(f"Operaciones promedio: {resultado.operaciones_promedio:.0f}")
+        self.stdout.write(f"Pausas promedio: {resultado.pausas_promedio:.2f}")
+
+        self.stdout.write(f"{'percentil':>10} {'balance':>10} {'drawdown %':>11} {'pausas':>7} {'h objetivo':>11}")
+        for percentil in resultado.balance_final:
+            self.stdout.write(
+                f"{percentil:>10} {resultado.balance_final[percentil]:>10.2f} "
+                f"{resultado.drawdown_maximo_pct[percentil]:>11.2f} "
+                f"{resultado.pausas[percentil]:>7.1f} "
+                f"{resultado.horas_hasta_objetivo[percentil]:>11.1f}"
+            )
@@ -0,0 +1,512 @@
+"""
+Microbenchmarks de las funciones calientes de señales, scoring, riesgo y
+simulador.
+
+Cada caso mide la implementación original (Decimal / instancias de modelo)
+frente al motor optimizado que la reemplaza en el bot (NumPy), sobre los
+mismos datos sintéticos de ``MercadoSintetico``, y verifica que ambas
+devuelvan exactamente los mismos números para cada activo. Los tiempos del
+motor optimizado incluyen la conversión desde las mismas entradas que
+recibe la implementación original.
+"""
+import statistics
+import timeit
+from dataclasses import dataclass, field
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.utils import timezone
+
+from historial.models import Tick
+from integracion_deriv.mercado_sintetico import MercadoSintetico, simbolos_sinteticos
+from simulacion.services import SimuladorHorariosService
+from simulacion.vectorizado import (
+    calcular_horas_locales,
+    epochs_a_segundos,
+    simular_duraciones,
+)
+from trading.models import IndicadoresActivo, RendimientoActivo
+from trading.ranking import calcular_score_activo, construir_matriz_indicadores
+from trading.ranking.vectorizado import calcular_scores_vectorizados, redondear_centesimas
+from trading.risk import PoliticaRiesgo, calcular_monto_adaptativo
+from trading.risk.montecarlo import fraccion_monto
+from trading.services_profesional import calcular_indicadores_precios
+from trading.signals import (
+    calcular_consistencia,
+    calcular_ema,
+    calcular_momentum,
+    calcular_rate_of_change,
+    calcular_volatilidad,
+)
+from trading.signals.vectorizado import (
+    COL_DIRECCION,
+    COLUMNAS_SENALES,
+    PERIODO_VOLATILIDAD,
+    calcular_indicadores_ventanas,
+    precios_a_unidades,
+)
+
+# Ticks por ventana (``periodo_analisis`` del motor y múltiplos) y tamaños
+# de universo habituales (12 activos habilitados hoy, cientos en pruebas de carga)
+VENTANAS_POR_DEFECTO = (20, 100, 500)
+ACTIVOS_POR_DEFECTO = (1, 12, 100, 500)
+# En el simulador la "ventana" son los ticks por hora de cada símbolo
+TICKS_POR_HORA_SIMULADOR = (600, 3600)
+ACTIVOS_SIMULADOR = (1, 12)
+HORAS_SIMULADOR = 4
+DURACION_SIMULADOR = 5
+OPERACIONES_POR_HORARIO = 5
+TOLERANCIA_PARIDAD = 1e-9
+MAX_EJEMPLOS = 3
+
+# Lunes 00:00 UTC: las horas simuladas empiezan en un borde de hora
+_EPOCH_BASE = datetime(2026, 1, 5, tzinfo=dt_timezone.utc).timestamp()
+
+
+@dataclass
+class CasoMicrobenchmark:
+    """
+    Función original, su reemplazo optimizado y cómo compararlos.
+
+    ``preparar(ventana, activos, semilla)`` arma los datos de entrada;
+    ``actual`` y ``optimizado`` reciben esos datos y devuelven un resultado
+    por activo que ``comparar`` contrasta (lista de diferencias legibles).
+    """
+    nombre: str
+    funcion: str
+    optimizado_por: str
+    preparar: Callable[[Optional[int], int, int], Any]
+    actual: Callable[[Any], Any]
+    optimizado: Callable[[Any], Any]
+    comparar: Callable[[Any, Any], List[str]]
+    ventanas: Optional[Sequence[int]] = VENTANAS_POR_DEFECTO
+    activos: Sequence[int] = ACTIVOS_POR_DEFECTO
+
+
+@dataclass
+class ResultadoMicrobenchmark:
+    caso: str
+    ventana: Optional[int]
+    activos: int
+    actual: Dict[str, float]
+    optimizado: Dict[str, float]
+    speedup: float
+    diferencias: int = 0
+    ejemplos: List[str] = field(default_factory=list)
+
+    @property
+    def etiqueta(self) -> str:
+        if self.ventana is None:
+            return f"a{self.activos}"
+        return f"v{self.ventana}_a{self.activos}"
+
+
+# --- Datos sintéticos ---------------------------------------------------------
+
+def _matriz_precios(pasos: int, activos: int, semilla: int, intervalo_tick: float = 1.0) -> np.ndarray:
+    """Precios (pasos, activos) del mercado sintético, del más antiguo al más reciente."""
+    mercado = MercadoSintetico(
+        simbolos_sinteticos(activos),
+        semilla=semilla,
+        intervalo_tick=intervalo_tick,
+        epoch_inicial=_EPOCH_BASE,
+        historial=2,
+    )
+    filas = [mercado.precios()]
+    filas.extend(mercado.avanzar() for _ in range(pasos - 1))
+    return np.stack(filas)
+
+
+def _a_decimal(valores: np.ndarray) -> List[Decimal]:
+    """Precios como los devuelve ``Tick.precio`` (Decimal con 5 decimales)."""
+    return [Decimal(f"{valor:.5f}") for valor in valores.tolist()]
+
+
+def _preparar_ventanas(ventana: Optional[int], activos: int, semilla: int) -> List[List[Decimal]]:
+    matriz = _matriz_precios(ventana or 20, activos, semilla)
+    return [_a_decimal(matriz[:, columna]) for columna in range(activos)]
+
+
+def _preparar_scoring(ventana: Optional[int], activos: int, semilla: int) -> Dict[str, Any]:
+    indicadores = [calcular_indicadores_precios(precios) for precios in _preparar_ventanas(ventana, activos, semilla)]
+    rng = np.random.default_rng(semilla)
+    # Un tercio de los activos sin historial (winrate neutro)
+    winrates = [
+        None if rng.random() < 1 / 3 else Decimal(f"{rng.uniform(20, 80):.2f}")
+        for _ in range(activos)
+    ]
+    return {
+        "indicadores": indicadores,
+        "modelos": [IndicadoresActivo(**fila) for fila in indicadores],
+        "rendimientos": [
+            RendimientoActivo(winrate_dinamico=winrate) if winrate is not None else None
+            for winrate in winrates
+        ],
+        "winrates": winrates,
+    }
+
+
+def _preparar_montos(ventana: Optional[int], activos: int, semilla: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(semilla)
+    # Hasta 3.0 para cubrir también el recorte por volatilidad máxima (2.0)
+    return {
+        "balance": Decimal("1234.56"),
+        "volatilidades": [Decimal(f"{valor:.4f}") for valor in rng.uniform(0, 3, activos)],
+    }
+
+
+def _preparar_simulador(ventana: Optional[int], activos: int, semilla: int) -> Dict[str, Any]:
+    ticks_por_hora = ventana or 3600
+    intervalo = 3600 / ticks_por_hora
+    matriz = _matriz_precios(HORAS_SIMULADOR * ticks_por_hora, activos, semilla, intervalo)
+    epochs = [
+        datetime.fromtimestamp(_EPOCH_BASE + paso * intervalo, dt_timezone.utc)
+        for paso in range(matriz.shape[0])
+    ]
+    simbolos = []
+    for columna, simbolo in enumerate(simbolos_sinteticos(activos)):
+        precios = _a_decimal(matriz[:, columna])
+        simbolos.append(
+            {
+                "simbolo": simbolo,
+                "epochs": epochs,
+                "precios": precios,
+                "ticks": [
+                    Tick(activo=simbolo, epoch=epoch, precio=precio)
+                    for epoch, precio in zip(epochs, precios)
+                ],
+            }
+        )
+    # Sin persistir operaciones: registrar cada Operacion es común a ambos caminos
+    servicio = SimuladorHorariosService(
+        operaciones_por_horario=OPERACIONES_POR_HORARIO,
+        activo=simbolos[0]["simbolo"],
+        duracion_ticks=DURACION_SIMULADOR,
+        persistir_operaciones=False,
+    )
+    return {"simbolos": simbolos, "servicio": servicio, "tz": timezone.get_current_timezone()}
+
+
+# --- Implementaciones medidas -------------------------------------------------
+
+def _indicador_actual(funcion: Callable, periodo: int, posicion: Optional[int] = None) -> Callable:
+    def _actual(ventanas: List[List[Decimal]]) -> List[float]:
+        resultados = [funcion(precios, periodo=periodo) for precios in ventanas]
+        if posicion is not None:
+            resultados = [resultado[posicion] for resultado in resultados]
+        return [float(resultado) for resultado in resultados]
+
+    return _actual
+
+
+def _indicadores_vectorizados(ventanas: List[List[Decimal]]) -> np.ndarray:
+    # El motor vectorizado solo lee los últimos PERIODO_VOLATILIDAD ticks
+    return calcular_indicadores_ventanas(
+        precios_a_unidades([precios[-PERIODO_VOLATILIDAD:] for precios in ventanas])
+    )
+
+
+def _indicador_optimizado(columna: int) -> Callable:
+    def _optimizado(ventanas: List[List[Decimal]]) -> np.ndarray:
+        return _indicadores_vectorizados(ventanas)[:, columna]
+
+    return _optimizado
+
+
+_CODIGO_DIRECCION = {"CALL": 1.0, "NONE": 0.0, "PUT": -1.0}
+
+
+def _indicadores_actual(ventanas: List[List[Decimal]]) -> np.ndarray:
+    filas = []
+    for precios in ventanas:
+        indicadores = calcular_indicadores_precios(precios)
+        fila = [float(indicadores[columna]) for columna in COLUMNAS_SENALES[:COL_DIRECCION]]
+        fila.append(_CODIGO_DIRECCION[indicadores["direccion_sugerida"]])
+        filas.append(fila)
+    return np.array(filas)
+
+
+def _score_actual(datos: Dict[str, Any]) -> List[float]:
+    return [
+        float(calcular_score_activo(indicadores, rendimiento))
+        for indicadores, rendimiento in zip(datos["modelos"], datos["rendimientos"])
+    ]
+
+
+def _score_optimizado(datos: Dict[str, Any]) -> np.ndarray:
+    winrates = np.array(
+        [50.0 if winrate is None else float(winrate) for winrate in datos["winrates"]]
+    )
+    return calcular_scores_vectorizados(
+        construir_matriz_indicadores(datos["indicadores"]), winrates
+    )
+
+
+def _monto_actual(datos: Dict[str, Any]) -> List[float]:
+    return [
+        float(calcular_monto_adaptativo(datos["balance"], volatilidad))
+        for volatilidad in datos["volatilidades"]
+    ]
+
+
+def _monto_optimizado(datos: Dict[str, Any]) -> np.ndarray:
+    volatilidades = np.array([float(valor) for valor in datos["volatilidades"]])
+    return redondear_centesimas(
+        float(datos["balance"]) * fraccion_monto(volatilidades, PoliticaRiesgo())
+    )
+
+
+def _simulador_actual(datos: Dict[str, Any]) -> List[Dict[int, tuple]]:
+    servicio = datos["servicio"]
+    resultados = []
+    for simbolo in datos["simbolos"]:
+        por_hora = servicio._agrupar_ticks_por_hora(simbolo["ticks"], datos["tz"])
+        resultados.append(
+            {
+                hora: tuple(
+                    servicio._simular_operaciones_con_ticks(
+                        por_hora.get(hora, []), DURACION_SIMULADOR
+                    ).values()
+                )
+                for hora in range(24)
+            }
+        )
+    return resultados
+
+
+def _simulador_optimizado(datos: Dict[str, Any]) -> List[Dict[int, tuple]]:
+    resultados = []
+    for simbolo in datos["simbolos"]:
+        epochs = simbolo["epochs"]
+        horas = calcular_horas_locales(epochs, epochs_a_segundos(epochs), datos["tz"])
+        simulacion = simular_duraciones(
+            horas.astype(np.uint8),
+            np.array(simbolo["precios"], dtype=np.float64),
+            [DURACION_SIMULADOR],
+            OPERACIONES_POR_HORARIO,
+        )[DURACION_SIMULADOR]
+        resultados.append(
+            {
+                hora: (
+                    int(simulacion.ganadas_por_hora[hora]),
+                    int(simulacion.perdidas_por_hora[hora]),
+                )
+                for hora in range(24)
+            }
+        )
+    return resultados
+
+
+# --- Paridad ------------------------------------------------------------------
+
+def _comparar_numeros(actual: Sequence[float], optimizado: Sequence[float]) -> List[str]:
+    optimizado = np.asarray(optimizado, dtype=np.float64)
+    if len(actual) != len(optimizado):
+        return [f"{len(actual)} resultados vs {len(optimizado)}"]
+    distintos = np.flatnonzero(
+        np.abs(np.asarray(actual, dtype=np.float64) - optimizado) > TOLERANCIA_PARIDAD
+    )
+    return [
+        f"activo {indice}: {actual[indice]!r} vs {float(optimizado[indice])!r}"
+        for indice in distintos.tolist()
+    ]
+
+
+def _comparar_matrices(actual: np.ndarray, optimizado: np.ndarray) -> List[str]:
+    if actual.shape != optimizado.shape:
+        return [f"forma {actual.shape} vs {optimizado.shape}"]
+    distintos = np.argwhere(np.abs(actual - optimizado) > TOLERANCIA_PARIDAD)
+    return [
+        f"activo {fila} {COLUMNAS_SENALES[columna]}: {actual[fila, columna]!r} vs {optimizado[fila, columna]!r}"
+        for fila, columna in distintos.tolist()
+    ]
+
+
+def _comparar_simulaciones(actual: List[Dict], optimizado: List[Dict]) -> List[str]:
+    diferencias = []
+    for indice, (original, vectorizado) in enumerate(zip(actual, optimizado)):
+        for hora in range(24):
+            if original[hora] != vectorizado[hora]:
+                diferencias.append(
+                    f"activo {indice} hora {hora}: {original[hora]} vs {vectorizado[hora]}"
+                )
+    return diferencias
+
+
+def _caso_indicador(nombre: str, funcion: Callable, periodo: int, columna: int, posicion=None):
+    return CasoMicrobenchmark(
+        nombre=nombre,
+        funcion=f"trading.signals.{funcion.__name__}",
+        optimizado_por="trading.signals.vectorizado.calcular_indicadores_ventanas",
+        preparar=_preparar_ventanas,
+        actual=_indicador_actual(funcion, periodo, posicion),
+        optimizado=_indicador_optimizado(columna),
+        comparar=_comparar_numeros,
+    )
+
+
+CASOS: Dict[str, CasoMicrobenchmark] = {
+    caso.nombre: caso
+    for caso in (
+        # Mismos periodos que calcular_indicadores_precios
+        _caso_indicador("momentum", calcular_momentum, 10, 0, posicion=1),
+        _caso_indicador("rate_of_change", calcular_rate_of_change, 10, 1),
+        _caso_indicador("volatilidad", calcular_volatilidad, 20, 2),
+        _caso_indicador("ema", calcular_ema, 10, 3),
+        _caso_indicador("consistencia", calcular_consistencia, 10, 5),
+        # Todos los indicadores y la dirección, como los pide el motor en cada ciclo
+        CasoMicrobenchmark(
+            nombre="indicadores",
+            funcion="trading.services_profesional.calcular_indicadores_precios",
+            optimizado_por="trading.signals.vectorizado.calcular_indicadores_ventanas",
+            preparar=_preparar_ventanas,
+            actual=_indicadores_actual,
+            optimizado=_indicadores_vectorizados,
+            comparar=_comparar_matrices,
+        ),
+        CasoMicrobenchmark(
+            nombre="score_activo",
+            funcion="trading.ranking.calcular_score_activo",
+            optimizado_por="trading.ranking.vectorizado.calcular_scores_vectorizados",
+            preparar=_preparar_scoring,
+            actual=_score_actual,
+            optimizado=_score_optimizado,
+            comparar=_comparar_numeros,
+            ventanas=None,
+            activos=(12, 100, 1000, 5000),
+        ),
+        CasoMicrobenchmark(
+            nombre="monto_adaptativo",
+            funcion="trading.risk.calcular_monto_adaptativo",
+            optimizado_por="trading.risk.montecarlo.fraccion_monto",
+            preparar=_preparar_montos,
+            actual=_monto_actual,
+            optimizado=_monto_optimizado,
+            comparar=_comparar_numeros,
+            ventanas=None,
+            activos=(12, 100, 1000, 10000),
+        ),
+        CasoMicrobenchmark(
+            nombre="simulador_horarios",
+            funcion="simulacion.services.SimuladorHorariosService._simular_operaciones_con_ticks",
+            optimizado_por="simulacion.vectorizado.simular_duraciones",
+            preparar=_preparar_simulador,
+            actual=_simulador_actual,
+            optimizado=_simulador_optimizado,
+            comparar=_comparar_simulaciones,
+            ventanas=TICKS_POR_HORA_SIMULADOR,
+            activos=ACTIVOS_SIMULADOR,
+        ),
+    )
+}
+
+
+# --- Medición -----------------------------------------------------------------
+
+def medir(funcion: Callable[[Any], Any], datos: Any, repeticiones: int = 5, tiempo_minimo: float = 0.02) -> Dict[str, float]:
+    """
+    Tiempo por llamada de ``funcion(datos)``.
+
+    Se duplica el número de vueltas hasta que una muestra dure al menos
+    ``tiempo_minimo`` segundos y luego se toman ``repeticiones`` muestras
+    (con el recolector de basura desactivado, como ``timeit``).
+
+    Returns:
+        Diccionario con mediana_ms, min_ms y vueltas por muestra
+    """
+    temporizador = timeit.Timer(lambda: funcion(datos))
+    vueltas = 1
+    while True:
+        transcurrido = temporizador.timeit(vueltas)
+        if transcurrido >= tiempo_minimo:
+            break
+        vueltas *= 2
+    muestras = [transcurrido / vueltas]
+    muestras.extend(
+        temporizador.timeit(vueltas) / vueltas for _ in range(max(0, repeticiones - 1))
+    )
+    return {
+        "mediana_ms": statistics.median(muestras) * 1000,
+        "min_ms": min(muestras) * 1000,
+        "vueltas": vueltas,
+    }
+
+
+def ejecutar_caso(
+    caso: CasoMicrobenchmark,
+    ventana: Optional[int],
+    activos: int,
+    repeticiones: int = 5,
+    tiempo_minimo: float = 0.02,
+    semilla: int = 7,
+) -> ResultadoMicrobenchmark:
+    datos = caso.preparar(ventana, activos, semilla)
+    diferencias = caso.comparar(caso.actual(datos), caso.optimizado(datos))
+    actual = medir(caso.actual, datos, repeticiones, tiempo_minimo)
+    optimizado = medir(caso.optimizado, datos, repeticiones, tiempo_minimo)
+    for tiempos in (actual, optimizado):
+        tiempos["por_activo_us"] = tiempos["mediana_ms"] * 1000 / activos
+    return ResultadoMicrobenchmark(
+        caso=caso.nombre,
+        ventana=ventana,
+        activos=activos,
+        actual=actual,
+        optimizado=optimizado,
+        speedup=actual["mediana_ms"] / optimizado["mediana_ms"],
+        diferencias=len(diferencias),
+        ejemplos=diferencias[:MAX_EJEMPLOS],
+    )
+
+
+def ejecutar_microbenchmarks(
+    casos: Optional[Sequence[str]] = None,
+    ventanas: Optional[Sequence[int]] = None,
+    activos: Optional[Sequence[int]] = None,
+    repeticiones: int = 5,
+    tiempo_minimo: float = 0.02,
+    semilla: int = 7,
+    al_terminar: Optional[Callable[[ResultadoMicrobenchmark], None]] = None,
+) -> List[ResultadoMicrobenchmark]:
+    """
+    Recorre los casos en todas sus combinaciones de ventana y activos.
+
+    Args:
+        casos: Nombres de ``CASOS`` a ejecutar (por defecto todos)
+        ventanas: Reemplaza las ventanas de los casos que las usan
+        activos: Reemplaza los tamaños de universo de todos los casos
+        repeticiones: Muestras por implementación
+        tiempo_minimo: Duración mínima de cada muestra en segundos
+        semilla: Semilla del mercado sintético
+        al_terminar: Callback con cada resultado (progreso)
+
+    Returns:
+        Lista de resultados en orden de ejecución
+    """
+    resultados = []
+    for nombre in casos or CASOS:
+        caso = CASOS[nombre]
+        ventanas_caso = [None] if caso.ventanas is None else (ventanas or caso.ventanas)
+        for ventana in ventanas_caso:
+            for cantidad in activos or caso.activos:
+                resultado = ejecutar_caso(
+                    caso, ventana, cantidad, repeticiones, tiempo_minimo, semilla
+                )
+                resultados.append(resultado)
+                if al_terminar:
+                    al_terminar(resultado)
+    return resultados
+
+
+def metricas_microbenchmarks(resultados: Sequence[ResultadoMicrobenchmark]) -> Dict[str, Dict]:
+    """Métricas anidadas ``{caso: {etiqueta: {...}}}`` para ``detectar_regresiones``."""
+    metricas: Dict[str, Dict] = {}
+    for resultado in resultados:
+        metricas.setdefault(resultado.caso, {})[resultado.etiqueta] = {
+            "actual_ms": resultado.actual["mediana_ms"],
+            "optimizado_ms": resultado.optimizado["mediana_ms"],
+            "speedup": resultado.speedup,
+        }
+    return metricas
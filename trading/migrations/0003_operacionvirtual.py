@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-19 04:55
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0002_alter_cooldownactivo_motivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperacionVirtual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variante', models.CharField(db_index=True, max_length=40)),
+                ('activo', models.CharField(max_length=80)),
+                ('direccion', models.CharField(max_length=4)),
+                ('score', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=5)),
+                ('duracion_ticks', models.PositiveSmallIntegerField(default=5)),
+                ('hora_decision', models.DateTimeField(db_index=True)),
+                ('precio_decision', models.DecimalField(decimal_places=5, max_digits=15)),
+                ('hora_entrada', models.DateTimeField(blank=True, null=True)),
+                ('precio_entrada', models.DecimalField(blank=True, decimal_places=5, max_digits=15, null=True)),
+                ('hora_cierre', models.DateTimeField(blank=True, null=True)),
+                ('precio_cierre', models.DecimalField(blank=True, decimal_places=5, max_digits=15, null=True)),
+                ('resultado', models.CharField(choices=[('win', 'Ganada'), ('loss', 'Perdida'), ('pending', 'Pendiente')], db_index=True, default='pending', max_length=10)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Operación virtual',
+                'verbose_name_plural': 'Operaciones virtuales',
+                'ordering': ('-hora_decision',),
+                'indexes': [models.Index(fields=['variante', 'hora_decision'], name='trading_ope_variant_2869d6_idx')],
+            },
+        ),
+    ]
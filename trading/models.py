@@ -242,3 +242,46 @@ class CooldownActivo(models.Model):
     def esta_activo(self) -> bool:
         """Verifica si el cooldown aún está activo."""
         return timezone.now() < self.finaliza_en
+
+
+class OperacionVirtual(models.Model):
+    """
+    Operación de una variante de estrategia evaluada en modo sombra.
+    No se envía al broker: se liquida con los ticks posteriores a la decisión.
+    """
+    class Resultado(models.TextChoices):
+        GANADA = "win", "Ganada"
+        PERDIDA = "loss", "Perdida"
+        PENDIENTE = "pending", "Pendiente"
+
+    variante = models.CharField(max_length=40, db_index=True)
+    activo = models.CharField(max_length=80)
+    direccion = models.CharField(max_length=4)
+    score = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal("0.00"))
+    duracion_ticks = models.PositiveSmallIntegerField(default=5)
+    
+    hora_decision = models.DateTimeField(db_index=True)
+    precio_decision = models.DecimalField(max_digits=15, decimal_places=5)
+    hora_entrada = models.DateTimeField(null=True, blank=True)
+    precio_entrada = models.DecimalField(max_digits=15, decimal_places=5, null=True, blank=True)
+    hora_cierre = models.DateTimeField(null=True, blank=True)
+    precio_cierre = models.DecimalField(max_digits=15, decimal_places=5, null=True, blank=True)
+    
+    resultado = models.CharField(
+        max_length=10,
+        choices=Resultado.choices,
+        default=Resultado.PENDIENTE,
+        db_index=True,
+    )
+    creado_en = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Operación virtual"
+        verbose_name_plural = "Operaciones virtuales"
+        ordering = ("-hora_decision",)
+        indexes = [
+            models.Index(fields=("variante", "hora_decision")),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.variante}] {self.activo} {self.direccion} {self.resultado}"
@@ -3,6 +3,15 @@ Módulo de scoring y ranking de activos.
 """
 
 from .scorer import calcular_score_activo
+from .vectorizado import (
+    construir_matriz_indicadores,
+    puntuar_activos,
+    seleccionar_top_k,
+)
 
-__all__ = ["calcular_score_activo"]
-
+__all__ = [
+    "calcular_score_activo",
+    "construir_matriz_indicadores",
+    "puntuar_activos",
+    "seleccionar_top_k",
+]
@@ -0,0 +1,239 @@
+"""
+Scoring vectorizado para rankear todos los activos en una sola pasada.
+
+Replica la fórmula de ``calcular_score_activo`` y ``determinar_direccion``
+sobre una matriz de indicadores (una fila por activo) usando NumPy, sin
+necesidad de instancias de ``IndicadoresActivo``.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .scorer import PesosScoring
+
+# Orden de columnas de la matriz producida por la etapa de indicadores
+COLUMNAS_INDICADORES = (
+    "momentum_pct",
+    "rate_of_change",
+    "volatilidad",
+    "tendencia_ema",
+    "precio_actual",
+    "consistencia",
+)
+COL_MOMENTUM = 0
+COL_ROC = 1
+COL_VOLATILIDAD = 2
+COL_EMA = 3
+COL_PRECIO = 4
+COL_CONSISTENCIA = 5
+
+_ETIQUETAS_DIRECCION = np.array(["PUT", "NONE", "CALL"])
+
+
+@dataclass
+class ResultadoScoringVectorizado:
+    scores: np.ndarray
+    direcciones: np.ndarray
+    top_k: np.ndarray
+
+
+def construir_matriz_indicadores(indicadores: Sequence[Dict]) -> np.ndarray:
+    """
+    Construye la matriz de features a partir de los diccionarios de indicadores.
+
+    Args:
+        indicadores: Diccionarios con las claves de ``COLUMNAS_INDICADORES``
+
+    Returns:
+        Matriz float64 de forma (n_activos, 6)
+    """
+    if not indicadores:
+        return np.empty((0, len(COLUMNAS_INDICADORES)), dtype=np.float64)
+    return np.array(
+        [[float(fila[columna]) for columna in COLUMNAS_INDICADORES] for fila in indicadores],
+        dtype=np.float64,
+    )
+
+
+def vector_pesos(pesos=PesosScoring) -> np.ndarray:
+    """
+    Convierte los pesos de scoring en un vector ordenado.
+
+    Orden: momentum, roc, volatilidad, tendencia EMA, consistencia, historial.
+    Acepta la clase ``PesosScoring``, una subclase/instancia con los mismos
+    atributos o un array de 6 posiciones ya construido.
+    """
+    if isinstance(pesos, np.ndarray):
+        return pesos.astype(np.float64)
+    return np.array(
+        [
+            float(pesos.MOMENTUM),
+            float(pesos.ROC),
+            float(pesos.VOLATILIDAD),
+            float(pesos.TENDENCIA_EMA),
+            float(pesos.CONSISTENCIA),
+            float(pesos.HISTORIAL),
+        ],
+        dtype=np.float64,
+    )
+
+
+def redondear_centesimas(valores: np.ndarray) -> np.ndarray:
+    """
+    Redondea a 2 decimales con la semántica de ``Decimal.quantize``
+    (ROUND_HALF_EVEN), tolerando el error de representación de float.
+    """
+    escalado = np.asarray(valores, dtype=np.float64) * 100.0
+    piso = np.floor(escalado)
+    empate = np.abs(escalado - piso - 0.5) < 1e-7
+    redondeado = np.where(empate, piso + (piso % 2 == 1), np.rint(escalado))
+    return redondeado / 100.0
+
+
+def normalizar_vector(
+    valores: np.ndarray, min_valor: float, max_valor: float
+) -> np.ndarray:
+    """Versión vectorizada de ``normalizar_valor`` (rango 0-100, 2 decimales)."""
+    if max_valor == min_valor:
+        return np.full(valores.shape, 50.0)
+    normalizado = (valores - min_valor) / (max_valor - min_valor) * 100.0
+    return redondear_centesimas(np.clip(normalizado, 0.0, 100.0))
+
+
+def normalizar_features(
+    matriz: np.ndarray, winrates: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Normaliza las features de la matriz de indicadores al rango 0-100.
+
+    Args:
+        matriz: Matriz (n_activos, 6) en el orden de ``COLUMNAS_INDICADORES``
+        winrates: Winrate histórico por activo (0-100). None = neutro (50)
+
+    Returns:
+        Matriz (n_activos, 6) alineada con ``vector_pesos``
+    """
+    n = matriz.shape[0]
+    momentum_norm = normalizar_vector(matriz[:, COL_MOMENTUM], -5.0, 5.0)
+    roc_norm = normalizar_vector(matriz[:, COL_ROC], -0.1, 0.1)
+    vol_norm = normalizar_vector(matriz[:, COL_VOLATILIDAD], 0.0, 2.0)
+
+    precio = matriz[:, COL_PRECIO]
+    positivo = precio > 0
+    diferencia_pct = np.zeros(n)
+    np.divide(
+        np.abs(matriz[:, COL_EMA] - precio) * 100.0,
+        precio,
+        out=diferencia_pct,
+        where=positivo,
+    )
+    tendencia_norm = np.where(
+        positivo, normalizar_vector(diferencia_pct, 0.0, 2.0), 0.0
+    )
+
+    if winrates is None:
+        historial = np.full(n, 50.0)
+    else:
+        historial = np.asarray(winrates, dtype=np.float64)
+
+    return np.column_stack(
+        (
+            momentum_norm,
+            roc_norm,
+            vol_norm,
+            tendencia_norm,
+            matriz[:, COL_CONSISTENCIA],
+            historial,
+        )
+    )
+
+
+def calcular_scores_vectorizados(
+    matriz: np.ndarray,
+    winrates: Optional[np.ndarray] = None,
+    pesos=PesosScoring,
+    umbral_minimo: Decimal = Decimal("30.00"),
+) -> np.ndarray:
+    """
+    Calcula el score (0-100) de todos los activos a la vez.
+
+    Equivalente a aplicar ``calcular_score_activo`` fila por fila.
+    """
+    if matriz.shape[0] == 0:
+        return np.empty(0)
+    score = redondear_centesimas(
+        normalizar_features(matriz, winrates) @ vector_pesos(pesos)
+    )
+    score = np.where(score < float(umbral_minimo), 0.0, score)
+    return np.minimum(score, 100.0)
+
+
+def calcular_cotas_superiores(matriz: np.ndarray, pesos=PesosScoring) -> np.ndarray:
+    """
+    Cota superior del score de cada activo antes de consultar su historial.
+
+    Asume winrate histórico de 100 y sin umbral mínimo; el score real
+    (incluida la penalización por confianza horaria) nunca la supera.
+    """
+    return calcular_scores_vectorizados(
+        matriz,
+        winrates=np.full(matriz.shape[0], 100.0),
+        pesos=pesos,
+        umbral_minimo=Decimal("0.00"),
+    )
+
+
+def determinar_direcciones_vectorizado(matriz: np.ndarray) -> np.ndarray:
+    """
+    Determina la dirección (CALL/PUT/NONE) de todos los activos a la vez.
+
+    Equivalente a aplicar ``determinar_direccion`` fila por fila.
+    """
+    votos = (
+        np.sign(matriz[:, COL_MOMENTUM])
+        + np.sign(matriz[:, COL_EMA] - matriz[:, COL_PRECIO])
+        + np.sign(matriz[:, COL_ROC])
+    )
+    return _ETIQUETAS_DIRECCION[np.sign(votos).astype(np.int64) + 1]
+
+
+def seleccionar_top_k(scores: np.ndarray, k: int = 1) -> np.ndarray:
+    """
+    Índices de los K mejores scores en orden descendente.
+    Los empates se resuelven por posición para que el resultado sea determinista.
+    """
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def puntuar_activos(
+    matriz: np.ndarray,
+    winrates: Optional[np.ndarray] = None,
+    pesos=PesosScoring,
+    umbral_minimo: Decimal = Decimal("30.00"),
+    k: int = 1,
+) -> ResultadoScoringVectorizado:
+    """
+    Calcula scores, direcciones y selección top-K para todos los activos.
+
+    Args:
+        matriz: Matriz de indicadores (ver ``construir_matriz_indicadores``)
+        winrates: Winrate histórico por activo (opcional)
+        pesos: Pesos de scoring
+        umbral_minimo: Score mínimo para considerar el activo
+        k: Número de activos a seleccionar
+
+    Returns:
+        ResultadoScoringVectorizado con arrays alineados a las filas de la matriz
+    """
+    scores = calcular_scores_vectorizados(
+        matriz, winrates=winrates, pesos=pesos, umbral_minimo=umbral_minimo
+    )
+    return ResultadoScoringVectorizado(
+        scores=scores,
+        direcciones=determinar_direcciones_vectorizado(matriz),
+        top_k=seleccionar_top_k(scores, k),
+    )
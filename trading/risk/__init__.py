@@ -4,16 +4,30 @@ Módulo de gestión de riesgo profesional.
 
 from .gestor_riesgo import (
     calcular_monto_adaptativo,
+    contar_trades_recientes,
     crear_cooldown,
     detectar_micro_congestion,
+    obtener_activos_en_cooldown,
     verificar_cooldown,
     verificar_limites_activo,
 )
+from .montecarlo import (
+    PerfilActivo,
+    PoliticaRiesgo,
+    perfiles_desde_operaciones,
+    simular_politica,
+)
 
 __all__ = [
+    "PerfilActivo",
+    "PoliticaRiesgo",
     "calcular_monto_adaptativo",
+    "contar_trades_recientes",
     "crear_cooldown",
     "detectar_micro_congestion",
+    "obtener_activos_en_cooldown",
+    "perfiles_desde_operaciones",
+    "simular_politica",
     "verificar_cooldown",
     "verificar_limites_activo",
 ]
@@ -3,7 +3,9 @@ Gestión profesional de riesgo dinámico.
 """
 from datetime import timedelta
 from decimal import Decimal
+from typing import Dict, Set
 
+from django.db.models import Count
 from django.utils import timezone
 
 from core.models import ConfiguracionBot
@@ -69,6 +71,20 @@ def verificar_cooldown(activo_id: int) -> bool:
     return not cooldowns_activos.exists()
 
 
+def obtener_activos_en_cooldown() -> Set[int]:
+    """
+    Obtiene en una sola consulta los IDs de activos con cooldown vigente.
+    
+    Returns:
+        Conjunto de IDs de activos que no pueden operar
+    """
+    return set(
+        CooldownActivo.objects.filter(
+            finaliza_en__gt=timezone.now(),
+        ).values_list("activo_id", flat=True)
+    )
+
+
 def crear_cooldown(
     activo_id: int,
     motivo: str,
@@ -171,6 +187,30 @@ def verificar_limites_activo(
     return trades_recientes < max_trades_por_ciclo
 
 
+def contar_trades_recientes(periodo_minutos: int = 60) -> Dict[str, int]:
+    """
+    Cuenta en una sola consulta los trades reales recientes por activo.
+    
+    Args:
+        periodo_minutos: Período de tiempo a considerar
+    
+    Returns:
+        Diccionario {nombre_activo: trades en el período}
+    """
+    from historial.models import Operacion
+    
+    desde = timezone.now() - timedelta(minutes=periodo_minutos)
+    
+    filas = (
+        Operacion.objetos.reales()
+        .filter(hora_inicio__gte=desde)
+        .values("activo")
+        .annotate(total=Count("id"))
+    )
+    
+    return {fila["activo"]: fila["total"] for fila in filas}
+
+
 def detectar_micro_congestion(
     indicadores: IndicadoresActivo,
     umbral_variacion: Decimal = Decimal("0.01"),  # 0.01%
@@ -0,0 +1,282 @@
+"""
+Monte Carlo vectorizado de la política de monto y stop-loss.
+
+Simula miles de trayectorias de balance a la vez con NumPy a partir del
+winrate y el pago empíricos de cada activo, aplicando las mismas reglas
+que el bot: monto de ``calcular_monto_adaptativo``, stop-loss de
+``ConfiguracionBot.STOP_LOSS_PORCENTAJE`` sobre el máximo desde la última
+pausa y pausa de 24 h al alcanzarlo.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import ConfiguracionBot
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class PerfilActivo:
+    """Comportamiento empírico de un activo."""
+    nombre: str
+    winrate: float  # 0-1
+    pago: float  # Beneficio por unidad invertida en operaciones ganadas
+    volatilidad: float = 0.0
+    peso: float = 1.0  # Frecuencia relativa con la que se opera
+
+
+@dataclass
+class PoliticaRiesgo:
+    """Parámetros de la política evaluada (por defecto, los del bot)."""
+    riesgo_base: Decimal = Decimal("0.005")
+    volatilidad_maxima: Decimal = Decimal("2.0")
+    meta_porcentaje: Decimal = ConfiguracionBot.META_PORCENTAJE
+    stop_loss_porcentaje: Decimal = ConfiguracionBot.STOP_LOSS_PORCENTAJE
+    horas_pausa: float = 24
+    operaciones_por_hora: float = 30
+    monto_minimo: Decimal = Decimal("0.35")  # Stake mínimo aceptado por Deriv
+    umbral_ruina: Decimal = Decimal("0.50")  # Fracción del balance inicial
+
+
+@dataclass
+class ResultadoMonteCarlo:
+    trayectorias: int
+    horizonte_horas: float
+    probabilidad_ruina: float
+    probabilidad_objetivo: float
+    balance_final: Dict[int, float]
+    drawdown_maximo_pct: Dict[int, float]
+    pausas: Dict[int, float]
+    pausas_promedio: float
+    horas_hasta_objetivo: Dict[int, float]
+    operaciones_promedio: float
+    segundos_ejecucion: float = 0.0
+    perfiles: List[str] = field(default_factory=list)
+
+
+def fraccion_monto(volatilidad: np.ndarray, politica: PoliticaRiesgo) -> np.ndarray:
+    """
+    Fracción del balance que arriesga ``calcular_monto_adaptativo``.
+
+    El mínimo (0.1%) y el máximo (2%) también son proporcionales al balance,
+    por lo que el monto es ``balance * fracción``.
+    """
+    volatilidad = np.asarray(volatilidad, dtype=np.float64)
+    maxima = float(politica.volatilidad_maxima)
+    if maxima > 0:
+        normalizada = np.minimum(volatilidad / maxima, 1.0)
+    else:
+        normalizada = np.zeros_like(volatilidad)
+    fraccion = float(politica.riesgo_base) * (1.0 - normalizada * 0.5)
+    return np.clip(fraccion, 0.001, 0.02)
+
+
+def perfiles_desde_operaciones(
+    dias: int = 30,
+    incluir_simuladas: bool = False,
+    pago_por_defecto: float = 0.95,
+) -> List[PerfilActivo]:
+    """
+    Construye los perfiles de activo desde el historial de operaciones.
+
+    Args:
+        dias: Días hacia atrás a considerar
+        incluir_simuladas: Incluir operaciones de la simulación de pausa
+            (aportan winrate; el pago sale solo de operaciones reales)
+        pago_por_defecto: Pago si el activo no tiene ganancias reales registradas
+
+    Returns:
+        Un perfil por activo operado, con peso proporcional a su número de operaciones
+    """
+    from trading.models import IndicadoresActivo
+    from historial.models import Operacion
+
+    operaciones = Operacion.objetos.filter(
+        hora_inicio__gte=timezone.now() - timedelta(days=dias),
+        resultado__in=[Operacion.Resultado.GANADA, Operacion.Resultado.PERDIDA],
+    )
+    if not incluir_simuladas:
+        operaciones = operaciones.reales()
+
+    ganada = Q(resultado=Operacion.Resultado.GANADA)
+    ganada_real = ganada & Q(es_simulada=False, monto_invertido__gt=0)
+    filas = operaciones.values("activo").annotate(
+        total=Count("id"),
+        ganadas=Count("id", filter=ganada),
+        beneficio_ganadas=Sum("beneficio", filter=ganada_real),
+        invertido_ganadas=Sum("monto_invertido", filter=ganada_real),
+    )
+    volatilidades = dict(
+        IndicadoresActivo.objects.values_list("activo__nombre", "volatilidad")
+    )
+
+    perfiles = []
+    for fila in filas.order_by("activo"):
+        if fila["invertido_ganadas"]:
+            pago = float(fila["beneficio_ganadas"] / fila["invertido_ganadas"])
+        else:
+            pago = pago_por_defecto
+        perfiles.append(
+            PerfilActivo(
+                nombre=fila["activo"],
+                winrate=fila["ganadas"] / fila["total"],
+                pago=pago,
+                volatilidad=float(volatilidades.get(fila["activo"], 0)),
+                peso=float(fila["total"]),
+            )
+        )
+    return perfiles
+
+
+def _percentiles(valores: np.ndarray) -> Dict[int, float]:
+    if valores.size == 0:
+        return {p: float("nan") for p in PERCENTILES}
+    return {p: float(v) for p, v in zip(PERCENTILES, np.percentile(valores, PERCENTILES))}
+
+
+def simular_politica(
+    perfiles: Sequence[PerfilActivo],
+    politica: Optional[PoliticaRiesgo] = None,
+    balance_inicial: float = 1000.0,
+    horizonte_horas: float = 24 * 30,
+    trayectorias: int = 10000,
+    objetivo_porcentaje: Optional[float] = None,
+    semilla: Optional[int] = None,
+    pasos_por_bloque: int = 512,
+) -> ResultadoMonteCarlo:
+    """
+    Simula ``trayectorias`` caminos de balance en paralelo.
+
+    Cada paso es una operación: se elige el activo según su peso, se sortea
+    el resultado con su winrate y el balance varía en ``monto * pago`` o
+    ``-monto``. El stop-loss se mide contra el máximo desde la última pausa
+    (como ``balance_stop_loss_base``) y cada pausa consume ``horas_pausa``
+    del horizonte. Una trayectoria se arruina si cae por debajo de
+    ``umbral_ruina`` o si el monto queda por debajo del mínimo del broker.
+
+    Args:
+        perfiles: Activos operables (ver ``perfiles_desde_operaciones``)
+        politica: Política de riesgo a evaluar
+        balance_inicial: Balance de partida
+        horizonte_horas: Tiempo simulado por trayectoria
+        trayectorias: Número de caminos
+        objetivo_porcentaje: Ganancia objetivo sobre el balance inicial
+            (por defecto ``meta_porcentaje``)
+        semilla: Semilla del generador para resultados reproducibles
+        pasos_por_bloque: Operaciones sorteadas por bloque vectorizado
+
+    Returns:
+        ResultadoMonteCarlo con probabilidades y percentiles
+    """
+    inicio_ejecucion = time.perf_counter()
+    if not perfiles:
+        raise ValueError("Se requiere al menos un perfil de activo.")
+    politica = politica or PoliticaRiesgo()
+    rng = np.random.default_rng(semilla)
+
+    pesos = np.array([perfil.peso for perfil in perfiles], dtype=np.float64)
+    pesos = pesos / pesos.sum()
+    winrates = np.array([perfil.winrate for perfil in perfiles])
+    pagos = np.array([perfil.pago for perfil in perfiles])
+    fracciones = fraccion_monto([perfil.volatilidad for perfil in perfiles], politica)
+
+    n = trayectorias
+    segundos_operacion = 3600.0 / max(politica.operaciones_por_hora, 1e-9)
+    segundos_pausa = politica.horas_pausa * 3600.0
+    horizonte = horizonte_horas * 3600.0
+    stop_loss = float(politica.stop_loss_porcentaje)
+    umbral_ruina = float(politica.umbral_ruina) * balance_inicial
+    monto_minimo = float(politica.monto_minimo)
+    objetivo = balance_inicial * (
+        1.0 + (float(politica.meta_porcentaje) if objetivo_porcentaje is None else objetivo_porcentaje)
+    )
+
+    balance = np.full(n, float(balance_inicial))
+    maximo = balance.copy()  # Máximo global (drawdown)
+    base_stop_loss = balance.copy()  # Máximo desde la última pausa
+    pausas = np.zeros(n, dtype=np.int64)
+    operaciones = np.zeros(n, dtype=np.int64)
+    drawdown = np.zeros(n)
+    tiempo_objetivo = np.full(n, np.nan)
+    vivas = np.ones(n, dtype=bool)
+    arruinadas = np.zeros(n, dtype=bool)
+
+    paso = 0
+    while vivas.any():
+        k = pasos_por_bloque
+        activos = rng.choice(len(perfiles), size=(k, n), p=pesos)
+        ganadas = rng.random((k, n)) < winrates[activos]
+        fraccion = fracciones[activos]
+        rendimiento = np.where(ganadas, pagos[activos], -1.0)
+
+        # Balance antes y después de cada operación del bloque
+        despues = balance * np.cumprod(1.0 + fraccion * rendimiento, axis=0)
+        antes = np.vstack((balance, despues[:-1]))
+
+        # Pausas: requieren recorrer el bloque porque reinician la base
+        pausas_acumuladas = np.empty((k, n), dtype=np.int64)
+        contador = pausas.copy()
+        base = base_stop_loss.copy()
+        for fila in range(k):
+            actual = despues[fila]
+            base = np.maximum(base, actual)
+            pausa = base - actual >= np.round(base * stop_loss, 2)
+            contador += pausa
+            base = np.where(pausa, actual, base)
+            pausas_acumuladas[fila] = contador
+
+        pausas_previas = np.vstack((pausas, pausas_acumuladas[:-1]))
+        indices = paso + np.arange(k)[:, None]
+        inicio_operacion = indices * segundos_operacion + pausas_previas * segundos_pausa
+        en_horizonte = inicio_operacion < horizonte
+        operable = (antes > umbral_ruina) & (antes * fraccion >= monto_minimo)
+        validas = np.cumprod(vivas & en_horizonte & operable, axis=0).astype(bool)
+        vivas_previas = np.vstack((vivas, validas[:-1]))
+        arruinadas |= (vivas_previas & en_horizonte & ~operable).any(axis=0)
+
+        # Drawdown y objetivo sobre las operaciones válidas
+        maximos = np.maximum(np.maximum.accumulate(despues, axis=0), maximo)
+        caidas = np.where(validas, (maximos - despues) / maximos, 0.0)
+        drawdown = np.maximum(drawdown, caidas.max(axis=0))
+        alcanzado = validas & (despues >= objetivo)
+        nuevo = np.isnan(tiempo_objetivo) & alcanzado.any(axis=0)
+        primera = alcanzado.argmax(axis=0)
+        columnas = np.arange(n)
+        tiempo_objetivo[nuevo] = (
+            inicio_operacion[primera, columnas][nuevo] + segundos_operacion
+        )
+
+        # Estado al final del bloque (última operación válida de cada trayectoria)
+        cantidad = validas.sum(axis=0)
+        ultima = np.maximum(cantidad - 1, 0)
+        con_operaciones = cantidad > 0
+        balance = np.where(con_operaciones, despues[ultima, columnas], balance)
+        pausas = np.where(con_operaciones, pausas_acumuladas[ultima, columnas], pausas)
+        maximo = np.where(con_operaciones, maximos[ultima, columnas], maximo)
+        base_stop_loss = base
+        operaciones += cantidad
+        vivas = validas[-1]
+        paso += k
+
+    horas_objetivo = tiempo_objetivo[~np.isnan(tiempo_objetivo)] / 3600.0
+    return ResultadoMonteCarlo(
+        trayectorias=n,
+        horizonte_horas=horizonte_horas,
+        probabilidad_ruina=float(arruinadas.mean()),
+        probabilidad_objetivo=float(horas_objetivo.size / n),
+        balance_final=_percentiles(balance),
+        drawdown_maximo_pct=_percentiles(drawdown * 100.0),
+        pausas=_percentiles(pausas.astype(np.float64)),
+        pausas_promedio=float(pausas.mean()),
+        horas_hasta_objetivo=_percentiles(horas_objetivo),
+        operaciones_promedio=float(operaciones.mean()),
+        segundos_ejecucion=time.perf_counter() - inicio_ejecucion,
+        perfiles=[perfil.nombre for perfil in perfiles],
+    )
@@ -4,13 +4,17 @@ Módulo de optimización por horario.
 
 from .horario_manager import (
     obtener_confianza_horaria,
+    obtener_confianzas_horarias,
     actualizar_rendimiento_horario,
     obtener_mejor_horario_activo,
+    obtener_duracion_contrato,
 )
 
 __all__ = [
     "obtener_confianza_horaria",
+    "obtener_confianzas_horarias",
     "actualizar_rendimiento_horario",
     "obtener_mejor_horario_activo",
+    "obtener_duracion_contrato",
 ]
 
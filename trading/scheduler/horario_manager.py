@@ -1,9 +1,10 @@
 """
 Gestión de optimización por horario y franjas rentables.
 """
+from collections import defaultdict
 from datetime import time, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
 
 from django.db import transaction
 from django.db.models import Avg, Count, Q
@@ -69,31 +70,37 @@ def calcular_winrate_horario_desde_operaciones(
     operaciones = Operacion.objetos.reales().filter(
         activo=activo.nombre,
         hora_inicio__gte=desde,
-    )
+    ).values_list("hora_inicio", "resultado")
     
+    return _winrate_alrededor_de(operaciones, hora)
+
+
+def _winrate_alrededor_de(operaciones, hora: time) -> Decimal:
+    """
+    Winrate de las operaciones (hora de inicio, resultado) que empezaron a
+    ±30 minutos de ``hora``; 50 si no hay ninguna.
+    """
     # Filtrar por hora (considerando un rango de ±30 minutos)
     hora_min = (hora.hour * 60 + hora.minute - 30) % (24 * 60)
     hora_max = (hora.hour * 60 + hora.minute + 30) % (24 * 60)
     
-    operaciones_hora = []
-    for op in operaciones:
-        if op.hora_inicio:
-            op_hora = timezone.localtime(op.hora_inicio).time()
+    ganadas = total = 0
+    for hora_inicio, resultado in operaciones:
+        if hora_inicio:
+            op_hora = timezone.localtime(hora_inicio).time()
             op_minutos = op_hora.hour * 60 + op_hora.minute
             
             if hora_min <= hora_max:
-                if hora_min <= op_minutos <= hora_max:
-                    operaciones_hora.append(op)
+                dentro = hora_min <= op_minutos <= hora_max
             else:  # Cruza medianoche
-                if op_minutos >= hora_min or op_minutos <= hora_max:
-                    operaciones_hora.append(op)
+                dentro = op_minutos >= hora_min or op_minutos <= hora_max
+            if dentro:
+                total += 1
+                ganadas += resultado == Operacion.Resultado.GANADA
     
-    if not operaciones_hora:
+    if not total:
         return Decimal("50.00")  # Valor neutro
     
-    ganadas = sum(1 for op in operaciones_hora if op.resultado == Operacion.Resultado.GANADA)
-    total = len(operaciones_hora)
-    
     winrate = (Decimal(str(ganadas)) / Decimal(str(total)) * Decimal("100")).quantize(
         Decimal("0.01")
     )
@@ -101,6 +108,48 @@ def calcular_winrate_horario_desde_operaciones(
     return winrate
 
 
+def obtener_confianzas_horarias(
+    activos: Sequence[ActivoPermitido],
+    hora_actual: Optional[time] = None,
+    dias_analisis: int = 30,
+) -> Dict[int, Decimal]:
+    """
+    Versión por lotes de ``obtener_confianza_horaria``: dos consultas para
+    todos los activos en lugar de una o dos por activo.
+    
+    Args:
+        activos: Activos a analizar
+        hora_actual: Hora actual (si None, usa la hora actual del sistema)
+        dias_analisis: Días hacia atrás para el análisis
+    
+    Returns:
+        Confianza horaria (0-100) por id de activo
+    """
+    if hora_actual is None:
+        hora_actual = timezone.localtime(timezone.now()).time()
+    
+    confianzas: Dict[int, Decimal] = dict(
+        RendimientoActivo.objects.filter(
+            activo__in=activos,
+            hora=hora_actual,
+        ).values_list("activo_id", "winrate_dinamico")
+    )
+    faltantes = [activo for activo in activos if activo.id not in confianzas]
+    if not faltantes:
+        return confianzas
+    
+    # Sin rendimiento para la hora: winrate desde operaciones históricas
+    operaciones: Dict[str, List] = defaultdict(list)
+    for nombre, hora_inicio, resultado in Operacion.objetos.reales().filter(
+        activo__in=[activo.nombre for activo in faltantes],
+        hora_inicio__gte=timezone.now() - timedelta(days=dias_analisis),
+    ).values_list("activo", "hora_inicio", "resultado"):
+        operaciones[nombre].append((hora_inicio, resultado))
+    for activo in faltantes:
+        confianzas[activo.id] = _winrate_alrededor_de(operaciones[activo.nombre], hora_actual)
+    return confianzas
+
+
 @transaction.atomic
 def actualizar_rendimiento_horario(
     activo: ActivoPermitido,
@@ -188,3 +237,31 @@ def obtener_mejor_horario_activo(
     
     return None
 
+
+
+def obtener_duracion_contrato(
+    activo: ActivoPermitido,
+    hora_actual: Optional[time] = None,
+    duracion_por_defecto: int = 5,
+) -> int:
+    """
+    Obtiene la duración de contrato (en ticks) con mejor winrate simulado
+    para el activo en la hora actual.
+    
+    Args:
+        activo: Activo a operar
+        hora_actual: Hora a consultar (si None, usa la hora actual del sistema)
+        duracion_por_defecto: Duración si la simulación no tiene datos
+    
+    Returns:
+        Duración en ticks
+    """
+    from simulacion.models import ResultadoHorarioSimulacion
+
+    if hora_actual is None:
+        hora_actual = timezone.localtime(timezone.now()).time()
+    
+    duracion = ResultadoHorarioSimulacion.objetos.mejor_duracion(
+        activo.nombre, time(hora_actual.hour, 0)
+    )
+    return duracion or duracion_por_defecto
@@ -3,7 +3,7 @@ from __future__ import annotations
 import random
 import uuid
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
@@ -12,9 +12,14 @@ from django.db import transaction
 from django.utils import timezone
 
 from core.models import ActivoPermitido
+from core.monitoreo import medir_consultas
 from core.services import GestorBotCore
 from historial.models import Operacion
-from integracion_deriv.client import obtener_ticks_history_sync, operar_contrato_sync
+from integracion_deriv.client import (
+    obtener_ticks_history_lote_sync,
+    obtener_ticks_history_sync,
+    operar_contrato_sync,
+)
 
 
 class MotorTrading:
@@ -23,6 +28,9 @@ class MotorTrading:
     y evaluación de resultados.
     """
 
+    # Solicitudes ticks_history en vuelo simultáneamente por ciclo
+    max_concurrencia_ticks = 10
+
     def __init__(self) -> None:
         self.gestor_core = GestorBotCore()
         self.channel_layer = get_channel_layer()
@@ -36,6 +44,35 @@ class MotorTrading:
             )
             return None
 
+        return self._senal_desde_respuesta(respuesta)
+
+    def generar_senales(
+        self, activos: List[str]
+    ) -> Dict[str, Optional[Dict[str, Decimal | str]]]:
+        """
+        Genera las señales de todos los activos con una sola conexión a Deriv,
+        solicitando los historiales de ticks de forma concurrente.
+        """
+        if not activos:
+            return {}
+        try:
+            respuestas = obtener_ticks_history_lote_sync(
+                activos, count=2, max_concurrencia=self.max_concurrencia_ticks
+            )
+        except Exception as exc:
+            self._enviar_evento(
+                {"tipo": "error", "mensaje": f"No se pudieron obtener ticks: {exc}"}
+            )
+            return {}
+
+        return {
+            activo: self._senal_desde_respuesta(respuestas[activo])
+            for activo in activos
+        }
+
+    def _senal_desde_respuesta(
+        self, respuesta: Dict
+    ) -> Optional[Dict[str, Decimal | str]]:
         if respuesta.get("error"):
             self._enviar_evento(
                 {
@@ -115,6 +152,7 @@ class MotorTrading:
         }
         self._enviar_evento(data)
 
+    @medir_consultas("ejecutar_ciclo_simple")
     @transaction.atomic
     def ejecutar_ciclo(self) -> Optional[Operacion]:
         config = self.gestor_core.configuracion
@@ -143,10 +181,12 @@ class MotorTrading:
             )
             return None
 
+        senales = self.generar_senales([activo.nombre for activo in activos])
+
         mejor_activo: Optional[ActivoPermitido] = None
         mejor_senal: Optional[Dict[str, Decimal | str]] = None
         for activo in activos:
-            senal_actual = self.generar_senal(activo.nombre)
+            senal_actual = senales.get(activo.nombre)
             if not senal_actual:
                 continue
             if mejor_senal is None or senal_actual["variacion"] > mejor_senal["variacion"]:
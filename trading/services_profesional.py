@@ -2,8 +2,16 @@
 Motor de trading profesional con análisis multi-activo optimizado.
 Reemplaza el sistema simple basado en 2 ticks por un análisis robusto.
 """
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import asdict, dataclass
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
@@ -12,22 +20,37 @@ from django.db import transaction
 from django.utils import timezone
 
 from core.models import ActivoPermitido
+from core.monitoreo import (
+    PerfiladorCiclo,
+    en_mediciones_activas,
+    mediciones_activas,
+    medir_consultas,
+)
 from core.services import GestorBotCore
 from historial.models import Operacion
 from integracion_deriv.client import operar_contrato_sync
-from trading.database import actualizar_tick_cache, obtener_ticks_cache
+from trading.database import actualizar_tick_cache_lote
 from trading.database.cache_manager import actualizar_indicadores_activo
-from trading.models import IndicadoresActivo
-from trading.ranking import calcular_score_activo
+from trading.evaluacion_paralela import (
+    calcular_indicadores_lote,
+    inicializar_worker_proceso,
+)
+from trading.models import IndicadoresActivo, RendimientoActivo
+from trading.ranking import (
+    calcular_score_activo,
+    construir_matriz_indicadores,
+    seleccionar_top_k,
+)
+from trading.ranking.vectorizado import calcular_cotas_superiores
 # determinar_direccion se define al final del archivo
 from trading.risk import (
     calcular_monto_adaptativo,
+    contar_trades_recientes,
     crear_cooldown,
     detectar_micro_congestion,
-    verificar_cooldown,
-    verificar_limites_activo,
+    obtener_activos_en_cooldown,
 )
-from trading.scheduler import obtener_confianza_horaria
+from trading.scheduler import obtener_confianzas_horarias, obtener_duracion_contrato
 from trading.signals import (
     calcular_consistencia,
     calcular_ema,
@@ -36,6 +59,29 @@ from trading.signals import (
     calcular_rate_of_change,
     calcular_volatilidad,
 )
+from trading.variantes import EvaluadorSombra
+
+
+# Columnas que reescribe el upsert de indicadores de la etapa de scoring
+CAMPOS_INDICADORES = [
+    campo.name
+    for campo in IndicadoresActivo._meta.concrete_fields
+    if campo.name not in ("id", "activo")
+]
+
+
+@dataclass
+class EstadisticasEvaluacion:
+    """Candidatos descartados por cada etapa de la evaluación."""
+    candidatos: int = 0
+    rechazados_cooldown: int = 0
+    rechazados_limites: int = 0
+    rechazados_sin_datos: int = 0
+    rechazados_volatilidad: int = 0
+    rechazados_consistencia: int = 0
+    rechazados_micro_congestion: int = 0
+    podados_cota: int = 0
+    evaluados: int = 0
 
 
 class MotorTradingProfesional:
@@ -44,9 +90,17 @@ class MotorTradingProfesional:
     Evalúa 88 activos simultáneamente usando indicadores técnicos avanzados.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        workers_evaluacion: int = 0,
+        tipo_pool_evaluacion: str = "hilos",
+        perfilador: Optional[PerfiladorCiclo] = None,
+        evaluador_sombra: Optional[EvaluadorSombra] = None,
+        usar_duracion_simulada: bool = False,
+    ) -> None:
         self.gestor_core = GestorBotCore()
         self.channel_layer = get_channel_layer()
+        self.perfilador = perfilador
         
         # Configuración
         self.periodo_analisis = 20  # Ticks a analizar
@@ -54,130 +108,260 @@ class MotorTradingProfesional:
         self.umbral_consistencia = Decimal("30.00")
         self.umbral_volatilidad_minima = Decimal("0.001")
         self.umbral_confianza_horaria = Decimal("45.00")
+        self.max_trades_por_activo = 1  # Por hora
+        self.duracion_contrato_ticks = 5  # Si la simulación no tiene datos
+        # Mejor duración simulada para la hora (opt-in: --duracion-simulada)
+        self.usar_duracion_simulada = usar_duracion_simulada
+        
+        # Evaluación paralela (0 = secuencial con cache de ticks)
+        self.workers_evaluacion = max(0, workers_evaluacion)
+        self.tipo_pool_evaluacion = tipo_pool_evaluacion  # "hilos" o "procesos"
+        self._pool_evaluacion: Optional[Executor] = None
+        
+        self.estadisticas_evaluacion = EstadisticasEvaluacion()
+        
+        # Variantes en modo sombra que reutilizan los indicadores del ciclo
+        self.evaluador_sombra = evaluador_sombra
+        self._confianza_ciclo: Dict[int, Decimal] = {}
+
+    def _medir(self, etapa: str):
+        """Temporizador de etapa del perfilador (no-op si no hay perfilador)."""
+        if self.perfilador is None:
+            return nullcontext()
+        return self.perfilador.medir(etapa)
 
     def _enviar_evento(self, data: Dict) -> None:
         """Envía evento a través de WebSockets."""
         if not self.channel_layer:
             return
-        async_to_sync(self.channel_layer.group_send)(
-            "deriv_estado",
-            {"type": "recibir_evento_deriv", "data": data},
-        )
+        with self._medir("publicacion_eventos"):
+            async_to_sync(self.channel_layer.group_send)(
+                "deriv_estado",
+                {"type": "recibir_evento_deriv", "data": data},
+            )
 
     def _calcular_indicadores_activo(
-        self, activo: ActivoPermitido
+        self, precios: List[Decimal]
     ) -> Optional[Dict]:
         """
-        Calcula todos los indicadores técnicos para un activo.
+        Calcula todos los indicadores técnicos para los precios de un activo.
         
         Returns:
             Diccionario con indicadores o None si no hay datos suficientes
         """
-        # Actualizar cache de ticks
-        actualizar_tick_cache(activo, max_ticks=self.periodo_analisis)
+        with self._medir("indicadores"):
+            return calcular_indicadores_precios(precios)
+
+    def _obtener_pool_evaluacion(self) -> Executor:
+        """Crea (una sola vez) el pool de workers para la evaluación paralela."""
+        if self._pool_evaluacion is None:
+            if self.tipo_pool_evaluacion == "procesos":
+                self._pool_evaluacion = ProcessPoolExecutor(
+                    max_workers=self.workers_evaluacion,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=inicializar_worker_proceso,
+                )
+            else:
+                self._pool_evaluacion = ThreadPoolExecutor(
+                    max_workers=self.workers_evaluacion,
+                    thread_name_prefix="evaluacion",
+                )
+        return self._pool_evaluacion
+
+    def cerrar(self) -> None:
+        """Libera el pool de workers de la evaluación paralela."""
+        if self._pool_evaluacion is not None:
+            self._pool_evaluacion.shutdown(wait=True)
+            self._pool_evaluacion = None
+
+    def _calcular_indicadores_paralelo(
+        self, activos: List[ActivoPermitido]
+    ) -> List[Optional[Dict]]:
+        """
+        Reparte el cálculo de indicadores entre los workers del pool.
         
-        # Obtener ticks desde cache
-        precios = obtener_ticks_cache(activo, cantidad=self.periodo_analisis)
+        Cada worker lee los precios con su propia conexión a la base de datos
+        (sin escribir en el cache) y devuelve los resultados etiquetados con su
+        posición, de modo que la fusión es determinista. Con hilos, sus
+        consultas se suman a la medición de ``ejecutar_ciclo``.
         
-        if len(precios) < 10:
-            return None
+        Returns:
+            Indicadores (o None) alineados con ``activos``
+        """
+        trabajos = [(indice, activo.nombre) for indice, activo in enumerate(activos)]
+        tamano_lote = -(-len(trabajos) // self.workers_evaluacion)
+        lotes = [
+            trabajos[inicio:inicio + tamano_lote]
+            for inicio in range(0, len(trabajos), tamano_lote)
+        ]
+        
+        pool = self._obtener_pool_evaluacion()
+        if self.tipo_pool_evaluacion == "procesos":
+            futuros = [
+                pool.submit(calcular_indicadores_lote, lote, self.periodo_analisis)
+                for lote in lotes
+            ]
+        else:
+            activas = mediciones_activas()
+            futuros = [
+                pool.submit(
+                    en_mediciones_activas,
+                    activas,
+                    calcular_indicadores_lote,
+                    lote,
+                    self.periodo_analisis,
+                )
+                for lote in lotes
+            ]
         
-        # Calcular indicadores
-        momentum_simple, momentum_pct = calcular_momentum(precios, periodo=10)
-        volatilidad = calcular_volatilidad(precios, periodo=20)
-        ema = calcular_ema(precios, periodo=10)
-        roc = calcular_rate_of_change(precios, periodo=10)
-        consistencia = calcular_consistencia(precios, periodo=10)
-        
-        precio_actual = precios[-1]
-        fuerza_movimiento = calcular_fuerza_movimiento(precio_actual, ema)
-        
-        # Determinar dirección usando función local
-        direccion = determinar_direccion_simple(precios, ema, roc)
-        
-        return {
-            "momentum_simple": momentum_simple,
-            "momentum_pct": momentum_pct,
-            "volatilidad": volatilidad,
-            "tendencia_ema": ema,
-            "precio_actual": precio_actual,
-            "rate_of_change": roc,
-            "fuerza_movimiento": fuerza_movimiento,
-            "consistencia": consistencia,
-            "direccion_sugerida": direccion,
-            "ticks_analizados": len(precios),
-        }
+        resultados: List[Optional[Dict]] = [None] * len(activos)
+        for futuro in futuros:
+            for indice, indicadores_data in futuro.result():
+                resultados[indice] = indicadores_data
+        return resultados
 
-    def _evaluar_activos(self) -> List[Dict]:
+    def _etapa_filtros_memoria(
+        self, activos: List[ActivoPermitido]
+    ) -> List[ActivoPermitido]:
         """
-        Evalúa todos los activos habilitados y calcula sus scores.
-        
-        Returns:
-            Lista de activos con sus indicadores y scores, ordenados por score
+        Etapa 1: descarta activos en cooldown o sin cupo de trades.
+        Usa dos consultas agregadas y verifica cada activo en memoria.
         """
-        activos = ActivoPermitido.objects.filter(habilitado=True)
-        resultados = []
+        en_cooldown = obtener_activos_en_cooldown()
+        trades_recientes = contar_trades_recientes(periodo_minutos=60)
         
+        aprobados = []
         for activo in activos:
-            # Verificar cooldown
-            if not verificar_cooldown(activo.id):
+            if activo.id in en_cooldown:
+                self.estadisticas_evaluacion.rechazados_cooldown += 1
                 continue
-            
-            # Verificar límites
-            if not verificar_limites_activo(activo.nombre):
+            if trades_recientes.get(activo.nombre, 0) >= self.max_trades_por_activo:
+                self.estadisticas_evaluacion.rechazados_limites += 1
                 continue
-            
-            # Calcular indicadores
-            indicadores_data = self._calcular_indicadores_activo(activo)
+            aprobados.append(activo)
+        return aprobados
+
+    def _calcular_indicadores(self, activos: List[ActivoPermitido]):
+        """Indicadores de los activos, en paralelo si hay workers configurados."""
+        if self.workers_evaluacion > 0 and activos:
+            # La carga de ticks ocurre dentro de los workers y se mide junto
+            # con el cálculo de indicadores.
+            with self._medir("indicadores"):
+                return self._calcular_indicadores_paralelo(activos)
+        with self._medir("carga_ticks"):
+            # Actualiza el cache de ticks de todos los activos de una vez
+            precios = actualizar_tick_cache_lote(activos, max_ticks=self.periodo_analisis)
+        return (self._calcular_indicadores_activo(precios[activo.id]) for activo in activos)
+
+    def _etapa_filtros_mercado(
+        self,
+        activos: List[ActivoPermitido],
+        indicadores_ciclo: Optional[Dict[int, Optional[Dict]]] = None,
+    ) -> List[Dict]:
+        """
+        Etapa 2: calcula indicadores y aplica los filtros de volatilidad,
+        consistencia y micro-congestión antes de cualquier escritura.
+        
+        Args:
+            activos: Activos que pasaron la etapa 1
+            indicadores_ciclo: Indicadores ya calculados en el ciclo por id
+                de activo (ver ``_evaluar_activos``)
+        """
+        estadisticas = self.estadisticas_evaluacion
+        if indicadores_ciclo is not None:
+            indicadores_por_activo = (indicadores_ciclo[activo.id] for activo in activos)
+        else:
+            indicadores_por_activo = self._calcular_indicadores(activos)
+        
+        candidatos = []
+        for activo, indicadores_data in zip(activos, indicadores_por_activo):
             if not indicadores_data:
+                estadisticas.rechazados_sin_datos += 1
                 continue
             
-            # Verificar umbrales mínimos
             if indicadores_data["volatilidad"] < self.umbral_volatilidad_minima:
+                estadisticas.rechazados_volatilidad += 1
                 continue
             
             if indicadores_data["consistencia"] < self.umbral_consistencia:
+                estadisticas.rechazados_consistencia += 1
                 continue
             
-            # Guardar indicadores
-            indicadores, _ = IndicadoresActivo.objects.update_or_create(
-                activo=activo,
-                defaults=indicadores_data,
-            )
-            
-            # Calcular score
-            from trading.models import RendimientoActivo
+            indicadores = IndicadoresActivo(activo=activo, **indicadores_data)
+            if detectar_micro_congestion(indicadores):
+                with self._medir("persistencia"):
+                    crear_cooldown(
+                        activo.id,
+                        motivo="Micro-congestion detectada",  # Truncado a 40 chars
+                        duracion_minutos=5,
+                    )
+                estadisticas.rechazados_micro_congestion += 1
+                continue
             
-            try:
-                rendimiento = RendimientoActivo.objects.filter(
-                    activo=activo
-                ).order_by("-winrate_dinamico").first()
-            except RendimientoActivo.DoesNotExist:
-                rendimiento = None
+            candidatos.append({
+                "activo": activo,
+                "indicadores_data": indicadores_data,
+                "indicadores": indicadores,
+            })
+        return candidatos
+
+    def _etapa_scoring(
+        self, candidatos: List[Dict], solo_mejor: bool = False
+    ) -> List[Dict]:
+        """
+        Etapa 3: calcula el score final de los candidatos y persiste indicadores.
+        
+        Los candidatos se recorren por cota superior de score descendente. Con
+        ``solo_mejor`` la evaluación se detiene en cuanto el mejor score ya
+        supera el umbral mínimo y ningún candidato restante puede superarlo.
+        """
+        matriz = construir_matriz_indicadores(
+            [candidato["indicadores_data"] for candidato in candidatos]
+        )
+        cotas = calcular_cotas_superiores(matriz)
+        orden = seleccionar_top_k(cotas, k=len(candidatos))
+        
+        # Rendimiento y confianza horaria de todos los candidatos de una vez
+        rendimientos: Dict[int, RendimientoActivo] = {}
+        if candidatos:
+            with self._medir("scoring"):
+                activos = [candidato["activo"] for candidato in candidatos]
+                for rendimiento in RendimientoActivo.objects.filter(
+                    activo__in=activos
+                ).order_by("activo_id", "-winrate_dinamico"):
+                    rendimientos.setdefault(rendimiento.activo_id, rendimiento)
+                self._confianza_ciclo.update(obtener_confianzas_horarias(activos))
+        
+        resultados = []
+        mejor_score = Decimal("0.00")
+        for posicion, indice in enumerate(orden):
+            if (
+                solo_mejor
+                and mejor_score >= self.umbral_score_minimo
+                and Decimal(str(cotas[indice])) <= mejor_score
+            ):
+                self.estadisticas_evaluacion.podados_cota += len(orden) - posicion
+                break
             
-            score = calcular_score_activo(
-                indicadores,
-                rendimiento=rendimiento,
-                umbral_minimo=self.umbral_score_minimo,
-            )
+            candidato = candidatos[indice]
+            activo = candidato["activo"]
+            indicadores = candidato["indicadores"]
             
-            # Verificar confianza horaria
-            confianza_horaria = obtener_confianza_horaria(activo)
-            if confianza_horaria < self.umbral_confianza_horaria:
-                score = score * Decimal("0.5")  # Reducir score si horario no es óptimo
+            with self._medir("scoring"):
+                score = calcular_score_activo(
+                    indicadores,
+                    rendimiento=rendimientos.get(activo.id),
+                    umbral_minimo=self.umbral_score_minimo,
+                )
+                
+                # Verificar confianza horaria
+                confianza_horaria = self._confianza_ciclo[activo.id]
+                if confianza_horaria < self.umbral_confianza_horaria:
+                    score = score * Decimal("0.5")  # Reducir score si horario no es óptimo
             
-            # Actualizar score en indicadores
             indicadores.score_total = score
-            indicadores.save()
-            
-            # Verificar micro-congestión
-            if detectar_micro_congestion(indicadores):
-                crear_cooldown(
-                    activo.id,
-                    motivo="Micro-congestion detectada",  # Truncado a 40 chars
-                    duracion_minutos=5,
-                )
-                continue
+            self.estadisticas_evaluacion.evaluados += 1
+            mejor_score = max(mejor_score, score)
             
             resultados.append({
                 "activo": activo,
@@ -186,27 +370,178 @@ class MotorTradingProfesional:
                 "confianza_horaria": confianza_horaria,
             })
         
+        # Guardar indicadores con su score en una sola sentencia
+        if resultados:
+            with self._medir("persistencia"):
+                IndicadoresActivo.objects.bulk_create(
+                    [resultado["indicadores"] for resultado in resultados],
+                    update_conflicts=True,
+                    unique_fields=["activo"],
+                    update_fields=CAMPOS_INDICADORES,
+                )
+        
+        return resultados
+
+    def _evaluar_activos(self, solo_mejor: bool = False) -> List[Dict]:
+        """
+        Evalúa los activos habilitados en etapas ordenadas por costo:
+        filtros en memoria (cooldown/límites), filtros de mercado
+        (volatilidad/consistencia/micro-congestión) y finalmente scoring.
+        
+        Args:
+            solo_mejor: Permite cortar la etapa de scoring en cuanto se
+                conoce el Top 1 (ver ``_etapa_scoring``)
+        
+        Returns:
+            Lista de activos con sus indicadores y scores, ordenados por score
+        """
+        with self._medir("filtros"):
+            habilitados = list(ActivoPermitido.objects.filter(habilitado=True))
+            self.estadisticas_evaluacion = EstadisticasEvaluacion(candidatos=len(habilitados))
+            
+            activos = self._etapa_filtros_memoria(habilitados)
+        
+        indicadores_ciclo = None
+        if self.evaluador_sombra is not None:
+            # Las variantes necesitan los indicadores de todos los activos:
+            # se calculan una sola vez y la etapa 2 del motor los reutiliza
+            indicadores_ciclo = dict(
+                zip(
+                    (activo.id for activo in habilitados),
+                    self._calcular_indicadores(habilitados),
+                )
+            )
+        
+        self._confianza_ciclo = {}
+        candidatos = self._etapa_filtros_mercado(activos, indicadores_ciclo)
+        resultados = self._etapa_scoring(candidatos, solo_mejor=solo_mejor)
+        
+        if indicadores_ciclo is not None:
+            self._evaluar_variantes(habilitados, indicadores_ciclo)
+        
         # Ordenar por score descendente
         resultados.sort(key=lambda x: x["score"], reverse=True)
         
         return resultados
 
-    @transaction.atomic
+    def _evaluar_variantes(
+        self,
+        activos: List[ActivoPermitido],
+        indicadores_ciclo: Dict[int, Optional[Dict]],
+    ) -> None:
+        """Pasada de scoring de las variantes en modo sombra (sin afectar al motor)."""
+        with self._medir("variantes_sombra"):
+            try:
+                with transaction.atomic():
+                    self.evaluador_sombra.procesar_ciclo(
+                        activos,
+                        [indicadores_ciclo[activo.id] for activo in activos],
+                        confianza_conocida=self._confianza_ciclo,
+                    )
+            except Exception as exc:
+                self._enviar_evento({
+                    "tipo": "error",
+                    "mensaje": f"Error evaluando variantes en modo sombra: {exc}",
+                })
+
+    @medir_consultas("ejecutar_ciclo")
     def ejecutar_ciclo(self) -> Optional[Operacion]:
         """
         Ejecuta un ciclo completo de trading profesional.
+
+        La evaluación y el alta de la operación se confirman antes de enviar
+        la orden, y la liquidación se guarda en otra transacción: mientras se
+        espera el resultado del contrato no se retiene el bloqueo de escritura
+        de la base de datos y el recolector sigue guardando ticks.
         
         Returns:
             Operación ejecutada o None
         """
+        with transaction.atomic():
+            preparada = self._preparar_operacion()
+        if preparada is None:
+            return None
+        operacion, mejor_activo, contract_type, duracion_ticks = preparada
+        monto_trade = operacion.monto_invertido
+        numero_contrato = operacion.numero_contrato
+        
+        try:
+            respuesta = operar_contrato_sync(
+                symbol=mejor_activo.nombre,
+                amount=float(monto_trade),
+                duration=duracion_ticks,
+                duration_unit="t",
+                contract_type=contract_type,
+                medir_etapa=self._medir,
+            )
+            
+            open_contract = respuesta.get("proposal_open_contract", {})
+            status = open_contract.get("status")
+            beneficio = Decimal(str(open_contract.get("profit", 0))).quantize(Decimal("0.01"))
+            precio_cierre = Decimal(str(open_contract.get("sell_price", 0))).quantize(Decimal("0.00001"))
+            
+            resultado = (
+                Operacion.Resultado.GANADA if status == "won" else Operacion.Resultado.PERDIDA
+            )
+            # Truncar contract_id a 40 caracteres máximo
+            contract_id = str(open_contract.get("contract_id", numero_contrato))
+            numero_final = contract_id[:40] if len(contract_id) > 40 else contract_id
+            
+        except Exception as exc:
+            self._enviar_evento({"tipo": "error", "mensaje": str(exc)})
+            resultado = Operacion.Resultado.PERDIDA
+            beneficio = -monto_trade
+            precio_cierre = operacion.precio_entrada
+            numero_final = numero_contrato
+        
+        # Actualizar operación
+        operacion.resultado = resultado
+        operacion.beneficio = beneficio
+        operacion.precio_cierre = precio_cierre
+        operacion.hora_fin = timezone.now()
+        operacion.numero_contrato = numero_final
+        
+        try:
+            with transaction.atomic(), self._medir("persistencia"):
+                operacion.save()
+                
+                # Registrar resultado y actualizar rendimiento horario
+                self.gestor_core.registrar_resultado_operacion(operacion)
+                from trading.scheduler import actualizar_rendimiento_horario
+                actualizar_rendimiento_horario(mejor_activo, operacion)
+                
+                self.gestor_core.finalizar_operacion()
+        except Exception:
+            # La marca de operación en curso ya está confirmada: se libera
+            # para que el bot no quede detenido esperando esta operación
+            self.gestor_core.finalizar_operacion()
+            raise
+        
+        # Emitir evento
+        self._emitir_evento_operacion(operacion)
+        
+        return operacion
+
+    def _preparar_operacion(
+        self,
+    ) -> Optional[Tuple[Operacion, ActivoPermitido, str, int]]:
+        """
+        Evalúa los activos y, si el mejor pasa los filtros, marca la operación
+        en curso y la registra como pendiente.
+
+        Returns:
+            (operación pendiente, activo, tipo de contrato, duración en
+            ticks), o None si el ciclo no debe operar
+        """
         config = self.gestor_core.configuracion
         
         # Verificaciones previas
         if config.estado != config.Estado.OPERANDO or config.en_operacion:
             return None
         
-        self.gestor_core.sincronizar_balance_desde_api()
-        config.refresh_from_db()
+        with self._medir("sincronizacion_balance"):
+            self.gestor_core.sincronizar_balance_desde_api()
+            config.refresh_from_db()
         
         if config.stop_loss_actual <= 0 or config.meta_actual <= 0:
             self._enviar_evento({
@@ -221,12 +556,13 @@ class MotorTradingProfesional:
             "mensaje": "Evaluando activos disponibles...",
         })
         
-        resultados = self._evaluar_activos()
+        resultados = self._evaluar_activos(solo_mejor=True)
         
         if not resultados:
             self._enviar_evento({
                 "tipo": "info",
                 "mensaje": "No se encontraron activos con señales válidas.",
+                "estadisticas": asdict(self.estadisticas_evaluacion),
             })
             return None
         
@@ -266,9 +602,6 @@ class MotorTradingProfesional:
             volatilidad=mejor_indicadores.volatilidad,
         )
         
-        # Marcar operación en curso
-        self.gestor_core.marcar_operacion_en_curso(mejor_activo.nombre)
-        
         # Crear operación
         import uuid
         # Generar número de contrato truncado a 40 caracteres máximo
@@ -277,17 +610,21 @@ class MotorTradingProfesional:
         # Asegurar que no exceda 40 caracteres
         numero_contrato = numero_contrato[:40]
         
-        operacion = Operacion.objetos.create(
-            activo=mejor_activo.nombre,
-            direccion=Operacion.Direccion.CALL if direccion == "CALL" else Operacion.Direccion.PUT,
-            precio_entrada=mejor_indicadores.precio_actual,
-            monto_invertido=monto_trade,
-            confianza=mejor_score,
-            resultado=Operacion.Resultado.PENDIENTE,
-            numero_contrato=numero_contrato,
-            hora_inicio=timezone.now(),
-            es_simulada=False,
-        )
+        with self._medir("persistencia"):
+            # Marcar operación en curso
+            self.gestor_core.marcar_operacion_en_curso(mejor_activo.nombre)
+            
+            operacion = Operacion.objetos.create(
+                activo=mejor_activo.nombre,
+                direccion=Operacion.Direccion.CALL if direccion == "CALL" else Operacion.Direccion.PUT,
+                precio_entrada=mejor_indicadores.precio_actual,
+                monto_invertido=monto_trade,
+                confianza=mejor_score,
+                resultado=Operacion.Resultado.PENDIENTE,
+                numero_contrato=numero_contrato,
+                hora_inicio=timezone.now(),
+                es_simulada=False,
+            )
         
         # Ejecutar contrato
         if not settings.DERIV_API_TOKEN:
@@ -298,53 +635,13 @@ class MotorTradingProfesional:
             self.gestor_core.finalizar_operacion()
             return None
         
-        try:
-            respuesta = operar_contrato_sync(
-                symbol=mejor_activo.nombre,
-                amount=float(monto_trade),
-                duration=5,
-                duration_unit="t",
-                contract_type=contract_type,
+        duracion_ticks = self.duracion_contrato_ticks
+        if self.usar_duracion_simulada:
+            duracion_ticks = obtener_duracion_contrato(
+                mejor_activo, duracion_por_defecto=self.duracion_contrato_ticks
             )
-            
-            open_contract = respuesta.get("proposal_open_contract", {})
-            status = open_contract.get("status")
-            beneficio = Decimal(str(open_contract.get("profit", 0))).quantize(Decimal("0.01"))
-            precio_cierre = Decimal(str(open_contract.get("sell_price", 0))).quantize(Decimal("0.00001"))
-            
-            resultado = (
-                Operacion.Resultado.GANADA if status == "won" else Operacion.Resultado.PERDIDA
-            )
-            # Truncar contract_id a 40 caracteres máximo
-            contract_id = str(open_contract.get("contract_id", numero_contrato))
-            numero_final = contract_id[:40] if len(contract_id) > 40 else contract_id
-            
-        except Exception as exc:
-            self._enviar_evento({"tipo": "error", "mensaje": str(exc)})
-            resultado = Operacion.Resultado.PERDIDA
-            beneficio = -monto_trade
-            precio_cierre = operacion.precio_entrada
-            numero_final = numero_contrato
         
-        # Actualizar operación
-        operacion.resultado = resultado
-        operacion.beneficio = beneficio
-        operacion.precio_cierre = precio_cierre
-        operacion.hora_fin = timezone.now()
-        operacion.numero_contrato = numero_final
-        operacion.save()
-        
-        # Registrar resultado y actualizar rendimiento horario
-        self.gestor_core.registrar_resultado_operacion(operacion)
-        from trading.scheduler import actualizar_rendimiento_horario
-        actualizar_rendimiento_horario(mejor_activo, operacion)
-        
-        self.gestor_core.finalizar_operacion()
-        
-        # Emitir evento
-        self._emitir_evento_operacion(operacion)
-        
-        return operacion
+        return operacion, mejor_activo, contract_type, duracion_ticks
 
     def _emitir_evento_operacion(self, operacion: Operacion) -> None:
         """Emite evento de operación completada."""
@@ -365,6 +662,46 @@ class MotorTradingProfesional:
         self._enviar_evento(data)
 
 
+def calcular_indicadores_precios(precios: List[Decimal]) -> Optional[Dict]:
+    """
+    Calcula todos los indicadores técnicos a partir de una lista de precios.
+    
+    Args:
+        precios: Lista de precios ordenados (más reciente al final)
+    
+    Returns:
+        Diccionario con indicadores o None si no hay datos suficientes
+    """
+    if len(precios) < 10:
+        return None
+    
+    # Calcular indicadores
+    momentum_simple, momentum_pct = calcular_momentum(precios, periodo=10)
+    volatilidad = calcular_volatilidad(precios, periodo=20)
+    ema = calcular_ema(precios, periodo=10)
+    roc = calcular_rate_of_change(precios, periodo=10)
+    consistencia = calcular_consistencia(precios, periodo=10)
+    
+    precio_actual = precios[-1]
+    fuerza_movimiento = calcular_fuerza_movimiento(precio_actual, ema)
+    
+    # Determinar dirección usando función local
+    direccion = determinar_direccion_simple(precios, ema, roc)
+    
+    return {
+        "momentum_simple": momentum_simple,
+        "momentum_pct": momentum_pct,
+        "volatilidad": volatilidad,
+        "tendencia_ema": ema,
+        "precio_actual": precio_actual,
+        "rate_of_change": roc,
+        "fuerza_movimiento": fuerza_movimiento,
+        "consistencia": consistencia,
+        "direccion_sugerida": direccion,
+        "ticks_analizados": len(precios),
+    }
+
+
 def determinar_direccion_simple(
     precios: List[Decimal],
     ema: Decimal,
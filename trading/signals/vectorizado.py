@@ -0,0 +1,130 @@
+"""
+Cálculo vectorizado de indicadores sobre ventanas de precios.
+
+Replica ``calcular_indicadores_precios`` (momentum, volatilidad, EMA, ROC,
+consistencia y dirección simple) para muchas ventanas a la vez. Los precios
+se manejan en unidades enteras de 0.00001 (los 5 decimales de ``Tick.precio``)
+para que las divisiones y redondeos coincidan con la aritmética Decimal del
+cálculo original.
+"""
+from decimal import Decimal
+from typing import Sequence, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from trading.ranking.vectorizado import COLUMNAS_INDICADORES
+
+# Mismas columnas que la matriz del scoring vectorizado más la dirección
+# sugerida codificada como 1 (CALL), 0 (NONE) o -1 (PUT)
+COLUMNAS_SENALES = COLUMNAS_INDICADORES + ("direccion_sugerida",)
+COL_DIRECCION = len(COLUMNAS_INDICADORES)
+
+ESCALA_PRECIO = 100_000
+PERIODO_CORTO = 10
+PERIODO_VOLATILIDAD = 20
+TICKS_MINIMOS = 10
+
+
+def precios_a_unidades(precios: Union[Sequence[Decimal], np.ndarray]) -> np.ndarray:
+    """Convierte precios (Decimal o float) a enteros en unidades de 0.00001."""
+    return np.rint(np.asarray(precios, dtype=np.float64) * ESCALA_PRECIO).astype(np.int64)
+
+
+def dividir_half_even(numerador: np.ndarray, denominador) -> np.ndarray:
+    """
+    División entera con redondeo ROUND_HALF_EVEN (el de ``Decimal.quantize``).
+    El denominador debe ser positivo.
+    """
+    cociente = np.floor_divide(numerador, denominador)
+    doble_resto = 2 * (numerador - cociente * denominador)
+    sube = (doble_resto > denominador) | (
+        (doble_resto == denominador) & (cociente % 2 == 1)
+    )
+    return cociente + sube
+
+
+def calcular_indicadores_ventanas(unidades: np.ndarray) -> np.ndarray:
+    """
+    Calcula los indicadores de cada fila de una matriz de ventanas.
+
+    Args:
+        unidades: Matriz (n_ventanas, largo) de precios en unidades enteras,
+            más reciente al final. El largo debe ser al menos ``TICKS_MINIMOS``.
+
+    Returns:
+        Matriz float64 (n_ventanas, len(COLUMNAS_SENALES))
+    """
+    unidades = np.asarray(unidades, dtype=np.int64)
+    filas, largo = unidades.shape
+    if largo < TICKS_MINIMOS:
+        raise ValueError(f"Se requieren al menos {TICKS_MINIMOS} ticks por ventana.")
+
+    cortos = unidades[:, -PERIODO_CORTO:]
+    precio = unidades[:, -1]
+
+    # Momentum porcentual con 4 decimales
+    momentum = cortos[:, -1] - cortos[:, 0]
+    momentum_pct = dividir_half_even(momentum * 10**6, cortos[:, 0]) / 10**4
+
+    # Volatilidad: desviación estándar muestral (desplazada para evitar desbordes)
+    largos = unidades[:, -PERIODO_VOLATILIDAD:]
+    n = largos.shape[1]
+    desplazados = largos - largos[:, :1]
+    suma = desplazados.sum(axis=1)
+    suma_cuadrados = (desplazados * desplazados).sum(axis=1)
+    varianza = (n * suma_cuadrados - suma * suma) / (n * (n - 1))
+    volatilidad = np.round(np.sqrt(varianza) / ESCALA_PRECIO, 4)
+
+    # EMA(10): con ventanas de 10 ticks coincide con la media simple
+    ema = dividir_half_even(cortos.sum(axis=1), PERIODO_CORTO)
+
+    # ROC: pendiente de la regresión sobre x = 0..9 (denominador 825)
+    posiciones = np.arange(PERIODO_CORTO, dtype=np.int64)
+    numerador_roc = PERIODO_CORTO * (cortos * posiciones).sum(axis=1) - posiciones.sum() * cortos.sum(
+        axis=1
+    )
+    roc = dividir_half_even(numerador_roc, 8250)
+
+    # Consistencia: racha inicial de movimientos en la misma dirección
+    direcciones = np.sign(np.diff(cortos, axis=1))
+    iguales = direcciones == direcciones[:, :1]
+    racha = np.where(iguales.all(axis=1), iguales.shape[1], np.argmin(iguales, axis=1))
+    racha = np.where(direcciones[:, 0] == 0, 0, racha)
+    consistencia = dividir_half_even(racha * 10**4, iguales.shape[1]) / 100
+
+    # Dirección simple: EMA vs precio, ROC y momentum de los últimos 5 ticks
+    votos = np.sign(ema - precio) + np.sign(roc)
+    if largo >= 5:
+        votos = votos + np.sign(unidades[:, -1] - unidades[:, -5])
+
+    matriz = np.empty((filas, len(COLUMNAS_SENALES)), dtype=np.float64)
+    matriz[:, 0] = momentum_pct
+    matriz[:, 1] = roc / 10**4
+    matriz[:, 2] = volatilidad
+    matriz[:, 3] = ema / ESCALA_PRECIO
+    matriz[:, 4] = precio / ESCALA_PRECIO
+    matriz[:, 5] = consistencia
+    matriz[:, COL_DIRECCION] = np.sign(votos)
+    return matriz
+
+
+def calcular_indicadores_serie(unidades: np.ndarray, periodo: int = 20) -> np.ndarray:
+    """
+    Indicadores para cada tick de una serie, usando los ``periodo`` ticks
+    que terminan en él (lo que vería el motor en ese instante).
+
+    Args:
+        unidades: Serie 1D de precios en unidades enteras
+        periodo: Ticks por ventana (``periodo_analisis`` del motor)
+
+    Returns:
+        Matriz (len(unidades), len(COLUMNAS_SENALES)); las filas sin ticks
+        suficientes quedan en NaN
+    """
+    unidades = np.asarray(unidades, dtype=np.int64)
+    resultado = np.full((unidades.size, len(COLUMNAS_SENALES)), np.nan)
+    if unidades.size >= periodo:
+        ventanas = sliding_window_view(unidades, periodo)
+        resultado[periodo - 1:] = calcular_indicadores_ventanas(ventanas)
+    return resultado
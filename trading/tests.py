@@ -1,3 +1,440 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import ActivoPermitido, ConfiguracionBot
+from core.monitoreo import registro_consultas
+from core.monitoreo.consultas import PRESUPUESTOS_POR_DEFECTO
+from core.services import GestorBotCore
+from historial.models import Operacion, Tick
+from trading.backtesting import HistoricoTicks, MotorBacktest, ParametrosEstrategia
+from trading.models import IndicadoresActivo, OperacionVirtual
+from trading.ranking import construir_matriz_indicadores, puntuar_activos
+from trading.ranking.scorer import calcular_score_activo, determinar_direccion
+from trading.services_profesional import MotorTradingProfesional
+from trading.signals.vectorizado import ESCALA_PRECIO
+from trading.variantes import EvaluadorSombra, VarianteEstrategia
+
+CAPA_MEMORIA = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+CONTRATO_GANADO = {
+    "proposal_open_contract": {
+        "status": "won",
+        "profit": 0.95,
+        "sell_price": 1.95,
+        "contract_id": "123456",
+    }
+}
+
+
+def crear_mercado(activos: int = 88, ticks: int = 40, semilla: int = 3) -> None:
+    """Activos habilitados con una caminata aleatoria de ticks cada uno."""
+    generador = np.random.default_rng(semilla)
+    ahora = timezone.now()
+    ActivoPermitido.objects.bulk_create(
+        [ActivoPermitido(nombre=f"SINT_{indice:03d}", habilitado=True) for indice in range(activos)]
+    )
+    filas = []
+    for indice in range(activos):
+        precios = 100 + np.cumsum(generador.normal(0, 0.05, ticks))
+        filas.extend(
+            Tick(
+                activo=f"SINT_{indice:03d}",
+                epoch=ahora - timedelta(seconds=2 * (ticks - posicion)),
+                precio=Decimal(str(round(precio, 5))),
+                pip_size=5,
+            )
+            for posicion, precio in enumerate(precios)
+        )
+    Tick.objects.bulk_create(filas)
+
+
+def crear_motor(**kwargs) -> MotorTradingProfesional:
+    """Motor sin umbrales, para que el ciclo llegue siempre a operar."""
+    motor = MotorTradingProfesional(**kwargs)
+    motor.umbral_score_minimo = Decimal("0")
+    motor.umbral_consistencia = Decimal("0")
+    motor.umbral_volatilidad_minima = Decimal("0")
+    motor.umbral_confianza_horaria = Decimal("0")
+    return motor
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("trading.services_profesional.operar_contrato_sync", return_value=CONTRATO_GANADO)
+@mock.patch("core.services.obtener_balance_sync", return_value={})
+class PresupuestoCicloProfesionalTests(TestCase):
+    """``ejecutar_ciclo`` con 88 activos dentro de su presupuesto de consultas."""
+
+    def setUp(self):
+        crear_mercado()
+        GestorBotCore().inicializar_balance(Decimal("1000.00"))
+
+    def test_ciclo_con_operacion_dentro_del_presupuesto(self, *_):
+        motor = crear_motor()
+
+        operacion = motor.ejecutar_ciclo()
+
+        self.assertIsNotNone(operacion)
+        self.assertEqual(operacion.resultado, Operacion.Resultado.GANADA)
+        medicion = registro_consultas.rutas["ejecutar_ciclo"].ultima
+        self.assertLessEqual(medicion.consultas, PRESUPUESTOS_POR_DEFECTO["ejecutar_ciclo"])
+
+    def test_ciclo_sin_operar_dentro_del_presupuesto(self, *_):
+        motor = crear_motor()
+        motor.umbral_score_minimo = Decimal("101")
+
+        self.assertIsNone(motor.ejecutar_ciclo())
+        medicion = registro_consultas.rutas["ejecutar_ciclo"].ultima
+        self.assertLessEqual(medicion.consultas, PRESUPUESTOS_POR_DEFECTO["ejecutar_ciclo"])
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True, CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("trading.services_profesional.operar_contrato_sync", return_value=CONTRATO_GANADO)
+@mock.patch("core.services.obtener_balance_sync", return_value={})
+class PresupuestoCicloEvaluacionParalelaTests(TransactionTestCase):
+    """
+    Con ``--workers-evaluacion`` los hilos leen los ticks con sus propias
+    conexiones; esas consultas también cuentan para el presupuesto.
+    """
+
+    def setUp(self):
+        crear_mercado()
+        GestorBotCore().inicializar_balance(Decimal("1000.00"))
+
+    def test_consultas_de_los_hilos_cuentan_en_el_ciclo(self, *_):
+        motor = crear_motor(workers_evaluacion=4)
+        try:
+            operacion = motor.ejecutar_ciclo()
+        finally:
+            motor.cerrar()
+
+        self.assertIsNotNone(operacion)
+        medicion = registro_consultas.rutas["ejecutar_ciclo"].ultima
+        lecturas_ticks = sum(
+            veces for forma, veces in medicion.formas.items() if '"historial_tick"' in forma
+        )
+        # Dos lecturas por lote (cortes y rangos), hechas en los hilos
+        self.assertEqual(lecturas_ticks, 2 * 4)
+        self.assertLessEqual(medicion.consultas, PRESUPUESTOS_POR_DEFECTO["ejecutar_ciclo"])
+
+
+@override_settings(CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("core.services.obtener_balance_sync", return_value={})
+class TransaccionCicloTests(TransactionTestCase):
+    """La orden se envía y se liquida sin una transacción abierta."""
+
+    def setUp(self):
+        crear_mercado(activos=4)
+        GestorBotCore().inicializar_balance(Decimal("1000.00"))
+
+    def test_orden_fuera_de_la_transaccion(self, _):
+        estados = []
+
+        def operar(**kwargs):
+            estados.append(
+                (
+                    connection.in_atomic_block,
+                    Operacion.objects.filter(resultado=Operacion.Resultado.PENDIENTE).count(),
+                    ConfiguracionBot.obtener().en_operacion,
+                )
+            )
+            return CONTRATO_GANADO
+
+        with mock.patch("trading.services_profesional.operar_contrato_sync", side_effect=operar):
+            operacion = crear_motor().ejecutar_ciclo()
+
+        # La operación pendiente y la marca en curso ya estaban confirmadas
+        self.assertEqual(estados, [(False, 1, True)])
+        self.assertEqual(operacion.resultado, Operacion.Resultado.GANADA)
+        self.assertFalse(ConfiguracionBot.obtener().en_operacion)
+
+    def test_falla_al_guardar_la_liquidacion_libera_el_bot(self, _):
+        with mock.patch(
+            "trading.services_profesional.operar_contrato_sync", return_value=CONTRATO_GANADO
+        ), mock.patch.object(
+            GestorBotCore, "registrar_resultado_operacion", side_effect=RuntimeError("bd")
+        ):
+            with self.assertRaises(RuntimeError):
+                crear_motor().ejecutar_ciclo()
+
+        self.assertFalse(ConfiguracionBot.obtener().en_operacion)
+
+
+class ParidadScoringVectorizadoTests(SimpleTestCase):
+    """``puntuar_activos`` frente a ``calcular_score_activo`` con Decimal."""
+
+    # (momentum_pct, rate_of_change, volatilidad, tendencia_ema, precio_actual,
+    # consistencia, winrate) que caen justo en un empate de redondeo
+    EMPATES = [
+        ("-3.7655", "0", "0", "100", "100", "0", None),  # momentum 12.345 -> 12.34
+        ("0.0025", "0", "0", "100", "100", "0", None),  # momentum 50.025 -> 50.02
+        ("0.0050", "0", "0", "100", "100", "0", None),  # score 30.015 -> 30.02
+        ("0.0015", "0", "0", "100", "100", "0", None),  # score 30.006 -> 30.01
+        ("0.0050", "0", "0", "100", "100", "0", None),  # mismo score que la anterior
+        ("0", "0", "0", "100", "100", "0", "49.95"),  # score 29.995 -> 30.00, pasa el umbral
+        ("4.5", "0.09", "1.8", "101.9", "100", "95", "90.00"),  # score 94: empate en el top
+        ("4.5", "0.09", "1.8", "101.9", "100", "95", "90.00"),
+        ("0", "0", "0.5", "100", "100", "40", "52.50"),  # sin dirección
+        ("1.5", "-0.02", "0.5", "100", "100", "40", "52.50"),  # CALL y PUT empatan
+    ]
+
+    def filas(self):
+        generador = np.random.default_rng(17)
+        filas = [
+            (
+                f"{generador.uniform(-6, 6):.4f}",
+                f"{generador.uniform(-0.12, 0.12):.4f}",
+                f"{generador.uniform(0, 2.5):.4f}",
+                f"{100 + generador.uniform(-3, 3):.5f}",
+                "100.00000",
+                f"{generador.uniform(0, 100):.2f}",
+                f"{generador.uniform(0, 100):.2f}" if generador.random() < 0.7 else None,
+            )
+            for _ in range(500)
+        ]
+        return filas + self.EMPATES
+
+    def test_scores_direcciones_y_top_k(self):
+        indicadores = []
+        winrates = []
+        esperados = []
+        for momentum, roc, volatilidad, ema, precio, consistencia, winrate in self.filas():
+            fila = {
+                "momentum_pct": Decimal(momentum),
+                "rate_of_change": Decimal(roc),
+                "volatilidad": Decimal(volatilidad),
+                "tendencia_ema": Decimal(ema),
+                "precio_actual": Decimal(precio),
+                "consistencia": Decimal(consistencia),
+            }
+            rendimiento = (
+                SimpleNamespace(winrate_dinamico=Decimal(winrate)) if winrate else None
+            )
+            instancia = IndicadoresActivo(**fila)
+            indicadores.append(fila)
+            winrates.append(float(winrate) if winrate else 50.0)
+            esperados.append(
+                (calcular_score_activo(instancia, rendimiento), determinar_direccion(instancia))
+            )
+
+        resultado = puntuar_activos(
+            construir_matriz_indicadores(indicadores), winrates=np.array(winrates), k=10
+        )
+
+        scores = [Decimal(f"{score:.2f}") for score in resultado.scores]
+        self.assertEqual(scores, [score for score, _ in esperados])
+        self.assertEqual(list(resultado.direcciones), [direccion for _, direccion in esperados])
+        top_decimal = sorted(range(len(esperados)), key=lambda indice: -esperados[indice][0])
+        self.assertEqual(list(resultado.top_k), top_decimal[:10])
+
+
+class BacktestSinTicksParaLiquidarTests(SimpleTestCase):
+    def test_activo_sin_ticks_para_liquidar_no_corta_el_backtest(self):
+        generador = np.random.default_rng(11)
+        epochs = np.arange(0, 6 * 3600, 2, dtype=np.float64)
+        historico = HistoricoTicks(
+            simbolos=["R_10", "R_25"],
+            epochs=[epochs, epochs.copy()],
+            unidades=[
+                int(ESCALA_PRECIO) * 100
+                + np.cumsum(generador.integers(-500, 501, epochs.size)).astype(np.int64)
+                for _ in range(2)
+            ],
+        )
+        motor = MotorBacktest(
+            historico,
+            ParametrosEstrategia(
+                umbral_score_minimo=Decimal("0"),
+                umbral_consistencia=Decimal("0"),
+                umbral_volatilidad_minima=Decimal("0"),
+            ),
+        )
+        liquidar = motor.broker.liquidar
+        llamadas = []
+
+        def sin_ticks_la_primera_vez(*args, **kwargs):
+            llamadas.append(args)
+            return None if len(llamadas) == 1 else liquidar(*args, **kwargs)
+
+        with mock.patch.object(motor.broker, "liquidar", side_effect=sin_ticks_la_primera_vez):
+            resultado = motor.ejecutar()
+
+        self.assertEqual(resultado.resumen.estadisticas["sin_liquidacion"], 1)
+        self.assertGreater(resultado.resumen.operaciones, 0)
+
+
+def variante_abierta(nombre: str, **kwargs) -> VarianteEstrategia:
+    """Variante sin umbrales: opera con cualquier activo disponible."""
+    datos = {
+        "umbral_score_minimo": Decimal("0"),
+        "umbral_consistencia": Decimal("0"),
+        "umbral_volatilidad_minima": Decimal("0"),
+        "umbral_confianza_horaria": Decimal("0"),
+        **kwargs,
+    }
+    return VarianteEstrategia(nombre=nombre, **datos)
+
+
+def indicadores_sombra(momentum: float = 0.5, ticks_analizados: int = 30) -> dict:
+    return {
+        "momentum_pct": momentum,
+        "rate_of_change": momentum,
+        "volatilidad": 0.05,
+        "tendencia_ema": 1,
+        "precio_actual": Decimal("100.00000"),
+        "consistencia": 70.0,
+        "direccion_sugerida": "CALL",
+        "ticks_analizados": ticks_analizados,
+    }
+
+
+class EvaluadorSombraTests(TestCase):
+    def setUp(self):
+        self.activos = [
+            ActivoPermitido.objects.create(nombre=nombre, habilitado=True)
+            for nombre in ("R_10", "R_25")
+        ]
+
+    def procesar(self, evaluador, indicadores=None):
+        indicadores = indicadores or [indicadores_sombra() for _ in self.activos]
+        return evaluador.procesar_ciclo(self.activos, indicadores)
+
+    def crear_ticks(self, operacion, precios, desde: int = 1):
+        """Ticks posteriores a la decisión, uno por segundo."""
+        Tick.objects.bulk_create(
+            Tick(
+                activo=operacion.activo,
+                epoch=operacion.hora_decision + timedelta(seconds=segundo),
+                precio=Decimal(precio),
+                pip_size=5,
+            )
+            for segundo, precio in enumerate(precios, start=desde)
+        )
+
+    def test_una_operacion_pendiente_por_variante(self):
+        variantes = [variante_abierta("a"), variante_abierta("b")]
+        evaluador = EvaluadorSombra(variantes)
+
+        nuevas = self.procesar(evaluador)
+
+        self.assertEqual(sorted(operacion.variante for operacion in nuevas), ["a", "b"])
+        self.assertEqual(self.procesar(evaluador), [])
+        # Un evaluador nuevo recupera las pendientes de la base
+        self.assertEqual(self.procesar(EvaluadorSombra(variantes)), [])
+        self.assertEqual(
+            OperacionVirtual.objects.filter(resultado=OperacionVirtual.Resultado.PENDIENTE).count(),
+            2,
+        )
+
+    def test_liquida_con_el_tick_duracion_mas_uno(self):
+        evaluador = EvaluadorSombra([variante_abierta("a", duracion_ticks=3)])
+        (operacion,) = self.procesar(evaluador)
+        Tick.objects.create(
+            activo=operacion.activo,
+            epoch=operacion.hora_decision - timedelta(seconds=1),
+            precio=Decimal("50.00000"),
+            pip_size=5,
+        )
+        self.crear_ticks(operacion, ["100.00000", "100.50000", "99.00000"])
+
+        self.assertEqual(evaluador.liquidar_pendientes(), 0)
+
+        self.crear_ticks(operacion, ["100.20000", "90.00000"], desde=4)
+        self.assertEqual(evaluador.liquidar_pendientes(), 1)
+
+        operacion.refresh_from_db()
+        self.assertEqual(operacion.precio_entrada, Decimal("100.00000"))
+        self.assertEqual(operacion.precio_cierre, Decimal("100.20000"))
+        self.assertEqual(operacion.hora_cierre, operacion.hora_decision + timedelta(seconds=4))
+        self.assertEqual(operacion.resultado, OperacionVirtual.Resultado.GANADA)
+
+    def test_respeta_max_trades_por_activo(self):
+        activo = self.activos[:1]
+        evaluador = EvaluadorSombra(
+            [variante_abierta("a", max_trades_por_activo=2, duracion_ticks=1)]
+        )
+        ahora = timezone.now()
+        # Ticks para liquidar cada operación antes del ciclo siguiente
+        Tick.objects.bulk_create(
+            Tick(
+                activo="R_10",
+                epoch=ahora + timedelta(seconds=segundo),
+                precio=Decimal("100.00000"),
+                pip_size=5,
+            )
+            for segundo in (1, 2)
+        )
+
+        abiertas = []
+        with mock.patch("trading.variantes.timezone.now", return_value=ahora):
+            for _ in range(3):
+                abiertas.append(len(evaluador.procesar_ciclo(activo, [indicadores_sombra()])))
+        with mock.patch(
+            "trading.variantes.timezone.now", return_value=ahora + timedelta(hours=1, seconds=1)
+        ):
+            abiertas.append(len(evaluador.procesar_ciclo(activo, [indicadores_sombra()])))
+
+        self.assertEqual(abiertas, [1, 1, 0, 1])
+
+    def test_respeta_el_cooldown_por_micro_congestion(self):
+        activo = self.activos[:1]
+        evaluador = EvaluadorSombra([variante_abierta("a")])
+        ahora = timezone.now()
+
+        with mock.patch("trading.variantes.timezone.now", return_value=ahora):
+            congestionado = evaluador.procesar_ciclo(activo, [indicadores_sombra(momentum=0.001)])
+            en_cooldown = evaluador.procesar_ciclo(activo, [indicadores_sombra()])
+        despues = ahora + timedelta(minutes=6)
+        with mock.patch("trading.variantes.timezone.now", return_value=despues):
+            liberado = evaluador.procesar_ciclo(activo, [indicadores_sombra()])
+
+        self.assertEqual((congestionado, en_cooldown), ([], []))
+        self.assertEqual(
+            evaluador._estado["a"].cooldown_hasta[activo[0].id], ahora + timedelta(minutes=5)
+        )
+        self.assertEqual([operacion.activo for operacion in liberado], ["R_10"])
+
+
+@override_settings(CHANNEL_LAYERS=CAPA_MEMORIA)
+@mock.patch("trading.services_profesional.operar_contrato_sync", return_value=CONTRATO_GANADO)
+@mock.patch("core.services.obtener_balance_sync", return_value={})
+class EvaluadorSombraCicloTests(TestCase):
+    """Las variantes en modo sombra nunca cortan el ciclo del motor."""
+
+    def setUp(self):
+        crear_mercado(activos=4)
+        GestorBotCore().inicializar_balance(Decimal("1000.00"))
+
+    def test_error_del_evaluador_no_corta_el_ciclo(self, *_):
+        evaluador = EvaluadorSombra([variante_abierta("a")])
+        motor = crear_motor(evaluador_sombra=evaluador)
+
+        def fallar(*args, **kwargs):
+            OperacionVirtual.objects.create(
+                variante="a",
+                activo="SINT_000",
+                direccion="CALL",
+                hora_decision=timezone.now(),
+                precio_decision=Decimal("100"),
+            )
+            raise RuntimeError("variante rota")
+
+        with mock.patch.object(evaluador, "procesar_ciclo", side_effect=fallar), mock.patch.object(
+            motor, "_enviar_evento", wraps=motor._enviar_evento
+        ) as enviar:
+            operacion = motor.ejecutar_ciclo()
+
+        self.assertEqual(operacion.resultado, Operacion.Resultado.GANADA)
+        # Lo que la variante alcanzó a escribir se revierte
+        self.assertFalse(OperacionVirtual.objects.exists())
+        errores = [
+            evento["mensaje"]
+            for (evento,), _ in enviar.call_args_list
+            if evento["tipo"] == "error"
+        ]
+        self.assertEqual(errores, ["Error evaluando variantes en modo sombra: variante rota"])
@@ -0,0 +1,356 @@
+"""
+Evaluación de variantes de estrategia en modo sombra (paper trading).
+
+Las variantes corren junto al MotorTradingProfesional sobre los mismos
+ticks: los indicadores se calculan una sola vez por ciclo y cada variante
+solo agrega una pasada de scoring vectorizado. Sus decisiones se guardan
+como ``OperacionVirtual`` y se liquidan con los ticks posteriores.
+"""
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Deque, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from core.models import ActivoPermitido
+from historial.models import Operacion, Tick
+from trading.models import OperacionVirtual, RendimientoActivo
+from trading.ranking.scorer import PesosScoring
+from trading.ranking.vectorizado import (
+    COL_CONSISTENCIA,
+    COL_MOMENTUM,
+    COL_VOLATILIDAD,
+    calcular_cotas_superiores,
+    calcular_scores_vectorizados,
+    construir_matriz_indicadores,
+    determinar_direcciones_vectorizado,
+    seleccionar_top_k,
+    vector_pesos,
+)
+from trading.scheduler import obtener_confianza_horaria
+
+DIRECCION_SIMPLE = "simple"  # determinar_direccion_simple (la del motor)
+DIRECCION_RANKING = "ranking"  # trading.ranking.determinar_direccion
+
+
+@dataclass
+class VarianteEstrategia:
+    """
+    Parámetros de una variante. El ``periodo_analisis`` es el del motor,
+    porque los indicadores se comparten.
+    """
+    nombre: str
+    pesos: object = PesosScoring
+    umbral_score_minimo: Decimal = Decimal("40.00")
+    umbral_consistencia: Decimal = Decimal("30.00")
+    umbral_volatilidad_minima: Decimal = Decimal("0.001")
+    umbral_confianza_horaria: Decimal = Decimal("45.00")
+    max_trades_por_activo: int = 1
+    direccion: str = DIRECCION_SIMPLE
+    duracion_ticks: int = 5
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> "VarianteEstrategia":
+        """Construye una variante desde JSON (decimales como texto o número)."""
+        variante = cls(nombre=str(datos["nombre"])[:40])
+        for campo in (
+            "umbral_score_minimo",
+            "umbral_consistencia",
+            "umbral_volatilidad_minima",
+            "umbral_confianza_horaria",
+        ):
+            if campo in datos:
+                setattr(variante, campo, Decimal(str(datos[campo])))
+        for campo in ("max_trades_por_activo", "duracion_ticks"):
+            if campo in datos:
+                setattr(variante, campo, int(datos[campo]))
+        if "pesos" in datos:
+            variante.pesos = np.array(datos["pesos"], dtype=np.float64)
+        if "direccion" in datos:
+            if datos["direccion"] not in (DIRECCION_SIMPLE, DIRECCION_RANKING):
+                raise ValueError(f"Dirección desconocida: {datos['direccion']}")
+            variante.direccion = datos["direccion"]
+        return variante
+
+
+def variantes_predefinidas() -> List[VarianteEstrategia]:
+    """Variantes de referencia: la configuración del motor y desvíos simples."""
+    return [
+        VarianteEstrategia(nombre="motor"),
+        VarianteEstrategia(nombre="direccion_ranking", direccion=DIRECCION_RANKING),
+        VarianteEstrategia(nombre="umbral_35", umbral_score_minimo=Decimal("35.00")),
+        VarianteEstrategia(nombre="umbral_45", umbral_score_minimo=Decimal("45.00")),
+        VarianteEstrategia(
+            nombre="pesos_tendencia",
+            pesos=np.array([0.20, 0.15, 0.10, 0.35, 0.10, 0.10]),
+        ),
+    ]
+
+
+def cargar_variantes(origen: str) -> List[VarianteEstrategia]:
+    """
+    Carga variantes desde un archivo JSON (lista de objetos) o devuelve las
+    predefinidas si ``origen`` es "predefinidas".
+    """
+    if origen == "predefinidas":
+        return variantes_predefinidas()
+    with open(origen, encoding="utf-8") as archivo:
+        return [VarianteEstrategia.desde_dict(datos) for datos in json.load(archivo)]
+
+
+@dataclass
+class _EstadoVariante:
+    cooldown_hasta: Dict[int, datetime] = field(default_factory=dict)
+    operaciones_recientes: Dict[int, Deque[datetime]] = field(
+        default_factory=lambda: defaultdict(deque)
+    )
+    pendiente: Optional[OperacionVirtual] = None
+
+
+class EvaluadorSombra:
+    """
+    Ejecuta las variantes sobre los indicadores de un ciclo del motor.
+
+    Cada variante mantiene en memoria sus propios cooldowns y límites por
+    activo y, como el motor, tiene como máximo una operación abierta.
+    """
+
+    def __init__(self, variantes: Sequence[VarianteEstrategia]) -> None:
+        nombres = [variante.nombre for variante in variantes]
+        if len(set(nombres)) != len(nombres):
+            raise ValueError("Los nombres de las variantes deben ser únicos.")
+        self.variantes = list(variantes)
+        self._pesos = {variante.nombre: vector_pesos(variante.pesos) for variante in variantes}
+        self._estado = {variante.nombre: _EstadoVariante() for variante in variantes}
+        for pendiente in OperacionVirtual.objects.filter(
+            variante__in=nombres, resultado=OperacionVirtual.Resultado.PENDIENTE
+        ):
+            self._estado[pendiente.variante].pendiente = pendiente
+
+    def procesar_ciclo(
+        self,
+        activos: Sequence[ActivoPermitido],
+        indicadores: Sequence[Optional[Dict]],
+        confianza_conocida: Optional[Dict[int, Decimal]] = None,
+    ) -> List[OperacionVirtual]:
+        """
+        Liquida las operaciones virtuales pendientes y evalúa todas las variantes.
+
+        Args:
+            activos: Activos habilitados del ciclo
+            indicadores: Indicadores de cada activo (None si no hay datos)
+            confianza_conocida: Confianza horaria ya calculada por el motor
+                en este ciclo, por id de activo
+
+        Returns:
+            Operaciones virtuales abiertas en este ciclo
+        """
+        self.liquidar_pendientes()
+
+        con_datos = [
+            (activo, datos) for activo, datos in zip(activos, indicadores) if datos
+        ]
+        if not con_datos:
+            return []
+        activos_datos = [activo for activo, _ in con_datos]
+        datos = [dato for _, dato in con_datos]
+
+        # Trabajo compartido por todas las variantes
+        matriz = construir_matriz_indicadores(datos)
+        direcciones = {
+            DIRECCION_SIMPLE: np.array([dato["direccion_sugerida"] for dato in datos]),
+            DIRECCION_RANKING: determinar_direcciones_vectorizado(matriz),
+        }
+        winrates = self._winrates_historial(activos_datos)
+        confianza = dict(confianza_conocida or {})
+        ahora = timezone.now()
+
+        nuevas = []
+        for variante in self.variantes:
+            estado = self._estado[variante.nombre]
+            if estado.pendiente is not None:
+                continue
+            operacion = self._evaluar_variante(
+                variante, estado, activos_datos, datos, matriz, direcciones,
+                winrates, confianza, ahora,
+            )
+            if operacion is not None:
+                nuevas.append(operacion)
+
+        if nuevas:
+            OperacionVirtual.objects.bulk_create(nuevas)
+            for operacion in nuevas:
+                self._estado[operacion.variante].pendiente = operacion
+        return nuevas
+
+    def _winrates_historial(self, activos: Sequence[ActivoPermitido]) -> np.ndarray:
+        """Mejor winrate dinámico por activo (el que usa el scoring del motor)."""
+        mejores = dict(
+            RendimientoActivo.objects.filter(activo__in=activos)
+            .values("activo_id")
+            .annotate(mejor=Max("winrate_dinamico"))
+            .values_list("activo_id", "mejor")
+        )
+        return np.array([float(mejores.get(activo.id, 50)) for activo in activos])
+
+    def _evaluar_variante(
+        self,
+        variante: VarianteEstrategia,
+        estado: _EstadoVariante,
+        activos: List[ActivoPermitido],
+        datos: List[Dict],
+        matriz: np.ndarray,
+        direcciones: Dict[str, np.ndarray],
+        winrates: np.ndarray,
+        confianza: Dict[int, Decimal],
+        ahora: datetime,
+    ) -> Optional[OperacionVirtual]:
+        hace_una_hora = ahora - timedelta(hours=1)
+        candidatos = []
+        for indice, activo in enumerate(activos):
+            if estado.cooldown_hasta.get(activo.id, ahora) > ahora:
+                continue
+            recientes = estado.operaciones_recientes[activo.id]
+            while recientes and recientes[0] < hace_una_hora:
+                recientes.popleft()
+            if len(recientes) >= variante.max_trades_por_activo:
+                continue
+            fila = matriz[indice]
+            if fila[COL_VOLATILIDAD] < float(variante.umbral_volatilidad_minima):
+                continue
+            if fila[COL_CONSISTENCIA] < float(variante.umbral_consistencia):
+                continue
+            if abs(fila[COL_MOMENTUM]) < 0.01 and datos[indice]["ticks_analizados"] > 10:
+                estado.cooldown_hasta[activo.id] = ahora + timedelta(minutes=5)
+                continue
+            candidatos.append(indice)
+        if not candidatos:
+            return None
+
+        seleccion = np.array(candidatos)
+        pesos = self._pesos[variante.nombre]
+        scores = calcular_scores_vectorizados(
+            matriz[seleccion],
+            winrates=winrates[seleccion],
+            pesos=pesos,
+            umbral_minimo=variante.umbral_score_minimo,
+        )
+        orden = seleccionar_top_k(
+            calcular_cotas_superiores(matriz[seleccion], pesos), k=len(candidatos)
+        )
+        # Confianza horaria solo para quien puede ganar (cacheada entre variantes)
+        for posicion in orden:
+            if scores[posicion] < float(variante.umbral_score_minimo):
+                continue
+            activo = activos[candidatos[posicion]]
+            if activo.id not in confianza:
+                confianza[activo.id] = obtener_confianza_horaria(activo)
+            if confianza[activo.id] < variante.umbral_confianza_horaria:
+                scores[posicion] *= 0.5
+
+        mejor = max(orden, key=lambda posicion: scores[posicion])
+        score = scores[mejor]
+        if score < float(variante.umbral_score_minimo):
+            return None
+
+        indice = candidatos[mejor]
+        direccion = direcciones[variante.direccion][indice]
+        if direccion == "NONE":
+            momentum = matriz[indice, COL_MOMENTUM]
+            if momentum == 0:
+                return None
+            direccion = "CALL" if momentum > 0 else "PUT"
+
+        activo = activos[indice]
+        estado.operaciones_recientes[activo.id].append(ahora)
+        return OperacionVirtual(
+            variante=variante.nombre,
+            activo=activo.nombre,
+            direccion=direccion,
+            score=Decimal(str(score)).quantize(Decimal("0.01")),
+            duracion_ticks=variante.duracion_ticks,
+            hora_decision=ahora,
+            precio_decision=datos[indice]["precio_actual"],
+        )
+
+    def liquidar_pendientes(self) -> int:
+        """
+        Liquida las operaciones abiertas cuyos ticks de salida ya existen.
+        La entrada es el primer tick posterior a la decisión, como en el broker.
+        """
+        liquidadas = []
+        for estado in self._estado.values():
+            operacion = estado.pendiente
+            if operacion is None:
+                continue
+            ticks = list(
+                Tick.objects.filter(activo=operacion.activo, epoch__gt=operacion.hora_decision)
+                .order_by("epoch")
+                .values_list("epoch", "precio")[: operacion.duracion_ticks + 1]
+            )
+            if len(ticks) <= operacion.duracion_ticks:
+                continue
+            (hora_entrada, entrada), (hora_cierre, cierre) = ticks[0], ticks[-1]
+            ganada = cierre > entrada if operacion.direccion == "CALL" else cierre < entrada
+            operacion.hora_entrada = hora_entrada
+            operacion.precio_entrada = entrada
+            operacion.hora_cierre = hora_cierre
+            operacion.precio_cierre = cierre
+            operacion.resultado = (
+                OperacionVirtual.Resultado.GANADA if ganada else OperacionVirtual.Resultado.PERDIDA
+            )
+            liquidadas.append(operacion)
+            estado.pendiente = None
+
+        if liquidadas:
+            OperacionVirtual.objects.bulk_update(
+                liquidadas,
+                ["hora_entrada", "precio_entrada", "hora_cierre", "precio_cierre", "resultado"],
+            )
+        return len(liquidadas)
+
+
+def resumen_variantes(desde: Optional[datetime] = None, pago: Decimal = Decimal("0.95")) -> List[Dict]:
+    """
+    Comparación de las variantes (y del motor real) desde una fecha.
+
+    El rendimiento por unidad es ``winrate * pago - (1 - winrate)``: lo que
+    se gana o pierde en promedio por cada unidad invertida.
+    """
+    filtro = Q()
+    if desde is not None:
+        filtro = Q(hora_decision__gte=desde)
+    filas = list(
+        OperacionVirtual.objects.filter(filtro)
+        .values("variante")
+        .annotate(
+            total=Count("id", filter=~Q(resultado=OperacionVirtual.Resultado.PENDIENTE)),
+            ganadas=Count("id", filter=Q(resultado=OperacionVirtual.Resultado.GANADA)),
+            pendientes=Count("id", filter=Q(resultado=OperacionVirtual.Resultado.PENDIENTE)),
+        )
+        .order_by("variante")
+    )
+
+    reales = Operacion.objetos.reales().exclude(resultado=Operacion.Resultado.PENDIENTE)
+    if desde is not None:
+        reales = reales.filter(hora_inicio__gte=desde)
+    filas.append(
+        {
+            "variante": "(real)",
+            "total": reales.count(),
+            "ganadas": reales.ganadas().count(),
+            "pendientes": 0,
+        }
+    )
+
+    for fila in filas:
+        total = fila["total"]
+        winrate = Decimal(fila["ganadas"]) / Decimal(total) if total else Decimal("0")
+        fila["winrate"] = (winrate * 100).quantize(Decimal("0.01"))
+        fila["rendimiento_unitario"] = (winrate * pago - (1 - winrate)).quantize(Decimal("0.0001"))
+    return sorted(filas, key=lambda fila: fila["rendimiento_unitario"], reverse=True)